@@ -2,7 +2,7 @@
 Configuración centralizada de la aplicación.
 """
 import os
-from typing import Dict
+from typing import Any, Dict, List, Optional, Tuple
 
 
 class Settings:
@@ -21,17 +21,264 @@ class Settings:
     
     # Workspace
     WORKSPACE_DIR: str = "/workspace"
-    
+
+    # Archivos de proyectos subidos, deduplicados por hash de contenido
+    BLOB_DIR: str = os.getenv("BLOB_DIR", os.path.join(WORKSPACE_DIR, ".blobs"))
+    # Límites de POST /analyze/project: bytes recibidos (archivo comprimido o
+    # multipart), bytes por archivo, bytes descomprimidos y archivos por proyecto
+    PROJECT_MAX_UPLOAD_BYTES: int = int(os.getenv("PROJECT_MAX_UPLOAD_BYTES", str(20 * 1024 * 1024)))
+    PROJECT_MAX_FILE_BYTES: int = int(os.getenv("PROJECT_MAX_FILE_BYTES", str(1024 * 1024)))
+    PROJECT_MAX_TOTAL_BYTES: int = int(os.getenv("PROJECT_MAX_TOTAL_BYTES", str(50 * 1024 * 1024)))
+    PROJECT_MAX_FILES: int = int(os.getenv("PROJECT_MAX_FILES", "2000"))
+
+    # Salidas de las herramientas (stdout/stderr) de más de estos bytes se
+    # guardan en <workspace>/<analysis_id>/.outputs y el análisis conserva una
+    # referencia con una vista previa de TOOL_OUTPUT_PREVIEW_CHARS (0 desactiva)
+    TOOL_OUTPUT_SPILL_BYTES: int = int(os.getenv("TOOL_OUTPUT_SPILL_BYTES", str(64 * 1024)))
+    TOOL_OUTPUT_PREVIEW_CHARS: int = int(os.getenv("TOOL_OUTPUT_PREVIEW_CHARS", "4000"))
+    # Las salidas guardadas se borran a los TOOL_OUTPUT_TTL segundos (igual que
+    # los reportes reutilizables que las citan), revisando cada
+    # TOOL_OUTPUT_SWEEP_INTERVAL segundos
+    TOOL_OUTPUT_TTL: float = float(os.getenv("TOOL_OUTPUT_TTL", str(7 * 24 * 3600)))
+    TOOL_OUTPUT_SWEEP_INTERVAL: float = float(os.getenv("TOOL_OUTPUT_SWEEP_INTERVAL", "3600"))
+
+    # Historial de análisis (SQLite embebido)
+    HISTORY_ENABLED: bool = os.getenv("HISTORY_ENABLED", "true").lower() == "true"
+    HISTORY_DB_PATH: str = os.getenv("HISTORY_DB_PATH", os.path.join(WORKSPACE_DIR, ".history", "analyses.db"))
+    # Tamaño máximo de página de GET /analyses
+    HISTORY_PAGE_MAX: int = 200
+
+    # Índice de huellas de código ya analizado (contratos y funciones normalizados)
+    FINGERPRINT_ENABLED: bool = os.getenv("FINGERPRINT_ENABLED", "true").lower() == "true"
+    FINGERPRINT_DB_PATH: str = os.getenv(
+        "FINGERPRINT_DB_PATH", os.path.join(WORKSPACE_DIR, ".history", "fingerprints.db")
+    )
+    # Reutilizar el reporte del mismo código exacto (mismo SHA-256) analizado
+    # sin corrección automática hace menos de este tiempo
+    FINGERPRINT_REUSE_REPORTS: bool = os.getenv("FINGERPRINT_REUSE_REPORTS", "true").lower() == "true"
+    FINGERPRINT_REPORT_TTL: float = float(os.getenv("FINGERPRINT_REPORT_TTL", str(7 * 24 * 3600)))
+    # Saltear el fuzzing si todos los contratos son de biblioteca o ya se
+    # fuzzearon sin hallazgos
+    FINGERPRINT_SKIP_KNOWN_FUZZING: bool = (
+        os.getenv("FINGERPRINT_SKIP_KNOWN_FUZZING", "true").lower() == "true"
+    )
+
     # Gemini AI
     GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY", "")
     GEMINI_MODEL: str = os.getenv("GEMINI_MODEL", "gemini-pro")
-    
+    # Modelos por nivel: "fast" para resúmenes simples, "strong" para reescrituras
+    GEMINI_MODELS: Dict[str, str] = {
+        "fast": os.getenv("GEMINI_FAST_MODEL", "gemini-2.0-flash"),
+        "strong": os.getenv("GEMINI_STRONG_MODEL", GEMINI_MODEL),
+    }
+    # Timeout por intento según el nivel; al vencer se pasa al siguiente modelo
+    GEMINI_TIMEOUTS: Dict[str, float] = {
+        "fast": float(os.getenv("GEMINI_FAST_TIMEOUT", "45")),
+        "strong": float(os.getenv("GEMINI_STRONG_TIMEOUT", "120")),
+    }
+    # Si es False se usa el modelo "strong" del backend para todas las llamadas
+    MODEL_ROUTING_ENABLED: bool = os.getenv("MODEL_ROUTING_ENABLED", "true").lower() == "true"
+    # Reglas evaluadas en orden; la primera que coincide define la cadena de
+    # modelos (el primero se usa y los siguientes son fallback)
+    MODEL_ROUTING_RULES: List[Dict[str, Any]] = [
+        # Reporte sin hallazgos relevantes: basta un modelo rápido
+        {
+            "name": "clean_summary",
+            "call_type": "analysis",
+            "max_severity": "low",
+            "max_prompt_chars": 60000,
+            "chain": ["fast", "strong"],
+        },
+        {"name": "analysis", "call_type": "analysis", "chain": ["strong", "fast"]},
+        # Las reescrituras usan siempre el modelo fuerte primero
+        {"name": "fix", "call_type": "fix", "chain": ["strong", "fast"]},
+    ]
+    # Backend de LLM del despliegue: "gemini", "openai" (servidor compatible
+    # con OpenAI, p. ej. inferencia local) o "stub" (respuestas fijas)
+    LLM_BACKEND: str = os.getenv("LLM_BACKEND", "gemini")
+    # Backend por tipo de llamada, p. ej. "analysis=openai,fix=gemini"
+    LLM_CALL_TYPE_BACKENDS: Dict[str, str] = dict(
+        tuple(part.strip() for part in item.split("=", 1))
+        for item in os.getenv("LLM_CALL_TYPE_BACKENDS", "").split(",")
+        if "=" in item
+    )
+    OPENAI_COMPAT_BASE_URL: str = os.getenv("OPENAI_COMPAT_BASE_URL", "http://localhost:8080/v1")
+    OPENAI_COMPAT_API_KEY: str = os.getenv("OPENAI_COMPAT_API_KEY", "")
+    OPENAI_COMPAT_MODELS: Dict[str, str] = {
+        "fast": os.getenv("OPENAI_COMPAT_FAST_MODEL", os.getenv("OPENAI_COMPAT_MODEL", "local-model")),
+        "strong": os.getenv("OPENAI_COMPAT_STRONG_MODEL", os.getenv("OPENAI_COMPAT_MODEL", "local-model")),
+    }
+    # La inferencia local suele ser más lenta que la remota
+    OPENAI_COMPAT_TIMEOUTS: Dict[str, float] = {
+        "fast": float(os.getenv("OPENAI_COMPAT_FAST_TIMEOUT", "120")),
+        "strong": float(os.getenv("OPENAI_COMPAT_STRONG_TIMEOUT", "300")),
+    }
+    # Archivo JSON con las respuestas del backend stub (opcional)
+    LLM_STUB_RESPONSES: str = os.getenv("LLM_STUB_RESPONSES", "")
+    # Generación en streaming con parseo JSON incremental
+    LLM_STREAMING: bool = os.getenv("LLM_STREAMING", "true").lower() == "true"
+    # Reintentos inmediatos por modelo cuando la respuesta deja de ser JSON válido
+    LLM_MALFORMED_RETRIES: int = int(os.getenv("LLM_MALFORMED_RETRIES", "1"))
+
     # Timeouts
     SERVICE_TIMEOUT: float = 300.0
+    # Timeout para las solicitudes de cancelación a los microservicios
+    CANCEL_TIMEOUT: float = 5.0
+    # Consumir /analyze/stream de los microservicios (progreso en vivo)
+    STREAM_TOOL_OUTPUT: bool = os.getenv("STREAM_TOOL_OUTPUT", "true").lower() == "true"
+    # Intervalo de sondeo de desconexión del cliente en /analyze
+    DISCONNECT_POLL_INTERVAL: float = 1.0
+    # Planificación justa de las llamadas a las herramientas
+    SCHEDULER_ENABLED: bool = os.getenv("SCHEDULER_ENABLED", "true").lower() == "true"
+    # Llamadas simultáneas por servicio (igual al MAX_CONCURRENCY de cada herramienta)
+    TOOL_SLOTS: Dict[str, int] = {
+        "slither": int(os.getenv("SLITHER_SLOTS", "1")),
+        "solc": int(os.getenv("SOLC_SLOTS", "2")),
+        "medusa": int(os.getenv("MEDUSA_SLOTS", "1")),
+        "echidna": int(os.getenv("ECHIDNA_SLOTS", "1")),
+    }
+    # Peso de cada clase de prioridad en la cola justa
+    PRIORITY_WEIGHTS: Dict[str, float] = {"interactive": 4.0, "batch": 1.0}
+    # Análisis activos por cliente y clase
+    CLIENT_MAX_ACTIVE: Dict[str, int] = {
+        "interactive": int(os.getenv("CLIENT_MAX_ACTIVE_INTERACTIVE", "4")),
+        "batch": int(os.getenv("CLIENT_MAX_ACTIVE_BATCH", "8")),
+    }
+    # Total de análisis activos a partir del cual se rechaza cada clase
+    # (batch se corta antes para dejar lugar a los interactivos)
+    ADMISSION_MAX_ACTIVE: Dict[str, int] = {
+        "interactive": int(os.getenv("ADMISSION_MAX_ACTIVE_INTERACTIVE", "64")),
+        "batch": int(os.getenv("ADMISSION_MAX_ACTIVE_BATCH", "32")),
+    }
+    # Suavizado de los tiempos de servicio observados y valor inicial
+    SCHEDULER_EWMA_ALPHA: float = 0.2
+    SCHEDULER_DEFAULT_SERVICE_SECONDS: float = 30.0
+    # Estado compartido entre workers: "local" (un proceso), "sqlite" (workers
+    # del mismo host) o "redis" (varios nodos, servidor compatible con Redis)
+    SHARED_STATE_BACKEND: str = os.getenv("SHARED_STATE_BACKEND", "local")
+    SHARED_STATE_PATH: str = os.getenv(
+        "SHARED_STATE_PATH", os.path.join(WORKSPACE_DIR, ".state", "shared_state.db")
+    )
+    SHARED_STATE_URL: str = os.getenv("SHARED_STATE_URL", "redis://redis:6379/0")
+    SHARED_STATE_PREFIX: str = os.getenv("SHARED_STATE_PREFIX", "eth-api:")
+    # Timeout de cada operación contra el backend
+    SHARED_STATE_TIMEOUT: float = 5.0
+    # Sondeo de slots libres, resultados y cancelaciones de otros workers
+    SHARED_STATE_POLL_INTERVAL: float = float(os.getenv("SHARED_STATE_POLL_INTERVAL", "0.5"))
+    # Vigencia de la marca de un trabajo o análisis en curso; el worker dueño
+    # la renueva, y si muere la marca expira sola
+    JOB_LEASE_TTL: float = 30.0
+    # Resultado de un análisis disponible para pedidos idénticos de otros workers
+    SHARED_RESULT_TTL: float = float(os.getenv("SHARED_RESULT_TTL", "60"))
+    # Vigencia máxima de un lugar de admisión (cota de la duración de un análisis)
+    ADMISSION_LEASE_TTL: float = float(os.getenv("ADMISSION_LEASE_TTL", "3600"))
+    # Procesos de uvicorn (lo usa el CMD del Dockerfile; con más de uno el
+    # backend debe ser sqlite o redis)
+    API_WORKERS: int = int(os.getenv("API_WORKERS", "1"))
+    # Lotes (POST /analyze/batch): contratos por lote, contratos en análisis a
+    # la vez (0 = el doble de los slots del servicio más ancho) y espera
+    # máxima entre reintentos cuando la admisión rechaza un contrato
+    BATCH_MAX_ITEMS: int = int(os.getenv("BATCH_MAX_ITEMS", "10000"))
+    BATCH_CONCURRENCY: int = int(os.getenv("BATCH_CONCURRENCY", "0"))
+    BATCH_ADMISSION_RETRY_MAX: float = float(os.getenv("BATCH_ADMISSION_RETRY_MAX", "30"))
+    # Tamaño máximo del código de cada contrato del lote (caracteres)
+    BATCH_MAX_CODE_CHARS: int = int(os.getenv("BATCH_MAX_CODE_CHARS", str(256 * 1024)))
+    # Unir pedidos concurrentes con el mismo código y opciones en un análisis
+    COALESCING_ENABLED: bool = os.getenv("COALESCING_ENABLED", "true").lower() == "true"
+    # Reglas de corte anticipado de las herramientas (separadas por comas)
+    SHORT_CIRCUIT_RULES: List[str] = [
+        rule.strip()
+        for rule in os.getenv("SHORT_CIRCUIT_RULES", "solc_compile_error").split(",")
+        if rule.strip()
+    ]
+    # Reglas de ruteo según la estructura del código (ver ROUTING_RULES)
+    TOOL_ROUTING_RULES: List[str] = [
+        rule.strip()
+        for rule in os.getenv(
+            "TOOL_ROUTING_RULES", "unsupported_compiler,no_deployable_contract,no_entry_points"
+        ).split(",")
+        if rule.strip()
+    ]
+    # Versiones de solc instaladas en las imágenes de las herramientas
+    SOLC_VERSIONS: List[str] = [
+        version.strip()
+        for version in os.getenv("SOLC_VERSIONS", "0.8.20").split(",")
+        if version.strip()
+    ]
+    # Readiness de los microservicios (GET /ready)
+    READINESS_TIMEOUT: float = 2.0
+    READINESS_CACHE_TTL: float = 5.0
+    READINESS_POLL_INTERVAL: float = 2.0
+    # Espera máxima a que una herramienta esté lista antes de omitirla
+    READINESS_WAIT_TIMEOUT: float = float(os.getenv("READINESS_WAIT_TIMEOUT", "60"))
+    # Margen sobre el timeout de cada herramienta (compilación, E/S, red)
+    SERVICE_TIMEOUT_MARGIN: float = float(os.getenv("SERVICE_TIMEOUT_MARGIN", "90"))
+    
+    # Presupuesto por complejidad del contrato
+    BUDGET_COMPLEXITY_WEIGHTS: Dict[str, float] = {
+        "contracts": 2.0,
+        "functions": 1.0,
+        "modifiers": 0.5,
+        "state_variables": 0.5,
+        "external_calls": 3.0,
+        "loops": 2.0,
+        "lines": 0.05,
+    }
+    # (nivel, puntuación máxima); el último nivel no tiene límite
+    BUDGET_TIER_THRESHOLDS: List[Tuple[str, Optional[float]]] = [
+        ("small", 20),
+        ("medium", 60),
+        ("large", 180),
+        ("xlarge", None),
+    ]
+    TOOL_BUDGETS: Dict[str, Dict[str, Dict[str, int]]] = {
+        "small": {
+            "slither": {"timeout": 60},
+            "solc": {"timeout": 30},
+            "medusa": {"timeout": 45, "workers": 1},
+            "echidna": {"timeout": 60, "test_limit": 20000, "workers": 1},
+        },
+        "medium": {
+            "slither": {"timeout": 120},
+            "solc": {"timeout": 60},
+            "medusa": {"timeout": 90, "workers": 2},
+            "echidna": {"timeout": 120, "test_limit": 50000, "workers": 2},
+        },
+        "large": {
+            "slither": {"timeout": 240},
+            "solc": {"timeout": 120},
+            "medusa": {"timeout": 180, "workers": 2},
+            "echidna": {"timeout": 240, "test_limit": 150000, "workers": 2},
+        },
+        "xlarge": {
+            "slither": {"timeout": 420},
+            "solc": {"timeout": 180},
+            "medusa": {"timeout": 360, "workers": 2},
+            "echidna": {"timeout": 480, "test_limit": 400000, "workers": 2},
+        },
+    }
     
     # Límites de reintentos para corrección automática
     MAX_FIX_RETRIES: int = 3
-    
+
+    # Modo de corrección: "patch" (ediciones aplicadas localmente, con
+    # reescritura completa si no aplican), "rewrite" (contrato completo) o
+    # "auto" (patch a partir de FIX_PATCH_MIN_LINES líneas)
+    FIX_MODE: str = os.getenv("FIX_MODE", "auto")
+    FIX_PATCH_MIN_LINES: int = int(os.getenv("FIX_PATCH_MIN_LINES", "40"))
+
+    # Candidatos de corrección generados y validados en paralelo por intento
+    # (1 = corrección secuencial)
+    FIX_CANDIDATES: int = int(os.getenv("FIX_CANDIDATES", "1"))
+    # Temperatura de los candidatos adicionales (el primero usa la del modelo)
+    FIX_CANDIDATE_TEMPERATURE: float = float(os.getenv("FIX_CANDIDATE_TEMPERATURE", "0.9"))
+    # Impactos de Slither que descartan un candidato
+    FIX_CANDIDATE_BLOCKING_IMPACTS: List[str] = [
+        impact.strip().lower()
+        for impact in os.getenv("FIX_CANDIDATE_BLOCKING_IMPACTS", "high,medium").split(",")
+        if impact.strip()
+    ]
+
     @property
     def services(self) -> Dict[str, str]:
         """Retorna diccionario de servicios disponibles."""
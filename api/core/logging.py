@@ -2,15 +2,19 @@
 Configuración de logging para la aplicación.
 """
 import logging
+
 from core.config import settings
+from log_runtime import setup_logging as setup_shared_logging
 
 
 def setup_logging():
-    """Configura el sistema de logging."""
-    logging.basicConfig(
-        level=settings.LOG_LEVEL,
-        format="[%(asctime)s] %(levelname)s %(name)s - %(message)s"
-    )
+    """
+    Configura el sistema de logging.
+
+    Usa el logging compartido con los microservicios (log_runtime): cola no
+    bloqueante, registros JSON con tamaño acotado y muestreo de payloads.
+    """
+    setup_shared_logging("api", level=settings.LOG_LEVEL)
 
 
 def get_logger(name: str) -> logging.Logger:
@@ -1,15 +1,20 @@
 """
 Aplicación principal FastAPI.
 """
+import asyncio
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from core.config import settings
-from core.logging import setup_logging
-from routes import analysis, general
+from core.logging import get_logger, setup_logging
+from routes import analysis, fingerprints, general, history, jobs
+from services.shared_state import shared_state
+from services.tool_outputs import sweep_outputs_periodically
 
 # Configurar logging
 setup_logging()
+logger = get_logger(__name__)
 
 # Crear aplicación
 app = FastAPI(
@@ -27,9 +32,36 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+async def check_shared_state():
+    if settings.API_WORKERS > 1 and not shared_state.distributed:
+        logger.warning(
+            f"API_WORKERS={settings.API_WORKERS} with the local shared state backend: "
+            "jobs, coalescing, tool slots and admission are not coordinated across workers"
+        )
+
+
+@app.on_event("startup")
+async def start_output_sweeper():
+    app.state.output_sweeper = asyncio.ensure_future(sweep_outputs_periodically())
+
+
+@app.on_event("shutdown")
+async def close_shared_state():
+    await shared_state.close()
+
+
+@app.on_event("shutdown")
+async def stop_output_sweeper():
+    app.state.output_sweeper.cancel()
+
+
 # Registrar routers
 app.include_router(general.router, tags=["General"])
 app.include_router(analysis.router, tags=["Analysis"])
+app.include_router(jobs.router, tags=["Jobs"])
+app.include_router(history.router, tags=["History"])
+app.include_router(fingerprints.router, tags=["Fingerprints"])
 
 
 if __name__ == "__main__":
@@ -1,7 +1,25 @@
 """
 Modelos Pydantic para la API.
 """
-from pydantic import BaseModel, Field
+from typing import List, Optional
+
+from pydantic import BaseModel, Field, field_validator
+
+from core.config import settings
+
+
+def _relative_filename(value: str) -> str:
+    """
+    Normaliza un nombre de archivo relativo al workspace del análisis.
+
+    Raises:
+        ValueError: Si la ruta es absoluta o sale del workspace
+    """
+    name = value.replace("\\", "/")
+    parts = [part for part in name.split("/") if part not in ("", ".")]
+    if not parts or name.startswith("/") or ".." in parts or ":" in parts[0]:
+        raise ValueError("filename must be a relative path inside the analysis workspace")
+    return "/".join(parts)
 
 
 class ContractRequest(BaseModel):
@@ -12,6 +30,50 @@ class ContractRequest(BaseModel):
         default=True, 
         description="Si es False, intenta correcciones automáticas"
     )
+    job_id: Optional[str] = Field(
+        default=None,
+        pattern=r"^[A-Za-z0-9_-]{1,64}$",
+        description="ID opcional del análisis, para cancelarlo con DELETE /jobs/{job_id}"
+    )
+    priority: str = Field(
+        default="interactive",
+        pattern=r"^(interactive|batch)$",
+        description="Clase de prioridad: interactive o batch (reescaneos masivos)"
+    )
+
+    _check_filename = field_validator("filename")(_relative_filename)
+
+
+class BatchItem(BaseModel):
+    """Modelo para un contrato de un lote de análisis."""
+    id: Optional[str] = Field(
+        default=None,
+        max_length=128,
+        description="Identificador del contrato en el sistema del cliente (se devuelve con su resultado)"
+    )
+    code: str = Field(..., max_length=settings.BATCH_MAX_CODE_CHARS, description="Código fuente del contrato Solidity")
+    filename: str = Field(default="contract.sol", description="Nombre del archivo")
+    is_production_ready: bool = Field(
+        default=True,
+        description="Si es False, intenta correcciones automáticas"
+    )
+
+    _check_filename = field_validator("filename")(_relative_filename)
+
+
+class BatchRequest(BaseModel):
+    """Modelo para la solicitud de análisis de un lote de contratos."""
+    contracts: List[BatchItem] = Field(..., min_length=1, description="Contratos a analizar")
+    batch_id: Optional[str] = Field(
+        default=None,
+        pattern=r"^[A-Za-z0-9_-]{1,48}$",
+        description="ID opcional del lote, para cancelarlo con DELETE /jobs/{batch_id}"
+    )
+    priority: str = Field(
+        default="batch",
+        pattern=r"^(interactive|batch)$",
+        description="Clase de prioridad de todos los contratos del lote"
+    )
 
 
 class FixChange(BaseModel):
@@ -26,3 +88,18 @@ class FixResult(BaseModel):
     fixed_code: str
     changes_made: list[FixChange]
     explanation: str
+
+
+class LibraryRequest(BaseModel):
+    """Modelo para registrar código de biblioteca de confianza en el índice de huellas."""
+    code: str = Field(..., description="Código fuente Solidity de la biblioteca")
+    label: str = Field(
+        ...,
+        max_length=200,
+        description="Nombre y versión de la biblioteca (p. ej. openzeppelin-contracts 4.9.3)"
+    )
+
+
+class FingerprintRequest(BaseModel):
+    """Modelo para consultar las huellas de un código sin analizarlo."""
+    code: str = Field(..., description="Código fuente del contrato Solidity")
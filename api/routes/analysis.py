@@ -1,45 +1,580 @@
 """
 Rutas de la API para análisis de contratos.
 """
-from fastapi import APIRouter, Body, HTTPException
-from fastapi.responses import JSONResponse
+import asyncio
+import json
+import re
+import uuid
+from typing import Dict, Any, List, Optional
 
-from models.schemas import ContractRequest
+from fastapi import APIRouter, Body, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.requests import ClientDisconnect
+
+from models.schemas import BatchItem, BatchRequest, ContractRequest
+from services.admission import AdmissionRejected, admission_controller, identify_client
 from services.analysis_service import analysis_service
+from services.batch import BatchRunner, order_by_cost
+from services.coalescing import analysis_coalescer
+from services.jobs import job_registry
+from services.multipart import parse_options_header
+from services.projects import (
+    ARCHIVE_TYPES, ProjectBuilder, ProjectError, read_entry, receive_archive, receive_multipart
+)
+from services.scheduler import ClientContext, current_client
+from core.config import settings
 from core.logging import get_logger
 
 logger = get_logger(__name__)
 router = APIRouter()
 
 
+async def _watch_disconnect(http_request: Request, job_id: str) -> None:
+    """Cancela el trabajo si el cliente cierra la conexión."""
+    while True:
+        if await http_request.is_disconnected():
+            job_registry.cancel(job_id, "client_disconnected")
+            return
+        await asyncio.sleep(settings.DISCONNECT_POLL_INTERVAL)
+
+
+async def _run_analysis(
+    request: ContractRequest,
+    job_id: str,
+    client: ClientContext,
+    admitted: float,
+    on_event=None,
+    project: Optional[Dict[str, Any]] = None
+):
+    """
+    Corrutina del análisis de un pedido admitido.
+
+    Los pedidos concurrentes con el mismo código y opciones comparten un
+    único análisis (ver AnalysisCoalescer). Las llamadas a las herramientas
+    se planifican con el cliente y la prioridad del pedido.
+    """
+    current_client.set(client)
+    enable_auto_fix = not request.is_production_ready
+    try:
+        return await analysis_coalescer.run(
+            analysis_coalescer.make_key(request.code, request.filename, enable_auto_fix, project),
+            job_id,
+            lambda publish: analysis_service.analyze_contract(
+                code=request.code,
+                filename=request.filename,
+                enable_auto_fix=enable_auto_fix,
+                analysis_id=job_id,
+                on_event=publish,
+                project=project
+            ),
+            on_event=on_event
+        )
+    finally:
+        await admission_controller.release(client, admitted)
+
+
+async def _start_job(
+    http_request: Request,
+    request: ContractRequest,
+    job_id: str,
+    on_event=None,
+    project: Optional[Dict[str, Any]] = None
+):
+    """
+    Admite el pedido y lanza su análisis como trabajo registrado.
+
+    Raises:
+        AdmissionRejected: Si el cliente superó su cuota o no hay capacidad
+        HTTPException: 409 si ya hay un trabajo con ese ID
+    """
+    client = identify_client(http_request, request.priority)
+    admitted = await admission_controller.admit(client)
+    try:
+        return await job_registry.start(
+            job_id, _run_analysis(request, job_id, client, admitted, on_event, project)
+        )
+    except ValueError as e:
+        await admission_controller.release(client, admitted)
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+def _rejected_response(job_id: str, rejection: AdmissionRejected) -> JSONResponse:
+    """Respuesta 429 con Retry-After para un pedido no admitido."""
+    return JSONResponse(
+        status_code=429,
+        headers={"Retry-After": str(rejection.retry_after)},
+        content={
+            "success": False,
+            "analysis_id": job_id,
+            "error": str(rejection),
+            "error_type": rejection.reason,
+            "retry_after": rejection.retry_after
+        }
+    )
+
+
 @router.post("/analyze")
-async def analyze_contract(request: ContractRequest = Body(...)):
+async def analyze_contract(http_request: Request, request: ContractRequest = Body(...)):
     """
     Analiza un contrato Solidity.
-    
+
     - **code**: Código fuente del contrato
     - **filename**: Nombre del archivo (opcional)
     - **is_production_ready**: Si es False, intenta correcciones automáticas
-    
+    - **job_id**: ID opcional para cancelar el análisis con `DELETE /jobs/{job_id}`
+    - **priority**: `interactive` (por defecto) o `batch`
+
+    El cliente se identifica con el header `X-Client-ID` (o la IP de origen).
+    Si supera su cuota de análisis activos o el sistema está saturado se
+    responde 429 con `Retry-After`.
+
     Retorna un análisis completo del contrato incluyendo:
     - Vulnerabilidades detectadas
     - Resultados de compilación
     - Resultados de fuzzing
     - Recomendaciones de seguridad
     - Código corregido (si se solicitó)
+
+    Si el cliente se desconecta o el trabajo se elimina, las herramientas
+    en curso se cancelan.
+
+    Los pedidos concurrentes con el mismo código y opciones comparten un
+    único análisis; la respuesta de los que se sumaron incluye
+    `coalesced_with`. Cancelar un pedido no afecta a los demás.
     """
+    return await _analysis_response(http_request, request, request.job_id or str(uuid.uuid4()))
+
+
+async def _analysis_response(
+    http_request: Request,
+    request: ContractRequest,
+    job_id: str,
+    project: Optional[Dict[str, Any]] = None
+):
+    """Ejecuta un análisis y arma la respuesta de /analyze."""
     try:
-        result = await analysis_service.analyze_contract(
-            code=request.code,
-            filename=request.filename,
-            enable_auto_fix=not request.is_production_ready
+        task = await _start_job(http_request, request, job_id, project=project)
+    except AdmissionRejected as e:
+        return _rejected_response(job_id, e)
+
+    watcher = asyncio.ensure_future(_watch_disconnect(http_request, job_id))
+    try:
+        await asyncio.wait({task})
+    finally:
+        watcher.cancel()
+
+    if task.cancelled():
+        reason = job_registry.cancel_reason(job_id) or "cancelled"
+        return JSONResponse(
+            status_code=499 if reason == "client_disconnected" else 409,
+            content={
+                "success": False,
+                "analysis_id": job_id,
+                "error": f"Analysis cancelled: {reason}",
+                "error_type": "cancelled"
+            }
         )
-        
+
+    try:
+        result = task.result()
+
         return JSONResponse(content=result)
-        
+
     except Exception as e:
         logger.exception("Error during contract analysis")
         raise HTTPException(
             status_code=500,
             detail=f"Internal server error: {str(e)}"
         )
+
+
+def _form_value(fields: Dict[str, List[str]], name: str, default):
+    """Último valor de un campo del formulario, o default."""
+    values = fields.get(name)
+    return values[-1] if values else default
+
+
+@router.post("/analyze/project")
+async def analyze_project(
+    http_request: Request,
+    entry: Optional[str] = None,
+    remappings: Optional[List[str]] = Query(None),
+    is_production_ready: bool = True,
+    job_id: Optional[str] = None,
+    priority: str = "interactive"
+):
+    """
+    Analiza un proyecto de varios archivos (contratos con imports).
+
+    El cuerpo puede ser:
+    - Un archivo comprimido (`Content-Type: application/zip`,
+      `application/x-tar` o `application/gzip`) con el proyecto; las opciones
+      van en la query
+    - Un formulario `multipart/form-data` con una parte por archivo (el
+      nombre de archivo de cada parte es su ruta relativa) o una parte
+      `archive` con el archivo comprimido; las opciones pueden ir como campos
+
+    Opciones:
+    - **entry**: Ruta del archivo principal (se detecta si el proyecto tiene
+      una sola fuente fuera de lib/, node_modules/, test/ y script/)
+    - **remappings**: Remapeos `prefijo=ruta` (por defecto los de
+      `remappings.txt`)
+    - **is_production_ready**, **job_id**, **priority**: igual que en `/analyze`
+
+    El cuerpo se guarda a medida que llega, con los límites de
+    `PROJECT_MAX_*` (413 si se superan). Los archivos se deduplican por hash
+    de contenido entre subidas. Las herramientas reciben el proyecto
+    completo y los remapeos; Gemini, el archivo principal.
+
+    La respuesta es la de `/analyze` más la sección `project`.
+    """
+    builder = ProjectBuilder()
+    try:
+        content_type, params = parse_options_header(http_request.headers.get("content-type", ""))
+        fields: Dict[str, List[str]] = {}
+        if content_type == "multipart/form-data":
+            fields = await receive_multipart(http_request, params.get("boundary"), builder)
+        elif content_type in ARCHIVE_TYPES:
+            await receive_archive(http_request, builder, ARCHIVE_TYPES[content_type])
+        else:
+            raise ProjectError(
+                415, "unsupported_media_type",
+                f"Expected multipart/form-data or an archive, got {content_type or 'no content type'}"
+            )
+
+        if "remappings" in fields:
+            remappings = fields["remappings"]
+        loop = asyncio.get_event_loop()
+        project = await loop.run_in_executor(
+            None, builder.build, _form_value(fields, "entry", entry), remappings
+        )
+        code = await loop.run_in_executor(None, read_entry, project)
+    except ProjectError as e:
+        return JSONResponse(
+            status_code=e.status_code,
+            content={"success": False, "error": e.message, "error_type": e.error_type}
+        )
+
+    try:
+        request = ContractRequest(
+            code=code,
+            filename=project["entry"],
+            is_production_ready=_form_value(fields, "is_production_ready", is_production_ready),
+            job_id=_form_value(fields, "job_id", job_id),
+            priority=_form_value(fields, "priority", priority)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid project options: {e}")
+
+    logger.info(
+        f"Project received | entry={project['entry']} files={len(project['files'])} "
+        f"bytes={project['size_bytes']} reused={project['reused_files']}"
+    )
+    return await _analysis_response(
+        http_request, request, request.job_id or str(uuid.uuid4()), project
+    )
+
+
+def _encode_event(event: Dict[str, Any]) -> bytes:
+    """Serializa un evento como una línea NDJSON."""
+    return (json.dumps(event, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+
+
+@router.post("/analyze/stream")
+async def analyze_contract_stream(http_request: Request, request: ContractRequest = Body(...)):
+    """
+    Analiza un contrato Solidity emitiendo el progreso como NDJSON.
+
+    Mismos parámetros que `/analyze`. Cada línea es un evento:
+    - **started**: ID del análisis
+    - **tools_completed**: estado de cada herramienta en un intento
+    - **vulnerability** / **tools_report**: entradas del análisis de Gemini en
+      cuanto se generan
+    - **llm_restart**: la generación se reinició; descartar las entradas del
+      intento
+    - **fix_applied**: corrección aplicada antes de volver a analizar
+    - **result** / **error**: respuesta final (mismo formato que `/analyze`)
+
+    Si el cliente cierra la conexión, el análisis se cancela.
+    """
+    job_id = request.job_id or str(uuid.uuid4())
+    queue: asyncio.Queue = asyncio.Queue()
+
+    try:
+        task = await _start_job(http_request, request, job_id, on_event=queue.put_nowait)
+    except AdmissionRejected as e:
+        return _rejected_response(job_id, e)
+
+    async def events():
+        getter = None
+        try:
+            yield _encode_event({"event": "started", "analysis_id": job_id})
+            while True:
+                getter = asyncio.ensure_future(queue.get())
+                done, _ = await asyncio.wait(
+                    {getter, task}, return_when=asyncio.FIRST_COMPLETED
+                )
+                if getter in done:
+                    yield _encode_event(getter.result())
+                    continue
+                getter.cancel()
+                while not queue.empty():
+                    yield _encode_event(queue.get_nowait())
+                break
+
+            if task.cancelled():
+                reason = job_registry.cancel_reason(job_id) or "cancelled"
+                yield _encode_event({
+                    "event": "error",
+                    "analysis_id": job_id,
+                    "error": f"Analysis cancelled: {reason}",
+                    "error_type": "cancelled"
+                })
+            elif task.exception() is not None:
+                logger.error(f"Error during streamed analysis {job_id}: {task.exception()}")
+                yield _encode_event({
+                    "event": "error",
+                    "analysis_id": job_id,
+                    "error": f"Internal server error: {task.exception()}",
+                    "error_type": "internal_error"
+                })
+            else:
+                yield _encode_event({"event": "result", "result": task.result()})
+        finally:
+            if getter is not None:
+                getter.cancel()
+            # El cliente cerró la conexión antes del final
+            if not task.done():
+                job_registry.cancel(job_id, "client_disconnected")
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+async def _run_batch_item(
+    http_request: Request,
+    item: BatchItem,
+    job_id: str,
+    priority: str
+) -> Dict[str, Any]:
+    """
+    Analiza un contrato de un lote como un trabajo más.
+
+    Pasa por la admisión como cualquier pedido (reintentando mientras el
+    sistema esté saturado) y se puede cancelar por separado con
+    `DELETE /jobs/{job_id}`.
+    """
+    request = ContractRequest(
+        code=item.code,
+        filename=item.filename,
+        is_production_ready=item.is_production_ready,
+        job_id=job_id,
+        priority=priority
+    )
+    while True:
+        try:
+            task = await _start_job(http_request, request, job_id)
+            break
+        except AdmissionRejected as e:
+            await asyncio.sleep(min(e.retry_after, settings.BATCH_ADMISSION_RETRY_MAX))
+        except HTTPException as e:
+            return {"success": False, "analysis_id": job_id, "error": e.detail, "error_type": "job_conflict"}
+
+    try:
+        await asyncio.wait({task})
+    except asyncio.CancelledError:
+        job_registry.cancel(job_id, "batch_cancelled")
+        raise
+
+    if task.cancelled():
+        reason = job_registry.cancel_reason(job_id) or "cancelled"
+        return {
+            "success": False,
+            "analysis_id": job_id,
+            "error": f"Analysis cancelled: {reason}",
+            "error_type": "cancelled"
+        }
+    return task.result()
+
+
+class _BodyReadingStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse que no escucha la desconexión del cliente.
+
+    StreamingResponse la detecta consumiendo la entrada, lo que le quitaría
+    el cuerpo a un generador que todavía lo está leyendo; quien la usa
+    detecta la desconexión por su cuenta.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+async def _read_ndjson_batch(http_request: Request, runner: BatchRunner, batch: asyncio.Task) -> None:
+    """
+    Encola los contratos de un cuerpo NDJSON (un BatchItem por línea) a
+    medida que llegan; los análisis empiezan antes de terminar de leerlo.
+
+    Corre junto a la respuesta: leído el cuerpo, sigue esperando la
+    desconexión del cliente para cancelar el lote.
+    """
+    index = 0
+    buffer = b""
+
+    def submit(line: bytes) -> bool:
+        nonlocal index
+        if not line.strip():
+            return True
+        if index >= settings.BATCH_MAX_ITEMS:
+            runner.reject(index, f"Batch exceeds {settings.BATCH_MAX_ITEMS} contracts", "batch_too_large")
+            return False
+        try:
+            runner.submit(index, BatchItem.model_validate(json.loads(line)))
+        except ValueError as e:
+            runner.reject(index, f"Invalid contract line: {e}")
+        index += 1
+        return True
+
+    async def read() -> None:
+        nonlocal buffer
+        async for chunk in http_request.stream():
+            if batch.done():
+                return
+            lines = (buffer + chunk).split(b"\n")
+            buffer = lines.pop()
+            for line in lines:
+                if not submit(line):
+                    return
+        submit(buffer)
+
+    try:
+        try:
+            await read()
+        finally:
+            runner.close()
+        # Lo que quede del cuerpo (lote cortado) se descarta hasta la desconexión
+        while (await http_request.receive())["type"] != "http.disconnect":
+            pass
+        job_registry.cancel(runner.batch_id, "client_disconnected")
+    except ClientDisconnect:
+        job_registry.cancel(runner.batch_id, "client_disconnected")
+    except Exception:
+        logger.exception(f"Error reading batch {runner.batch_id}")
+        job_registry.cancel(runner.batch_id, "body_read_error")
+
+
+@router.post("/analyze/batch")
+async def analyze_batch(http_request: Request, batch_id: Optional[str] = None, priority: str = "batch"):
+    """
+    Analiza un lote de contratos emitiendo los resultados como NDJSON.
+
+    El cuerpo puede ser:
+    - JSON (`BatchRequest`): `contracts` con `code`, `filename`,
+      `is_production_ready` e `id` opcional de cada contrato, más `batch_id`
+      y `priority` opcionales
+    - NDJSON (`Content-Type: application/x-ndjson`): un contrato por línea;
+      `batch_id` y `priority` van en la query. Los contratos se analizan a
+      medida que llegan
+
+    Los contratos con el mismo código y opciones se analizan una sola vez.
+    Hasta `BATCH_CONCURRENCY` contratos corren a la vez, los más costosos
+    primero, y sus llamadas a las herramientas comparten la cola de cada
+    servicio con la prioridad del lote.
+
+    Cada línea de la respuesta es un evento:
+    - **started**: ID del lote
+    - **result**: respuesta de `/analyze` de un contrato (`index`, `id`)
+    - **duplicate**: contrato idéntico a otro del lote (`duplicate_of`,
+      `analysis_id` del análisis compartido)
+    - **error**: contrato inválido, fallido o cancelado
+    - **summary**: totales del lote y veredictos
+
+    El lote se cancela con `DELETE /jobs/{batch_id}` o si el cliente cierra
+    la conexión; cada contrato se cancela con `DELETE /jobs/{batch_id}-{index}`.
+    """
+    content_type = http_request.headers.get("content-type", "")
+    streamed = content_type.startswith(("application/x-ndjson", "application/jsonl"))
+    if not streamed:
+        try:
+            request = BatchRequest.model_validate(await http_request.json())
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=f"Invalid batch: {e}")
+        if len(request.contracts) > settings.BATCH_MAX_ITEMS:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Batch exceeds {settings.BATCH_MAX_ITEMS} contracts"
+            )
+        batch_id, priority = request.batch_id, request.priority
+
+    if priority not in ("interactive", "batch"):
+        raise HTTPException(status_code=422, detail=f"Invalid priority: {priority}")
+    if batch_id is not None and not re.fullmatch(r"[A-Za-z0-9_-]{1,48}", batch_id):
+        raise HTTPException(status_code=422, detail=f"Invalid batch_id: {batch_id}")
+    batch_id = batch_id or str(uuid.uuid4())
+
+    queue: asyncio.Queue = asyncio.Queue()
+    runner = BatchRunner(
+        batch_id,
+        lambda item, job_id: _run_batch_item(http_request, item, job_id, priority),
+        queue.put_nowait
+    )
+    try:
+        batch = await job_registry.start(batch_id, runner.run())
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    if not streamed:
+        for index in order_by_cost(request.contracts):
+            runner.submit(index, request.contracts[index])
+        runner.close()
+
+    async def events():
+        getter = None
+        # El cuerpo NDJSON se lee mientras se emiten los resultados
+        reader = None
+        if streamed:
+            reader = asyncio.ensure_future(_read_ndjson_batch(http_request, runner, batch))
+        try:
+            yield _encode_event({"event": "started", "batch_id": batch_id})
+            while True:
+                getter = asyncio.ensure_future(queue.get())
+                done, _ = await asyncio.wait(
+                    {getter, batch}, return_when=asyncio.FIRST_COMPLETED
+                )
+                if getter in done:
+                    yield _encode_event(getter.result())
+                    continue
+                getter.cancel()
+                while not queue.empty():
+                    yield _encode_event(queue.get_nowait())
+                break
+
+            if batch.cancelled():
+                reason = job_registry.cancel_reason(batch_id) or "cancelled"
+                yield _encode_event({
+                    "event": "error",
+                    "batch_id": batch_id,
+                    "error": f"Batch cancelled: {reason}",
+                    "error_type": "cancelled"
+                })
+            elif batch.exception() is not None:
+                logger.error(f"Error during batch {batch_id}: {batch.exception()}")
+                yield _encode_event({
+                    "event": "error",
+                    "batch_id": batch_id,
+                    "error": f"Internal server error: {batch.exception()}",
+                    "error_type": "internal_error"
+                })
+        finally:
+            if getter is not None:
+                getter.cancel()
+            if reader is not None:
+                reader.cancel()
+            # El cliente cerró la conexión antes del final
+            if not batch.done():
+                job_registry.cancel(batch_id, "client_disconnected")
+
+    if streamed:
+        return _BodyReadingStreamingResponse(events(), media_type="application/x-ndjson")
+    return StreamingResponse(events(), media_type="application/x-ndjson")
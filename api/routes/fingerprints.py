@@ -0,0 +1,63 @@
+"""
+Rutas de la API para el índice de huellas de código.
+"""
+from fastapi import APIRouter, HTTPException, Path
+
+from models.schemas import FingerprintRequest, LibraryRequest
+from services.fingerprints import fingerprint_source
+from services.fingerprint_index import fingerprint_index, summarize_fingerprints
+
+router = APIRouter()
+
+
+def _require_index() -> None:
+    if not fingerprint_index.enabled:
+        raise HTTPException(status_code=503, detail="Fingerprint index is disabled")
+
+
+@router.post("/fingerprints")
+async def lookup_fingerprints(request: FingerprintRequest):
+    """
+    Huellas de un código y qué contratos ya están en el índice, sin analizarlo.
+    """
+    _require_index()
+    fingerprints = fingerprint_source(request.code)
+    return summarize_fingerprints(fingerprints, await fingerprint_index.lookup(fingerprints))
+
+
+@router.get("/fingerprints/{fingerprint}")
+async def get_fingerprint(fingerprint: str = Path(..., pattern=r"^[0-9a-f]{64}$")):
+    """
+    Lo que el índice sabe de una huella: en qué análisis apareció, sus
+    hallazgos y si es código de biblioteca.
+    """
+    _require_index()
+    units = await fingerprint_index.get(fingerprint)
+    if not units:
+        raise HTTPException(status_code=404, detail=f"Fingerprint not found: {fingerprint}")
+    return {"fingerprint": fingerprint, "units": units}
+
+
+@router.post("/fingerprints/library")
+async def register_library(request: LibraryRequest):
+    """
+    Registra código de biblioteca de confianza (p. ej. OpenZeppelin).
+
+    Los análisis cuyos contratos sean todos de biblioteca o ya conocidos no
+    vuelven a pasar por los fuzzers.
+    """
+    _require_index()
+    fingerprints = fingerprint_source(request.code)
+    if not fingerprints["contracts"]:
+        raise HTTPException(status_code=422, detail="No contracts found in the library code")
+    await fingerprint_index.register_library(fingerprints, request.label)
+    return {
+        "success": True,
+        "label": request.label,
+        "source": fingerprints["source"],
+        "contracts": [
+            {"name": contract["name"], "fingerprint": contract["fingerprint"]}
+            for contract in fingerprints["contracts"]
+        ],
+        "functions": sum(len(contract["functions"]) for contract in fingerprints["contracts"])
+    }
@@ -2,7 +2,11 @@
 Rutas generales de la API.
 """
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
 from core.config import settings
+from services.llm import llm_backends
+from services.readiness import service_readiness
 
 router = APIRouter()
 
@@ -17,7 +21,39 @@ async def root():
         "version": settings.VERSION,
         "endpoints": {
             "analyze": "POST /analyze - Analyze a Solidity contract",
+            "analyze_stream": "POST /analyze/stream - Analyze a contract streaming NDJSON progress",
+            "analyze_project": "POST /analyze/project - Analyze a multi-file project (archive or multipart)",
+            "analyze_batch": "POST /analyze/batch - Analyze a batch of contracts streaming NDJSON results",
+            "jobs": "GET /jobs, DELETE /jobs/{job_id} - List or cancel running analyses",
+            "analyses": "GET /analyses, GET /analyses/{analysis_id} - Search and read stored analyses",
+            "outputs": "GET /analyses/{analysis_id}/outputs/{name} - Full tool output spilled to disk",
+            "fingerprints": "POST /fingerprints, GET /fingerprints/{fingerprint}, POST /fingerprints/library - Known code index",
+            "health": "GET /health, GET /ready - Liveness and readiness of the API and tools",
             "docs": "GET /docs - Interactive API documentation"
         },
         "available_tools": list(settings.services.keys())
     }
+
+
+@router.get("/health")
+async def health():
+    """
+    Liveness: la API responde.
+    """
+    return {"status": "ok"}
+
+
+@router.get("/ready")
+async def ready():
+    """
+    Readiness de la API: estado de warm-up y versiones de cada herramienta.
+
+    Responde 503 si alguna herramienta no está lista; esas herramientas no
+    reciben análisis hasta estarlo.
+    """
+    services = await service_readiness.check_all()
+    all_ready = all(status["ready"] for status in services.values())
+    content = {"ready": all_ready, "services": services, "llm": llm_backends.snapshot()}
+    if not all_ready:
+        return JSONResponse(status_code=503, content=content)
+    return content
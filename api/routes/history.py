@@ -0,0 +1,85 @@
+"""
+Rutas de la API para consultar el historial de análisis.
+"""
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import FileResponse
+
+from core.config import settings
+from services.history_store import SORTABLE_COLUMNS, history_store
+from services.tool_outputs import output_path
+
+router = APIRouter()
+
+
+def _require_history() -> None:
+    if not history_store.enabled:
+        raise HTTPException(status_code=503, detail="Analysis history is disabled")
+
+
+@router.get("/analyses")
+async def list_analyses(
+    source_hash: Optional[str] = Query(default=None, description="SHA-256 del código original"),
+    status: Optional[str] = Query(default=None, pattern=r"^(?i:safe|warning|critical)$"),
+    outcome: Optional[str] = Query(default=None, pattern=r"^(completed|failed|cancelled)$"),
+    min_risk: Optional[float] = Query(default=None, ge=0, le=100),
+    max_risk: Optional[float] = Query(default=None, ge=0, le=100),
+    since: Optional[float] = Query(default=None, description="Creados desde (epoch)"),
+    until: Optional[float] = Query(default=None, description="Creados antes de (epoch)"),
+    filename: Optional[str] = Query(default=None, description="Texto contenido en el nombre del archivo"),
+    sort: str = Query(default="created_at", pattern=f"^({'|'.join(SORTABLE_COLUMNS)})$"),
+    order: str = Query(default="desc", pattern=r"^(asc|desc)$"),
+    limit: int = Query(default=50, ge=1, le=settings.HISTORY_PAGE_MAX),
+    offset: int = Query(default=0, ge=0)
+):
+    """
+    Lista y busca análisis guardados, sin volver a ejecutarlos.
+
+    Devuelve resúmenes (veredicto, risk_score, duración) paginados con
+    `limit` / `offset`; el reporte completo se obtiene con
+    `GET /analyses/{analysis_id}`.
+    """
+    _require_history()
+    return await history_store.search(
+        source_hash=source_hash,
+        status=status,
+        outcome=outcome,
+        min_risk=min_risk,
+        max_risk=max_risk,
+        since=since,
+        until=until,
+        filename=filename,
+        sort=sort,
+        descending=order == "desc",
+        limit=limit,
+        offset=offset
+    )
+
+
+@router.get("/analyses/{analysis_id}")
+async def get_analysis(analysis_id: str):
+    """
+    Análisis guardado: código, reporte de `/analyze`, resultados de las
+    herramientas, historial de correcciones y tiempos.
+    """
+    _require_history()
+    record = await history_store.get(analysis_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail=f"Analysis not found: {analysis_id}")
+    return record
+
+
+@router.get("/analyses/{analysis_id}/outputs/{name}")
+async def get_analysis_output(analysis_id: str, name: str):
+    """
+    Salida completa de una herramienta guardada en disco.
+
+    Los resultados de las herramientas (en el historial y en el prompt de
+    Gemini) conservan solo una vista previa de las salidas grandes, con el
+    `name` del archivo; el contenido se envía por bloques desde el disco.
+    """
+    path = output_path(analysis_id, name)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"Output not found: {analysis_id}/{name}")
+    return FileResponse(path, media_type="text/plain; charset=utf-8")
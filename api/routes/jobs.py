@@ -0,0 +1,46 @@
+"""
+Rutas de la API para gestionar análisis en curso.
+"""
+from fastapi import APIRouter, HTTPException
+
+from services.admission import admission_controller
+from services.coalescing import analysis_coalescer
+from services.jobs import job_registry
+from services.scheduler import tool_scheduler
+from services.shared_state import shared_state
+
+router = APIRouter()
+
+
+@router.get("/jobs")
+async def list_jobs():
+    """
+    Lista los análisis en curso, los contadores de coalescencia y el estado
+    de admisión y de las colas de las herramientas.
+
+    Los datos son de este worker; con estado compartido distribuido
+    `cluster_jobs` lista los IDs en curso en todos los workers.
+    """
+    return {
+        "shared_state": shared_state.info(),
+        "jobs": job_registry.list_jobs(),
+        "cluster_jobs": await job_registry.list_cluster_jobs(),
+        "coalescing": analysis_coalescer.snapshot(),
+        "admission": admission_controller.snapshot(),
+        "scheduler": tool_scheduler.snapshot()
+    }
+
+
+@router.delete("/jobs/{job_id}")
+async def delete_job(job_id: str):
+    """
+    Cancela un análisis en curso.
+
+    Las llamadas a las herramientas se abortan y sus procesos se terminan,
+    salvo que otros pedidos coalescidos sigan esperando el mismo análisis.
+    Si el análisis corre en otro worker, ese worker lo cancela en su
+    próximo sondeo del estado compartido.
+    """
+    if not await job_registry.cancel_anywhere(job_id, "job_deleted"):
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return {"job_id": job_id, "cancelled": True}
@@ -0,0 +1,212 @@
+"""
+Verifica SHARED_STATE_BACKEND=redis contra el servidor de scripts/resp_standin.py.
+
+Levanta el servidor RESP y dos workers de la API (procesos uvicorn separados)
+y comprueba:
+- las operaciones del backend (SET NX con expiración, DEL condicional con
+  WATCH/MULTI/EXEC, PEXPIRE y leases),
+- la coalescencia: el mismo código pedido a los dos workers se analiza una vez,
+- la cancelación remota: DELETE /jobs/{job_id} en un worker cancela el análisis
+  que corre en el otro, y el ID queda libre,
+- los slots globales: dos schedulers con TOOL_SLOTS=1 no llaman a la vez a la
+  misma herramienta y el slot se guarda como clave del backend.
+
+Los workers simulan el análisis (una espera, sin herramientas ni Gemini): lo
+que se verifica es el estado compartido.
+
+Uso (desde api/, con las dependencias de requirements.txt y uvicorn):
+    PYTHONPATH=.. python scripts/check_shared_state.py
+"""
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STANDIN = os.path.join(API_DIR, "scripts", "resp_standin.py")
+
+# Duración del análisis simulado en los workers
+ANALYSIS_SECONDS = 1.5
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_port(port: int, timeout: float = 20) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Nothing listening on port {port}")
+
+
+def worker_env(redis_url: str) -> dict:
+    env = dict(os.environ)
+    env.update(
+        SHARED_STATE_BACKEND="redis",
+        SHARED_STATE_URL=redis_url,
+        SHARED_STATE_POLL_INTERVAL="0.1",
+        HISTORY_ENABLED="false",
+        FINGERPRINT_ENABLED="false",
+        LLM_BACKEND=env.get("LLM_BACKEND", "stub"),
+        PYTHONPATH=os.pathsep.join(filter(None, [API_DIR, os.path.dirname(API_DIR), env.get("PYTHONPATH")]))
+    )
+    return env
+
+
+def run_worker(port: int) -> None:
+    """Worker de la API con el análisis simulado."""
+    sys.path[:0] = [API_DIR, os.path.dirname(API_DIR)]
+    import uvicorn
+    import services.analysis_service as analysis_module
+
+    async def analyze_contract(self, code, filename, enable_auto_fix=False, analysis_id=None, **kwargs):
+        await asyncio.sleep(ANALYSIS_SECONDS)
+        return {"analysis_id": analysis_id, "worker_pid": os.getpid()}
+
+    analysis_module.AnalysisService.analyze_contract = analyze_contract
+    from main import app
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def check(condition: bool, message: str) -> None:
+    print(f"{'ok  ' if condition else 'FAIL'} {message}")
+    if not condition:
+        raise SystemExit(1)
+
+
+async def check_backend() -> None:
+    from services.shared_state import create_backend
+
+    backend = create_backend("redis")
+    await backend.delete("check:key")
+    check(await backend.set("check:key", "a", ttl=0.3, only_if_absent=True), "SET NX on a free key")
+    check(not await backend.set("check:key", "b", only_if_absent=True), "SET NX on a taken key")
+    check(not await backend.delete("check:key", expected="other"), "DEL with a wrong expected value")
+    check(await backend.delete("check:key", expected="a"), "DEL with the expected value")
+    await backend.set("check:ttl", "x", ttl=0.2)
+    await asyncio.sleep(0.3)
+    check(await backend.get("check:ttl") is None, "keys expire")
+    check(not await backend.expire("check:ttl", 1), "PEXPIRE on an expired key")
+    await backend.lease_add("check:group", "short", 0.2)
+    await backend.lease_add("check:group", "long", 5)
+    await asyncio.sleep(0.3)
+    check(await backend.lease_members("check:group") == ["long"], "expired leases are dropped")
+    await backend.lease_remove("check:group", "long")
+    check(await backend.lease_members("check:group") == [], "leases are released")
+    await backend.close()
+
+
+async def check_slots() -> None:
+    from core.config import settings
+    from services.scheduler import ToolScheduler
+    from services.shared_state import shared_state
+
+    settings.TOOL_SLOTS["slither"] = 1
+    schedulers = [ToolScheduler(), ToolScheduler()]
+    active = 0
+    peak = 0
+    held = []
+
+    async def call():
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        held.append(await shared_state.get("slot:slither:0"))
+        await asyncio.sleep(0.2)
+        active -= 1
+
+    await asyncio.gather(*(scheduler.run("slither", call) for scheduler in schedulers for _ in range(2)))
+    check(peak == 1, f"shared slots serialize calls across schedulers (peak {peak})")
+    check(all(held) and len(set(held)) == len(held), "each call holds slot:slither:0 under its own owner")
+    check(await shared_state.get("slot:slither:0") is None, "slots are released")
+
+
+def check_workers(ports: list) -> None:
+    import httpx
+
+    responses = {}
+
+    def analyze(name: str, port: int, code: str, job_id=None) -> None:
+        responses[name] = httpx.post(
+            f"http://127.0.0.1:{port}/analyze",
+            json={"code": code, "job_id": job_id},
+            timeout=30
+        )
+
+    threads = [
+        threading.Thread(target=analyze, args=("first", ports[0], "contract Same {}")),
+        threading.Thread(target=analyze, args=("second", ports[1], "contract Same {}")),
+    ]
+    threads[0].start()
+    time.sleep(0.3)
+    threads[1].start()
+    time.sleep(0.3)
+    cluster_jobs = httpx.get(f"http://127.0.0.1:{ports[1]}/jobs").json()["cluster_jobs"]
+    check(len(cluster_jobs) == 2, "both requests are listed as cluster jobs by either worker")
+    for thread in threads:
+        thread.join()
+    first, second = responses["first"].json(), responses["second"].json()
+    check(
+        first["analysis_id"] == second["analysis_id"] and first["worker_pid"] == second["worker_pid"],
+        "identical requests on two workers share one analysis"
+    )
+
+    thread = threading.Thread(target=analyze, args=("remote", ports[0], "contract Cancel {}", "check-job"))
+    thread.start()
+    time.sleep(0.3)
+    deleted = httpx.delete(f"http://127.0.0.1:{ports[1]}/jobs/check-job")
+    check(deleted.status_code == 200, "DELETE /jobs/{job_id} finds a job of the other worker")
+    thread.join()
+    check(responses["remote"].status_code != 200, f"the job is cancelled ({responses['remote'].status_code})")
+    reused = httpx.post(
+        f"http://127.0.0.1:{ports[1]}/analyze",
+        json={"code": "contract Again {}", "job_id": "check-job"},
+        timeout=30
+    )
+    check(reused.status_code == 200, "the cancelled job ID can be used again")
+
+
+def main() -> None:
+    redis_port = free_port()
+    redis_url = f"redis://127.0.0.1:{redis_port}/0"
+    os.environ.update(worker_env(redis_url))
+    sys.path[:0] = [API_DIR, os.path.dirname(API_DIR)]
+
+    processes = [subprocess.Popen([sys.executable, STANDIN, "--port", str(redis_port)])]
+    try:
+        wait_port(redis_port)
+        asyncio.run(check_backend())
+        asyncio.run(check_slots())
+
+        ports = [free_port(), free_port()]
+        for port in ports:
+            processes.append(subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), "--worker", str(port)],
+                env=worker_env(redis_url)
+            ))
+        for port in ports:
+            wait_port(port)
+        check_workers(ports)
+        print("shared state checks passed")
+    finally:
+        # Los workers primero, para que no pierdan el backend mientras terminan
+        for process in reversed(processes):
+            process.terminate()
+            process.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--worker"]:
+        run_worker(int(sys.argv[2]))
+    else:
+        main()
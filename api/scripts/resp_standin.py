@@ -0,0 +1,247 @@
+"""
+Servidor RESP2 mínimo en memoria para probar SHARED_STATE_BACKEND=redis sin
+un Redis real.
+
+Implementa solo los comandos que usa RedisStateBackend (cadenas con
+expiración, sorted sets para los leases y WATCH/MULTI/EXEC). No persiste nada
+ni está pensado para producción.
+
+Uso:
+    python scripts/resp_standin.py [--host 127.0.0.1] [--port 6399]
+"""
+import argparse
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Set
+
+# Respuestas simples (+OK) y errores (-ERR) se distinguen de las cadenas
+OK = object()
+QUEUED = object()
+
+
+class ReplyError(Exception):
+    """Error RESP devuelto al cliente."""
+
+
+class Store:
+    """Cadenas con expiración y sorted sets, con versión por clave para WATCH."""
+
+    def __init__(self):
+        self.strings: Dict[str, tuple] = {}
+        self.zsets: Dict[str, Dict[str, float]] = {}
+        self.versions: Dict[str, int] = {}
+
+    def touch(self, key: str) -> None:
+        self.versions[key] = self.versions.get(key, 0) + 1
+
+    def version(self, key: str) -> int:
+        self._expire(key)
+        return self.versions.get(key, 0)
+
+    def _expire(self, key: str) -> None:
+        entry = self.strings.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= time.time():
+            del self.strings[key]
+            self.touch(key)
+
+    def get(self, key: str) -> Optional[str]:
+        self._expire(key)
+        entry = self.strings.get(key)
+        return entry[0] if entry else None
+
+    def execute(self, args: List[str]) -> Any:
+        command = args[0].upper()
+        handler = getattr(self, f"cmd_{command.lower()}", None)
+        if handler is None:
+            raise ReplyError(f"unknown command '{command}'")
+        return handler(*args[1:])
+
+    def cmd_ping(self, *args: str) -> Any:
+        return OK if not args else args[0]
+
+    def cmd_auth(self, *args: str) -> Any:
+        return OK
+
+    def cmd_select(self, db: str) -> Any:
+        return OK
+
+    def cmd_get(self, key: str) -> Optional[str]:
+        return self.get(key)
+
+    def cmd_set(self, key: str, value: str, *options: str) -> Any:
+        upper = [option.upper() for option in options]
+        expires = None
+        if "PX" in upper:
+            expires = time.time() + int(options[upper.index("PX") + 1]) / 1000
+        elif "EX" in upper:
+            expires = time.time() + int(options[upper.index("EX") + 1])
+        if "NX" in upper and self.get(key) is not None:
+            return None
+        self.strings[key] = (value, expires)
+        self.touch(key)
+        return OK
+
+    def cmd_del(self, *keys: str) -> int:
+        removed = 0
+        for key in keys:
+            if self.get(key) is not None:
+                del self.strings[key]
+                removed += 1
+            elif self.zsets.pop(key, None) is not None:
+                removed += 1
+            else:
+                continue
+            self.touch(key)
+        return removed
+
+    def cmd_pexpire(self, key: str, milliseconds: str) -> int:
+        value = self.get(key)
+        if value is None:
+            return 0
+        self.strings[key] = (value, time.time() + int(milliseconds) / 1000)
+        self.touch(key)
+        return 1
+
+    def cmd_zadd(self, key: str, *pairs: str) -> int:
+        zset = self.zsets.setdefault(key, {})
+        added = 0
+        for score, member in zip(pairs[::2], pairs[1::2]):
+            added += member not in zset
+            zset[member] = float(score)
+        self.touch(key)
+        return added
+
+    def cmd_zrem(self, key: str, *members: str) -> int:
+        zset = self.zsets.get(key, {})
+        removed = sum(zset.pop(member, None) is not None for member in members)
+        if removed:
+            self.touch(key)
+        return removed
+
+    def cmd_zremrangebyscore(self, key: str, low: str, high: str) -> int:
+        zset = self.zsets.get(key, {})
+        low_score, high_score = float(low), float(high)
+        stale = [member for member, score in zset.items() if low_score <= score <= high_score]
+        for member in stale:
+            del zset[member]
+        if stale:
+            self.touch(key)
+        return len(stale)
+
+    def cmd_zrange(self, key: str, start: str, stop: str) -> List[str]:
+        members = sorted(self.zsets.get(key, {}).items(), key=lambda item: (item[1], item[0]))
+        names = [member for member, _ in members]
+        stop_index = int(stop)
+        return names[int(start):None if stop_index == -1 else stop_index + 1]
+
+
+def encode(value: Any) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    if value is OK:
+        return b"+OK\r\n"
+    if value is QUEUED:
+        return b"+QUEUED\r\n"
+    if isinstance(value, ReplyError):
+        return f"-ERR {value}\r\n".encode("utf-8")
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, list):
+        return b"*%d\r\n" % len(value) + b"".join(encode(item) for item in value)
+    data = str(value).encode("utf-8")
+    return b"$%d\r\n%s\r\n" % (len(data), data)
+
+
+async def read_command(reader: asyncio.StreamReader) -> Optional[List[str]]:
+    line = await reader.readline()
+    if not line:
+        return None
+    if not line.startswith(b"*"):
+        raise ReplyError("only RESP arrays are supported")
+    args = []
+    for _ in range(int(line[1:])):
+        header = await reader.readline()
+        size = int(header[1:])
+        args.append((await reader.readexactly(size + 2))[:-2].decode("utf-8"))
+    return args
+
+
+class Connection:
+    """Estado de WATCH/MULTI de un cliente."""
+
+    def __init__(self, store: Store):
+        self.store = store
+        self.watched: Dict[str, int] = {}
+        self.queued: Optional[List[List[str]]] = None
+
+    def handle(self, args: List[str]) -> Any:
+        command = args[0].upper()
+        if command == "WATCH":
+            for key in args[1:]:
+                self.watched[key] = self.store.version(key)
+            return OK
+        if command == "UNWATCH":
+            self.watched = {}
+            return OK
+        if command == "MULTI":
+            self.queued = []
+            return OK
+        if command == "DISCARD":
+            self.queued, self.watched = None, {}
+            return OK
+        if command == "EXEC":
+            queued, self.queued = self.queued or [], None
+            changed: Set[str] = {
+                key for key, version in self.watched.items() if self.store.version(key) != version
+            }
+            self.watched = {}
+            if changed:
+                return None
+            return [self._run(command_args) for command_args in queued]
+        if self.queued is not None:
+            self.queued.append(args)
+            return QUEUED
+        return self._run(args)
+
+    def _run(self, args: List[str]) -> Any:
+        try:
+            return self.store.execute(args)
+        except (ReplyError, ValueError, TypeError, IndexError) as e:
+            return ReplyError(str(e))
+
+
+async def serve(host: str, port: int) -> None:
+    store = Store()
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        connection = Connection(store)
+        try:
+            while True:
+                try:
+                    args = await read_command(reader)
+                except ReplyError as e:
+                    writer.write(encode(e))
+                    break
+                if args is None:
+                    break
+                writer.write(encode(connection.handle(args)))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6399)
+    options = parser.parse_args()
+    try:
+        asyncio.run(serve(options.host, options.port))
+    except KeyboardInterrupt:
+        pass
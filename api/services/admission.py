@@ -0,0 +1,197 @@
+"""
+Identificación de clientes y control de admisión de análisis.
+"""
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+from fastapi import Request
+
+from core.config import settings
+from core.logging import get_logger
+from services.scheduler import ClientContext, retry_after_seconds, tool_scheduler
+from services.shared_state import WORKER_ID, SharedStateError, shared_state
+
+logger = get_logger(__name__)
+
+
+def identify_client(http_request: Request, priority: str) -> ClientContext:
+    """
+    Cliente de un pedido: header X-Client-ID o, si falta, la IP de origen.
+
+    Args:
+        http_request: Pedido HTTP
+        priority: Clase de prioridad pedida ("interactive" o "batch")
+    """
+    client_id = (http_request.headers.get("x-client-id") or "").strip()[:128]
+    if not client_id:
+        client_id = http_request.client.host if http_request.client else "anonymous"
+    return ClientContext(client_id, priority)
+
+
+class AdmissionRejected(Exception):
+    """El análisis no se admite ahora; reintentar después de retry_after segundos."""
+
+    def __init__(self, reason: str, message: str, retry_after: int):
+        super().__init__(message)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Cuotas de análisis activos por cliente y por clase de prioridad.
+
+    Un cliente no puede tener más de CLIENT_MAX_ACTIVE[prioridad] análisis
+    activos, y la clase batch deja de admitirse antes que la interactiva
+    cuando el total de análisis activos alcanza ADMISSION_MAX_ACTIVE.
+
+    Con un backend de estado compartido distribuido los conteos abarcan
+    todos los workers: cada análisis admitido es un lease que vence a los
+    ADMISSION_LEASE_TTL segundos si su worker muere. El conteo y el alta no
+    son atómicos, así que dos workers pueden admitir a la vez el último lugar.
+    """
+
+    def __init__(self):
+        """Inicializa sin análisis activos."""
+        self._active: Dict[str, Dict[str, List[float]]] = {}
+        self._avg_duration: Optional[float] = None
+        self._rejected: Dict[str, int] = {}
+        # (cliente, admisión) -> miembro de los grupos compartidos
+        self._shared_members: Dict[tuple, str] = {}
+
+    async def _shared_counts(self, client: ClientContext) -> Optional[Tuple[List[float], int]]:
+        """Inicios de los análisis del cliente y total activo en todos los workers."""
+        try:
+            members = await shared_state.lease_members(
+                f"admission:client:{client.client_id}:{client.priority}"
+            )
+            total = 0
+            for priority in settings.ADMISSION_MAX_ACTIVE:
+                total += len(await shared_state.lease_members(f"admission:{priority}"))
+        except SharedStateError as e:
+            logger.warning(f"Shared admission counts unavailable, using local ones: {e}")
+            return None
+        # Los miembros empiezan con el instante de admisión (epoch)
+        now = time.time()
+        return [time.monotonic() - (now - float(member.split("|")[0])) for member in members], total
+
+    async def admit(self, client: ClientContext) -> float:
+        """
+        Admite un análisis o lo rechaza.
+
+        Args:
+            client: Cliente y prioridad del pedido
+
+        Returns:
+            Marca de tiempo de admisión (se pasa a release)
+
+        Raises:
+            AdmissionRejected: Si se supera la cuota del cliente o la capacidad
+        """
+        active = self._active.get(client.client_id, {}).get(client.priority, [])
+        total = sum(
+            len(started)
+            for classes in self._active.values()
+            for started in classes.values()
+        )
+        if shared_state.distributed:
+            counts = await self._shared_counts(client)
+            if counts is not None:
+                active, total = counts
+
+        client_limit = settings.CLIENT_MAX_ACTIVE.get(client.priority, 1)
+        if len(active) >= client_limit:
+            # Se libera un lugar cuando termina el análisis más antiguo del cliente
+            oldest_elapsed = time.monotonic() - min(active)
+            raise self._reject(
+                "client_quota_exceeded",
+                f"Client {client.client_id} already has {len(active)} active "
+                f"{client.priority} analyses (limit {client_limit})",
+                self.avg_duration - oldest_elapsed
+            )
+
+        total_limit = settings.ADMISSION_MAX_ACTIVE.get(client.priority, 1)
+        if total >= total_limit:
+            raise self._reject(
+                "overloaded",
+                f"{total} analyses active; {client.priority} limit is {total_limit}",
+                tool_scheduler.estimated_wait()
+            )
+
+        started = time.monotonic()
+        self._active.setdefault(client.client_id, {}).setdefault(client.priority, []).append(started)
+        if shared_state.distributed:
+            member = f"{time.time()}|{WORKER_ID}|{started}"
+            try:
+                await shared_state.lease_add(
+                    f"admission:client:{client.client_id}:{client.priority}",
+                    member, settings.ADMISSION_LEASE_TTL
+                )
+                await shared_state.lease_add(
+                    f"admission:{client.priority}", member, settings.ADMISSION_LEASE_TTL
+                )
+                self._shared_members[(client.client_id, started)] = member
+            except SharedStateError as e:
+                logger.warning(f"Could not register admission in shared state: {e}")
+        return started
+
+    async def release(self, client: ClientContext, started: float) -> None:
+        """
+        Libera el lugar de un análisis terminado.
+
+        Args:
+            client: Cliente del análisis
+            started: Valor devuelto por admit
+        """
+        classes = self._active.get(client.client_id, {})
+        active = classes.get(client.priority, [])
+        if started in active:
+            active.remove(started)
+        if not active:
+            classes.pop(client.priority, None)
+        if not classes:
+            self._active.pop(client.client_id, None)
+
+        elapsed = time.monotonic() - started
+        alpha = settings.SCHEDULER_EWMA_ALPHA
+        self._avg_duration = (
+            elapsed if self._avg_duration is None
+            else alpha * elapsed + (1 - alpha) * self._avg_duration
+        )
+
+        member = self._shared_members.pop((client.client_id, started), None)
+        if member is not None:
+            try:
+                await shared_state.lease_remove(
+                    f"admission:client:{client.client_id}:{client.priority}", member
+                )
+                await shared_state.lease_remove(f"admission:{client.priority}", member)
+            except SharedStateError as e:
+                logger.warning(f"Could not release admission in shared state: {e}")
+
+    @property
+    def avg_duration(self) -> float:
+        """Duración promedio observada de un análisis."""
+        if self._avg_duration is None:
+            return settings.SCHEDULER_DEFAULT_SERVICE_SECONDS * len(settings.services)
+        return self._avg_duration
+
+    def _reject(self, reason: str, message: str, wait_seconds: float) -> AdmissionRejected:
+        self._rejected[reason] = self._rejected.get(reason, 0) + 1
+        retry_after = retry_after_seconds(wait_seconds)
+        logger.warning(f"Analysis rejected ({reason}): {message}; retry after {retry_after}s")
+        return AdmissionRejected(reason, message, retry_after)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "active": {
+                client_id: {priority: len(started) for priority, started in classes.items()}
+                for client_id, classes in self._active.items()
+            },
+            "rejected": dict(self._rejected),
+            "avg_analysis_seconds": round(self.avg_duration, 2)
+        }
+
+
+# Instancia global del control de admisión
+admission_controller = AdmissionController()
@@ -2,17 +2,136 @@
 Servicio de análisis de contratos.
 """
 import os
+import time
 import uuid
+import shutil
 import asyncio
-from typing import Dict, Any, List
+import hashlib
+from typing import Dict, Any, List, Optional, Callable, Tuple
 
 from core.config import settings
 from core.logging import get_logger
-from services.http_client import call_service
+from services.http_client import call_service, cancel_service
+from services.readiness import service_readiness
+from services.scheduler import tool_scheduler
 from services.gemini_service import gemini_service
+from services.history_store import history_store
+from services.fingerprints import fingerprint_source
+from services.fingerprint_index import fingerprint_index, summarize_fingerprints, unit_status
+from services.budget_planner import budget_planner
+from services.solidity_parser import (
+    contract_info, deployable_contracts, has_entry_points, parse_source, select_compiler
+)
+from services.model_router import model_router, NEUTRAL_ERROR_TYPES
+from services.patching import PatchError, apply_fix_patch
+from services.projects import materialize, project_summary
+from services.tool_outputs import OutputSpool, current_spool
 
 logger = get_logger(__name__)
 
+# Callback de eventos de progreso del análisis (ver /analyze/stream)
+AnalysisEventCallback = Callable[[Dict[str, Any]], None]
+
+# Reglas de corte anticipado: nombre -> (servicio que dispara, condición)
+# Cuando la condición se cumple, se cancelan las herramientas que siguen en curso.
+SHORT_CIRCUIT_RULES = {
+    "solc_compile_error": (
+        "solc",
+        lambda result: result.get("error_type") == "compilation_error"
+    ),
+    "slither_compile_error": (
+        "slither",
+        lambda result: result.get("error_type") in ("compilation_error", "syntax_error")
+    ),
+}
+
+
+# Herramientas de fuzzing (las más caras)
+FUZZ_SERVICES = ("medusa", "echidna")
+
+
+# Reglas de ruteo previas a la ejecución, sobre la estructura del código
+# (ver parse_source): nombre -> (servicios omitidos, error_type, condición)
+ROUTING_RULES = {
+    "unsupported_compiler": (
+        None,
+        "unsupported_compiler",
+        lambda outline: select_compiler(outline["solidity_version"], settings.SOLC_VERSIONS) is None
+    ),
+    "no_deployable_contract": (
+        FUZZ_SERVICES,
+        "skipped",
+        lambda outline: not deployable_contracts(outline)
+    ),
+    "no_entry_points": (
+        FUZZ_SERVICES,
+        "skipped",
+        lambda outline: not any(
+            has_entry_points(outline, contract) for contract in deployable_contracts(outline)
+        )
+    ),
+}
+
+
+def _inconclusive(result: Dict[str, Any]) -> bool:
+    """Error de herramienta que no permite juzgar el contrato."""
+    return result.get("error_type") in NEUTRAL_ERROR_TYPES
+
+
+def _compiles(results: Dict[str, Any]) -> bool:
+    solc = results.get("solc") or {}
+    return bool(solc.get("success")) or _inconclusive(solc)
+
+
+def _static_clean(results: Dict[str, Any]) -> bool:
+    slither = results.get("slither") or {}
+    if slither.get("error_type") in ("compilation_error", "syntax_error"):
+        return False
+    detectors = (slither.get("results") or {}).get("detectors") or []
+    return not any(
+        (detector.get("impact") or "").lower() in settings.FIX_CANDIDATE_BLOCKING_IMPACTS
+        for detector in detectors
+    )
+
+
+def _fuzz_clean(results: Dict[str, Any]) -> bool:
+    return not any(
+        ((results.get(name) or {}).get("results") or {}).get("failed")
+        for name in FUZZ_SERVICES
+    )
+
+
+# Etapas de validación de los candidatos de corrección, de la más barata a
+# la más cara: nombre -> (servicios de la etapa, condición para pasarla)
+CANDIDATE_STAGES = [
+    ("compile", ["solc"], _compiles),
+    ("static", ["slither"], _static_clean),
+    ("fuzz", list(FUZZ_SERVICES), _fuzz_clean),
+]
+
+
+def _set_contract_info(
+    gemini_feedback: Dict[str, Any],
+    outline: Dict[str, Any],
+    filename: Optional[str],
+    compiled: Optional[bool]
+) -> None:
+    """Completa contract_name y contract_info del reporte a partir del código."""
+    report = gemini_feedback.get("response")
+    if not isinstance(report, dict):
+        return
+    info = contract_info(outline, filename, compiled=compiled)
+    report["contract_name"] = info.pop("contract_name") or report.get("contract_name")
+    report["contract_info"] = info
+
+
+def _apply_layout(tool_options: Dict[str, Dict[str, Any]], project: Optional[Dict[str, Any]]) -> None:
+    """Pasa la estructura del proyecto (remapeos) a todas las herramientas."""
+    if project is None:
+        return
+    for options in tool_options.values():
+        options["remappings"] = list(project["remappings"])
+
 
 class AnalysisService:
     """Servicio para análisis de contratos inteligentes."""
@@ -21,58 +140,195 @@ class AnalysisService:
         self,
         code: str,
         filename: str,
-        enable_auto_fix: bool = False
+        enable_auto_fix: bool = False,
+        analysis_id: Optional[str] = None,
+        on_event: Optional[AnalysisEventCallback] = None,
+        project: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """
         Analiza un contrato y opcionalmente intenta corregirlo.
         
+        La corrutina admite cancelación: al cancelarla se abortan las
+        llamadas a las herramientas en curso. El análisis (terminado, fallido
+        o cancelado) se guarda en el historial (ver AnalysisHistoryStore).
+        
+        Antes de ejecutar las herramientas se buscan las huellas del código en
+        el índice (ver FingerprintIndex): un archivo equivalente ya analizado
+        sin corrección reutiliza su reporte, y si todos los contratos son de
+        biblioteca o ya se fuzzearon sin hallazgos no se vuelve a fuzzear.
+        
+        Las salidas grandes de las herramientas se guardan en disco y los
+        resultados conservan solo una referencia con vista previa (ver
+        OutputSpool); la sección "memory" de la respuesta informa el pico de
+        memoria retenida por el análisis.
+        
         Args:
             code: Código fuente del contrato
             filename: Nombre del archivo
             enable_auto_fix: Si se deben intentar correcciones automáticas
+            analysis_id: ID del análisis (se genera si no se indica)
+            on_event: Callback de progreso: resultados de herramientas,
+                vulnerabilidades y reportes a medida que Gemini los genera
+            project: Proyecto de varios archivos (ver ProjectBuilder.build);
+                code y filename son entonces su archivo principal
             
         Returns:
             Resultados del análisis
         """
-        analysis_id = str(uuid.uuid4())
+        analysis_id = analysis_id or str(uuid.uuid4())
+        created_at = time.time()
+        started = time.monotonic()
+        # Duración de cada fase por intento
+        timings = {"attempts": []}
+        tool_results = None
         contract_folder = os.path.join(settings.WORKSPACE_DIR, analysis_id)
         
         current_code = code
         fix_history = []
+        # Trazas de las llamadas a Gemini (modelo, latencia, tokens)
+        llm_calls = []
+        
+        # El linaje se identifica por el código original: las correcciones
+        # sucesivas reutilizan el mismo corpus de Echidna
+        lineage_id = hashlib.sha256(code.encode("utf-8")).hexdigest()
+        
+        def record(outcome: str, **kwargs) -> None:
+            history_store.record(
+                analysis_id, lineage_id, filename, code, enable_auto_fix, outcome,
+                created_at, tool_results=tool_results, **kwargs
+            )
         
         max_retries = settings.MAX_FIX_RETRIES if enable_auto_fix else 0
+        # Resultados del candidato ganador, ya validado con las cuatro herramientas
+        validated_results = None
+        # Salidas grandes de las herramientas a disco y memoria retenida
+        spool = OutputSpool(analysis_id)
+        spool_token = current_spool.set(spool)
         
         try:
+            fingerprints, known = await self._fingerprint_lookup(code, lineage_id)
+            # En un proyecto el resultado depende también de los imports
+            reused = (known or {}).get("report") if project is None else None
+            if reused and not enable_auto_fix and settings.FINGERPRINT_REUSE_REPORTS:
+                logger.info(
+                    f"Analysis {analysis_id} matches {reused['analysis_id']} by fingerprint; reusing report"
+                )
+                # Mismo código, pero el contrato principal depende del nombre
+                # del archivo
+                results = reused["report"].get("results") or {}
+                _set_contract_info(
+                    results,
+                    parse_source(code),
+                    filename,
+                    ((results.get("response") or {}).get("contract_info") or {}).get("compiled_successfully")
+                )
+                # Solo el veredicto: presupuesto, ruteo y uso de Gemini son
+                # del análisis original, no de este pedido (reused_from)
+                response = {
+                    "analysis_id": analysis_id,
+                    "results": results,
+                    "timings": {"attempts": [], "total_seconds": round(time.monotonic() - started, 3)},
+                    "fingerprint": summarize_fingerprints(
+                        fingerprints, known, reused_from=reused["analysis_id"]
+                    ),
+                    "memory": spool.report()
+                }
+                if on_event is not None:
+                    on_event({"event": "report_reused", "reused_from": reused["analysis_id"]})
+                record("completed", report=response)
+                return response
+            
+            # Si todos los contratos ya son conocidos, el primer intento no fuzzea
+            known_code = bool(
+                known is not None and settings.FINGERPRINT_SKIP_KNOWN_FUZZING and fingerprints["contracts"]
+                and all(
+                    unit_status(known["units"].get(("contract", contract["fingerprint"]))) in ("library", "known")
+                    for contract in fingerprints["contracts"]
+                )
+            )
+            skipped_tools = []
+            
             os.makedirs(contract_folder, exist_ok=True)
+            if project is not None:
+                await asyncio.get_event_loop().run_in_executor(
+                    None, materialize, project, contract_folder, filename
+                )
             
             for attempt in range(max_retries + 1):
                 logger.info(
                     f"Analysis attempt {attempt+1}/{max_retries+1} for {analysis_id}"
                 )
+                attempt_timings = {"attempt": attempt + 1}
+                timings["attempts"].append(attempt_timings)
+                phase_started = time.monotonic()
                 
                 # Guardar contrato actual
                 contract_path = os.path.join(contract_folder, filename)
+                os.makedirs(os.path.dirname(contract_path), exist_ok=True)
                 with open(contract_path, "w") as f:
                     f.write(current_code)
                 
+                # Estructura del código: ruteo de herramientas y presupuesto
+                outline = parse_source(current_code)
+                routing = self._route_tools(outline)
+                if attempt == 0 and known_code:
+                    for name in FUZZ_SERVICES:
+                        routing["skipped"].setdefault(name, {
+                            "success": False,
+                            "error": "Skipped: all contracts match known fingerprints",
+                            "error_type": "skipped"
+                        })
+                skipped_tools = sorted(routing["skipped"])
+                
                 # Llamar a todos los servicios en paralelo
-                tool_results = await self._call_all_services(analysis_id, filename)
+                # Presupuesto por herramienta según la complejidad del contrato
+                budget = budget_planner.plan(current_code, outline)
+                tool_options = budget["tools"]
+                tool_options["echidna"].update({
+                    "corpus_key": lineage_id,
+                    "fix_iteration": attempt
+                })
+                _apply_layout(tool_options, project)
+                if validated_results is not None:
+                    tool_results, validated_results = validated_results, None
+                else:
+                    tool_results = await self._run_tools(
+                        analysis_id, filename, tool_options, routing["skipped"]
+                    )
+                attempt_timings["tools_seconds"] = round(time.monotonic() - phase_started, 3)
+                spool.sample()
+                
+                if on_event is not None:
+                    on_event({
+                        "event": "tools_completed",
+                        "attempt": attempt + 1,
+                        "tools": {
+                            name: {
+                                "success": result.get("success"),
+                                "error_type": result.get("error_type")
+                            }
+                            for name, result in tool_results.items()
+                        }
+                    })
                 
                 # Agregar historial de correcciones si existe
                 if fix_history:
                     tool_results["_fix_history"] = fix_history
                 
                 # Análisis con Gemini
-                gemini_feedback = await gemini_service.analyze_contract(tool_results)
+                phase_started = time.monotonic()
+                on_value, on_restart = self._stream_callbacks(on_event, attempt + 1)
+                gemini_feedback = await gemini_service.analyze_contract(
+                    tool_results, on_value=on_value, on_restart=on_restart
+                )
+                attempt_timings["llm_seconds"] = round(time.monotonic() - phase_started, 3)
+                if "llm" in gemini_feedback:
+                    llm_calls.append(gemini_feedback.pop("llm"))
+                spool.sample()
                 
                 # Si no se pidió corrección, terminar aquí
                 if not enable_auto_fix:
-                    return self._build_response(
-                        gemini_feedback, 
-                        tool_results, 
-                        current_code, 
-                        fix_history
-                    )
+                    break
                 
                 # Verificar si necesitamos corregir
                 analysis_json = gemini_feedback.get("response", {})
@@ -88,102 +344,752 @@ class AnalysisService:
                 # Intentar corrección si quedan intentos
                 if attempt < max_retries:
                     logger.info(f"Attempting to fix contract. Attempt {attempt+1}")
-                    fix_result = await gemini_service.fix_contract(
-                        current_code, 
-                        tool_results, 
-                        analysis_json
-                    )
-                    
-                    if fix_result.get("success") and fix_result.get("fix_data"):
-                        fix_data = fix_result["fix_data"]
-                        new_code = fix_data.get("fixed_code")
-                        
-                        if new_code and new_code.strip() != current_code.strip():
-                            current_code = new_code
-                            fix_history.append({
-                                "attempt": attempt + 1,
-                                "changes": fix_data.get("changes_made"),
-                                "explanation": fix_data.get("explanation")
-                            })
-                            continue
-                        else:
-                            logger.warning("Gemini returned same code. No fixes applied.")
-                            fix_history.append({
-                                "attempt": attempt + 1,
-                                "error": "Same code returned. No fixes applied."
-                            })
+                    phase_started = time.monotonic()
+                    if settings.FIX_CANDIDATES > 1:
+                        fix = await self._speculative_fix(
+                            analysis_id, filename, current_code, tool_results,
+                            analysis_json, llm_calls, lineage_id, attempt + 1, project
+                        )
                     else:
-                        error_msg = fix_result.get('error', 'Unknown error')
-                        logger.error(f"Fix failed: {error_msg}")
+                        fix = await self._request_fix(
+                            current_code, tool_results, analysis_json, llm_calls
+                        )
+                    attempt_timings["fix_seconds"] = round(time.monotonic() - phase_started, 3)
+                    
+                    if fix["code"] is not None:
+                        current_code = fix["code"]
+                        validated_results = fix.get("tool_results")
                         fix_history.append({
                             "attempt": attempt + 1,
-                            "error": f"Fix generation failed: {error_msg}"
+                            "mode": fix["mode"],
+                            "changes": fix["fix_data"].get("changes_made"),
+                            "explanation": fix["fix_data"].get("explanation"),
+                            **fix["details"]
                         })
+                        if on_event is not None:
+                            on_event({"event": "fix_applied", **fix_history[-1]})
+                        continue
+                    
+                    logger.error(f"Fix failed: {fix['error']}")
+                    fix_history.append({
+                        "attempt": attempt + 1,
+                        "mode": fix["mode"],
+                        "error": fix["error"],
+                        **fix["details"]
+                    })
                     
                     break
             
-            return self._build_response(
+            timings["total_seconds"] = round(time.monotonic() - started, 3)
+            response = self._build_response(
+                analysis_id,
                 gemini_feedback, 
                 tool_results, 
                 current_code, 
-                fix_history
+                fix_history,
+                budget,
+                llm_calls,
+                timings,
+                summarize_fingerprints(fingerprints, known, skipped_tools=skipped_tools)
+                if fingerprints is not None else None,
+                outline,
+                routing,
+                filename
             )
+            if project is not None:
+                response["project"] = project_summary(project)
+            spool.sample()
+            response["memory"] = spool.report()
+            record("completed", report=response)
+            if fingerprints is not None:
+                fingerprint_index.record(
+                    analysis_id,
+                    fingerprints if current_code == code else fingerprint_source(current_code),
+                    tool_results,
+                    fuzzed=any((tool_results.get(name) or {}).get("success") for name in FUZZ_SERVICES),
+                    fuzz_clean=_fuzz_clean(tool_results),
+                    report=None if enable_auto_fix or project is not None else response,
+                    source_hash=lineage_id
+                )
+            return response
             
+        except asyncio.CancelledError:
+            logger.info(f"Analysis {analysis_id} cancelled")
+            record("cancelled", error="cancelled")
+            raise
         except Exception as e:
             logger.exception("Error in analysis loop")
+            record("failed", error=str(e))
             raise
+        finally:
+            current_spool.reset(spool_token)
+    
+    async def _fingerprint_lookup(
+        self,
+        code: str,
+        source_hash: str
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """
+        Huellas del código y lo que el índice sabe de ellas.
+        
+        Args:
+            code: Código fuente del contrato
+            source_hash: SHA-256 del código (solo el código exacto reutiliza
+                un reporte; las huellas normalizadas sirven para los hallazgos
+                por unidad y para saltear el fuzzing)
+        
+        Returns:
+            Tupla (fingerprints, known); (None, None) si el índice está
+            deshabilitado y known None si no responde
+        """
+        if not fingerprint_index.enabled:
+            return None, None
+        fingerprints = fingerprint_source(code)
+        try:
+            return fingerprints, await fingerprint_index.lookup(fingerprints, source_hash)
+        except Exception as e:
+            logger.warning(f"Fingerprint lookup failed: {e}")
+            return fingerprints, None
+    
+    def _stream_callbacks(
+        self,
+        on_event: Optional[AnalysisEventCallback],
+        attempt: int
+    ) -> Tuple[Optional[Callable], Optional[Callable]]:
+        """
+        Traduce los valores parseados del streaming de Gemini a eventos.
+        
+        Se emiten las vulnerabilidades y los reportes por herramienta en
+        cuanto se completan; un reinicio de la generación se informa para que
+        el cliente descarte lo recibido en ese intento.
+        
+        Returns:
+            Tupla (on_value, on_restart) para GeminiService, o (None, None)
+        """
+        if on_event is None:
+            return None, None
+        
+        def on_value(path, value):
+            if path[0] == "vulnerabilities":
+                on_event({"event": "vulnerability", "attempt": attempt, "index": path[1], "data": value})
+            elif path[0] == "tools_reports":
+                on_event({"event": "tools_report", "attempt": attempt, "tool": path[1], "data": value})
+        
+        def on_restart(info):
+            on_event({"event": "llm_restart", "attempt": attempt, **info})
+        
+        return on_value, on_restart
+    
+    def _fix_mode(self, code: str) -> str:
+        """
+        Modo de corrección para el código actual según FIX_MODE.
+        
+        En modo "auto" los contratos cortos se reescriben completos y los
+        largos se corrigen con parches.
+        """
+        if settings.FIX_MODE == "auto":
+            lines = code.count("\n") + 1
+            return "patch" if lines >= settings.FIX_PATCH_MIN_LINES else "rewrite"
+        return "patch" if settings.FIX_MODE == "patch" else "rewrite"
+    
+    async def _request_fix(
+        self,
+        code: str,
+        tool_results: Dict[str, Any],
+        analysis_json: Dict[str, Any],
+        llm_calls: List[Dict[str, Any]],
+        temperature: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Pide una corrección a Gemini y la aplica.
+        
+        En modo patch los edits se aplican y validan localmente; si no
+        aplican se pide una reescritura completa del contrato.
+        
+        Args:
+            code: Código fuente actual
+            tool_results: Resultados de las herramientas
+            analysis_json: Análisis de Gemini
+            llm_calls: Lista donde se acumulan las trazas de Gemini
+            temperature: Temperatura de muestreo de Gemini
+            
+        Returns:
+            Diccionario con code (None si no hubo corrección), mode, fix_data,
+            error y details (estadísticas del parche, se agregan al historial)
+        """
+        mode = self._fix_mode(code)
+        details: Dict[str, Any] = {}
+        
+        if mode == "patch":
+            fix_result = await gemini_service.fix_contract(
+                code, tool_results, analysis_json, mode="patch", temperature=temperature
+            )
+            if "llm" in fix_result:
+                llm_calls.append(fix_result.pop("llm"))
+            
+            fix_data = fix_result.get("fix_data")
+            if fix_result.get("success") and isinstance(fix_data, dict):
+                try:
+                    new_code = apply_fix_patch(code, fix_data)
+                    details["patch_edits"] = len(fix_data.get("edits") or [])
+                    return {
+                        "code": new_code,
+                        "mode": "patch",
+                        "fix_data": fix_data,
+                        "error": None,
+                        "details": details
+                    }
+                except PatchError as exc:
+                    details["patch_error"] = str(exc)
+            else:
+                details["patch_error"] = f"Fix generation failed: {fix_result.get('error', 'Unknown error')}"
+            logger.warning(
+                f"Patch fix not applied ({details['patch_error']}); falling back to full rewrite"
+            )
+        
+        fix_result = await gemini_service.fix_contract(
+            code, tool_results, analysis_json, mode="rewrite", temperature=temperature
+        )
+        if "llm" in fix_result:
+            llm_calls.append(fix_result.pop("llm"))
+        
+        fix_data = fix_result.get("fix_data")
+        if not (fix_result.get("success") and isinstance(fix_data, dict)):
+            error = f"Fix generation failed: {fix_result.get('error', 'Unknown error')}"
+            return {"code": None, "mode": "rewrite", "fix_data": {}, "error": error, "details": details}
+        
+        new_code = fix_data.get("fixed_code")
+        if not new_code or new_code.strip() == code.strip():
+            logger.warning("Gemini returned same code. No fixes applied.")
+            return {
+                "code": None,
+                "mode": "rewrite",
+                "fix_data": fix_data,
+                "error": "Same code returned. No fixes applied.",
+                "details": details
+            }
+        
+        return {"code": new_code, "mode": "rewrite", "fix_data": fix_data, "error": None, "details": details}
+    
+    async def _speculative_fix(
+        self,
+        analysis_id: str,
+        filename: str,
+        code: str,
+        tool_results: Dict[str, Any],
+        analysis_json: Dict[str, Any],
+        llm_calls: List[Dict[str, Any]],
+        lineage_id: str,
+        fix_iteration: int,
+        project: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Genera FIX_CANDIDATES correcciones en paralelo y elige la primera válida.
+        
+        Cada candidato se valida en su propio workspace recorriendo
+        CANDIDATE_STAGES; el primero que pasa todas las etapas gana y los
+        demás se cancelan. Si ninguno pasa, se elige el que llegó más lejos.
+        
+        Args:
+            analysis_id: ID del análisis
+            filename: Nombre del archivo
+            code: Código fuente actual
+            tool_results: Resultados de las herramientas
+            analysis_json: Análisis de Gemini
+            llm_calls: Lista donde se acumulan las trazas de Gemini
+            lineage_id: Linaje del corpus de Echidna
+            fix_iteration: Número de intento de corrección
+            project: Proyecto del análisis (se enlaza en cada workspace de candidato)
+            
+        Returns:
+            Igual que _request_fix, más tool_results del ganador (None si
+            ningún candidato pasó todas las etapas)
+        """
+        seen: Dict[str, int] = {}
+        tasks = {
+            asyncio.ensure_future(
+                self._fix_candidate(
+                    index,
+                    f"{analysis_id}-fix{fix_iteration}-c{index}",
+                    filename, code, tool_results, analysis_json, llm_calls,
+                    lineage_id, fix_iteration, seen, project
+                )
+            ): index
+            for index in range(settings.FIX_CANDIDATES)
+        }
+        candidates: Dict[int, Dict[str, Any]] = {}
+        winner = None
+        pending = set(tasks)
+        
+        try:
+            while pending and winner is None:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    try:
+                        candidate = task.result()
+                    except Exception as e:
+                        # Un candidato que falla no detiene a los demás
+                        logger.error(f"Fix candidate {tasks[task]} failed for {analysis_id}: {e}")
+                        candidates[tasks[task]] = {
+                            "report": {
+                                "index": tasks[task],
+                                "passed": False,
+                                "stages_passed": 0,
+                                "status": "error",
+                                "error": str(e)
+                            },
+                            "fix": None,
+                            "results": None
+                        }
+                        continue
+                    candidates[candidate["report"]["index"]] = candidate
+                    if candidate["report"]["passed"] and winner is None:
+                        winner = candidate
+            
+            if pending:
+                logger.info(
+                    f"Fix candidate {winner['report']['index']} passed for {analysis_id}; "
+                    f"cancelling {sorted(tasks[t] for t in pending)}"
+                )
+        finally:
+            # Con ganador, cancelación o error: ningún candidato sigue usando
+            # las herramientas ni su workspace después de borrarlo
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.shield(asyncio.gather(*pending, return_exceptions=True))
+            for index in tasks.values():
+                shutil.rmtree(
+                    os.path.join(settings.WORKSPACE_DIR, f"{analysis_id}-fix{fix_iteration}-c{index}"),
+                    ignore_errors=True
+                )
+        
+        reports = [
+            candidates[index]["report"] if index in candidates
+            else {"index": index, "passed": False, "status": "cancelled"}
+            for index in range(settings.FIX_CANDIDATES)
+        ]
+        
+        if winner is None:
+            viable = [c for c in candidates.values() if c["report"]["stages_passed"] > 0]
+            if viable:
+                winner = max(
+                    viable,
+                    key=lambda c: (c["report"]["stages_passed"], -c["report"]["index"])
+                )
+        
+        speculative = {
+            "candidates": reports,
+            "selected": winner["report"]["index"] if winner else None,
+            "validated": bool(winner and winner["report"]["passed"])
+        }
+        if winner is None:
+            errors = [r.get("error") for r in reports if r.get("error")]
+            return {
+                "code": None,
+                "mode": None,
+                "fix_data": {},
+                "error": "No fix candidate compiled" + (f": {errors[0]}" if errors else ""),
+                "details": {"speculative": speculative},
+                "tool_results": None
+            }
+        
+        fix = winner["fix"]
+        return {
+            **fix,
+            "details": {**fix["details"], "speculative": speculative},
+            "tool_results": winner["results"] if winner["report"]["passed"] else None
+        }
+    
+    async def _fix_candidate(
+        self,
+        index: int,
+        candidate_id: str,
+        filename: str,
+        code: str,
+        tool_results: Dict[str, Any],
+        analysis_json: Dict[str, Any],
+        llm_calls: List[Dict[str, Any]],
+        lineage_id: str,
+        fix_iteration: int,
+        seen: Dict[str, int],
+        project: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Genera un candidato de corrección y lo valida por etapas.
+        
+        Args:
+            index: Índice del candidato (el 0 usa la temperatura del modelo)
+            candidate_id: ID de workspace del candidato
+            seen: Hash del código -> índice del candidato que ya lo valida
+            (resto: ver _speculative_fix)
+            
+        Returns:
+            Diccionario con fix (ver _request_fix), report y results
+        """
+        started = time.monotonic()
+        fix = await self._request_fix(
+            code, tool_results, analysis_json, llm_calls,
+            temperature=None if index == 0 else settings.FIX_CANDIDATE_TEMPERATURE
+        )
+        report: Dict[str, Any] = {
+            "index": index,
+            "mode": fix["mode"],
+            "passed": False,
+            "stages_passed": 0
+        }
+        candidate = {"fix": fix, "report": report, "results": {}}
+        
+        if fix["code"] is None:
+            report.update(status="no_fix", error=fix["error"])
+            return candidate
+        
+        digest = hashlib.sha256(fix["code"].encode("utf-8")).hexdigest()
+        if digest in seen:
+            report.update(status="duplicate", duplicate_of=seen[digest])
+            return candidate
+        seen[digest] = index
+        
+        folder = os.path.join(settings.WORKSPACE_DIR, candidate_id)
+        os.makedirs(folder, exist_ok=True)
+        if project is not None:
+            await asyncio.get_event_loop().run_in_executor(None, materialize, project, folder, filename)
+        os.makedirs(os.path.dirname(os.path.join(folder, filename)), exist_ok=True)
+        with open(os.path.join(folder, filename), "w") as f:
+            f.write(fix["code"])
+        
+        outline = parse_source(fix["code"])
+        skipped = self._route_tools(outline)["skipped"]
+        tool_options = budget_planner.plan(fix["code"], outline)["tools"]
+        tool_options["echidna"].update({
+            "corpus_key": lineage_id,
+            "fix_iteration": fix_iteration
+        })
+        _apply_layout(tool_options, project)
+        
+        report["status"] = "passed"
+        for stage, service_names, condition in CANDIDATE_STAGES:
+            stage_results = await self._run_tools(
+                candidate_id, filename, tool_options, skipped, service_names
+            )
+            candidate["results"].update(stage_results)
+            if not condition(stage_results):
+                report.update(status="rejected", failed_stage=stage)
+                break
+            report["stages_passed"] += 1
+        else:
+            report["passed"] = True
+        
+        report["elapsed_seconds"] = round(time.monotonic() - started, 2)
+        logger.info(
+            f"Fix candidate {candidate_id} {report['status']} "
+            f"after {report['stages_passed']} stage(s) in {report['elapsed_seconds']}s"
+        )
+        return candidate
+    
+    def _route_tools(self, outline: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Evalúa las reglas de ruteo habilitadas sobre la estructura del código.
+        
+        Args:
+            outline: Resultado de parse_source
+            
+        Returns:
+            Diccionario con solidity_version, compiler (versión elegida entre
+            SOLC_VERSIONS), rules (reglas cumplidas) y skipped (servicio ->
+            resultado que lo reemplaza)
+        """
+        compiler = select_compiler(outline["solidity_version"], settings.SOLC_VERSIONS)
+        rules = []
+        skipped: Dict[str, Dict[str, Any]] = {}
+        for rule in settings.TOOL_ROUTING_RULES:
+            if rule not in ROUTING_RULES:
+                continue
+            service_names, error_type, condition = ROUTING_RULES[rule]
+            if not condition(outline):
+                continue
+            rules.append(rule)
+            if rule == "unsupported_compiler":
+                error = (
+                    f"pragma solidity {outline['solidity_version']} is not satisfied by the "
+                    f"available compilers ({', '.join(settings.SOLC_VERSIONS)})"
+                )
+            else:
+                error = f"Skipped by routing rule {rule}"
+            for name in service_names or settings.services:
+                skipped.setdefault(name, {"success": False, "error": error, "error_type": error_type})
+        return {
+            "solidity_version": outline["solidity_version"],
+            "compiler": compiler,
+            "rules": rules,
+            "skipped": skipped
+        }
+    
+    async def _run_tools(
+        self,
+        analysis_id: str,
+        filename: str,
+        tool_options: Dict[str, Dict[str, Any]],
+        skipped: Dict[str, Dict[str, Any]],
+        service_names: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Llama a los servicios que el ruteo no omitió (ver _call_all_services).
+        
+        Los omitidos se reportan con el resultado de skipped, en el orden de
+        settings.services.
+        """
+        selected = [
+            name for name in settings.services
+            if (service_names is None or name in service_names) and name not in skipped
+        ]
+        if skipped:
+            logger.info(f"Routing {analysis_id}: skipping {', '.join(sorted(skipped))}")
+        output = await self._call_all_services(analysis_id, filename, tool_options, selected) if selected else {}
+        return {
+            name: output[name] if name in output else dict(skipped[name])
+            for name in settings.services
+            if service_names is None or name in service_names
+        }
     
     async def _call_all_services(
         self, 
         analysis_id: str, 
-        filename: str
+        filename: str,
+        tool_options: Optional[Dict[str, Dict[str, Any]]] = None,
+        service_names: Optional[List[str]] = None
     ) -> Dict[str, Any]:
         """
-        Llama a todos los microservicios en paralelo.
+        Llama a todos los microservicios (o a service_names) en paralelo.
+        
+        Si se cumple una regla de corte anticipado (SHORT_CIRCUIT_RULES), las
+        herramientas restantes se cancelan y se reportan como "skipped".
         
         Args:
             analysis_id: ID del análisis
             filename: Nombre del archivo
+            tool_options: Parámetros adicionales por servicio
+            service_names: Servicios a llamar (por defecto todos)
             
         Returns:
             Resultados de todos los servicios
         """
-        tasks = [
-            call_service(name, url, analysis_id, filename)
+        tool_options = tool_options or {}
+        tasks = {
+            asyncio.ensure_future(
+                self._call_when_ready(
+                    name,
+                    url,
+                    analysis_id,
+                    filename,
+                    tool_options.get(name),
+                    budget_planner.http_timeout(tool_options.get(name, {}))
+                )
+            ): name
             for name, url in settings.services.items()
-        ]
-        
-        results = await asyncio.gather(*tasks)
+            if service_names is None or name in service_names
+        }
         
         output = {}
-        for (service_name, _), result in zip(settings.services.items(), results):
-            output[service_name] = result
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    output[tasks[task]] = task.result()
+                
+                rule = self._triggered_rule(output)
+                if rule and pending:
+                    logger.info(
+                        f"Short-circuit rule {rule} triggered for {analysis_id}; "
+                        f"cancelling {sorted(tasks[t] for t in pending)}"
+                    )
+                    await self._cancel_tools(analysis_id, pending, tasks)
+                    for task in pending:
+                        output[tasks[task]] = {
+                            "success": False,
+                            "error": f"Cancelled by short-circuit rule {rule}",
+                            "error_type": "skipped"
+                        }
+                    pending = set()
+        except asyncio.CancelledError:
+            await self._cancel_tools(analysis_id, pending, tasks)
+            raise
         
-        return output
+        # Mantener el orden de settings.services en la salida
+        return {name: output[name] for name in settings.services if name in output}
+    
+    async def _call_when_ready(
+        self,
+        service_name: str,
+        service_url: str,
+        analysis_id: str,
+        filename: str,
+        options: Optional[Dict[str, Any]],
+        timeout: float
+    ) -> Dict[str, Any]:
+        """
+        Llama a un servicio solo cuando reporta estar listo (GET /ready).
+        
+        La llamada espera su turno en la cola justa del servicio según el
+        cliente y la prioridad del análisis.
+        
+        Args:
+            service_name: Nombre del servicio
+            service_url: URL del servicio
+            analysis_id: ID del análisis
+            filename: Nombre del archivo
+            options: Parámetros adicionales del servicio
+            timeout: Timeout HTTP de la llamada
+            
+        Returns:
+            Resultado del servicio (con las salidas grandes derramadas a disco,
+            ver OutputSpool), o un error "service_unavailable"
+        """
+        if not await service_readiness.wait_until_ready(service_name, service_url):
+            return {
+                "success": False,
+                "error": f"Service {service_name} is not ready",
+                "error_type": "service_unavailable"
+            }
+        result = await tool_scheduler.run(
+            service_name,
+            lambda: call_service(
+                service_name, service_url, analysis_id, filename, options, timeout
+            ),
+            cost=float((options or {}).get("timeout") or 1)
+        )
+        spool = current_spool.get()
+        if spool is None:
+            return result
+        return await asyncio.get_event_loop().run_in_executor(
+            None, spool.spill, service_name, result
+        )
+    
+    def _triggered_rule(self, output: Dict[str, Any]) -> Optional[str]:
+        """
+        Evalúa las reglas de corte anticipado habilitadas.
+        
+        Args:
+            output: Resultados de las herramientas terminadas
+            
+        Returns:
+            Nombre de la primera regla que se cumple, o None
+        """
+        for rule in settings.SHORT_CIRCUIT_RULES:
+            if rule not in SHORT_CIRCUIT_RULES:
+                continue
+            service_name, condition = SHORT_CIRCUIT_RULES[rule]
+            result = output.get(service_name)
+            if isinstance(result, dict) and condition(result):
+                return rule
+        return None
+    
+    async def _cancel_tools(
+        self,
+        analysis_id: str,
+        pending: set,
+        tasks: Dict[asyncio.Future, str]
+    ) -> None:
+        """
+        Cancela las llamadas en curso y los procesos remotos asociados.
+        
+        En modo streaming basta con cerrar la conexión; en modo bloqueante se
+        pide la cancelación explícita a cada servicio.
+        
+        Args:
+            analysis_id: ID del análisis
+            pending: Tareas de llamada aún en curso
+            tasks: Mapa tarea -> nombre de servicio
+        """
+        for task in pending:
+            task.cancel()
+        cancel_calls = []
+        if not settings.STREAM_TOOL_OUTPUT:
+            cancel_calls = [
+                cancel_service(tasks[task], settings.services[tasks[task]], analysis_id)
+                for task in pending
+            ]
+        # Protegido para que una segunda cancelación no deje procesos vivos
+        await asyncio.shield(
+            asyncio.gather(*pending, *cancel_calls, return_exceptions=True)
+        )
     
     def _build_response(
         self,
+        analysis_id: str,
         gemini_feedback: Dict[str, Any],
         tool_results: Dict[str, Any],
         current_code: str,
-        fix_history: List[Dict[str, Any]]
+        fix_history: List[Dict[str, Any]],
+        budget: Optional[Dict[str, Any]] = None,
+        llm_calls: Optional[List[Dict[str, Any]]] = None,
+        timings: Optional[Dict[str, Any]] = None,
+        fingerprint: Optional[Dict[str, Any]] = None,
+        outline: Optional[Dict[str, Any]] = None,
+        routing: Optional[Dict[str, Any]] = None,
+        filename: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Construye la respuesta final del análisis.
         
         Args:
+            analysis_id: ID del análisis (para GET /analyses/{analysis_id})
             gemini_feedback: Feedback de Gemini
             tool_results: Resultados de las herramientas
             current_code: Código actual (potencialmente corregido)
             fix_history: Historial de correcciones
+            budget: Presupuesto aplicado a las herramientas
+            llm_calls: Trazas de las llamadas a Gemini
+            timings: Duración de cada fase por intento y total
+            fingerprint: Huellas del código y coincidencias en el índice
+            outline: Estructura del código final (parse_source); completa
+                contract_name y contract_info sin depender del modelo
+            routing: Ruteo de herramientas del último intento
+            filename: Nombre del archivo
             
         Returns:
             Respuesta estructurada
         """
         response = {
+            "analysis_id": analysis_id,
             "results": gemini_feedback
         }
         
+        if timings:
+            response["timings"] = timings
+        
+        if fingerprint:
+            response["fingerprint"] = fingerprint
+        
+        if routing:
+            response["routing"] = {
+                key: value for key, value in routing.items() if key != "skipped"
+            }
+            response["routing"]["skipped_tools"] = sorted(routing["skipped"])
+        
+        if outline:
+            solc = tool_results.get("solc") or {}
+            _set_contract_info(
+                gemini_feedback,
+                outline,
+                filename,
+                bool(solc.get("success")) if solc.get("error_type") != "skipped" else None
+            )
+        
+        if budget:
+            response["budget"] = {
+                "tier": budget["tier"],
+                "complexity": budget["complexity"]
+            }
+        
+        if llm_calls:
+            response["llm_usage"] = model_router.summarize(llm_calls)
+        
         if fix_history:
             response["fixed_contract_code"] = current_code
             response["fix_history"] = fix_history
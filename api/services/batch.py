@@ -0,0 +1,226 @@
+"""
+Ejecución de lotes de análisis con deduplicación y ventana de concurrencia.
+"""
+import asyncio
+import hashlib
+import time
+from typing import Dict, Any, Awaitable, Callable, List, Optional
+
+from core.config import settings
+from core.logging import get_logger
+from models.schemas import BatchItem
+
+logger = get_logger(__name__)
+
+# Ejecuta un contrato del lote: (item, job_id) -> respuesta de /analyze
+BatchItemRunner = Callable[[BatchItem, str], Awaitable[Dict[str, Any]]]
+# Recibe los eventos del lote (ver POST /analyze/batch)
+BatchEventCallback = Callable[[Dict[str, Any]], None]
+
+# Fin de la entrada del lote
+_END = object()
+
+
+def batch_concurrency() -> int:
+    """
+    Contratos del lote en análisis a la vez.
+
+    Por defecto el doble de los slots del servicio más ancho: mientras unos
+    análisis están en Gemini, los demás mantienen ocupadas las herramientas.
+    """
+    if settings.BATCH_CONCURRENCY > 0:
+        return settings.BATCH_CONCURRENCY
+    return 2 * max(settings.TOOL_SLOTS.values())
+
+
+def order_by_cost(items: List[BatchItem]) -> List[int]:
+    """
+    Índices de los contratos del más largo al más corto.
+
+    Empezar por los más largos evita que un contrato grande lanzado al final
+    alargue todo el lote. Se ordena por tamaño del código y no por el
+    presupuesto (budget_planner parsea el contrato): ordenar miles de
+    contratos no debe bloquear el event loop.
+    """
+    return sorted(range(len(items)), key=lambda index: -len(items[index].code))
+
+
+def _source_key(item: BatchItem) -> str:
+    """
+    Contratos idénticos (mismo código, nombre de archivo y opciones) se
+    analizan una sola vez; el nombre cuenta porque elige el contrato
+    principal del reporte, igual que en la clave de coalescencia.
+    """
+    digest = hashlib.sha256(item.code.encode("utf-8")).hexdigest()
+    return f"{digest}:{item.filename}:{int(not item.is_production_ready)}"
+
+
+class BatchRunner:
+    """
+    Analiza los contratos de un lote a medida que llegan.
+
+    Cada código distinto se analiza una vez; las copias se informan con
+    duplicate_of apuntando al primero. Como mucho batch_concurrency()
+    contratos corren a la vez, y sus llamadas a las herramientas comparten
+    la cola justa de cada servicio con prioridad batch. Los resultados se
+    emiten en cuanto terminan, y al final un resumen del lote.
+    """
+
+    def __init__(
+        self,
+        batch_id: str,
+        run_item: BatchItemRunner,
+        emit: BatchEventCallback,
+        concurrency: Optional[int] = None
+    ):
+        """
+        Args:
+            batch_id: ID del lote (los contratos usan {batch_id}-{índice})
+            run_item: Corrutina que analiza un contrato
+            emit: Callback de eventos
+            concurrency: Contratos a la vez (por defecto batch_concurrency())
+        """
+        self.batch_id = batch_id
+        self._run_item = run_item
+        self._emit = emit
+        self._slots = asyncio.Semaphore(concurrency or batch_concurrency())
+        self._input: asyncio.Queue = asyncio.Queue()
+        self._tasks: set = set()
+        # Clave del código -> primer contrato con ese código
+        self._primaries: Dict[str, Dict[str, Any]] = {}
+        self._started = time.monotonic()
+        self._counts = {
+            "total": 0,
+            "unique": 0,
+            "duplicates": 0,
+            "completed": 0,
+            "failed": 0,
+            "cancelled": 0,
+            "invalid": 0,
+        }
+        self._verdicts: Dict[str, int] = {}
+
+    def submit(self, index: int, item: BatchItem) -> None:
+        """Encola un contrato del lote."""
+        self._counts["total"] += 1
+        self._input.put_nowait((index, item))
+
+    def reject(self, index: int, error: str, error_type: str = "invalid_item") -> None:
+        """Informa una entrada inválida del lote (no se analiza)."""
+        self._counts["total"] += 1
+        self._counts["invalid"] += 1
+        self._emit({
+            "event": "error",
+            "index": index,
+            "error": error,
+            "error_type": error_type
+        })
+
+    def close(self) -> None:
+        """Marca el fin de la entrada; run() termina cuando acaban los análisis."""
+        self._input.put_nowait(_END)
+
+    async def run(self) -> Dict[str, Any]:
+        """
+        Consume la entrada hasta close() y espera todos los análisis.
+
+        Returns:
+            Resumen del lote (también se emite como evento "summary")
+        """
+        try:
+            while True:
+                entry = await self._input.get()
+                if entry is _END:
+                    break
+                index, item = entry
+                key = _source_key(item)
+                primary = self._primaries.get(key)
+                if primary is not None:
+                    self._counts["duplicates"] += 1
+                    primary["duplicates"].append((index, item.id))
+                    if primary["done"]:
+                        self._emit_duplicates(primary)
+                    continue
+
+                primary = {"index": index, "id": item.id, "done": False, "duplicates": []}
+                self._primaries[key] = primary
+                self._counts["unique"] += 1
+                await self._slots.acquire()
+                task = asyncio.ensure_future(self._analyze(index, item, primary))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+            if self._tasks:
+                await asyncio.wait(set(self._tasks))
+        except asyncio.CancelledError:
+            for task in self._tasks:
+                task.cancel()
+            await asyncio.shield(asyncio.gather(*self._tasks, return_exceptions=True))
+            # Los contratos sin terminar cuentan como cancelados
+            finished = sum(self._counts[key] for key in ("completed", "failed", "cancelled", "invalid"))
+            self._counts["cancelled"] += self._counts["total"] - finished
+            self._emit(self._summary("cancelled"))
+            raise
+
+        summary = self._summary("completed")
+        self._emit(summary)
+        return summary
+
+    def _summary(self, status: str) -> Dict[str, Any]:
+        return {
+            "event": "summary",
+            "batch_id": self.batch_id,
+            "status": status,
+            **self._counts,
+            "verdicts": self._verdicts,
+            "elapsed_seconds": round(time.monotonic() - self._started, 3)
+        }
+
+    async def _analyze(self, index: int, item: BatchItem, primary: Dict[str, Any]) -> None:
+        job_id = f"{self.batch_id}-{index}"
+        try:
+            result = await self._run_item(item, job_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Batch {self.batch_id} item {index} failed: {e}")
+            result = {
+                "success": False,
+                "analysis_id": job_id,
+                "error": f"Internal server error: {e}",
+                "error_type": "internal_error"
+            }
+        finally:
+            self._slots.release()
+
+        primary.update(done=True, analysis_id=result.get("analysis_id", job_id))
+        if result.get("success") is False:
+            outcome = "cancelled" if result.get("error_type") == "cancelled" else "failed"
+            primary["outcome"] = outcome
+            self._counts[outcome] += 1
+            self._emit({"event": "error", "index": index, "id": item.id, **result})
+        else:
+            primary["outcome"] = "completed"
+            self._counts["completed"] += 1
+            verdict = ((result.get("results") or {}).get("response") or {}).get("status")
+            if isinstance(verdict, str):
+                primary["verdict"] = verdict
+                self._verdicts[verdict] = self._verdicts.get(verdict, 0) + 1
+            self._emit({"event": "result", "index": index, "id": item.id, "result": result})
+        self._emit_duplicates(primary)
+
+    def _emit_duplicates(self, primary: Dict[str, Any]) -> None:
+        """Informa las copias de un contrato ya analizado (sin repetir el resultado)."""
+        for index, item_id in primary["duplicates"]:
+            self._counts[primary["outcome"]] += 1
+            if primary.get("verdict"):
+                self._verdicts[primary["verdict"]] += 1
+            self._emit({
+                "event": "duplicate",
+                "index": index,
+                "id": item_id,
+                "duplicate_of": primary["index"],
+                "analysis_id": primary["analysis_id"],
+                "outcome": primary["outcome"]
+            })
+        primary["duplicates"] = []
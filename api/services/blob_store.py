@@ -0,0 +1,135 @@
+"""
+Almacén de archivos direccionado por contenido (SHA-256).
+"""
+import os
+import uuid
+import shutil
+import hashlib
+from typing import BinaryIO, Optional, Tuple
+
+from core.config import settings
+
+# Tamaño de los bloques de copia
+CHUNK_SIZE = 64 * 1024
+
+
+class BlobTooLarge(Exception):
+    """El archivo supera el tamaño máximo permitido."""
+
+
+class BlobWriter:
+    """
+    Escribe un archivo por bloques calculando su hash; al confirmarlo se
+    guarda bajo su hash, o se descarta si el almacén ya lo tenía.
+    """
+
+    def __init__(self, store: "BlobStore", max_bytes: Optional[int] = None):
+        self._store = store
+        self._max_bytes = max_bytes
+        self._tmp_path = store.temp_path()
+        self._file = open(self._tmp_path, "wb")
+        self._hash = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data: bytes) -> None:
+        """
+        Raises:
+            BlobTooLarge: Si el archivo supera max_bytes
+        """
+        self.size += len(data)
+        if self._max_bytes is not None and self.size > self._max_bytes:
+            raise BlobTooLarge(f"File exceeds {self._max_bytes} bytes")
+        self._hash.update(data)
+        self._file.write(data)
+
+    def commit(self) -> Tuple[str, bool]:
+        """
+        Returns:
+            (hash del contenido, True si el almacén no lo tenía)
+        """
+        self._file.close()
+        digest = self._hash.hexdigest()
+        path = self._store.path(digest)
+        if os.path.exists(path):
+            os.remove(self._tmp_path)
+            return digest, False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Solo lectura: los workspaces enlazan el mismo inodo
+        os.chmod(self._tmp_path, 0o444)
+        os.replace(self._tmp_path, path)
+        return digest, True
+
+    def abort(self) -> None:
+        """Descarta el archivo a medio escribir."""
+        self._file.close()
+        try:
+            os.remove(self._tmp_path)
+        except FileNotFoundError:
+            pass
+
+
+class BlobStore:
+    """
+    Archivos deduplicados por hash en BLOB_DIR/<2 primeros caracteres>/<hash>.
+
+    Los archivos se materializan en los workspaces como hard links (o copias
+    si el sistema de archivos no los admite), así que un mismo archivo subido
+    en muchos proyectos ocupa disco una sola vez.
+    """
+
+    def __init__(self, root: str):
+        """
+        Args:
+            root: Directorio del almacén
+        """
+        self.root = root
+
+    def path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest)
+
+    def temp_path(self) -> str:
+        """Ruta temporal dentro del almacén (mismo sistema de archivos que los blobs)."""
+        tmp_dir = os.path.join(self.root, ".tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+        return os.path.join(tmp_dir, uuid.uuid4().hex)
+
+    def writer(self, max_bytes: Optional[int] = None) -> BlobWriter:
+        return BlobWriter(self, max_bytes)
+
+    def put(self, source: BinaryIO, max_bytes: Optional[int] = None) -> Tuple[str, int, bool]:
+        """
+        Guarda el contenido de un archivo abierto.
+
+        Returns:
+            (hash, tamaño, True si el almacén no lo tenía)
+
+        Raises:
+            BlobTooLarge: Si el archivo supera max_bytes
+        """
+        writer = self.writer(max_bytes)
+        try:
+            for chunk in iter(lambda: source.read(CHUNK_SIZE), b""):
+                writer.write(chunk)
+            digest, new = writer.commit()
+        except BaseException:
+            writer.abort()
+            raise
+        return digest, writer.size, new
+
+    def read(self, digest: str) -> bytes:
+        with open(self.path(digest), "rb") as f:
+            return f.read()
+
+    def link(self, digest: str, destination: str) -> None:
+        """Materializa un blob en destination (hard link, o copia como respaldo)."""
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        if os.path.lexists(destination):
+            os.remove(destination)
+        try:
+            os.link(self.path(digest), destination)
+        except OSError:
+            shutil.copyfile(self.path(digest), destination)
+
+
+# Instancia global del almacén
+blob_store = BlobStore(settings.BLOB_DIR)
@@ -0,0 +1,74 @@
+"""
+Planificador de presupuesto por contrato para las herramientas de análisis.
+"""
+from typing import Dict, Any, Optional
+
+from core.config import settings
+from core.logging import get_logger
+from services.solidity_parser import parse_source
+
+logger = get_logger(__name__)
+
+
+class BudgetPlanner:
+    """Estima la complejidad de un contrato y asigna presupuestos por herramienta."""
+
+    def estimate_complexity(self, code: str, outline: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Estima la complejidad de un contrato a partir de su estructura.
+
+        Args:
+            code: Código fuente del contrato
+            outline: Resultado de parse_source, si ya se calculó
+
+        Returns:
+            Métricas de complejidad y puntuación agregada
+        """
+        metrics = dict((outline or parse_source(code))["metrics"])
+        weights = settings.BUDGET_COMPLEXITY_WEIGHTS
+        metrics["score"] = round(
+            sum(metrics[name] * weight for name, weight in weights.items()), 2
+        )
+        return metrics
+
+    def plan(self, code: str, outline: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Calcula el presupuesto de cada herramienta para un contrato.
+
+        Args:
+            code: Código fuente del contrato
+            outline: Resultado de parse_source, si ya se calculó
+
+        Returns:
+            Diccionario con la complejidad, el nivel asignado y los
+            parámetros por herramienta (timeout, test_limit, workers)
+        """
+        complexity = self.estimate_complexity(code, outline)
+
+        tier = None
+        for name, max_score in settings.BUDGET_TIER_THRESHOLDS:
+            if max_score is None or complexity["score"] <= max_score:
+                tier = name
+                break
+
+        tools = {
+            tool: dict(params)
+            for tool, params in settings.TOOL_BUDGETS[tier].items()
+        }
+        logger.info(
+            f"Budget planned | tier={tier} score={complexity['score']} "
+            f"functions={complexity['functions']} lines={complexity['lines']}"
+        )
+        return {"tier": tier, "complexity": complexity, "tools": tools}
+
+    @staticmethod
+    def http_timeout(tool_budget: Dict[str, Any]) -> float:
+        """Timeout HTTP para una llamada según el presupuesto de la herramienta."""
+        timeout = tool_budget.get("timeout")
+        if timeout is None:
+            return settings.SERVICE_TIMEOUT
+        return float(timeout) + settings.SERVICE_TIMEOUT_MARGIN
+
+
+# Instancia global del servicio
+budget_planner = BudgetPlanner()
@@ -0,0 +1,239 @@
+"""
+Coalescencia de análisis idénticos concurrentes (singleflight).
+"""
+import asyncio
+import copy
+import hashlib
+import json
+import time
+from typing import Dict, Any, Callable, Coroutine, List, Optional
+
+from core.config import settings
+from core.logging import get_logger
+from services.shared_state import SharedStateError, shared_state
+
+logger = get_logger(__name__)
+
+# Callback de eventos de progreso (ver AnalysisService.analyze_contract)
+EventCallback = Callable[[Dict[str, Any]], None]
+# Crea la corrutina del análisis a partir del callback de eventos compartido
+AnalysisFactory = Callable[[EventCallback], Coroutine]
+
+
+class Flight:
+    """Un análisis en curso compartido por todos los pedidos con la misma clave."""
+
+    def __init__(self, key: str, leader_id: str):
+        self.key = key
+        self.leader_id = leader_id
+        self.task: Optional[asyncio.Task] = None
+        self.waiters = 0
+        self.followers = 0
+        self.abandoned = False
+        self.started = time.time()
+        # Eventos emitidos hasta ahora, para los pedidos que se suman tarde
+        self.events: List[Dict[str, Any]] = []
+        self.subscribers: List[EventCallback] = []
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        """Reenvía un evento del análisis a todos los pedidos suscriptos."""
+        self.events.append(event)
+        for subscriber in list(self.subscribers):
+            subscriber(event)
+
+
+class AnalysisCoalescer:
+    """
+    Une los pedidos concurrentes con el mismo código y opciones en un solo análisis.
+
+    El primer pedido (líder) lanza el análisis; los siguientes (seguidores)
+    esperan el mismo resultado. Cualquiera puede cancelarse sin afectar a los
+    demás: el análisis solo se cancela cuando no queda nadie esperándolo.
+
+    Con un backend de estado compartido distribuido la coalescencia abarca
+    todos los workers: el primero en reservar la clave ejecuta el análisis y
+    publica el resultado por SHARED_RESULT_TTL segundos; los demás lo esperan
+    sondeando el backend (sin eventos de progreso intermedios).
+    """
+
+    def __init__(self):
+        """Inicializa sin análisis en curso."""
+        self._flights: Dict[str, Flight] = {}
+        self._stats = {"leaders": 0, "followers": 0, "remote_followers": 0, "abandoned": 0}
+
+    @staticmethod
+    def make_key(
+        code: str,
+        filename: str,
+        enable_auto_fix: bool,
+        project: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """
+        Clave de coalescencia: hash del código y de las opciones del análisis
+        (en un proyecto, también de sus archivos y remapeos).
+        """
+        key = {"code": code, "filename": filename, "enable_auto_fix": enable_auto_fix}
+        if project is not None:
+            key["project"] = {"files": project["files"], "remappings": project["remappings"]}
+        payload = json.dumps(key, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def run(
+        self,
+        key: str,
+        job_id: str,
+        factory: AnalysisFactory,
+        on_event: Optional[EventCallback] = None
+    ) -> Dict[str, Any]:
+        """
+        Ejecuta el análisis o se suma al que ya está en curso con la misma clave.
+
+        Args:
+            key: Clave de coalescencia (make_key)
+            job_id: ID del pedido; si es líder, también es el ID del análisis
+            factory: Crea la corrutina del análisis con el callback de eventos
+            on_event: Callback de eventos de este pedido
+
+        Returns:
+            Resultado del análisis; en los seguidores incluye coalesced_with
+            con el ID del análisis compartido
+        """
+        if not settings.COALESCING_ENABLED:
+            return await factory(on_event)
+
+        flight = self._flights.get(key)
+        leader = flight is None or flight.abandoned
+        if leader:
+            flight = Flight(key, job_id)
+            flight.task = asyncio.ensure_future(self._lead(flight, factory))
+            flight.task.add_done_callback(lambda _, flight=flight: self._forget(flight))
+            self._flights[key] = flight
+            self._stats["leaders"] += 1
+        else:
+            flight.followers += 1
+            self._stats["followers"] += 1
+            logger.info(f"Request {job_id} coalesced with in-flight analysis {flight.leader_id}")
+
+        if on_event is not None:
+            for event in flight.events:
+                on_event(event)
+            flight.subscribers.append(on_event)
+
+        flight.waiters += 1
+        try:
+            # shield: cancelar este pedido no cancela el análisis compartido
+            result = await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if on_event is not None:
+                flight.subscribers.remove(on_event)
+            if flight.waiters == 0 and not flight.task.done():
+                logger.info(f"No requests left waiting for {flight.leader_id}; cancelling it")
+                flight.abandoned = True
+                self._stats["abandoned"] += 1
+                flight.task.cancel()
+
+        result = copy.deepcopy(result)
+        if flight.leader_id != job_id:
+            result["coalesced_with"] = flight.leader_id
+        return result
+
+    async def _lead(self, flight: Flight, factory: AnalysisFactory) -> Dict[str, Any]:
+        """Análisis de un Flight: propio, o el de otro worker si ya está en curso."""
+        if not shared_state.distributed:
+            return await factory(flight.publish)
+
+        result = await self._follow_shared(flight)
+        if result is not None:
+            return result
+
+        renewal = asyncio.ensure_future(self._renew_shared(flight))
+        try:
+            result = await factory(flight.publish)
+        except BaseException:
+            renewal.cancel()
+            await self._release_shared(flight, None)
+            raise
+        renewal.cancel()
+        await self._release_shared(flight, result)
+        return result
+
+    async def _follow_shared(self, flight: Flight) -> Optional[Dict[str, Any]]:
+        """
+        Espera el resultado de otro worker o reserva la clave para este.
+
+        Returns:
+            Resultado publicado por otro worker, o None si este worker debe
+            ejecutar el análisis
+        """
+        flight_key, result_key = f"flight:{flight.key}", f"result:{flight.key}"
+        following = None
+        try:
+            while True:
+                published = await shared_state.get(result_key)
+                if published is not None:
+                    entry = json.loads(published)
+                    flight.leader_id = entry["analysis_id"]
+                    self._stats["remote_followers"] += 1
+                    return entry["result"]
+                if await shared_state.set(
+                    flight_key, flight.leader_id, ttl=settings.JOB_LEASE_TTL, only_if_absent=True
+                ):
+                    return None
+                if following is None:
+                    following = await shared_state.get(flight_key)
+                    logger.info(
+                        f"Request {flight.leader_id} waiting for analysis {following} in another worker"
+                    )
+                await asyncio.sleep(settings.SHARED_STATE_POLL_INTERVAL)
+        except SharedStateError as e:
+            logger.warning(f"Shared coalescing unavailable, analysing locally: {e}")
+            return None
+
+    async def _renew_shared(self, flight: Flight) -> None:
+        """Renueva la reserva de la clave mientras el análisis corre."""
+        while True:
+            await asyncio.sleep(settings.JOB_LEASE_TTL / 3)
+            try:
+                await shared_state.expire(f"flight:{flight.key}", settings.JOB_LEASE_TTL)
+            except SharedStateError as e:
+                logger.warning(f"Could not renew shared flight {flight.leader_id}: {e}")
+
+    async def _release_shared(self, flight: Flight, result: Optional[Dict[str, Any]]) -> None:
+        """Publica el resultado (si lo hay) y libera la clave para otros workers."""
+        try:
+            if result is not None:
+                await shared_state.set(
+                    f"result:{flight.key}",
+                    json.dumps({"analysis_id": flight.leader_id, "result": result}, default=str),
+                    ttl=settings.SHARED_RESULT_TTL
+                )
+            await shared_state.delete(f"flight:{flight.key}", expected=flight.leader_id)
+        except SharedStateError as e:
+            logger.warning(f"Could not release shared flight {flight.leader_id}: {e}")
+
+    def _forget(self, flight: Flight) -> None:
+        if self._flights.get(flight.key) is flight:
+            del self._flights[flight.key]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Contadores de coalescencia y análisis compartidos en curso."""
+        now = time.time()
+        return {
+            "enabled": settings.COALESCING_ENABLED,
+            "shared": shared_state.distributed,
+            **self._stats,
+            "in_flight": [
+                {
+                    "analysis_id": flight.leader_id,
+                    "waiters": flight.waiters,
+                    "followers": flight.followers,
+                    "running_seconds": round(now - flight.started, 2)
+                }
+                for flight in self._flights.values()
+            ]
+        }
+
+
+# Instancia global del coalescedor
+analysis_coalescer = AnalysisCoalescer()
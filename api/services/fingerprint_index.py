@@ -0,0 +1,344 @@
+"""
+Índice de huellas de código ya analizado (SQLite embebido).
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import time
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+
+from core.config import settings
+from core.logging import get_logger
+from services.fingerprints import attribute_findings
+
+logger = get_logger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS units (
+    fingerprint TEXT NOT NULL,
+    -- source, contract o function
+    kind TEXT NOT NULL,
+    name TEXT,
+    -- Código de biblioteca registrado con POST /fingerprints/library
+    library INTEGER NOT NULL DEFAULT 0,
+    label TEXT,
+    seen INTEGER NOT NULL DEFAULT 0,
+    first_analysis_id TEXT,
+    last_analysis_id TEXT,
+    -- Hallazgos del último análisis (JSON)
+    findings TEXT NOT NULL DEFAULT '[]',
+    -- Sin hallazgos bloqueantes en el último análisis
+    clean INTEGER NOT NULL DEFAULT 0,
+    -- Alguna vez pasó por los fuzzers
+    fuzzed INTEGER NOT NULL DEFAULT 0,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    PRIMARY KEY (fingerprint, kind)
+);
+-- Reportes reutilizables, solo para el mismo código exacto (SHA-256): la
+-- huella normalizada no distingue nombres, literales ni líneas
+CREATE TABLE IF NOT EXISTS source_reports (
+    source_hash TEXT PRIMARY KEY,
+    analysis_id TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    -- Respuesta de /analyze comprimida con zlib
+    report BLOB NOT NULL
+);
+"""
+
+UPSERT = """
+INSERT INTO units (
+    fingerprint, kind, name, library, label, seen, first_analysis_id, last_analysis_id,
+    findings, clean, fuzzed, first_seen, last_seen
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (fingerprint, kind) DO UPDATE SET
+    name = COALESCE(units.name, excluded.name),
+    library = MAX(units.library, excluded.library),
+    label = COALESCE(excluded.label, units.label),
+    seen = units.seen + excluded.seen,
+    first_analysis_id = COALESCE(units.first_analysis_id, excluded.first_analysis_id),
+    last_analysis_id = COALESCE(excluded.last_analysis_id, units.last_analysis_id),
+    findings = CASE WHEN excluded.seen > 0 THEN excluded.findings ELSE units.findings END,
+    clean = CASE WHEN excluded.seen > 0 THEN excluded.clean ELSE units.clean END,
+    fuzzed = MAX(units.fuzzed, excluded.fuzzed),
+    last_seen = excluded.last_seen
+"""
+
+
+def _blocking(findings: List[Dict[str, Any]]) -> bool:
+    return any(
+        (finding.get("impact") or "").lower() in settings.FIX_CANDIDATE_BLOCKING_IMPACTS
+        for finding in findings
+    )
+
+
+def _row(row: sqlite3.Row) -> Dict[str, Any]:
+    unit = dict(row)
+    unit["findings"] = json.loads(unit["findings"])
+    for flag in ("library", "clean", "fuzzed"):
+        unit[flag] = bool(unit[flag])
+    return unit
+
+
+class FingerprintIndex:
+    """
+    Guarda las huellas de cada archivo, contrato y función analizados junto
+    con sus hallazgos, para reconocer código ya visto (clones, bibliotecas).
+
+    Igual que AnalysisHistoryStore, todas las operaciones corren en un único
+    hilo dedicado.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Ruta del archivo SQLite
+        """
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fingerprints")
+        # Solo se usa desde el hilo del executor
+        self._conn: Optional[sqlite3.Connection] = None
+
+    @property
+    def enabled(self) -> bool:
+        return settings.FINGERPRINT_ENABLED
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_event_loop().run_in_executor(self._executor, fn, *args)
+
+    def record(
+        self,
+        analysis_id: str,
+        fingerprints: Dict[str, Any],
+        tool_results: Dict[str, Any],
+        fuzzed: bool,
+        fuzz_clean: bool,
+        report: Optional[Dict[str, Any]] = None,
+        source_hash: Optional[str] = None
+    ) -> Optional[Future]:
+        """
+        Indexa en segundo plano las huellas de un análisis terminado.
+
+        Args:
+            analysis_id: ID del análisis
+            fingerprints: Resultado de fingerprint_source del código analizado
+            tool_results: Resultados de las herramientas sobre ese código
+            fuzzed: Si los fuzzers corrieron sobre ese código
+            fuzz_clean: Si los fuzzers no encontraron fallas
+            report: Respuesta de /analyze reutilizable para el mismo archivo
+                (solo análisis sin corrección automática)
+            source_hash: SHA-256 del código exacto (clave del reporte)
+
+        Returns:
+            Future de la escritura, o None si el índice está deshabilitado
+        """
+        if not self.enabled:
+            return None
+        findings = attribute_findings(fingerprints["contracts"], tool_results)
+        rows = [(
+            fingerprints["source"], "source", None, False, None, analysis_id,
+            [], fuzz_clean and not _blocking(sum(findings.values(), [])), fuzzed
+        )]
+        for contract in fingerprints["contracts"]:
+            contract_findings = findings[contract["fingerprint"]]
+            rows.append((
+                contract["fingerprint"], "contract", contract["name"], False, None, analysis_id,
+                contract_findings, fuzz_clean and not _blocking(contract_findings), fuzzed
+            ))
+            for function in contract["functions"]:
+                function_findings = findings[function["fingerprint"]]
+                rows.append((
+                    function["fingerprint"], "function", f"{contract['name']}.{function['name']}",
+                    False, None, analysis_id, function_findings,
+                    fuzz_clean and not _blocking(function_findings), fuzzed
+                ))
+        if source_hash is None:
+            report = None
+        future = self._executor.submit(self._write, rows, source_hash, analysis_id, report)
+        future.add_done_callback(self._log_failure)
+        return future
+
+    async def register_library(self, fingerprints: Dict[str, Any], label: str) -> None:
+        """
+        Marca como biblioteca de confianza los contratos y funciones de un archivo.
+
+        Args:
+            fingerprints: Resultado de fingerprint_source del código de la biblioteca
+            label: Nombre de la biblioteca (p. ej. "openzeppelin-contracts 4.9.3")
+        """
+        rows = [(fingerprints["source"], "source", None, True, label, None, [], True, False)]
+        for contract in fingerprints["contracts"]:
+            rows.append((contract["fingerprint"], "contract", contract["name"], True, label, None, [], True, False))
+            for function in contract["functions"]:
+                rows.append((
+                    function["fingerprint"], "function", f"{contract['name']}.{function['name']}",
+                    True, label, None, [], True, False
+                ))
+        await self._run(self._write, rows, None, None, None)
+
+    @staticmethod
+    def _log_failure(future: Future) -> None:
+        if future.exception() is not None:
+            logger.error(f"Could not update fingerprint index: {future.exception()}")
+
+    def _write(
+        self,
+        rows: List[tuple],
+        source_hash: Optional[str],
+        analysis_id: Optional[str],
+        report: Optional[Dict[str, Any]]
+    ) -> None:
+        now = time.time()
+        conn = self._connection()
+        with conn:
+            conn.executemany(UPSERT, [
+                (
+                    fingerprint, kind, name, int(library), label, int(analysis_id is not None),
+                    analysis_id, analysis_id, json.dumps(findings), int(clean), int(fuzzed), now, now
+                )
+                for fingerprint, kind, name, library, label, analysis_id, findings, clean, fuzzed in rows
+            ])
+            if report is not None:
+                conn.execute(
+                    "INSERT OR REPLACE INTO source_reports (source_hash, analysis_id, created_at, report) "
+                    "VALUES (?, ?, ?, ?)",
+                    (source_hash, analysis_id, now, zlib.compress(json.dumps(report, default=str).encode("utf-8")))
+                )
+
+    async def lookup(self, fingerprints: Dict[str, Any], source_hash: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Lo que el índice sabe de un archivo.
+
+        Args:
+            fingerprints: Resultado de fingerprint_source
+            source_hash: SHA-256 del código exacto; sin él no se busca reporte
+
+        Returns:
+            Diccionario con report (reporte reutilizable del mismo archivo y
+            su analysis_id, o None si no hay uno vigente) y units
+            ((kind, huella) -> registro de las unidades ya vistas)
+        """
+        keys = [("source", fingerprints["source"])]
+        for contract in fingerprints["contracts"]:
+            keys.append(("contract", contract["fingerprint"]))
+            keys.extend(("function", function["fingerprint"]) for function in contract["functions"])
+        return await self._run(self._lookup, source_hash, keys)
+
+    def _lookup(self, source_hash: Optional[str], keys: List[tuple]) -> Dict[str, Any]:
+        conn = self._connection()
+        units = {}
+        for kind, fingerprint in keys:
+            row = conn.execute(
+                "SELECT * FROM units WHERE fingerprint = ? AND kind = ?", (fingerprint, kind)
+            ).fetchone()
+            if row is not None:
+                units[(kind, fingerprint)] = _row(row)
+
+        report = None
+        row = None
+        if source_hash is not None:
+            row = conn.execute(
+                "SELECT analysis_id, report FROM source_reports WHERE source_hash = ? AND created_at > ?",
+                (source_hash, time.time() - settings.FINGERPRINT_REPORT_TTL)
+            ).fetchone()
+        if row is not None:
+            report = {
+                "analysis_id": row["analysis_id"],
+                "report": json.loads(zlib.decompress(row["report"]).decode("utf-8"))
+            }
+        return {"report": report, "units": units}
+
+    async def get(self, fingerprint: str) -> List[Dict[str, Any]]:
+        """
+        Registros de una huella (uno por tipo de unidad que la comparte).
+
+        Args:
+            fingerprint: Huella SHA-256
+
+        Returns:
+            Lista de registros, vacía si la huella no se vio nunca
+        """
+        return await self._run(self._get, fingerprint)
+
+    def _get(self, fingerprint: str) -> List[Dict[str, Any]]:
+        rows = self._connection().execute(
+            "SELECT * FROM units WHERE fingerprint = ? ORDER BY kind", (fingerprint,)
+        ).fetchall()
+        return [_row(row) for row in rows]
+
+
+def unit_status(unit: Optional[Dict[str, Any]]) -> str:
+    """
+    Clasifica una unidad del índice.
+
+    Returns:
+        library, known (analizada y fuzzeada sin hallazgos bloqueantes),
+        seen (analizada con hallazgos o sin fuzzing) o novel
+    """
+    if unit is None:
+        return "novel"
+    if unit["library"]:
+        return "library"
+    return "known" if unit["clean"] and unit["fuzzed"] else "seen"
+
+
+def summarize_fingerprints(
+    fingerprints: Dict[str, Any],
+    known: Optional[Dict[str, Any]],
+    reused_from: Optional[str] = None,
+    skipped_tools: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """
+    Sección "fingerprint" de la respuesta: qué contratos y funciones ya
+    estaban en el índice y qué se reutilizó.
+
+    Args:
+        fingerprints: Resultado de fingerprint_source
+        known: Resultado de FingerprintIndex.lookup (None si no se consultó)
+        reused_from: Análisis cuyo reporte se reutilizó
+        skipped_tools: Herramientas que no se ejecutaron por código conocido
+    """
+    units = (known or {}).get("units") or {}
+    contracts = []
+    for contract in fingerprints["contracts"]:
+        unit = units.get(("contract", contract["fingerprint"]))
+        contracts.append({
+            "name": contract["name"],
+            "kind": contract["kind"],
+            "fingerprint": contract["fingerprint"],
+            "status": unit_status(unit),
+            "library": unit["label"] if unit and unit["library"] else None,
+            "previously_analyzed": unit["last_analysis_id"] if unit else None,
+            "previous_findings": unit["findings"] if unit else [],
+            "functions": {
+                "total": len(contract["functions"]),
+                "known": sum(
+                    ("function", function["fingerprint"]) in units
+                    for function in contract["functions"]
+                )
+            }
+        })
+    return {
+        "source": fingerprints["source"],
+        "solidity": fingerprints["solidity"],
+        "reused_from": reused_from,
+        "skipped_tools": skipped_tools or [],
+        "novel_contracts": [c["name"] for c in contracts if c["status"] == "novel"],
+        "contracts": contracts
+    }
+
+
+# Instancia global del índice
+fingerprint_index = FingerprintIndex(settings.FINGERPRINT_DB_PATH)
@@ -0,0 +1,206 @@
+"""
+Huellas normalizadas de contratos y funciones Solidity.
+"""
+import hashlib
+import re
+from typing import Dict, Any, List, Optional
+
+from services.solidity_lexer import Token, matching_brace, tokenize
+
+# Identificadores con semántica propia del lenguaje: no se renombran
+BUILTIN_IDENTIFIERS = frozenset("""
+    msg block tx abi this super now selfdestruct suicide require assert keccak256 sha256 sha3
+    ripemd160 ecrecover addmod mulmod gasleft blockhash
+    sender value data sig timestamp number origin gasprice coinbase difficulty prevrandao
+    basefee chainid gaslimit call delegatecall staticcall transfer send balance code codehash
+    length push pop encode encodePacked encodeWithSelector encodeWithSignature encodeCall
+    decode selector creationCode runtimeCode interfaceId min max concat
+""".split())
+
+# Unidades de primer nivel y miembros con cuerpo propio
+CONTRACT_KEYWORDS = ("contract", "library", "interface")
+FUNCTION_KEYWORDS = ("function", "modifier", "constructor", "fallback", "receive")
+
+_VERSION_RE = re.compile(r"\d+\.\d+")
+
+
+def _solidity_family(tokens: List[Token]) -> str:
+    """Versión mayor.menor del primer pragma solidity (la semántica cambia entre versiones)."""
+    for index, token in enumerate(tokens):
+        if token.text == "pragma" and index + 1 < len(tokens) and tokens[index + 1].text == "solidity":
+            text = "".join(t.text for t in tokens[index + 2:index + 8])
+            match = _VERSION_RE.search(text)
+            if match:
+                return match.group()
+    return "unknown"
+
+
+def normalize(tokens: List[Token]) -> List[str]:
+    """
+    Forma canónica de una secuencia de tokens.
+
+    Los identificadores propios se reemplazan por su orden de aparición
+    ($1, $2...), los números por NUM y los textos por STR. Se conservan
+    palabras reservadas, tipos, operadores e identificadores del lenguaje
+    (msg.sender, .call, require...). Dos fragmentos que difieren solo en
+    nombres, constantes, comentarios o formato quedan iguales.
+    """
+    names: Dict[str, str] = {}
+    normalized = []
+    for token in tokens:
+        if token.kind == "ident" and token.text not in BUILTIN_IDENTIFIERS:
+            normalized.append(names.setdefault(token.text, f"${len(names) + 1}"))
+        elif token.kind == "number":
+            normalized.append("NUM")
+        elif token.kind == "string":
+            normalized.append("STR")
+        else:
+            normalized.append(token.text)
+    return normalized
+
+
+def _digest(family: str, tokens: List[Token]) -> str:
+    payload = f"solidity {family}\n" + " ".join(normalize(tokens))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _without_pragmas(tokens: List[Token]) -> List[Token]:
+    """Quita pragmas e imports (la versión ya va aparte en la huella)."""
+    result = []
+    skipping = False
+    for token in tokens:
+        if not skipping and token.text in ("pragma", "import") and token.kind == "keyword":
+            skipping = True
+        if not skipping:
+            result.append(token)
+        elif token.text == ";":
+            skipping = False
+    return result
+
+
+def _unit_name(tokens: List[Token], index: int) -> Optional[str]:
+    following = tokens[index + 1] if index + 1 < len(tokens) else None
+    return following.text if following is not None and following.kind == "ident" else None
+
+
+def _function_units(tokens: List[Token], body_start: int, body_end: int) -> List[Dict[str, Any]]:
+    """Funciones, modificadores y constructores declarados en el cuerpo de un contrato."""
+    units = []
+    index = body_start + 1
+    while index < body_end:
+        token = tokens[index]
+        if token.text == "{":
+            # Structs, enums y bloques anidados se saltean completos
+            index = matching_brace(tokens, index) + 1
+            continue
+        if token.kind == "keyword" and token.text in FUNCTION_KEYWORDS:
+            name = token.text
+            if token.text in ("function", "modifier"):
+                name = _unit_name(tokens, index) or token.text
+            end = index
+            while end < body_end and tokens[end].text not in ("{", ";"):
+                end += 1
+            if end < body_end and tokens[end].text == "{":
+                end = matching_brace(tokens, end)
+            units.append({"kind": token.text, "name": name, "start": index, "end": end})
+            index = end + 1
+            continue
+        index += 1
+    return units
+
+
+def fingerprint_source(code: str) -> Dict[str, Any]:
+    """
+    Huellas del archivo completo, de cada contrato y de cada función.
+
+    Args:
+        code: Código fuente Solidity
+
+    Returns:
+        Diccionario con la huella del archivo (source), la familia de
+        versión del compilador y la lista de contratos, cada uno con su
+        huella y las de sus funciones
+    """
+    tokens = tokenize(code)
+    family = _solidity_family(tokens)
+    body = _without_pragmas(tokens)
+
+    contracts = []
+    index = 0
+    while index < len(body):
+        token = body[index]
+        if token.kind == "keyword" and token.text in CONTRACT_KEYWORDS:
+            start = index - 1 if index > 0 and body[index - 1].text == "abstract" else index
+            brace = index
+            while brace < len(body) and body[brace].text not in ("{", ";"):
+                brace += 1
+            if brace >= len(body) or body[brace].text != "{":
+                index = brace + 1
+                continue
+            end = matching_brace(body, brace)
+            functions = [
+                {
+                    "kind": unit["kind"],
+                    "name": unit["name"],
+                    "fingerprint": _digest(family, body[unit["start"]:unit["end"] + 1]),
+                }
+                for unit in _function_units(body, brace, end)
+            ]
+            contracts.append({
+                "kind": token.text,
+                "name": _unit_name(body, index) or token.text,
+                "fingerprint": _digest(family, body[start:end + 1]),
+                "functions": functions,
+            })
+            index = end + 1
+            continue
+        index += 1
+
+    return {
+        "source": _digest(family, body),
+        "solidity": family,
+        "contracts": contracts,
+    }
+
+
+def attribute_findings(
+    contracts: List[Dict[str, Any]],
+    tool_results: Dict[str, Any]
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Asigna los detectores de Slither a contratos y funciones por nombre.
+
+    Slither describe cada hallazgo como "Contrato.funcion(args) (archivo#línea)";
+    un hallazgo se asigna a la función que menciona y al contrato.
+
+    Args:
+        contracts: Contratos de fingerprint_source
+        tool_results: Resultados de las herramientas
+
+    Returns:
+        Huella -> hallazgos de esa unidad
+    """
+    detectors = ((tool_results.get("slither") or {}).get("results") or {}).get("detectors") or []
+    findings: Dict[str, List[Dict[str, Any]]] = {}
+    for contract in contracts:
+        findings.setdefault(contract["fingerprint"], [])
+        for function in contract["functions"]:
+            findings.setdefault(function["fingerprint"], [])
+
+    for detector in detectors:
+        description = detector.get("description") or ""
+        finding = {
+            "tool": "slither",
+            "check": detector.get("check"),
+            "impact": detector.get("impact"),
+            "confidence": detector.get("confidence"),
+        }
+        for contract in contracts:
+            name = re.escape(contract["name"])
+            if not re.search(rf"\b{name}\b", description):
+                continue
+            findings[contract["fingerprint"]].append(finding)
+            for function in contract["functions"]:
+                if re.search(rf"\b{name}\.{re.escape(function['name'])}\(", description):
+                    findings[function["fingerprint"]].append(finding)
+    return findings
@@ -1,37 +1,38 @@
 """
-Servicio de integración con Gemini AI.
+Servicio de análisis y corrección con LLM (Gemini u otro backend configurado).
 """
 import asyncio
 import json
-from typing import Dict, Any, Tuple, Optional
-from google import genai
+import time
+from typing import Dict, Any, Tuple, Optional, Callable
 
 from core.config import settings
 from core.logging import get_logger
-from services.prompts import ANALYSIS_PROMPT, FIX_PROMPT
+from services.llm import LLMBackend, empty_usage, llm_backends
+from services.model_router import model_router, max_severity
+from services.json_stream import JSONStreamError, JSONStreamParser, Path
+from services.prompts import ANALYSIS_PROMPT, FIX_PROMPT, FIX_PATCH_PROMPT
 
 logger = get_logger(__name__)
 
+# Callback de valores completos durante el streaming: recibe (ruta, valor)
+ValueCallback = Callable[[Path, Any], None]
+# Callback de reinicio de la generación: recibe {model, reason}
+RestartCallback = Callable[[Dict[str, Any]], None]
+
 
 class GeminiService:
-    """Servicio para interactuar con Gemini AI."""
+    """
+    Servicio de análisis y corrección de contratos con LLM.
     
-    def __init__(self):
-        """Inicializa el cliente de Gemini."""
-        self.client = None
-        self.enabled = False
-        
-        if settings.GEMINI_API_KEY:
-            try:
-                self.client = genai.Client(api_key=settings.GEMINI_API_KEY)
-                self.enabled = True
-                logger.info(
-                    f"Gemini initialized | model={settings.GEMINI_MODEL} enabled=True"
-                )
-            except Exception as exc:
-                logger.error(f"Failed to initialize Gemini client: {exc}")
-        else:
-            logger.warning("Gemini API key not configured")
+    El proveedor de cada tipo de llamada lo define el registro de backends
+    (LLM_BACKEND / LLM_CALL_TYPE_BACKENDS); Gemini es el backend por defecto.
+    """
+    
+    @property
+    def enabled(self) -> bool:
+        """Si el backend de análisis está configurado."""
+        return llm_backends.for_call_type("analysis").enabled
     
     def _extract_json_from_text(self, text: str) -> Tuple[Optional[Any], Optional[str]]:
         """
@@ -75,38 +76,49 @@ class GeminiService:
         except json.JSONDecodeError as exc:
             return None, f"json_decode_error: {exc} | Text snippet: {cleaned[:100]}..."
     
-    async def analyze_contract(self, tool_outputs: Dict[str, Any]) -> Dict[str, Any]:
+    async def analyze_contract(
+        self,
+        tool_outputs: Dict[str, Any],
+        on_value: Optional[ValueCallback] = None,
+        on_restart: Optional[RestartCallback] = None
+    ) -> Dict[str, Any]:
         """
         Analiza los resultados de las herramientas con Gemini.
         
         Args:
             tool_outputs: Resultados de los microservicios
+            on_value: Callback con cada (ruta, valor) de primer nivel ya
+                completo (p. ej. ("vulnerabilities", 0)) mientras se genera
+            on_restart: Callback cuando la generación se reinicia y los
+                valores ya emitidos deben descartarse
             
         Returns:
             Análisis de Gemini o error
         """
-        if not self.enabled or not self.client:
-            logger.warning("Gemini not available; skipping analysis")
-            return {"enabled": False, "reason": "gemini_not_configured"}
+        backend = llm_backends.for_call_type("analysis")
+        if not backend.enabled:
+            logger.warning(f"LLM backend {backend.name} not available; skipping analysis")
+            return {"enabled": False, "reason": f"{backend.name}_not_configured"}
         
         try:
             prompt = f"{ANALYSIS_PROMPT}\n\nResultados de herramientas:\n{json.dumps(tool_outputs, ensure_ascii=False)}"
             
-            response = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: self.client.models.generate_content(
-                    model=settings.GEMINI_MODEL,
-                    contents=prompt
-                )
+            text_response, parsed_json, trace, error = await self._generate(
+                "analysis", prompt, max_severity(tool_outputs),
+                on_value=on_value, on_restart=on_restart
             )
+            if text_response is None:
+                return {"enabled": True, "error": f"Gemini request failed: {error}", "llm": trace}
             
-            text_response = self._extract_response_text(response)
-            parsed_json, parse_error = self._extract_json_from_text(text_response)
+            parse_error = None
+            if parsed_json is None:
+                parsed_json, parse_error = self._extract_json_from_text(text_response)
             
             response_payload = {
                 "enabled": True,
                 "response": parsed_json if parsed_json is not None else text_response,
-                "response_format": "json" if parsed_json is not None else "text"
+                "response_format": "json" if parsed_json is not None else "text",
+                "llm": trace
             }
             
             if parse_error:
@@ -122,7 +134,9 @@ class GeminiService:
         self, 
         code: str, 
         tool_outputs: Dict[str, Any], 
-        analysis_json: Dict[str, Any]
+        analysis_json: Dict[str, Any],
+        mode: str = "rewrite",
+        temperature: Optional[float] = None
     ) -> Dict[str, Any]:
         """
         Solicita a Gemini que corrija el contrato.
@@ -131,58 +145,197 @@ class GeminiService:
             code: Código fuente del contrato
             tool_outputs: Resultados de las herramientas
             analysis_json: Análisis previo
+            mode: "rewrite" (fixed_code completo) o "patch" (lista de edits)
+            temperature: Temperatura de muestreo (None = la del modelo)
             
         Returns:
             Contrato corregido o error
         """
-        if not self.enabled or not self.client:
-            return {"success": False, "reason": "gemini_not_configured"}
+        backend = llm_backends.for_call_type("fix")
+        if not backend.enabled:
+            return {"success": False, "reason": f"{backend.name}_not_configured"}
         
         try:
-            prompt = FIX_PROMPT.format(
+            template = FIX_PATCH_PROMPT if mode == "patch" else FIX_PROMPT
+            prompt = template.format(
                 code=code,
                 analysis_json=json.dumps(analysis_json, ensure_ascii=False),
                 tool_outputs=json.dumps(tool_outputs, ensure_ascii=False)
             )
             
-            response = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: self.client.models.generate_content(
-                    model=settings.GEMINI_MODEL,
-                    contents=prompt
-                )
+            text_response, parsed_json, trace, error = await self._generate(
+                "fix", prompt, max_severity(tool_outputs, analysis_json), temperature,
+                response_type="fix_patch" if mode == "patch" else "fix"
             )
+            if text_response is None:
+                return {"success": False, "error": error, "llm": trace}
             
-            text_response = self._extract_response_text(response)
-            parsed_json, parse_error = self._extract_json_from_text(text_response)
+            parse_error = None
+            if parsed_json is None:
+                parsed_json, parse_error = self._extract_json_from_text(text_response)
             
             return {
                 "success": parsed_json is not None,
                 "fix_data": parsed_json,
-                "error": parse_error
+                "error": parse_error,
+                "llm": trace
             }
             
         except Exception as exc:
             logger.exception("Error requesting fix from Gemini")
             return {"success": False, "error": str(exc)}
     
-    def _extract_response_text(self, response) -> Optional[str]:
-        """Extrae el texto de respuesta del objeto de Gemini."""
-        text_response = getattr(response, "text", None)
+    async def _generate(
+        self,
+        call_type: str,
+        prompt: str,
+        severity: str,
+        temperature: Optional[float] = None,
+        on_value: Optional[ValueCallback] = None,
+        on_restart: Optional[RestartCallback] = None,
+        response_type: Optional[str] = None
+    ) -> Tuple[Optional[str], Optional[Any], Dict[str, Any], Optional[str]]:
+        """
+        Ejecuta una llamada recorriendo la cadena de modelos elegida por el router.
         
-        if not text_response:
-            # Fallback para candidates
-            candidates = getattr(response, "candidates", [])
-            texts = []
-            for cand in candidates or []:
-                parts = getattr(getattr(cand, "content", None), "parts", []) or []
-                for part in parts:
-                    text = part.get("text") if isinstance(part, dict) else getattr(part, "text", "")
-                    if text:
-                        texts.append(text)
-            text_response = "\n".join(texts).strip() if texts else None
+        Cada modelo tiene su propio timeout; si vence o la llamada falla se
+        prueba el siguiente de la cadena. Con LLM_STREAMING la respuesta
+        se parsea mientras llega: si deja de ser JSON válido la generación se
+        corta y se reintenta enseguida (LLM_MALFORMED_RETRIES veces por
+        modelo antes de pasar al siguiente).
         
-        return text_response
+        Args:
+            call_type: Tipo de llamada ("analysis" o "fix")
+            prompt: Prompt completo
+            severity: Severidad más alta de los hallazgos
+            temperature: Temperatura de muestreo (None = la del modelo)
+            on_value: Callback de valores completos (solo en streaming)
+            on_restart: Callback de reinicio de la generación
+            response_type: Respuesta esperada que se informa al backend
+                ("analysis", "fix" o "fix_patch"; por defecto call_type)
+            
+        Returns:
+            Tupla (texto o None, JSON parseado o None, traza de
+            modelos/latencia/tokens, último error)
+        """
+        route = model_router.route(call_type, len(prompt), severity)
+        backend = llm_backends.get(route["backend"])
+        trace = {
+            "call_type": call_type,
+            "backend": backend.name,
+            "rule": route["rule"],
+            "severity": severity,
+            "prompt_chars": len(prompt),
+            "temperature": temperature,
+            "streaming": settings.LLM_STREAMING,
+            "model": None,
+            "attempts": []
+        }
+        response_type = response_type or call_type
+        last_error = None
+        last_text = None
+        
+        for step in route["chain"]:
+            tries = 1 + (settings.LLM_MALFORMED_RETRIES if settings.LLM_STREAMING else 0)
+            for _ in range(tries):
+                if trace["attempts"] and on_restart is not None:
+                    on_restart({"model": step["model"], "reason": last_error})
+                
+                attempt = {"model": step["model"], "tier": step["tier"]}
+                started = time.monotonic()
+                parsed = None
+                try:
+                    if settings.LLM_STREAMING:
+                        text, parsed, usage = await asyncio.wait_for(
+                            self._stream(
+                                backend, step["model"], prompt, temperature, response_type, on_value
+                            ),
+                            timeout=step["timeout"]
+                        )
+                    else:
+                        text, usage = await asyncio.wait_for(
+                            backend.generate(step["model"], prompt, temperature, response_type),
+                            timeout=step["timeout"]
+                        )
+                except asyncio.TimeoutError:
+                    attempt["status"] = "timeout"
+                    last_error = f"{step['model']} timed out after {step['timeout']}s"
+                except JSONStreamError as exc:
+                    attempt["status"] = "malformed"
+                    attempt["error"] = str(exc)
+                    last_error = f"{step['model']}: malformed JSON ({exc})"
+                    last_text = exc.text
+                except Exception as exc:
+                    attempt["status"] = "error"
+                    attempt["error"] = str(exc)
+                    last_error = f"{step['model']}: {exc}"
+                else:
+                    attempt["status"] = "ok"
+                    attempt.update(usage)
+                attempt["latency_seconds"] = round(time.monotonic() - started, 3)
+                trace["attempts"].append(attempt)
+                
+                if attempt["status"] == "ok":
+                    trace["model"] = step["model"]
+                    return text, parsed, trace, None
+                if attempt["status"] != "malformed":
+                    break
+                logger.warning(f"LLM {call_type} response from {step['model']} is malformed; retrying")
+            
+            logger.warning(
+                f"LLM {call_type} call failed on {backend.name}/{step['model']} "
+                f"({attempt['status']}); trying next model"
+            )
+        
+        # Si todo terminó en JSON inválido se devuelve el último texto para el
+        # parseo tolerante de _extract_json_from_text
+        if last_text is not None and trace["attempts"][-1]["status"] == "malformed":
+            return last_text, None, trace, last_error
+        return None, None, trace, last_error
+    
+    async def _stream(
+        self,
+        backend: LLMBackend,
+        model: str,
+        prompt: str,
+        temperature: Optional[float],
+        response_type: str,
+        on_value: Optional[ValueCallback]
+    ) -> Tuple[str, Any, Dict[str, Optional[int]]]:
+        """
+        Genera en streaming y parsea el JSON a medida que llegan fragmentos.
+        
+        Raises:
+            JSONStreamError: En cuanto el texto deja de ser JSON válido
+                (el atributo text tiene lo recibido hasta ese momento)
+        """
+        parser = JSONStreamParser()
+        texts = []
+        usage = empty_usage()
+        chunks = backend.stream(model, prompt, temperature, response_type)
+        try:
+            async for text, chunk_usage in chunks:
+                texts.append(text)
+                if chunk_usage is not None:
+                    usage = chunk_usage
+                try:
+                    values = parser.feed(text)
+                except JSONStreamError as exc:
+                    exc.text = "".join(texts)
+                    raise
+                if on_value is not None:
+                    for path, value in values:
+                        on_value(path, value)
+            
+            full_text = "".join(texts)
+            try:
+                return full_text, parser.close(), usage
+            except JSONStreamError as exc:
+                exc.text = full_text
+                raise
+        finally:
+            # Corta la generación si se abandonó antes del final
+            await chunks.aclose()
 
 
 # Instancia global del servicio
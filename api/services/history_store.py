@@ -0,0 +1,284 @@
+"""
+Historial persistente de análisis (SQLite embebido).
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import time
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+
+from core.config import settings
+from core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Columnas de resumen (las que devuelve el listado)
+SUMMARY_COLUMNS = (
+    "analysis_id", "source_hash", "filename", "outcome", "status", "risk_score",
+    "auto_fix", "fix_attempts", "created_at", "finished_at", "duration_seconds", "error"
+)
+
+# Campos por los que se puede ordenar el listado
+SORTABLE_COLUMNS = ("created_at", "risk_score", "duration_seconds")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS analyses (
+    analysis_id TEXT PRIMARY KEY,
+    source_hash TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    outcome TEXT NOT NULL,
+    status TEXT,
+    risk_score REAL,
+    auto_fix INTEGER NOT NULL,
+    fix_attempts INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    finished_at REAL NOT NULL,
+    duration_seconds REAL NOT NULL,
+    error TEXT,
+    -- JSON comprimido con zlib: código, reporte y resultados de las herramientas
+    details BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_analyses_source_hash ON analyses (source_hash, created_at);
+CREATE INDEX IF NOT EXISTS idx_analyses_status ON analyses (status, created_at);
+CREATE INDEX IF NOT EXISTS idx_analyses_risk_score ON analyses (risk_score);
+CREATE INDEX IF NOT EXISTS idx_analyses_created_at ON analyses (created_at);
+"""
+
+
+def _risk_score(report: Optional[Dict[str, Any]]) -> Optional[float]:
+    """risk_score del análisis de Gemini, si es numérico."""
+    try:
+        return float((report or {})["results"]["response"]["risk_score"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _verdict(report: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Estado SAFE / WARNING / CRITICAL del análisis de Gemini."""
+    try:
+        status = report["results"]["response"]["status"]
+    except (KeyError, TypeError):
+        return None
+    return status.upper() if isinstance(status, str) else None
+
+
+class AnalysisHistoryStore:
+    """
+    Guarda cada análisis terminado en SQLite y lo consulta por ID o por filtros.
+
+    Todas las operaciones corren en un único hilo dedicado: la serialización
+    de resultados grandes y la E/S de SQLite no bloquean el event loop, y las
+    escrituras quedan serializadas.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Ruta del archivo SQLite
+        """
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="history")
+        # Solo se usa desde el hilo del executor
+        self._conn: Optional[sqlite3.Connection] = None
+
+    @property
+    def enabled(self) -> bool:
+        return settings.HISTORY_ENABLED
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def record(
+        self,
+        analysis_id: str,
+        source_hash: str,
+        filename: str,
+        code: str,
+        auto_fix: bool,
+        outcome: str,
+        created_at: float,
+        report: Optional[Dict[str, Any]] = None,
+        tool_results: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None
+    ) -> Optional[Future]:
+        """
+        Guarda un análisis en segundo plano (no espera la escritura).
+
+        Args:
+            analysis_id: ID del análisis
+            source_hash: SHA-256 del código original
+            filename: Nombre del archivo
+            code: Código original
+            auto_fix: Si se pidió corrección automática
+            outcome: completed, failed o cancelled
+            created_at: Inicio del análisis (epoch)
+            report: Respuesta de /analyze, si terminó
+            tool_results: Resultados de las herramientas del último intento
+            error: Mensaje de error, si falló
+
+        Returns:
+            Future de la escritura, o None si el historial está deshabilitado
+        """
+        if not self.enabled:
+            return None
+        finished_at = time.time()
+        future = self._executor.submit(
+            self._insert, analysis_id, source_hash, filename, code, auto_fix, outcome,
+            created_at, finished_at, report, tool_results, error
+        )
+        future.add_done_callback(self._log_failure)
+        return future
+
+    @staticmethod
+    def _log_failure(future: Future) -> None:
+        if future.exception() is not None:
+            logger.error(f"Could not store analysis history: {future.exception()}")
+
+    def _insert(
+        self,
+        analysis_id: str,
+        source_hash: str,
+        filename: str,
+        code: str,
+        auto_fix: bool,
+        outcome: str,
+        created_at: float,
+        finished_at: float,
+        report: Optional[Dict[str, Any]],
+        tool_results: Optional[Dict[str, Any]],
+        error: Optional[str]
+    ) -> None:
+        details = {"code": code, "report": report, "tool_results": tool_results}
+        blob = zlib.compress(json.dumps(details, default=str).encode("utf-8"))
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO analyses (
+                    analysis_id, source_hash, filename, outcome, status, risk_score,
+                    auto_fix, fix_attempts, created_at, finished_at, duration_seconds,
+                    error, details
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    analysis_id, source_hash, filename, outcome, _verdict(report),
+                    _risk_score(report), int(auto_fix),
+                    len((report or {}).get("fix_history") or []),
+                    created_at, finished_at, round(finished_at - created_at, 3),
+                    error, blob
+                )
+            )
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_event_loop().run_in_executor(self._executor, fn, *args)
+
+    async def get(self, analysis_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Análisis guardado con su código, reporte y resultados de las herramientas.
+
+        Args:
+            analysis_id: ID del análisis
+
+        Returns:
+            Registro completo, o None si no existe
+        """
+        return await self._run(self._get, analysis_id)
+
+    def _get(self, analysis_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute(
+            "SELECT * FROM analyses WHERE analysis_id = ?", (analysis_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        record = {column: row[column] for column in SUMMARY_COLUMNS}
+        record["auto_fix"] = bool(record["auto_fix"])
+        record.update(json.loads(zlib.decompress(row["details"]).decode("utf-8")))
+        return record
+
+    async def search(
+        self,
+        source_hash: Optional[str] = None,
+        status: Optional[str] = None,
+        outcome: Optional[str] = None,
+        min_risk: Optional[float] = None,
+        max_risk: Optional[float] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        filename: Optional[str] = None,
+        sort: str = "created_at",
+        descending: bool = True,
+        limit: int = 50,
+        offset: int = 0
+    ) -> Dict[str, Any]:
+        """
+        Lista resúmenes de análisis con filtros y paginación.
+
+        Args:
+            source_hash: SHA-256 del código original
+            status: Veredicto de Gemini (SAFE, WARNING, CRITICAL)
+            outcome: completed, failed o cancelled
+            min_risk: risk_score mínimo
+            max_risk: risk_score máximo
+            since: Creados desde este instante (epoch)
+            until: Creados antes de este instante (epoch)
+            filename: Texto contenido en el nombre del archivo
+            sort: Campo de orden (ver SORTABLE_COLUMNS)
+            descending: Orden descendente
+            limit: Tamaño de página
+            offset: Registros a saltear
+
+        Returns:
+            Diccionario con items, total, limit y offset
+        """
+        if sort not in SORTABLE_COLUMNS:
+            raise ValueError(f"Cannot sort by {sort}; use one of {', '.join(SORTABLE_COLUMNS)}")
+
+        conditions: List[str] = []
+        params: List[Any] = []
+        for column, operator, value in (
+            ("source_hash", "=", source_hash),
+            ("status", "=", status.upper() if status else None),
+            ("outcome", "=", outcome),
+            ("risk_score", ">=", min_risk),
+            ("risk_score", "<=", max_risk),
+            ("created_at", ">=", since),
+            ("created_at", "<", until),
+        ):
+            if value is not None:
+                conditions.append(f"{column} {operator} ?")
+                params.append(value)
+        if filename:
+            conditions.append("filename LIKE ? ESCAPE '\\'")
+            escaped = filename.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            params.append(f"%{escaped}%")
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        order = f"ORDER BY {sort} {'DESC' if descending else 'ASC'}, analysis_id"
+        return await self._run(self._search, where, order, params, limit, offset)
+
+    def _search(self, where: str, order: str, params: List[Any], limit: int, offset: int) -> Dict[str, Any]:
+        conn = self._connection()
+        total = conn.execute(f"SELECT COUNT(*) FROM analyses {where}", params).fetchone()[0]
+        rows = conn.execute(
+            f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM analyses {where} {order} LIMIT ? OFFSET ?",
+            [*params, limit, offset]
+        ).fetchall()
+        items = []
+        for row in rows:
+            item = dict(row)
+            item["auto_fix"] = bool(item["auto_fix"])
+            items.append(item)
+        return {"items": items, "total": total, "limit": limit, "offset": offset}
+
+
+# Instancia global del historial
+history_store = AnalysisHistoryStore(settings.HISTORY_DB_PATH)
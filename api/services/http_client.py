@@ -1,42 +1,67 @@
 """
 Cliente HTTP para comunicación con microservicios.
 """
-from typing import Dict, Any
+import json
+import asyncio
+from typing import Dict, Any, Optional, Callable
 import httpx
 from core.config import settings
 from core.logging import get_logger
+from services.tool_outputs import current_spool
 
 logger = get_logger(__name__)
 
+# Callback de progreso: recibe (nombre_servicio, evento)
+EventCallback = Callable[[str, Dict[str, Any]], None]
+
 
 async def call_service(
-    service_name: str, 
-    service_url: str, 
-    analysis_id: str, 
-    filename: str
+    service_name: str,
+    service_url: str,
+    analysis_id: str,
+    filename: str,
+    options: Optional[Dict[str, Any]] = None,
+    timeout: Optional[float] = None,
+    on_event: Optional[EventCallback] = None
 ) -> Dict[str, Any]:
     """
     Llama a un microservicio de análisis de forma asíncrona.
-    
+
     Args:
         service_name: Nombre del servicio (slither, solc, etc.)
         service_url: URL del servicio
         analysis_id: ID único del análisis
         filename: Nombre del archivo a analizar
-        
+        options: Parámetros adicionales específicos del servicio
+        timeout: Timeout HTTP (por defecto SERVICE_TIMEOUT)
+        on_event: Callback para los eventos de progreso del modo streaming
+
     Returns:
         Diccionario con el resultado del análisis
     """
+    payload = {
+        **(options or {}),
+        "analysis_id": analysis_id,
+        "filename": filename
+    }
+    timeout = timeout or settings.SERVICE_TIMEOUT
+
     try:
-        async with httpx.AsyncClient(timeout=settings.SERVICE_TIMEOUT) as client:
+        async with httpx.AsyncClient(timeout=timeout) as client:
+            if settings.STREAM_TOOL_OUTPUT:
+                # El timeout de httpx aplica entre fragmentos; el total se
+                # acota aquí. Cerrar el stream mata el proceso remoto.
+                return await asyncio.wait_for(
+                    _consume_stream(client, service_name, service_url, payload, on_event),
+                    timeout=timeout
+                )
+
             response = await client.post(
                 f"{service_url}/analyze",
-                json={
-                    "analysis_id": analysis_id,
-                    "filename": filename
-                }
+                json=payload
             )
-            
+            _record_received(response.num_bytes_downloaded)
+
             if response.status_code == 200:
                 return response.json()
             else:
@@ -45,8 +70,8 @@ async def call_service(
                     "error": f"HTTP {response.status_code}: {response.text}",
                     "error_type": "http_error"
                 }
-                
-    except httpx.TimeoutException:
+
+    except (httpx.TimeoutException, asyncio.TimeoutError):
         logger.error(f"Service {service_name} timed out")
         return {
             "success": False,
@@ -60,3 +85,89 @@ async def call_service(
             "error": f"Error calling {service_name}: {str(e)}",
             "error_type": "connection_error"
         }
+
+
+async def _consume_stream(
+    client: httpx.AsyncClient,
+    service_name: str,
+    service_url: str,
+    payload: Dict[str, Any],
+    on_event: Optional[EventCallback]
+) -> Dict[str, Any]:
+    """
+    Consume el endpoint NDJSON /analyze/stream hasta recibir el resultado.
+
+    Args:
+        client: Cliente HTTP abierto
+        service_name: Nombre del servicio
+        service_url: URL del servicio
+        payload: Cuerpo de la solicitud
+        on_event: Callback para los eventos intermedios
+
+    Returns:
+        Resultado final emitido por el servicio
+    """
+    async with client.stream(
+        "POST", f"{service_url}/analyze/stream", json=payload
+    ) as response:
+        if response.status_code != 200:
+            body = (await response.aread()).decode("utf-8", errors="replace")
+            return {
+                "success": False,
+                "error": f"HTTP {response.status_code}: {body}",
+                "error_type": "http_error"
+            }
+
+        async for line in response.aiter_lines():
+            if not line.strip():
+                continue
+            event = json.loads(line)
+            kind = event.get("event")
+
+            if kind in ("result", "error"):
+                # Los eventos de progreso se descartan; solo queda el resultado
+                _record_received(len(line))
+                return event.get("result", {})
+
+            if on_event is not None:
+                on_event(service_name, event)
+            elif kind == "stats":
+                logger.debug(f"{service_name} progress: {event}")
+
+    return {
+        "success": False,
+        "error": f"Stream from {service_name} ended without a result",
+        "error_type": "stream_error"
+    }
+
+
+def _record_received(size: int) -> None:
+    """Suma una respuesta de herramienta al spool del análisis en curso."""
+    spool = current_spool.get()
+    if spool is not None:
+        spool.received(size)
+
+
+async def cancel_service(
+    service_name: str,
+    service_url: str,
+    analysis_id: str
+) -> bool:
+    """
+    Pide a un microservicio que mate la ejecución en curso de un análisis.
+
+    Args:
+        service_name: Nombre del servicio
+        service_url: URL del servicio
+        analysis_id: ID del análisis a cancelar
+
+    Returns:
+        True si el servicio confirmó la cancelación
+    """
+    try:
+        async with httpx.AsyncClient(timeout=settings.CANCEL_TIMEOUT) as client:
+            response = await client.post(f"{service_url}/cancel/{analysis_id}")
+            return response.status_code == 200
+    except Exception as e:
+        logger.warning(f"Could not cancel {analysis_id} on {service_name}: {e}")
+        return False
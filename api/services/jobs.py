@@ -0,0 +1,183 @@
+"""
+Registro de análisis en curso para cancelación cooperativa.
+"""
+import asyncio
+import json
+import time
+from typing import Dict, Any, Optional, Coroutine, List
+
+from core.config import settings
+from core.logging import get_logger
+from services.shared_state import WORKER_ID, SharedStateError, shared_state
+
+logger = get_logger(__name__)
+
+# Grupo de leases con los trabajos en curso de todos los workers
+JOBS_GROUP = "jobs"
+
+
+class JobRegistry:
+    """
+    Mantiene las tareas de análisis en curso indexadas por ID.
+
+    Con un backend de estado compartido distribuido, cada trabajo además
+    reserva su ID en el backend (no puede haber dos trabajos con el mismo ID
+    en distintos workers) y el worker dueño atiende las cancelaciones pedidas
+    desde otros workers.
+    """
+
+    def __init__(self):
+        """Inicializa el registro vacío."""
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._started: Dict[str, float] = {}
+        self._cancel_reasons: Dict[str, str] = {}
+        self._leases: Dict[str, asyncio.Task] = {}
+
+    async def start(self, job_id: str, coro: Coroutine) -> asyncio.Task:
+        """
+        Lanza una corrutina de análisis como tarea registrada.
+
+        Args:
+            job_id: ID del trabajo (coincide con el analysis_id)
+            coro: Corrutina a ejecutar
+
+        Returns:
+            Tarea creada
+
+        Raises:
+            ValueError: Si ya existe un trabajo en curso con ese ID
+        """
+        if job_id in self._tasks or not await self._claim(job_id):
+            coro.close()
+            raise ValueError(f"Job {job_id} is already running")
+
+        task = asyncio.ensure_future(coro)
+        self._tasks[job_id] = task
+        self._started[job_id] = time.time()
+        task.add_done_callback(lambda _: self._forget(job_id))
+        if shared_state.distributed:
+            self._leases[job_id] = asyncio.ensure_future(self._keep_lease(job_id, task))
+        return task
+
+    async def _claim(self, job_id: str) -> bool:
+        """Reserva el ID en el backend compartido (siempre True si es local)."""
+        if not shared_state.distributed:
+            return True
+        try:
+            claimed = await shared_state.set(
+                f"job:{job_id}",
+                json.dumps({"worker": WORKER_ID, "started": time.time()}),
+                ttl=settings.JOB_LEASE_TTL,
+                only_if_absent=True
+            )
+            if claimed:
+                await shared_state.lease_add(JOBS_GROUP, job_id, settings.JOB_LEASE_TTL)
+            return claimed
+        except SharedStateError as e:
+            logger.warning(f"Could not claim job {job_id} in shared state: {e}")
+            return True
+
+    async def _keep_lease(self, job_id: str, task: asyncio.Task) -> None:
+        """Renueva la reserva del trabajo y atiende cancelaciones remotas."""
+        renewed = time.monotonic()
+        try:
+            while True:
+                await asyncio.wait({task}, timeout=settings.SHARED_STATE_POLL_INTERVAL)
+                if task.done():
+                    break
+                try:
+                    reason = await shared_state.get(f"cancel:{job_id}")
+                    if reason:
+                        self.cancel(job_id, reason)
+                    if time.monotonic() - renewed >= settings.JOB_LEASE_TTL / 3:
+                        await shared_state.expire(f"job:{job_id}", settings.JOB_LEASE_TTL)
+                        await shared_state.lease_add(JOBS_GROUP, job_id, settings.JOB_LEASE_TTL)
+                        renewed = time.monotonic()
+                except SharedStateError as e:
+                    logger.warning(f"Could not renew job {job_id} in shared state: {e}")
+        finally:
+            try:
+                await shared_state.delete(f"job:{job_id}")
+                await shared_state.delete(f"cancel:{job_id}")
+                await shared_state.lease_remove(JOBS_GROUP, job_id)
+            except SharedStateError as e:
+                logger.warning(f"Could not release job {job_id} in shared state: {e}")
+
+    def cancel(self, job_id: str, reason: str) -> bool:
+        """
+        Cancela un trabajo en curso en este worker.
+
+        Args:
+            job_id: ID del trabajo
+            reason: Motivo de la cancelación (client_disconnected, job_deleted...)
+
+        Returns:
+            True si el trabajo existía y se canceló
+        """
+        task = self._tasks.get(job_id)
+        if task is None or task.done():
+            return False
+        logger.info(f"Cancelling job {job_id} | reason={reason}")
+        self._cancel_reasons[job_id] = reason
+        task.cancel()
+        return True
+
+    async def cancel_anywhere(self, job_id: str, reason: str) -> bool:
+        """
+        Cancela un trabajo de este o de otro worker.
+
+        Si el trabajo corre en otro worker se deja un pedido de cancelación
+        en el backend compartido; su dueño lo atiende en el próximo sondeo.
+
+        Returns:
+            True si el trabajo existía
+        """
+        if self.cancel(job_id, reason):
+            return True
+        if not shared_state.distributed:
+            return False
+        try:
+            if await shared_state.get(f"job:{job_id}") is None:
+                return False
+            await shared_state.set(f"cancel:{job_id}", reason, ttl=settings.JOB_LEASE_TTL)
+        except SharedStateError as e:
+            logger.warning(f"Could not request cancellation of job {job_id}: {e}")
+            return False
+        logger.info(f"Cancellation of remote job {job_id} requested | reason={reason}")
+        return True
+
+    def cancel_reason(self, job_id: str) -> Optional[str]:
+        """Motivo con el que se canceló un trabajo, si se canceló."""
+        return self._cancel_reasons.pop(job_id, None)
+
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        """Lista los trabajos en curso de este worker."""
+        now = time.time()
+        return [
+            {
+                "job_id": job_id,
+                "worker": WORKER_ID,
+                "running_seconds": round(now - self._started[job_id], 2)
+            }
+            for job_id in self._tasks
+        ]
+
+    async def list_cluster_jobs(self) -> Optional[List[str]]:
+        """IDs de los trabajos en curso en todos los workers (None si es local)."""
+        if not shared_state.distributed:
+            return None
+        try:
+            return await shared_state.lease_members(JOBS_GROUP)
+        except SharedStateError as e:
+            logger.warning(f"Could not list cluster jobs: {e}")
+            return None
+
+    def _forget(self, job_id: str) -> None:
+        """Elimina un trabajo terminado del registro."""
+        self._tasks.pop(job_id, None)
+        self._started.pop(job_id, None)
+        self._leases.pop(job_id, None)
+
+
+# Instancia global del registro
+job_registry = JobRegistry()
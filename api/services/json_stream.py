@@ -0,0 +1,217 @@
+"""
+Parser JSON incremental para respuestas de Gemini en streaming.
+"""
+import json
+from typing import Any, List, Optional, Tuple
+
+# Texto tolerado antes del objeto raíz (p. ej. "```json" o una frase breve)
+MAX_PREFIX_CHARS = 500
+
+WHITESPACE = " \t\r\n"
+SCALAR_CHARS = set("-+.0123456789eEtruefalsn")
+
+# Ruta de un valor: claves de objeto e índices de arreglo desde la raíz
+Path = Tuple[Any, ...]
+
+
+class JSONStreamError(ValueError):
+    """La respuesta dejó de ser JSON válido (se detecta al recibir el fragmento)."""
+
+    def __init__(self, message: str, position: int):
+        super().__init__(f"{message} at char {position}")
+        self.position = position
+        # Texto recibido hasta el error (lo completa quien consume el stream)
+        self.text: Optional[str] = None
+
+
+class JSONStreamParser:
+    """
+    Valida un objeto JSON fragmento a fragmento y emite valores completos.
+
+    feed() devuelve los valores que terminaron de llegar cuya ruta tiene
+    emit_depth niveles (p. ej. ("vulnerabilities", 0) o ("tools_reports",
+    "slither") con emit_depth=2). Un error de sintaxis se detecta en el
+    fragmento que lo contiene, sin esperar al final de la generación.
+    """
+
+    def __init__(self, emit_depth: int = 2):
+        """
+        Args:
+            emit_depth: Profundidad de los valores a emitir
+        """
+        self.emit_depth = emit_depth
+        self.done = False
+        self._text = ""
+        self._pos = 0
+        self._root_start: Optional[int] = None
+        self._root_end: Optional[int] = None
+        # Marcos abiertos: [tipo, estado, clave actual, inicio del valor actual]
+        self._stack: List[list] = []
+        self._in_string = False
+        self._escape = False
+        self._string_is_key = False
+        self._string_start = 0
+        self._scalar_start: Optional[int] = None
+
+    def feed(self, chunk: str) -> List[Tuple[Path, Any]]:
+        """
+        Procesa un fragmento de texto.
+
+        Args:
+            chunk: Texto recibido
+
+        Returns:
+            Lista de (ruta, valor) completados en este fragmento
+
+        Raises:
+            JSONStreamError: Si el texto ya no puede ser un objeto JSON válido
+        """
+        if self.done or not chunk:
+            return []
+        self._text += chunk
+        emitted: List[Tuple[Path, Any]] = []
+        text = self._text
+
+        while self._pos < len(text) and not self.done:
+            char = text[self._pos]
+
+            if self._root_start is None:
+                if char == "{":
+                    self._root_start = self._pos
+                    self._stack.append(["object", "key_or_end", None, None])
+                elif self._pos >= MAX_PREFIX_CHARS:
+                    raise JSONStreamError("no JSON object found", self._pos)
+                self._pos += 1
+                continue
+
+            if self._in_string:
+                self._consume_string(char, emitted)
+                self._pos += 1
+                continue
+
+            if self._scalar_start is not None:
+                if char in SCALAR_CHARS:
+                    self._pos += 1
+                    continue
+                self._finish_scalar(emitted)
+                continue
+
+            self._consume_structural(char, emitted)
+            self._pos += 1
+
+        return emitted
+
+    def close(self) -> Any:
+        """
+        Termina el parseo y devuelve el objeto raíz.
+
+        Raises:
+            JSONStreamError: Si la respuesta terminó incompleta
+        """
+        if not self.done:
+            raise JSONStreamError("response ended before the JSON object closed", len(self._text))
+        return json.loads(self._text[self._root_start:self._root_end], strict=False)
+
+    def _path(self) -> Path:
+        return tuple(frame[2] for frame in self._stack)
+
+    def _begin_value(self) -> None:
+        self._stack[-1][3] = self._pos
+
+    def _end_value(self, end: int, emitted: List[Tuple[Path, Any]]) -> None:
+        """Cierra el valor actual del marco superior y lo emite si corresponde."""
+        frame = self._stack[-1]
+        if len(self._stack) == self.emit_depth:
+            raw = self._text[frame[3]:end]
+            try:
+                emitted.append((self._path(), json.loads(raw, strict=False)))
+            except ValueError:
+                raise JSONStreamError("invalid value", frame[3])
+        frame[1] = "comma_or_end"
+
+    def _consume_string(self, char: str, emitted: List[Tuple[Path, Any]]) -> None:
+        if self._escape:
+            self._escape = False
+        elif char == "\\":
+            self._escape = True
+        elif char == '"':
+            self._in_string = False
+            if self._string_is_key:
+                frame = self._stack[-1]
+                frame[2] = json.loads(self._text[self._string_start:self._pos + 1], strict=False)
+                frame[1] = "colon"
+            else:
+                self._end_value(self._pos + 1, emitted)
+
+    def _finish_scalar(self, emitted: List[Tuple[Path, Any]]) -> None:
+        raw = self._text[self._scalar_start:self._pos]
+        try:
+            json.loads(raw)
+        except ValueError:
+            raise JSONStreamError(f"invalid literal {raw!r}", self._scalar_start)
+        self._scalar_start = None
+        self._end_value(self._pos, emitted)
+
+    def _consume_structural(self, char: str, emitted: List[Tuple[Path, Any]]) -> None:
+        if char in WHITESPACE:
+            return
+        frame = self._stack[-1]
+        kind, state = frame[0], frame[1]
+
+        if state == "colon":
+            if char != ":":
+                raise JSONStreamError("expected ':'", self._pos)
+            frame[1] = "value"
+            return
+
+        if state in ("key_or_end", "key"):
+            if char == "}" and state == "key_or_end":
+                self._close_container(emitted)
+            elif char == '"':
+                self._start_string(is_key=True)
+            else:
+                raise JSONStreamError("expected object key", self._pos)
+            return
+
+        if state == "comma_or_end":
+            closer = "}" if kind == "object" else "]"
+            if char == ",":
+                if kind == "object":
+                    frame[1] = "key"
+                else:
+                    frame[1] = "value"
+                    frame[2] += 1
+            elif char == closer:
+                self._close_container(emitted)
+            else:
+                raise JSONStreamError(f"expected ',' or '{closer}'", self._pos)
+            return
+
+        # Estados que esperan un valor: "value" y "value_or_end" (arreglos)
+        if char == "]" and state == "value_or_end":
+            self._close_container(emitted)
+            return
+        self._begin_value()
+        if char == "{":
+            self._stack.append(["object", "key_or_end", None, None])
+        elif char == "[":
+            self._stack.append(["array", "value_or_end", 0, None])
+        elif char == '"':
+            self._start_string(is_key=False)
+        elif char in SCALAR_CHARS:
+            self._scalar_start = self._pos
+        else:
+            raise JSONStreamError(f"unexpected character {char!r}", self._pos)
+
+    def _start_string(self, is_key: bool) -> None:
+        self._in_string = True
+        self._string_is_key = is_key
+        self._string_start = self._pos
+
+    def _close_container(self, emitted: List[Tuple[Path, Any]]) -> None:
+        self._stack.pop()
+        if not self._stack:
+            self.done = True
+            self._root_end = self._pos + 1
+            return
+        self._end_value(self._pos + 1, emitted)
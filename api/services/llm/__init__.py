@@ -0,0 +1,7 @@
+"""
+Backends de modelos de lenguaje (Gemini, servidores compatibles con OpenAI y stub).
+"""
+from services.llm.base import LLMBackend, LLMBackendError, Usage, empty_usage
+from services.llm.registry import llm_backends
+
+__all__ = ["LLMBackend", "LLMBackendError", "Usage", "empty_usage", "llm_backends"]
@@ -0,0 +1,96 @@
+"""
+Interfaz común de los backends de modelos de lenguaje.
+"""
+from typing import Dict, Any, AsyncIterator, Optional, Tuple
+
+# Conteo de tokens de una respuesta (None si el proveedor no lo informa)
+Usage = Dict[str, Optional[int]]
+
+
+def empty_usage() -> Usage:
+    """Uso de tokens desconocido."""
+    return {"prompt_tokens": None, "output_tokens": None, "total_tokens": None}
+
+
+class LLMBackendError(RuntimeError):
+    """El proveedor rechazó la solicitud o devolvió una respuesta inválida."""
+
+
+class LLMBackend:
+    """
+    Proveedor de modelos de lenguaje.
+
+    Cada backend resuelve los tiers del router ("fast", "strong") a sus
+    propios modelos y timeouts, y genera texto completo o en fragmentos.
+    """
+
+    name = ""
+
+    def __init__(self, models: Dict[str, str], timeouts: Dict[str, float]):
+        """
+        Args:
+            models: Tier -> nombre del modelo
+            timeouts: Tier -> timeout de la llamada en segundos
+        """
+        self.models = models
+        self.timeouts = timeouts
+
+    @property
+    def enabled(self) -> bool:
+        """Si el backend está configurado para atender llamadas."""
+        return True
+
+    def model_for(self, tier: str) -> str:
+        """Modelo de un tier (el fuerte si el tier no existe)."""
+        return self.models.get(tier, self.models["strong"])
+
+    def timeout_for(self, tier: str) -> float:
+        """Timeout de un tier (el del fuerte si el tier no existe)."""
+        return self.timeouts.get(tier, self.timeouts["strong"])
+
+    async def generate(
+        self,
+        model: str,
+        prompt: str,
+        temperature: Optional[float] = None,
+        call_type: Optional[str] = None
+    ) -> Tuple[Optional[str], Usage]:
+        """
+        Genera la respuesta completa.
+
+        Args:
+            model: Modelo
+            prompt: Prompt completo
+            temperature: Temperatura de muestreo (None = la del modelo)
+            call_type: Tipo de llamada ("analysis", "fix" o "fix_patch");
+                los proveedores reales lo ignoran
+
+        Returns:
+            Tupla (texto, uso de tokens)
+
+        Raises:
+            LLMBackendError: Si la llamada falla
+        """
+        raise NotImplementedError
+
+    async def stream(
+        self,
+        model: str,
+        prompt: str,
+        temperature: Optional[float] = None,
+        call_type: Optional[str] = None
+    ) -> AsyncIterator[Tuple[str, Optional[Usage]]]:
+        """
+        Genera la respuesta en fragmentos.
+
+        Por defecto entrega la respuesta completa como un único fragmento.
+
+        Yields:
+            Tuplas (texto, uso de tokens o None); el uso suele llegar al final
+        """
+        text, usage = await self.generate(model, prompt, temperature, call_type)
+        yield text or "", usage
+
+    def info(self) -> Dict[str, Any]:
+        """Descripción del backend para logs y /health."""
+        return {"backend": self.name, "enabled": self.enabled, "models": self.models}
@@ -0,0 +1,149 @@
+"""
+Backend de Google Gemini (google-genai).
+"""
+import asyncio
+import threading
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+from core.config import settings
+from core.logging import get_logger
+from services.llm.base import LLMBackend, Usage
+
+try:
+    from google import genai
+except ImportError:  # Despliegues sin acceso a Gemini
+    genai = None
+
+logger = get_logger(__name__)
+
+
+class GeminiBackend(LLMBackend):
+    """Modelos de Gemini vía google-genai."""
+
+    name = "gemini"
+
+    def __init__(self):
+        super().__init__(settings.GEMINI_MODELS, settings.GEMINI_TIMEOUTS)
+        self.client = None
+
+        if genai is None:
+            logger.warning("google-genai is not installed; Gemini backend disabled")
+        elif settings.GEMINI_API_KEY:
+            try:
+                self.client = genai.Client(api_key=settings.GEMINI_API_KEY)
+                logger.info(f"Gemini initialized | models={self.models} enabled=True")
+            except Exception as exc:
+                logger.error(f"Failed to initialize Gemini client: {exc}")
+        else:
+            logger.warning("Gemini API key not configured")
+
+    @property
+    def enabled(self) -> bool:
+        return self.client is not None
+
+    async def generate(
+        self,
+        model: str,
+        prompt: str,
+        temperature: Optional[float] = None,
+        call_type: Optional[str] = None
+    ) -> Tuple[Optional[str], Usage]:
+        loop = asyncio.get_event_loop()
+        response = await loop.run_in_executor(
+            None,
+            lambda: self.client.models.generate_content(
+                model=model,
+                contents=prompt,
+                config=self._config(temperature)
+            )
+        )
+        return self._extract_response_text(response), self._extract_usage(response)
+
+    async def stream(
+        self,
+        model: str,
+        prompt: str,
+        temperature: Optional[float] = None,
+        call_type: Optional[str] = None
+    ) -> AsyncIterator[Tuple[str, Optional[Usage]]]:
+        """
+        Genera en streaming.
+
+        El iterador del SDK es bloqueante: se consume en un hilo que pasa
+        los fragmentos al event loop por una cola.
+        """
+        loop = asyncio.get_event_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        stop = threading.Event()
+        config = self._config(temperature)
+
+        def publish(kind: str, item: Any) -> None:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, (kind, item))
+            except RuntimeError:
+                # El event loop ya se cerró
+                pass
+
+        def worker() -> None:
+            try:
+                chunks = self.client.models.generate_content_stream(
+                    model=model,
+                    contents=prompt,
+                    config=config
+                )
+                for chunk in chunks:
+                    if stop.is_set():
+                        return
+                    publish("chunk", chunk)
+                publish("end", None)
+            except Exception as exc:
+                publish("error", exc)
+
+        loop.run_in_executor(None, worker)
+        try:
+            while True:
+                kind, item = await queue.get()
+                if kind == "error":
+                    raise item
+                if kind == "end":
+                    return
+                usage = None
+                if getattr(item, "usage_metadata", None) is not None:
+                    usage = self._extract_usage(item)
+                yield self._extract_response_text(item) or "", usage
+        finally:
+            # Corta el hilo en el próximo fragmento si se abandonó la generación
+            stop.set()
+
+    @staticmethod
+    def _config(temperature: Optional[float]) -> Optional[Dict[str, Any]]:
+        return {"temperature": temperature} if temperature is not None else None
+
+    @staticmethod
+    def _extract_usage(response) -> Usage:
+        """Extrae el conteo de tokens de la respuesta de Gemini."""
+        usage = getattr(response, "usage_metadata", None)
+        return {
+            "prompt_tokens": getattr(usage, "prompt_token_count", None),
+            "output_tokens": getattr(usage, "candidates_token_count", None),
+            "total_tokens": getattr(usage, "total_token_count", None)
+        }
+
+    @staticmethod
+    def _extract_response_text(response) -> Optional[str]:
+        """Extrae el texto de respuesta del objeto de Gemini."""
+        text_response = getattr(response, "text", None)
+
+        if not text_response:
+            # Fallback para candidates
+            candidates = getattr(response, "candidates", [])
+            texts = []
+            for cand in candidates or []:
+                parts = getattr(getattr(cand, "content", None), "parts", []) or []
+                for part in parts:
+                    text = part.get("text") if isinstance(part, dict) else getattr(part, "text", "")
+                    if text:
+                        texts.append(text)
+            text_response = "\n".join(texts).strip() if texts else None
+
+        return text_response
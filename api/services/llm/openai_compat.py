@@ -0,0 +1,131 @@
+"""
+Backend HTTP compatible con la API de OpenAI (/v1/chat/completions).
+
+Sirve para servidores de inferencia locales (llama.cpp, vLLM, Ollama...)
+en despliegues sin acceso a proveedores remotos.
+"""
+import json
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+import httpx
+
+from core.config import settings
+from core.logging import get_logger
+from services.llm.base import LLMBackend, LLMBackendError, Usage, empty_usage
+
+logger = get_logger(__name__)
+
+
+class OpenAICompatibleBackend(LLMBackend):
+    """Chat completions sobre HTTP contra un servidor compatible con OpenAI."""
+
+    name = "openai"
+
+    def __init__(self):
+        super().__init__(settings.OPENAI_COMPAT_MODELS, settings.OPENAI_COMPAT_TIMEOUTS)
+        self.base_url = settings.OPENAI_COMPAT_BASE_URL.rstrip("/")
+        self.api_key = settings.OPENAI_COMPAT_API_KEY
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.base_url)
+
+    def info(self) -> Dict[str, Any]:
+        return {**super().info(), "base_url": self.base_url}
+
+    async def generate(
+        self,
+        model: str,
+        prompt: str,
+        temperature: Optional[float] = None,
+        call_type: Optional[str] = None
+    ) -> Tuple[Optional[str], Usage]:
+        payload = self._payload(model, prompt, temperature, stream=False)
+        # El timeout total lo impone quien llama (timeout del tier)
+        async with httpx.AsyncClient(timeout=None) as client:
+            response = await client.post(
+                f"{self.base_url}/chat/completions",
+                json=payload,
+                headers=self._headers()
+            )
+            if response.status_code != 200:
+                raise LLMBackendError(f"HTTP {response.status_code}: {response.text[:500]}")
+            body = response.json()
+
+        choices = body.get("choices") or []
+        if not choices:
+            raise LLMBackendError("response has no choices")
+        text = (choices[0].get("message") or {}).get("content")
+        return text, self._usage(body.get("usage"))
+
+    async def stream(
+        self,
+        model: str,
+        prompt: str,
+        temperature: Optional[float] = None,
+        call_type: Optional[str] = None
+    ) -> AsyncIterator[Tuple[str, Optional[Usage]]]:
+        """Consume la respuesta como server-sent events (líneas "data: ...")."""
+        payload = self._payload(model, prompt, temperature, stream=True)
+        async with httpx.AsyncClient(timeout=None) as client:
+            async with client.stream(
+                "POST",
+                f"{self.base_url}/chat/completions",
+                json=payload,
+                headers=self._headers()
+            ) as response:
+                if response.status_code != 200:
+                    body = (await response.aread()).decode("utf-8", errors="replace")
+                    raise LLMBackendError(f"HTTP {response.status_code}: {body[:500]}")
+
+                async for line in response.aiter_lines():
+                    line = line.strip()
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        return
+                    try:
+                        chunk = json.loads(data)
+                    except ValueError:
+                        raise LLMBackendError(f"invalid stream chunk: {data[:200]}")
+
+                    text = "".join(
+                        (choice.get("delta") or {}).get("content") or ""
+                        for choice in chunk.get("choices") or []
+                    )
+                    usage = self._usage(chunk["usage"]) if chunk.get("usage") else None
+                    if text or usage:
+                        yield text, usage
+
+    def _payload(
+        self,
+        model: str,
+        prompt: str,
+        temperature: Optional[float],
+        stream: bool
+    ) -> Dict[str, Any]:
+        payload: Dict[str, Any] = {
+            "model": model,
+            "messages": [{"role": "user", "content": prompt}],
+            "stream": stream
+        }
+        if stream:
+            # El uso de tokens llega en el último fragmento
+            payload["stream_options"] = {"include_usage": True}
+        if temperature is not None:
+            payload["temperature"] = temperature
+        return payload
+
+    def _headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+
+    @staticmethod
+    def _usage(usage: Optional[Dict[str, Any]]) -> Usage:
+        if not usage:
+            return empty_usage()
+        return {
+            "prompt_tokens": usage.get("prompt_tokens"),
+            "output_tokens": usage.get("completion_tokens"),
+            "total_tokens": usage.get("total_tokens")
+        }
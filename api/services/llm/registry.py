@@ -0,0 +1,57 @@
+"""
+Registro de backends de LLM y selección por despliegue y tipo de llamada.
+"""
+from typing import Dict, Any
+
+from core.config import settings
+from services.llm.base import LLMBackend
+from services.llm.gemini import GeminiBackend
+from services.llm.openai_compat import OpenAICompatibleBackend
+from services.llm.stub import StubBackend
+
+BACKEND_CLASSES = {
+    GeminiBackend.name: GeminiBackend,
+    OpenAICompatibleBackend.name: OpenAICompatibleBackend,
+    StubBackend.name: StubBackend,
+}
+
+
+class LLMRegistry:
+    """Crea cada backend la primera vez que se usa y lo reutiliza."""
+
+    def __init__(self):
+        """Inicializa el registro vacío."""
+        self._backends: Dict[str, LLMBackend] = {}
+
+    def get(self, name: str) -> LLMBackend:
+        """
+        Backend por nombre.
+
+        Raises:
+            ValueError: Si el backend no existe
+        """
+        if name not in self._backends:
+            if name not in BACKEND_CLASSES:
+                raise ValueError(f"Unknown LLM backend: {name}")
+            self._backends[name] = BACKEND_CLASSES[name]()
+        return self._backends[name]
+
+    def name_for(self, call_type: str) -> str:
+        """Nombre del backend de un tipo de llamada (LLM_CALL_TYPE_BACKENDS o LLM_BACKEND)."""
+        return settings.LLM_CALL_TYPE_BACKENDS.get(call_type, settings.LLM_BACKEND)
+
+    def for_call_type(self, call_type: str) -> LLMBackend:
+        """Backend de un tipo de llamada ("analysis" o "fix")."""
+        return self.get(self.name_for(call_type))
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Backends por tipo de llamada y estado de los ya creados."""
+        return {
+            "default": settings.LLM_BACKEND,
+            "call_types": dict(settings.LLM_CALL_TYPE_BACKENDS),
+            "backends": {name: backend.info() for name, backend in self._backends.items()}
+        }
+
+
+# Instancia global del registro
+llm_backends = LLMRegistry()
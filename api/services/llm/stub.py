@@ -0,0 +1,105 @@
+"""
+Backend determinista para pruebas y despliegues sin modelo.
+"""
+import json
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+from core.config import settings
+from core.logging import get_logger
+from services.llm.base import LLMBackend, Usage
+
+logger = get_logger(__name__)
+
+# Tamaño de los fragmentos en streaming (ejercita el parser incremental)
+STUB_CHUNK_CHARS = 64
+
+# Respuesta de análisis por defecto: contrato sin hallazgos
+DEFAULT_ANALYSIS = {
+    "contract_name": "",
+    "analysis_id": "",
+    "status": "SAFE",
+    "risk_score": 0,
+    "vulnerabilities": [],
+    "tools_reports": {},
+    "testing_results": {"total_tests": 0, "passed": 0, "failed": 0, "coverage_score": 0},
+    "summary": {
+        "is_production_ready": True,
+        "critical_issues": 0,
+        "main_concerns": [],
+        "recommendation": "Respuesta generada por el backend stub."
+    }
+}
+
+
+class StubBackend(LLMBackend):
+    """
+    Devuelve respuestas fijas según el tipo de llamada.
+
+    Las respuestas se pueden reemplazar con un archivo JSON
+    (LLM_STUB_RESPONSES) con las claves "analysis", "fix" y "fix_patch";
+    un valor string se devuelve tal cual (útil para probar JSON inválido).
+    """
+
+    name = "stub"
+
+    def __init__(self):
+        super().__init__(
+            {"fast": "stub", "strong": "stub"},
+            {"fast": 5.0, "strong": 5.0}
+        )
+        self.responses: Dict[str, Any] = {}
+        if settings.LLM_STUB_RESPONSES:
+            try:
+                with open(settings.LLM_STUB_RESPONSES) as f:
+                    self.responses = json.load(f)
+            except (OSError, ValueError) as exc:
+                logger.error(f"Could not load stub responses from {settings.LLM_STUB_RESPONSES}: {exc}")
+
+    async def generate(
+        self,
+        model: str,
+        prompt: str,
+        temperature: Optional[float] = None,
+        call_type: Optional[str] = None
+    ) -> Tuple[Optional[str], Usage]:
+        text = self._respond(call_type or "analysis", prompt)
+        return text, {
+            "prompt_tokens": len(prompt) // 4,
+            "output_tokens": len(text) // 4,
+            "total_tokens": (len(prompt) + len(text)) // 4
+        }
+
+    async def stream(
+        self,
+        model: str,
+        prompt: str,
+        temperature: Optional[float] = None,
+        call_type: Optional[str] = None
+    ) -> AsyncIterator[Tuple[str, Optional[Usage]]]:
+        text, usage = await self.generate(model, prompt, temperature, call_type)
+        for start in range(0, len(text), STUB_CHUNK_CHARS):
+            yield text[start:start + STUB_CHUNK_CHARS], None
+        yield "", usage
+
+    def _respond(self, call_type: str, prompt: str) -> str:
+        if call_type == "fix_patch":
+            default = {"edits": [], "changes_made": [], "explanation": ""}
+        elif call_type == "fix":
+            # Sin cambios: devuelve el código original del prompt
+            default = {
+                "fixed_code": self._original_code(prompt),
+                "changes_made": [],
+                "explanation": ""
+            }
+        else:
+            default = DEFAULT_ANALYSIS
+        response = self.responses.get(call_type, default)
+        return response if isinstance(response, str) else json.dumps(response, ensure_ascii=False)
+
+    @staticmethod
+    def _original_code(prompt: str) -> str:
+        start = prompt.find("Código Original:\n")
+        end = prompt.find("\n\nReporte de Análisis")
+        if start == -1 or end == -1:
+            return ""
+        return prompt[start + len("Código Original:\n"):end]
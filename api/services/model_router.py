@@ -0,0 +1,169 @@
+"""
+Ruteo de llamadas al LLM por tipo de llamada, tamaño y severidad.
+"""
+from typing import Dict, Any, List, Optional
+
+from core.config import settings
+from services.llm import LLMBackend, llm_backends
+
+# Severidades normalizadas, de menor a mayor
+SEVERITY_ORDER = ["none", "info", "low", "medium", "high", "critical"]
+
+# Impacto de Slither -> severidad normalizada
+SLITHER_IMPACT_SEVERITY = {
+    "high": "high",
+    "medium": "medium",
+    "low": "low",
+    "informational": "info",
+    "optimization": "info",
+}
+
+# Errores de herramienta que no dicen nada sobre el contrato
+NEUTRAL_ERROR_TYPES = ("skipped", "service_unavailable", "cancelled", "timeout")
+
+
+def severity_rank(severity: Optional[str]) -> int:
+    """Posición de una severidad en SEVERITY_ORDER (desconocida = none)."""
+    severity = (severity or "none").lower()
+    return SEVERITY_ORDER.index(severity) if severity in SEVERITY_ORDER else 0
+
+
+def max_severity(
+    tool_outputs: Dict[str, Any],
+    analysis_json: Optional[Dict[str, Any]] = None
+) -> str:
+    """
+    Severidad más alta observada en los resultados de las herramientas.
+
+    Args:
+        tool_outputs: Resultados de los microservicios
+        analysis_json: Análisis previo de Gemini (sus vulnerabilidades cuentan)
+
+    Returns:
+        Severidad normalizada (ver SEVERITY_ORDER)
+    """
+    found = ["none"]
+
+    slither = tool_outputs.get("slither") or {}
+    for detector in (slither.get("results") or {}).get("detectors") or []:
+        impact = (detector.get("impact") or "").lower()
+        found.append(SLITHER_IMPACT_SEVERITY.get(impact, "info"))
+
+    solc = tool_outputs.get("solc") or {}
+    if solc and not solc.get("success") and solc.get("error_type") not in NEUTRAL_ERROR_TYPES:
+        found.append("high")
+
+    for fuzzer in ("medusa", "echidna"):
+        results = (tool_outputs.get(fuzzer) or {}).get("results") or {}
+        if results.get("failed"):
+            found.append("high")
+
+    if isinstance(analysis_json, dict):
+        for vulnerability in analysis_json.get("vulnerabilities") or []:
+            if isinstance(vulnerability, dict):
+                found.append((vulnerability.get("severity") or "none").lower())
+
+    return max(found, key=severity_rank)
+
+
+class ModelRouter:
+    """
+    Elige la cadena de modelos de cada llamada según MODEL_ROUTING_RULES.
+
+    Las reglas hablan de tiers ("fast", "strong"); el backend del tipo de
+    llamada los traduce a modelos y timeouts concretos.
+    """
+
+    def route(self, call_type: str, prompt_chars: int, severity: str) -> Dict[str, Any]:
+        """
+        Selecciona la cadena de modelos para una llamada.
+
+        Una regla coincide si coinciden su call_type y, cuando los define,
+        max_severity (severidad <= límite) y max_prompt_chars. La primera
+        regla que coincide gana.
+
+        Args:
+            call_type: Tipo de llamada ("analysis" o "fix")
+            prompt_chars: Tamaño del prompt en caracteres
+            severity: Severidad más alta de los hallazgos
+
+        Returns:
+            Diccionario con rule, backend y chain (lista de {tier, model, timeout})
+        """
+        backend = llm_backends.for_call_type(call_type)
+        if not settings.MODEL_ROUTING_ENABLED:
+            return {
+                "rule": "disabled",
+                "backend": backend.name,
+                "chain": [self._step(backend, "strong")]
+            }
+
+        for rule in settings.MODEL_ROUTING_RULES:
+            if rule["call_type"] != call_type:
+                continue
+            if "max_severity" in rule and severity_rank(severity) > severity_rank(rule["max_severity"]):
+                continue
+            if "max_prompt_chars" in rule and prompt_chars > rule["max_prompt_chars"]:
+                continue
+            return {
+                "rule": rule["name"],
+                "backend": backend.name,
+                "chain": [self._step(backend, tier) for tier in rule["chain"]]
+            }
+
+        return {
+            "rule": "default",
+            "backend": backend.name,
+            "chain": [self._step(backend, "strong")]
+        }
+
+    @staticmethod
+    def _step(backend: LLMBackend, tier: str) -> Dict[str, Any]:
+        return {
+            "tier": tier,
+            "model": backend.model_for(tier),
+            "timeout": backend.timeout_for(tier)
+        }
+
+    @staticmethod
+    def summarize(calls: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Agrega latencia y tokens por modelo a partir de la traza de llamadas.
+
+        Args:
+            calls: Trazas "llm" devueltas por GeminiService
+
+        Returns:
+            Diccionario con las llamadas y el acumulado por modelo
+        """
+        per_model: Dict[str, Dict[str, Any]] = {}
+        for call in calls:
+            for attempt in call.get("attempts", []):
+                stats = per_model.setdefault(attempt["model"], {
+                    "backend": call.get("backend"),
+                    "requests": 0,
+                    "timeouts": 0,
+                    "errors": 0,
+                    "malformed": 0,
+                    "latency_seconds": 0.0,
+                    "prompt_tokens": 0,
+                    "output_tokens": 0,
+                    "total_tokens": 0,
+                })
+                stats["requests"] += 1
+                if attempt["status"] == "timeout":
+                    stats["timeouts"] += 1
+                elif attempt["status"] == "error":
+                    stats["errors"] += 1
+                elif attempt["status"] == "malformed":
+                    stats["malformed"] += 1
+                stats["latency_seconds"] = round(
+                    stats["latency_seconds"] + attempt["latency_seconds"], 3
+                )
+                for key in ("prompt_tokens", "output_tokens", "total_tokens"):
+                    stats[key] += attempt.get(key) or 0
+        return {"calls": calls, "per_model": per_model}
+
+
+# Instancia global del router
+model_router = ModelRouter()
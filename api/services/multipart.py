@@ -0,0 +1,155 @@
+"""
+Parser incremental de cuerpos multipart/form-data.
+"""
+import re
+from typing import Dict, Any, List, Optional, Tuple
+
+# Evento del parser: ("part", encabezados), ("data", bytes) o ("end", None)
+MultipartEvent = Tuple[str, Any]
+
+_PARAM_RE = re.compile(r';\s*([A-Za-z0-9_*-]+)\s*=\s*("(?:[^"\\]|\\.)*"|[^;]*)')
+# Límite de los encabezados de una parte
+MAX_HEADER_BYTES = 16 * 1024
+
+
+class MultipartError(ValueError):
+    """Cuerpo multipart mal formado."""
+
+
+def parse_options_header(value: str) -> Tuple[str, Dict[str, str]]:
+    """
+    Separa un encabezado con parámetros (Content-Type, Content-Disposition).
+
+    Returns:
+        (valor principal en minúsculas, parámetros)
+    """
+    main, _, rest = value.partition(";")
+    params = {}
+    for key, raw in _PARAM_RE.findall(";" + rest):
+        raw = raw.strip()
+        if raw.startswith('"') and raw.endswith('"'):
+            raw = re.sub(r"\\(.)", r"\1", raw[1:-1])
+        params[key.lower()] = raw
+    return main.strip().lower(), params
+
+
+class MultipartParser:
+    """
+    Parser de multipart/form-data que procesa el cuerpo por fragmentos.
+
+    feed() devuelve los eventos completos hasta el momento; los datos de cada
+    parte se entregan a medida que llegan, sin acumular la parte entera en
+    memoria (solo se retiene el final de cada fragmento por si contiene el
+    comienzo del delimitador).
+    """
+
+    def __init__(self, boundary: str):
+        """
+        Args:
+            boundary: Parámetro boundary del Content-Type
+        """
+        self._delimiter = b"\r\n--" + boundary.encode("latin-1")
+        self._buffer = b"\r\n"
+        # preamble, boundary (delimitador al comienzo del buffer), headers,
+        # body o done
+        self._state = "preamble"
+
+    @property
+    def done(self) -> bool:
+        return self._state == "done"
+
+    def feed(self, chunk: bytes) -> List[MultipartEvent]:
+        """
+        Procesa un fragmento del cuerpo.
+
+        Raises:
+            MultipartError: Si el cuerpo está mal formado
+        """
+        if self._state == "done":
+            return []
+        self._buffer += chunk
+        events: List[MultipartEvent] = []
+        while True:
+            if self._state == "boundary":
+                if not self._after_delimiter(0):
+                    return events
+            elif self._state == "preamble":
+                position = self._buffer.find(self._delimiter)
+                if position < 0:
+                    self._buffer = self._buffer[-len(self._delimiter):]
+                    return events
+                if not self._after_delimiter(position):
+                    return events
+            elif self._state == "headers":
+                position = self._buffer.find(b"\r\n\r\n")
+                if position < 0:
+                    if len(self._buffer) > MAX_HEADER_BYTES:
+                        raise MultipartError("Part headers too large")
+                    return events
+                events.append(("part", self._parse_headers(self._buffer[:position])))
+                self._buffer = self._buffer[position + 4:]
+                self._state = "body"
+            elif self._state == "body":
+                position = self._buffer.find(self._delimiter)
+                if position < 0:
+                    # Retener lo que podría ser el comienzo del delimitador
+                    keep = len(self._delimiter) - 1
+                    if len(self._buffer) > keep:
+                        events.append(("data", self._buffer[:-keep]))
+                        self._buffer = self._buffer[-keep:]
+                    return events
+                if position:
+                    events.append(("data", self._buffer[:position]))
+                events.append(("end", None))
+                if not self._after_delimiter(position):
+                    return events
+            else:
+                return events
+
+    def _after_delimiter(self, position: int) -> bool:
+        """Consume un delimitador; False si faltan bytes para decidir qué sigue."""
+        rest = self._buffer[position + len(self._delimiter):]
+        if len(rest) < 2:
+            self._buffer = self._buffer[position:]
+            self._state = "boundary"
+            return False
+        if rest[:2] == b"--":
+            self._state = "done"
+            self._buffer = b""
+            return False
+        if rest[:2] != b"\r\n":
+            raise MultipartError("Malformed multipart boundary")
+        self._buffer = rest[2:]
+        self._state = "headers"
+        return True
+
+    @staticmethod
+    def _parse_headers(raw: bytes) -> Dict[str, str]:
+        headers = {}
+        for line in raw.decode("utf-8", "replace").split("\r\n"):
+            name, separator, value = line.partition(":")
+            if not separator:
+                raise MultipartError(f"Malformed part header: {line[:80]}")
+            headers[name.strip().lower()] = value.strip()
+        return headers
+
+    def close(self) -> None:
+        """
+        Verifica que el cuerpo terminó con el delimitador final.
+
+        Raises:
+            MultipartError: Si el cuerpo está truncado
+        """
+        if self._state != "done":
+            raise MultipartError("Truncated multipart body")
+
+
+def part_disposition(headers: Dict[str, str]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Nombre del campo y nombre de archivo de una parte.
+
+    Returns:
+        (name, filename); filename es None en los campos de texto
+    """
+    _, params = parse_options_header(headers.get("content-disposition", ""))
+    return params.get("name"), params.get("filename")
@@ -0,0 +1,238 @@
+"""
+Aplicación local de parches (edits search/replace o unified diff) al contrato.
+"""
+import re
+from typing import Dict, Any, List, Optional, Tuple
+
+HUNK_RE = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+BRACKET_PAIRS = {")": "(", "]": "[", "}": "{"}
+
+
+class PatchError(ValueError):
+    """El parche no se puede aplicar limpiamente o deja el contrato inválido."""
+
+
+def apply_fix_patch(code: str, fix_data: Dict[str, Any]) -> str:
+    """
+    Aplica el parche devuelto por Gemini y valida el resultado.
+
+    Acepta "edits" (lista de {search, replace}) o "diff" (unified diff).
+
+    Args:
+        code: Código fuente actual
+        fix_data: Respuesta de corrección en modo parche
+
+    Returns:
+        Código corregido
+
+    Raises:
+        PatchError: Si el parche no aplica o el resultado no es válido
+    """
+    edits = fix_data.get("edits")
+    diff = fix_data.get("diff")
+    if isinstance(edits, list) and edits:
+        patched = apply_edits(code, edits)
+    elif isinstance(diff, str) and diff.strip():
+        patched = apply_unified_diff(code, diff)
+    else:
+        raise PatchError("response has no edits or diff")
+    validate_patched_code(code, patched)
+    return patched
+
+
+def apply_edits(code: str, edits: List[Dict[str, Any]]) -> str:
+    """
+    Aplica edits search/replace en orden.
+
+    Cada bloque search debe aparecer exactamente una vez. Si no aparece
+    literal, se busca por líneas ignorando indentación y espacios finales.
+
+    Raises:
+        PatchError: Si algún bloque no aparece o es ambiguo
+    """
+    result = code
+    for index, edit in enumerate(edits):
+        if not isinstance(edit, dict):
+            raise PatchError(f"edit {index}: not an object")
+        search = edit.get("search")
+        replace = edit.get("replace") or ""
+        if not isinstance(search, str) or not search.strip():
+            raise PatchError(f"edit {index}: empty search block")
+
+        count = result.count(search)
+        if count == 1:
+            result = result.replace(search, replace, 1)
+        elif count > 1:
+            raise PatchError(f"edit {index}: search block matches {count} times")
+        else:
+            result = _replace_by_lines(result, search, replace, index)
+    return result
+
+
+def _replace_by_lines(code: str, search: str, replace: str, index: int) -> str:
+    """Reemplaza un bloque comparando líneas sin indentación ni espacios finales."""
+    lines = code.split("\n")
+    search_lines = _trim_blank_edges(search.split("\n"))
+    wanted = [line.strip() for line in search_lines]
+
+    matches = [
+        start for start in range(len(lines) - len(wanted) + 1)
+        if [line.strip() for line in lines[start:start + len(wanted)]] == wanted
+    ]
+    if not matches:
+        raise PatchError(f"edit {index}: search block not found")
+    if len(matches) > 1:
+        raise PatchError(f"edit {index}: search block matches {len(matches)} times")
+
+    start = matches[0]
+    replace_lines = _reindent(
+        _trim_blank_edges(replace.split("\n")),
+        _indent(search_lines[0]),
+        _indent(lines[start])
+    )
+    lines[start:start + len(wanted)] = replace_lines
+    return "\n".join(lines)
+
+
+def _trim_blank_edges(lines: List[str]) -> List[str]:
+    start, end = 0, len(lines)
+    while start < end and not lines[start].strip():
+        start += 1
+    while end > start and not lines[end - 1].strip():
+        end -= 1
+    return lines[start:end]
+
+
+def _indent(line: str) -> str:
+    return line[:len(line) - len(line.lstrip())]
+
+
+def _reindent(lines: List[str], old_indent: str, new_indent: str) -> List[str]:
+    """Traslada la indentación del bloque del modelo a la del código real."""
+    if old_indent == new_indent:
+        return lines
+    return [
+        new_indent + line[len(old_indent):] if line.startswith(old_indent) else line
+        for line in lines
+    ]
+
+
+def apply_unified_diff(code: str, diff: str) -> str:
+    """
+    Aplica un unified diff.
+
+    Los hunks se ubican por su contexto: si no coinciden en la línea indicada
+    se usa la coincidencia más cercana.
+
+    Raises:
+        PatchError: Si el diff no tiene hunks o el contexto no aparece
+    """
+    hunks = _parse_hunks(diff)
+    if not hunks:
+        raise PatchError("diff has no hunks")
+
+    trailing_newline = code.endswith("\n")
+    lines = code.split("\n")
+    if trailing_newline:
+        lines.pop()
+
+    offset = 0
+    for index, (old_start, hunk_lines) in enumerate(hunks):
+        old = [text for tag, text in hunk_lines if tag in (" ", "-")]
+        new = [text for tag, text in hunk_lines if tag in (" ", "+")]
+        expected = max(0, old_start - 1 + offset)
+        position = _locate(lines, old, expected)
+        if position is None:
+            raise PatchError(f"hunk {index}: context not found")
+        lines[position:position + len(old)] = new
+        offset = position - (old_start - 1) + len(new) - len(old)
+
+    return "\n".join(lines) + ("\n" if trailing_newline else "")
+
+
+def _parse_hunks(diff: str) -> List[Tuple[int, List[Tuple[str, str]]]]:
+    hunks = []
+    current = None
+    for line in diff.split("\n"):
+        if line.startswith(("--- ", "+++ ")) and current is None:
+            continue
+        match = HUNK_RE.match(line)
+        if match:
+            current = (int(match.group(1)), [])
+            hunks.append(current)
+            continue
+        if current is None or line.startswith("\\"):
+            continue
+        if line.startswith(("+", "-", " ")):
+            current[1].append((line[0], line[1:]))
+        elif not line:
+            current[1].append((" ", ""))
+    # Las líneas vacías finales del texto del diff no son contexto
+    for _, hunk_lines in hunks:
+        while hunk_lines and hunk_lines[-1] == (" ", ""):
+            hunk_lines.pop()
+    return hunks
+
+
+def _locate(lines: List[str], old: List[str], expected: int) -> Optional[int]:
+    """Posición de old en lines más cercana a expected."""
+    if not old:
+        return min(expected, len(lines))
+    wanted = [line.rstrip() for line in old]
+    candidates = [
+        start for start in range(len(lines) - len(old) + 1)
+        if [line.rstrip() for line in lines[start:start + len(old)]] == wanted
+    ]
+    if not candidates:
+        return None
+    return min(candidates, key=lambda start: abs(start - expected))
+
+
+def validate_patched_code(original: str, patched: str) -> None:
+    """
+    Verificaciones baratas del código parcheado antes de volver a analizarlo.
+
+    Raises:
+        PatchError: Si el resultado está vacío, no cambió, perdió el pragma o
+            los delimitadores no están balanceados
+    """
+    if not patched.strip():
+        raise PatchError("patched code is empty")
+    if patched.strip() == original.strip():
+        raise PatchError("patch does not change the code")
+    if "pragma solidity" in original and "pragma solidity" not in patched:
+        raise PatchError("patch removed the pragma")
+    error = _bracket_error(patched)
+    if error:
+        raise PatchError(error)
+
+
+def _bracket_error(code: str) -> Optional[str]:
+    """Verifica el balance de (), [] y {} fuera de strings y comentarios."""
+    stack = []
+    i = 0
+    length = len(code)
+    while i < length:
+        char = code[i]
+        if code.startswith("//", i):
+            newline = code.find("\n", i)
+            i = length if newline == -1 else newline
+            continue
+        if code.startswith("/*", i):
+            end = code.find("*/", i + 2)
+            i = length if end == -1 else end + 2
+            continue
+        if char in ("'", '"'):
+            i += 1
+            while i < length and code[i] != char:
+                i += 2 if code[i] == "\\" else 1
+        elif char in "([{":
+            stack.append(char)
+        elif char in BRACKET_PAIRS:
+            if not stack or stack.pop() != BRACKET_PAIRS[char]:
+                return f"unbalanced '{char}' in patched code"
+        i += 1
+    if stack:
+        return f"unclosed '{stack[-1]}' in patched code"
+    return None
@@ -0,0 +1,398 @@
+"""
+Ingesta de proyectos de varios archivos (archivo comprimido o multipart).
+"""
+import os
+import stat
+import asyncio
+import tarfile
+import zipfile
+from typing import Dict, Any, List, Optional
+
+from fastapi import Request
+
+from core.config import settings
+from core.logging import get_logger
+from services.blob_store import BlobStore, BlobTooLarge, BlobWriter, blob_store
+from services.multipart import MultipartError, MultipartParser, part_disposition
+from services.solidity_parser import parse_source
+
+logger = get_logger(__name__)
+
+# Content-Type de los archivos comprimidos aceptados (None = detectar)
+ARCHIVE_TYPES = {
+    "application/zip": "zip",
+    "application/x-zip-compressed": "zip",
+    "application/x-tar": "tar",
+    "application/gzip": "tar",
+    "application/x-gzip": "tar",
+    "application/x-compressed-tar": "tar",
+    "application/octet-stream": None,
+}
+
+# Archivos del proyecto que se guardan además de las fuentes
+LAYOUT_FILES = ("remappings.txt",)
+
+# Directorios de dependencias, tests y scripts: no se eligen como archivo principal
+NON_ENTRY_DIRS = ("lib", "node_modules", "test", "tests", "script", "scripts")
+
+# Tamaño máximo de un campo de texto del formulario multipart
+MAX_FIELD_BYTES = 64 * 1024
+
+
+class ProjectError(Exception):
+    """Proyecto rechazado antes de analizarlo (límites, formato, rutas)."""
+
+    def __init__(self, status_code: int, error_type: str, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+        self.error_type = error_type
+        self.message = message
+
+
+def _too_large(message: str) -> ProjectError:
+    return ProjectError(413, "project_too_large", message)
+
+
+def _invalid(message: str) -> ProjectError:
+    return ProjectError(422, "invalid_project", message)
+
+
+def normalize_path(name: str) -> str:
+    """
+    Ruta relativa normalizada de un archivo del proyecto.
+
+    Raises:
+        ProjectError: Si la ruta es absoluta o sale del proyecto
+    """
+    name = name.replace("\\", "/")
+    parts = [part for part in name.split("/") if part not in ("", ".")]
+    if not parts or name.startswith("/") or ".." in parts or ":" in parts[0]:
+        raise _invalid(f"Invalid path in project: {name}")
+    return "/".join(parts)
+
+
+def parse_remappings(text: str) -> List[str]:
+    """
+    Remapeos prefijo=ruta separados por líneas o espacios (formato de
+    remappings.txt de Foundry).
+
+    Raises:
+        ProjectError: Si un remapeo está mal formado o sale del proyecto
+    """
+    remappings = []
+    for remapping in text.split():
+        prefix, separator, target = remapping.partition("=")
+        # Contexto de Foundry (contexto:prefijo=ruta): no se admite
+        if not separator or not prefix or ":" in prefix:
+            raise _invalid(f"Invalid remapping: {remapping}")
+        normalized = normalize_path(target) if target.strip("./") else "."
+        if target.endswith("/"):
+            normalized += "/"
+        remappings.append(f"{prefix}={normalized}")
+    return remappings
+
+
+class ProjectBuilder:
+    """
+    Recibe los archivos de un proyecto y los guarda en el almacén de blobs a
+    medida que llegan, controlando los límites de PROJECT_MAX_*.
+
+    Solo se guardan las fuentes Solidity y LAYOUT_FILES; el resto se ignora.
+    """
+
+    def __init__(self, store: BlobStore = blob_store):
+        self.store = store
+        # Ruta relativa -> hash del contenido
+        self.files: Dict[str, str] = {}
+        self.total_bytes = 0
+        # Archivos que el almacén ya tenía de otras subidas
+        self.reused: set = set()
+
+    def start(self, name: str) -> Optional[BlobWriter]:
+        """
+        Abre la escritura de un archivo del proyecto.
+
+        Returns:
+            Escritor del archivo, o None si el archivo se ignora
+
+        Raises:
+            ProjectError: Si la ruta es inválida o hay demasiados archivos
+        """
+        path = normalize_path(name)
+        if not path.endswith(".sol") and os.path.basename(path) not in LAYOUT_FILES:
+            return None
+        if len(self.files) >= settings.PROJECT_MAX_FILES:
+            raise _too_large(f"Project exceeds {settings.PROJECT_MAX_FILES} files")
+        return self.store.writer(settings.PROJECT_MAX_FILE_BYTES)
+
+    def write(self, writer: BlobWriter, data: bytes) -> None:
+        """
+        Raises:
+            ProjectError: Si se supera el tamaño por archivo o total
+        """
+        self.total_bytes += len(data)
+        if self.total_bytes > settings.PROJECT_MAX_TOTAL_BYTES:
+            raise _too_large(f"Project exceeds {settings.PROJECT_MAX_TOTAL_BYTES} bytes")
+        try:
+            writer.write(data)
+        except BlobTooLarge:
+            raise _too_large(f"A project file exceeds {settings.PROJECT_MAX_FILE_BYTES} bytes")
+
+    def finish(self, name: str, writer: BlobWriter) -> None:
+        digest, new = writer.commit()
+        path = normalize_path(name)
+        self.files[path] = digest
+        if not new:
+            self.reused.add(path)
+
+    def add(self, name: str, source) -> None:
+        """Guarda un archivo abierto (miembro de un archivo comprimido)."""
+        writer = self.start(name)
+        if writer is None:
+            return
+        try:
+            for chunk in iter(lambda: source.read(64 * 1024), b""):
+                self.write(writer, chunk)
+            self.finish(name, writer)
+        except BaseException:
+            writer.abort()
+            raise
+
+    def extract(self, archive_path: str, kind: Optional[str] = None) -> None:
+        """
+        Guarda las fuentes de un archivo zip o tar (comprimido o no).
+
+        Los enlaces simbólicos, dispositivos y directorios se ignoran; los
+        límites se controlan sobre los bytes descomprimidos reales.
+
+        Raises:
+            ProjectError: Si el archivo no es un zip/tar válido o supera los límites
+        """
+        if kind == "zip" or (kind is None and zipfile.is_zipfile(archive_path)):
+            try:
+                with zipfile.ZipFile(archive_path) as archive:
+                    for info in archive.infolist():
+                        mode = info.external_attr >> 16
+                        if info.is_dir() or stat.S_ISLNK(mode):
+                            continue
+                        with archive.open(info) as source:
+                            self.add(info.filename, source)
+            except (zipfile.BadZipFile, RuntimeError, NotImplementedError) as e:
+                raise _invalid(f"Invalid zip archive: {e}")
+            return
+        try:
+            with tarfile.open(archive_path, "r:*") as archive:
+                for member in archive:
+                    if not member.isfile():
+                        continue
+                    source = archive.extractfile(member)
+                    if source is not None:
+                        self.add(member.name, source)
+        except (tarfile.TarError, EOFError, OSError) as e:
+            raise _invalid(f"Invalid tar archive: {e}")
+
+    def build(self, entry: Optional[str] = None, remappings: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Cierra el proyecto: quita el directorio raíz común (p. ej. el de un
+        zip descargado de GitHub), elige el archivo principal (si no se
+        indica, la única fuente propia que ninguna otra importa) y resuelve
+        los remapeos (los indicados o los de remappings.txt).
+
+        Returns:
+            Proyecto: entry, files (ruta -> hash), remappings, size_bytes y
+            reused_files
+
+        Raises:
+            ProjectError: Si no hay fuentes o el archivo principal es ambiguo
+        """
+        files = dict(self.files)
+        reused = set(self.reused)
+        entry = normalize_path(entry) if entry else None
+        roots = {path.split("/", 1)[0] for path in files}
+        if (
+            len(roots) == 1 and all("/" in path for path in files)
+            and (entry is None or entry not in files)
+        ):
+            root = roots.pop() + "/"
+            files = {path[len(root):]: digest for path, digest in files.items()}
+            reused = {path[len(root):] for path in reused}
+
+        sources = sorted(path for path in files if path.endswith(".sol"))
+        if not sources:
+            raise _invalid("No Solidity files found in the project")
+
+        if remappings is None:
+            remappings = []
+            if "remappings.txt" in files:
+                remappings = parse_remappings(
+                    self.store.read(files["remappings.txt"]).decode("utf-8", "replace")
+                )
+        else:
+            remappings = parse_remappings(" ".join(remappings))
+
+        if entry is None:
+            candidates = [
+                path for path in sources
+                if path.split("/", 1)[0] not in NON_ENTRY_DIRS
+                and not path.endswith((".t.sol", ".s.sol"))
+            ]
+            if len(candidates) > 1:
+                # Preferir las raíces del grafo de imports
+                imported = {
+                    os.path.basename(item["path"])
+                    for path in candidates
+                    for item in parse_source(
+                        self.store.read(files[path]).decode("utf-8", "replace")
+                    )["imports"]
+                }
+                roots = [path for path in candidates if os.path.basename(path) not in imported]
+                candidates = roots or candidates
+            if len(candidates) != 1:
+                raise ProjectError(
+                    422, "entry_required",
+                    f"Specify the main file with entry; candidates: {', '.join(candidates[:20]) or 'none'}"
+                )
+            entry = candidates[0]
+        elif entry not in files or not entry.endswith(".sol"):
+            raise _invalid(f"Entry file not found in the project: {entry}")
+
+        return {
+            "entry": entry,
+            "files": {path: files[path] for path in sources},
+            "remappings": remappings,
+            "size_bytes": self.total_bytes,
+            "reused_files": len(reused.intersection(sources))
+        }
+
+
+def _check_upload(received: int) -> None:
+    if received > settings.PROJECT_MAX_UPLOAD_BYTES:
+        raise _too_large(f"Upload exceeds {settings.PROJECT_MAX_UPLOAD_BYTES} bytes")
+
+
+async def receive_archive(http_request: Request, builder: ProjectBuilder, kind: Optional[str]) -> None:
+    """
+    Recibe un archivo comprimido en el cuerpo del pedido y guarda sus fuentes.
+
+    El cuerpo se escribe a disco por fragmentos (zip necesita acceso
+    aleatorio) y se extrae en un hilo.
+    """
+    path = builder.store.temp_path()
+    try:
+        received = 0
+        with open(path, "wb") as f:
+            async for chunk in http_request.stream():
+                received += len(chunk)
+                _check_upload(received)
+                f.write(chunk)
+        await asyncio.get_event_loop().run_in_executor(None, builder.extract, path, kind)
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+async def receive_multipart(http_request: Request, boundary: str, builder: ProjectBuilder) -> Dict[str, List[str]]:
+    """
+    Recibe un formulario multipart/form-data.
+
+    Cada parte con nombre de archivo es una fuente del proyecto (el nombre
+    de archivo es su ruta relativa) y se escribe en el almacén a medida que
+    llega; la parte "archive" es un archivo comprimido con el proyecto.
+
+    Returns:
+        Campos de texto del formulario (nombre -> valores)
+    """
+    if not boundary:
+        raise _invalid("Missing multipart boundary")
+    parser = MultipartParser(boundary)
+    fields: Dict[str, List[str]] = {}
+    # Parte en curso: (tipo, nombre, destino)
+    current = None
+    archives: List[str] = []
+    received = 0
+    try:
+        async for chunk in http_request.stream():
+            received += len(chunk)
+            _check_upload(received)
+            for kind, value in parser.feed(chunk):
+                if kind == "part":
+                    name, filename = part_disposition(value)
+                    if filename is None:
+                        current = ("field", name, bytearray())
+                    elif name == "archive":
+                        archives.append(builder.store.temp_path())
+                        current = ("archive", name, open(archives[-1], "wb"))
+                    else:
+                        current = ("file", filename, builder.start(filename))
+                elif kind == "data":
+                    part_kind, _, target = current
+                    if part_kind == "field":
+                        target += value
+                        if len(target) > MAX_FIELD_BYTES:
+                            raise _too_large(f"Form field exceeds {MAX_FIELD_BYTES} bytes")
+                    elif part_kind == "archive":
+                        target.write(value)
+                    elif target is not None:
+                        builder.write(target, value)
+                else:
+                    part_kind, name, target = current
+                    current = None
+                    if part_kind == "field":
+                        fields.setdefault(name, []).append(target.decode("utf-8", "replace"))
+                    elif part_kind == "archive":
+                        target.close()
+                    elif target is not None:
+                        builder.finish(name, target)
+        parser.close()
+        for path in archives:
+            await asyncio.get_event_loop().run_in_executor(None, builder.extract, path, None)
+    except MultipartError as e:
+        raise _invalid(f"Invalid multipart body: {e}")
+    finally:
+        if current is not None and current[0] == "archive":
+            current[2].close()
+        elif current is not None and current[0] == "file" and current[2] is not None:
+            current[2].abort()
+        for path in archives:
+            if os.path.exists(path):
+                os.remove(path)
+    return fields
+
+
+def read_entry(project: Dict[str, Any], store: BlobStore = blob_store) -> str:
+    """
+    Código del archivo principal del proyecto.
+
+    Raises:
+        ProjectError: Si no es texto UTF-8
+    """
+    try:
+        return store.read(project["files"][project["entry"]]).decode("utf-8")
+    except UnicodeDecodeError:
+        raise _invalid(f"Entry file is not valid UTF-8: {project['entry']}")
+
+
+def materialize(project: Dict[str, Any], folder: str, exclude: Optional[str] = None, store: BlobStore = blob_store) -> None:
+    """
+    Enlaza los archivos del proyecto en el workspace de un análisis.
+
+    Args:
+        project: Resultado de ProjectBuilder.build
+        folder: Workspace del análisis
+        exclude: Archivo que el análisis escribe por su cuenta (el principal,
+            que las correcciones reescriben)
+    """
+    for path, digest in project["files"].items():
+        if path != exclude:
+            store.link(digest, os.path.join(folder, path))
+
+
+def project_summary(project: Dict[str, Any]) -> Dict[str, Any]:
+    """Sección "project" de la respuesta."""
+    return {
+        "entry": project["entry"],
+        "files": len(project["files"]),
+        "size_bytes": project["size_bytes"],
+        "reused_files": project["reused_files"],
+        "remappings": project["remappings"]
+    }
@@ -52,12 +52,6 @@ json{
     }
   },
   
-  "contract_info": {
-    "functions": ["array - nombres de funciones públicas/externas"],
-    "has_payable_functions": "boolean",
-    "compiled_successfully": "boolean"
-  },
-  
   "testing_results": {
     "total_tests": "number",
     "passed": "number",
@@ -183,3 +177,49 @@ json{{
   "explanation": "string - resumen general de las correcciones aplicadas"
 }}
 """
+
+
+FIX_PATCH_PROMPT = """Eres un experto desarrollador de seguridad en Solidity.
+Tu tarea es CORREGIR un contrato inteligente que ha fallado en un análisis de seguridad, devolviendo SOLO los cambios necesarios.
+
+Código Original:
+{code}
+
+Reporte de Análisis (JSON):
+{analysis_json}
+
+Resultados de Herramientas (JSON):
+{tool_outputs}
+
+Tu tarea:
+1. Analiza las vulnerabilidades reportadas en el análisis y por las herramientas.
+2. Para cada vulnerabilidad, escribe una o más ediciones mínimas que la corrijan.
+3. NO reescribas el contrato completo: cada edición reemplaza un fragmento concreto del código.
+4. Mantén la funcionalidad original del contrato tanto como sea posible, solo arregla la seguridad.
+
+Reglas de las ediciones:
+- "search" debe copiarse LITERALMENTE del código original (mismos espacios y saltos de línea), sin números de línea.
+- "search" debe incluir suficientes líneas para aparecer UNA sola vez en el código.
+- "replace" contiene el fragmento que sustituye a "search"; para agregar código incluye en "search" la línea anterior y repítela en "replace".
+- Las ediciones se aplican en orden y no deben solaparse.
+
+Formato de Salida (JSON):
+Responde ÚNICAMENTE con un objeto JSON con la siguiente estructura:
+json{{
+  "edits": [
+    {{
+      "vulnerability": "string - vulnerabilidad que corrige esta edición",
+      "search": "string - fragmento exacto del código original",
+      "replace": "string - fragmento corregido"
+    }}
+  ],
+  "changes_made": [
+    {{
+      "issue": "string - nombre de la vulnerabilidad corregida",
+      "fix_description": "string - descripción técnica de qué cambiaste",
+      "severity": "string - severidad original (CRITICAL, HIGH, etc)"
+    }}
+  ],
+  "explanation": "string - resumen general de las correcciones aplicadas"
+}}
+"""
@@ -0,0 +1,106 @@
+"""
+Seguimiento de la disponibilidad (readiness) de los microservicios.
+"""
+import time
+import asyncio
+from typing import Dict, Any, Optional
+
+import httpx
+
+from core.config import settings
+from core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class ServiceReadiness:
+    """Consulta y cachea el estado de GET /ready de cada microservicio."""
+
+    def __init__(self):
+        """Inicializa la caché de estados vacía."""
+        self._status: Dict[str, Dict[str, Any]] = {}
+        self._checked_at: Dict[str, float] = {}
+
+    async def check(self, service_name: str, service_url: str, force: bool = False) -> Dict[str, Any]:
+        """
+        Obtiene el estado de readiness de un servicio.
+
+        Args:
+            service_name: Nombre del servicio
+            service_url: URL del servicio
+            force: Ignorar el estado cacheado
+
+        Returns:
+            Estado reportado por el servicio; siempre incluye "ready"
+        """
+        checked_at = self._checked_at.get(service_name)
+        if (
+            not force
+            and checked_at is not None
+            and time.monotonic() - checked_at < settings.READINESS_CACHE_TTL
+        ):
+            return self._status[service_name]
+
+        try:
+            async with httpx.AsyncClient(timeout=settings.READINESS_TIMEOUT) as client:
+                response = await client.get(f"{service_url}/ready")
+            status = response.json()
+            status["ready"] = response.status_code == 200 and bool(status.get("ready"))
+        except Exception as e:
+            status = {"ready": False, "status": "unreachable", "error": str(e)}
+
+        previous = self._status.get(service_name, {}).get("ready")
+        if previous is not None and previous != status["ready"]:
+            logger.info(f"Service {service_name} ready={status['ready']} ({status.get('status')})")
+        self._status[service_name] = status
+        self._checked_at[service_name] = time.monotonic()
+        return status
+
+    async def wait_until_ready(
+        self,
+        service_name: str,
+        service_url: str,
+        max_wait: Optional[float] = None
+    ) -> bool:
+        """
+        Espera a que un servicio esté listo.
+
+        Args:
+            service_name: Nombre del servicio
+            service_url: URL del servicio
+            max_wait: Segundos máximos de espera (por defecto READINESS_WAIT_TIMEOUT)
+
+        Returns:
+            True si el servicio quedó listo dentro del plazo
+        """
+        max_wait = settings.READINESS_WAIT_TIMEOUT if max_wait is None else max_wait
+        deadline = time.monotonic() + max_wait
+        force = False
+        while True:
+            status = await self.check(service_name, service_url, force=force)
+            if status["ready"]:
+                return True
+            if time.monotonic() >= deadline:
+                logger.warning(
+                    f"Service {service_name} not ready after {max_wait}s ({status.get('status')})"
+                )
+                return False
+            await asyncio.sleep(settings.READINESS_POLL_INTERVAL)
+            force = True
+
+    async def check_all(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Consulta el estado de todos los servicios en paralelo.
+
+        Returns:
+            Estado por servicio
+        """
+        names = list(settings.services)
+        statuses = await asyncio.gather(
+            *(self.check(name, settings.services[name], force=True) for name in names)
+        )
+        return dict(zip(names, statuses))
+
+
+# Instancia global del seguimiento de readiness
+service_readiness = ServiceReadiness()
@@ -0,0 +1,259 @@
+"""
+Planificación justa de las llamadas a las herramientas entre clientes y prioridades.
+"""
+import asyncio
+import heapq
+import math
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Dict, Any, List, Optional, Tuple
+
+from core.config import settings
+from core.logging import get_logger
+from services.shared_state import WORKER_ID, SharedStateError, shared_state
+
+logger = get_logger(__name__)
+
+
+class ClientContext:
+    """Cliente que originó un análisis y su clase de prioridad."""
+
+    def __init__(self, client_id: str, priority: str = "interactive"):
+        self.client_id = client_id
+        self.priority = priority
+
+    @property
+    def flow(self) -> Tuple[str, str]:
+        """Flujo de la cola justa: cada cliente y clase compite por separado."""
+        return self.client_id, self.priority
+
+    @property
+    def weight(self) -> float:
+        return settings.PRIORITY_WEIGHTS.get(self.priority, 1.0)
+
+
+ANONYMOUS_CLIENT = ClientContext("anonymous")
+
+# Cliente del análisis en curso; las tareas creadas dentro del análisis lo heredan
+current_client: ContextVar[ClientContext] = ContextVar("current_client", default=ANONYMOUS_CLIENT)
+
+
+class FairQueue:
+    """
+    Cola con N slots y orden justo ponderado (start-time fair queueing).
+
+    Cada flujo (cliente, prioridad) recibe etiquetas de inicio virtual según
+    el costo de sus pedidos dividido por su peso; se atiende primero la
+    etiqueta menor. Un cliente con muchos pedidos batch no bloquea a los
+    pedidos interactivos de otros clientes.
+    """
+
+    def __init__(self, name: str, slots: int):
+        """
+        Args:
+            name: Nombre del servicio
+            slots: Llamadas simultáneas permitidas
+        """
+        self.name = name
+        self.slots = max(1, slots)
+        self.busy = 0
+        self._heap: List[tuple] = []
+        self._seq = 0
+        self._virtual = 0.0
+        self._finish: Dict[Tuple[str, str], float] = {}
+        self._avg_service: Optional[float] = None
+
+    def _tag(self, client: ClientContext, cost: float) -> float:
+        start = max(self._virtual, self._finish.get(client.flow, 0.0))
+        self._finish[client.flow] = start + cost / client.weight
+        return start
+
+    async def acquire(self, client: ClientContext, cost: float = 1.0) -> None:
+        """
+        Espera un slot libre según el orden justo.
+
+        Args:
+            client: Cliente del pedido
+            cost: Costo estimado del pedido (p. ej. su timeout presupuestado)
+        """
+        start = self._tag(client, cost)
+        if self.busy < self.slots and not self._queued():
+            self.busy += 1
+            self._virtual = start
+            return
+
+        future = asyncio.get_event_loop().create_future()
+        self._seq += 1
+        heapq.heappush(self._heap, (start, self._seq, future, client.priority))
+        try:
+            await future
+        except asyncio.CancelledError:
+            # El slot se asignó justo antes de la cancelación: devolverlo
+            if future.done() and not future.cancelled():
+                self._dispatch()
+            raise
+
+    def release(self, elapsed: Optional[float] = None) -> None:
+        """
+        Libera un slot y lo asigna al siguiente pedido en orden justo.
+
+        Args:
+            elapsed: Duración de la llamada, para el promedio de servicio
+        """
+        if elapsed is not None:
+            alpha = settings.SCHEDULER_EWMA_ALPHA
+            self._avg_service = (
+                elapsed if self._avg_service is None
+                else alpha * elapsed + (1 - alpha) * self._avg_service
+            )
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        while self._heap:
+            start, _, future, _ = heapq.heappop(self._heap)
+            if future.cancelled():
+                continue
+            self._virtual = start
+            future.set_result(None)
+            return
+        self.busy -= 1
+        # Las etiquetas de flujos inactivos ya no influyen en el orden
+        if not self.busy:
+            self._finish = {
+                flow: finish for flow, finish in self._finish.items() if finish > self._virtual
+            }
+
+    def _queued(self) -> List[tuple]:
+        return [entry for entry in self._heap if not entry[2].cancelled()]
+
+    @property
+    def avg_service_seconds(self) -> float:
+        if self._avg_service is None:
+            return settings.SCHEDULER_DEFAULT_SERVICE_SECONDS
+        return self._avg_service
+
+    def estimated_wait(self) -> float:
+        """Tiempo estimado hasta atender un pedido nuevo."""
+        if self.busy < self.slots:
+            return 0.0
+        return (len(self._queued()) + 1) * self.avg_service_seconds / self.slots
+
+    def snapshot(self) -> Dict[str, Any]:
+        queued = self._queued()
+        by_priority: Dict[str, int] = {}
+        for entry in queued:
+            by_priority[entry[3]] = by_priority.get(entry[3], 0) + 1
+        return {
+            "slots": self.slots,
+            "busy": self.busy,
+            "queued": len(queued),
+            "queued_by_priority": by_priority,
+            "avg_service_seconds": round(self.avg_service_seconds, 2),
+            "estimated_wait_seconds": round(self.estimated_wait(), 2)
+        }
+
+
+class ToolScheduler:
+    """
+    Una cola justa por microservicio, delante de las llamadas HTTP.
+
+    Con un backend de estado compartido distribuido, la llamada que sale de
+    la cola además reserva uno de los TOOL_SLOTS slots globales del servicio,
+    así varios workers juntos no superan la concurrencia de la herramienta.
+    """
+
+    def __init__(self):
+        """Crea las colas con los slots de TOOL_SLOTS."""
+        self._queues: Dict[str, FairQueue] = {
+            name: FairQueue(name, settings.TOOL_SLOTS.get(name, 1))
+            for name in settings.services
+        }
+
+    def queue(self, service_name: str) -> FairQueue:
+        if service_name not in self._queues:
+            self._queues[service_name] = FairQueue(
+                service_name, settings.TOOL_SLOTS.get(service_name, 1)
+            )
+        return self._queues[service_name]
+
+    async def run(self, service_name: str, coro_factory, cost: float = 1.0) -> Any:
+        """
+        Ejecuta una llamada a un servicio cuando le toca según la cola justa.
+
+        Args:
+            service_name: Nombre del servicio
+            coro_factory: Función sin argumentos que crea la corrutina de la llamada
+            cost: Costo estimado de la llamada
+
+        Returns:
+            Resultado de la llamada
+        """
+        if not settings.SCHEDULER_ENABLED:
+            return await coro_factory()
+
+        queue = self.queue(service_name)
+        client = current_client.get()
+        await queue.acquire(client, cost)
+        slot = None
+        elapsed = None
+        try:
+            if shared_state.distributed:
+                slot = await self._acquire_shared_slot(queue, cost)
+            started = time.monotonic()
+            result = await coro_factory()
+            elapsed = time.monotonic() - started
+            return result
+        finally:
+            queue.release(elapsed)
+            if slot is not None:
+                await self._release_shared_slot(*slot)
+
+    async def _acquire_shared_slot(self, queue: FairQueue, cost: float) -> Optional[Tuple[str, str]]:
+        """
+        Espera un slot global libre del servicio.
+
+        El slot expira solo después del costo de la llamada más el margen de
+        red, por si el worker muere sin liberarlo.
+
+        Returns:
+            (clave, dueño) del slot, o None si el backend no respondió (en ese
+            caso la llamada sigue limitada solo por la cola local)
+        """
+        holder = f"{WORKER_ID}:{uuid.uuid4().hex}"
+        ttl = cost + settings.SERVICE_TIMEOUT_MARGIN
+        try:
+            while True:
+                for index in range(queue.slots):
+                    key = f"slot:{queue.name}:{index}"
+                    if await shared_state.set(key, holder, ttl=ttl, only_if_absent=True):
+                        return key, holder
+                await asyncio.sleep(settings.SHARED_STATE_POLL_INTERVAL)
+        except SharedStateError as e:
+            logger.warning(f"Shared {queue.name} slots unavailable: {e}")
+            return None
+
+    async def _release_shared_slot(self, key: str, holder: str) -> None:
+        try:
+            await shared_state.delete(key, expected=holder)
+        except SharedStateError as e:
+            logger.warning(f"Could not release shared slot {key}: {e}")
+
+    def estimated_wait(self) -> float:
+        """Espera estimada del servicio más congestionado (cuello de botella)."""
+        return max((queue.estimated_wait() for queue in self._queues.values()), default=0.0)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.SCHEDULER_ENABLED,
+            "services": {name: queue.snapshot() for name, queue in self._queues.items()}
+        }
+
+
+def retry_after_seconds(seconds: float) -> int:
+    """Segundos enteros para el header Retry-After (mínimo 1)."""
+    return max(1, int(math.ceil(seconds)))
+
+
+# Instancia global del planificador
+tool_scheduler = ToolScheduler()
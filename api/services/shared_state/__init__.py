@@ -0,0 +1,8 @@
+"""
+Estado compartido entre workers y nodos de la API (trabajos, coalescencia,
+slots de las herramientas y admisión).
+"""
+from services.shared_state.base import WORKER_ID, SharedStateError, StateBackend
+from services.shared_state.registry import create_backend, shared_state
+
+__all__ = ["SharedStateError", "StateBackend", "WORKER_ID", "create_backend", "shared_state"]
@@ -0,0 +1,97 @@
+"""
+Interfaz común de los backends de estado compartido entre workers.
+"""
+import os
+import socket
+from typing import Dict, Any, List, Optional
+
+from core.config import settings
+
+# Identidad de este proceso dentro del despliegue (host + PID)
+WORKER_ID = f"{socket.gethostname()}-{os.getpid()}"
+
+
+class SharedStateError(RuntimeError):
+    """El backend de estado compartido no respondió o rechazó la operación."""
+
+
+class StateBackend:
+    """
+    Almacén clave-valor con expiración y conjuntos de leases.
+
+    Los valores son strings (quien llama serializa). Las claves llevan el
+    prefijo SHARED_STATE_PREFIX para poder compartir el almacén con otras
+    aplicaciones. Un lease es un miembro de un grupo que expira solo si su
+    dueño deja de renovarlo (p. ej. porque el proceso murió).
+    """
+
+    name = ""
+    # False: el estado vive en el proceso y no coordina varios workers
+    distributed = True
+
+    def __init__(self):
+        """Inicializa el prefijo de las claves."""
+        self.prefix = settings.SHARED_STATE_PREFIX
+
+    def key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    async def get(self, key: str) -> Optional[str]:
+        """Valor de una clave, o None si no existe o expiró."""
+        raise NotImplementedError
+
+    async def set(
+        self,
+        key: str,
+        value: str,
+        ttl: Optional[float] = None,
+        only_if_absent: bool = False
+    ) -> bool:
+        """
+        Guarda un valor.
+
+        Args:
+            key: Clave
+            value: Valor
+            ttl: Segundos hasta que expira (None = no expira)
+            only_if_absent: Solo guardar si la clave no existe (lock / elección de líder)
+
+        Returns:
+            True si se guardó
+        """
+        raise NotImplementedError
+
+    async def delete(self, key: str, expected: Optional[str] = None) -> bool:
+        """
+        Elimina una clave.
+
+        Args:
+            key: Clave
+            expected: Solo eliminar si el valor actual es este (liberar un lock propio)
+
+        Returns:
+            True si se eliminó
+        """
+        raise NotImplementedError
+
+    async def expire(self, key: str, ttl: float) -> bool:
+        """Renueva la expiración de una clave existente; False si no existe."""
+        raise NotImplementedError
+
+    async def lease_add(self, group: str, member: str, ttl: float) -> None:
+        """Agrega o renueva un lease del grupo por ttl segundos."""
+        raise NotImplementedError
+
+    async def lease_remove(self, group: str, member: str) -> None:
+        """Libera un lease del grupo."""
+        raise NotImplementedError
+
+    async def lease_members(self, group: str) -> List[str]:
+        """Leases vigentes del grupo."""
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        """Libera conexiones y archivos."""
+
+    def info(self) -> Dict[str, Any]:
+        return {"backend": self.name, "distributed": self.distributed, "worker": WORKER_ID}
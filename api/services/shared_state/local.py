@@ -0,0 +1,76 @@
+"""
+Backend en memoria: estado de un solo proceso (despliegue con un worker).
+"""
+import time
+from typing import Dict, List, Optional, Tuple
+
+from services.shared_state.base import StateBackend
+
+
+class LocalStateBackend(StateBackend):
+    """Diccionarios del proceso; no coordina workers pero no agrega latencia."""
+
+    name = "local"
+    distributed = False
+
+    def __init__(self):
+        """Inicializa el almacén vacío."""
+        super().__init__()
+        # clave -> (valor, expiración monotónica o None)
+        self._values: Dict[str, Tuple[str, Optional[float]]] = {}
+        # grupo -> miembro -> expiración monotónica
+        self._leases: Dict[str, Dict[str, float]] = {}
+
+    @staticmethod
+    def _deadline(ttl: Optional[float]) -> Optional[float]:
+        return time.monotonic() + ttl if ttl is not None else None
+
+    def _live(self, key: str) -> Optional[str]:
+        entry = self._values.get(key)
+        if entry is None:
+            return None
+        value, deadline = entry
+        if deadline is not None and deadline <= time.monotonic():
+            del self._values[key]
+            return None
+        return value
+
+    async def get(self, key: str) -> Optional[str]:
+        return self._live(self.key(key))
+
+    async def set(self, key: str, value: str, ttl: Optional[float] = None, only_if_absent: bool = False) -> bool:
+        key = self.key(key)
+        if only_if_absent and self._live(key) is not None:
+            return False
+        self._values[key] = (value, self._deadline(ttl))
+        return True
+
+    async def delete(self, key: str, expected: Optional[str] = None) -> bool:
+        key = self.key(key)
+        current = self._live(key)
+        if current is None or (expected is not None and current != expected):
+            return False
+        del self._values[key]
+        return True
+
+    async def expire(self, key: str, ttl: float) -> bool:
+        key = self.key(key)
+        current = self._live(key)
+        if current is None:
+            return False
+        self._values[key] = (current, self._deadline(ttl))
+        return True
+
+    async def lease_add(self, group: str, member: str, ttl: float) -> None:
+        self._leases.setdefault(self.key(group), {})[member] = time.monotonic() + ttl
+
+    async def lease_remove(self, group: str, member: str) -> None:
+        members = self._leases.get(self.key(group), {})
+        members.pop(member, None)
+
+    async def lease_members(self, group: str) -> List[str]:
+        members = self._leases.get(self.key(group), {})
+        now = time.monotonic()
+        for member in [member for member, deadline in members.items() if deadline <= now]:
+            del members[member]
+        return list(members)
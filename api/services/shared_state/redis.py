@@ -0,0 +1,184 @@
+"""
+Backend Redis: estado compartido entre nodos mediante el protocolo RESP.
+"""
+import asyncio
+import time
+from typing import Any, List, Optional
+from urllib.parse import urlparse
+
+from core.config import settings
+from services.shared_state.base import SharedStateError, StateBackend
+
+
+class RedisProtocolError(SharedStateError):
+    """El servidor respondió con un error RESP."""
+
+
+class RedisStateBackend(StateBackend):
+    """
+    Cliente RESP2 mínimo sobre asyncio para Redis o servidores compatibles
+    (Valkey, KeyDB, Dragonfly).
+
+    Usa una conexión por proceso; los comandos se serializan con un lock, lo
+    que además permite las transacciones WATCH/MULTI/EXEC de delete(expected).
+    Si la conexión se cae se reabre en el siguiente comando.
+    """
+
+    name = "redis"
+
+    def __init__(self, url: Optional[str] = None):
+        """
+        Args:
+            url: redis://[:password@]host[:port][/db] (por defecto SHARED_STATE_URL)
+        """
+        super().__init__()
+        self.url = url or settings.SHARED_STATE_URL
+        parsed = urlparse(self.url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        # Se crea en el primer uso, dentro del event loop del worker
+        self._lock_instance: Optional[asyncio.Lock] = None
+
+    @property
+    def _lock(self) -> asyncio.Lock:
+        if self._lock_instance is None:
+            self._lock_instance = asyncio.Lock()
+        return self._lock_instance
+
+    # --- Protocolo -------------------------------------------------------
+
+    @staticmethod
+    def _encode(*args: Any) -> bytes:
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode("utf-8")
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        return b"".join(parts)
+
+    async def _read_reply(self) -> Any:
+        line = await self._reader.readline()
+        if not line:
+            raise SharedStateError("Connection closed by the Redis server")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode("utf-8")
+        if kind == b"-":
+            raise RedisProtocolError(payload.decode("utf-8"))
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length < 0:
+                return None
+            data = await self._reader.readexactly(length + 2)
+            return data[:-2].decode("utf-8")
+        if kind == b"*":
+            length = int(payload)
+            if length < 0:
+                return None
+            return [await self._read_reply() for _ in range(length)]
+        raise SharedStateError(f"Unexpected RESP reply: {line[:40]!r}")
+
+    async def _connect(self) -> None:
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        if self.password:
+            await self._roundtrip(("AUTH", self.password))
+        if self.db:
+            await self._roundtrip(("SELECT", self.db))
+
+    async def _roundtrip(self, *commands: tuple) -> List[Any]:
+        self._writer.write(b"".join(self._encode(*command) for command in commands))
+        await self._writer.drain()
+        return [await self._read_reply() for _ in commands]
+
+    def _disconnect(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+    async def execute(self, *commands: tuple) -> List[Any]:
+        """
+        Envía uno o más comandos en pipeline y devuelve sus respuestas.
+
+        Raises:
+            SharedStateError: Si el servidor no responde o devuelve un error
+        """
+        async with self._lock:
+            return await self._execute_locked(*commands)
+
+    async def _execute_locked(self, *commands: tuple) -> List[Any]:
+        try:
+            if self._writer is None:
+                await asyncio.wait_for(self._connect(), settings.SHARED_STATE_TIMEOUT)
+            return await asyncio.wait_for(
+                self._roundtrip(*commands), settings.SHARED_STATE_TIMEOUT
+            )
+        except RedisProtocolError:
+            raise
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, SharedStateError) as e:
+            self._disconnect()
+            raise SharedStateError(f"Redis shared state error: {e or type(e).__name__}") from e
+        except asyncio.CancelledError:
+            # La respuesta pendiente desincronizaría la conexión
+            self._disconnect()
+            raise
+
+    async def command(self, *args: Any) -> Any:
+        return (await self.execute(args))[0]
+
+    # --- StateBackend ----------------------------------------------------
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self.command("GET", self.key(key))
+
+    async def set(self, key: str, value: str, ttl: Optional[float] = None, only_if_absent: bool = False) -> bool:
+        args: List[Any] = ["SET", self.key(key), value]
+        if ttl is not None:
+            args += ["PX", max(1, int(ttl * 1000))]
+        if only_if_absent:
+            args.append("NX")
+        return await self.command(*args) == "OK"
+
+    async def delete(self, key: str, expected: Optional[str] = None) -> bool:
+        key = self.key(key)
+        if expected is None:
+            return await self.command("DEL", key) > 0
+
+        # WATCH + GET + MULTI/DEL/EXEC sin soltar la conexión: si otro proceso
+        # cambia la clave entre GET y EXEC, EXEC no aplica el DEL
+        async with self._lock:
+            _, current = await self._execute_locked(("WATCH", key), ("GET", key))
+            if current != expected:
+                await self._execute_locked(("UNWATCH",))
+                return False
+            replies = await self._execute_locked(("MULTI",), ("DEL", key), ("EXEC",))
+        return bool(replies[-1]) and replies[-1][0] > 0
+
+    async def expire(self, key: str, ttl: float) -> bool:
+        return await self.command("PEXPIRE", self.key(key), max(1, int(ttl * 1000))) == 1
+
+    async def lease_add(self, group: str, member: str, ttl: float) -> None:
+        # Score = instante de expiración; lease_members descarta los vencidos
+        await self.command("ZADD", self.key(group), repr(time.time() + ttl), member)
+
+    async def lease_remove(self, group: str, member: str) -> None:
+        await self.command("ZREM", self.key(group), member)
+
+    async def lease_members(self, group: str) -> List[str]:
+        group = self.key(group)
+        _, members = await self.execute(
+            ("ZREMRANGEBYSCORE", group, "-inf", repr(time.time())),
+            ("ZRANGE", group, 0, -1)
+        )
+        return members or []
+
+    async def close(self) -> None:
+        async with self._lock:
+            self._disconnect()
+
+    def info(self):
+        return {**super().info(), "url": f"redis://{self.host}:{self.port}/{self.db}"}
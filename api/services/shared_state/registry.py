@@ -0,0 +1,33 @@
+"""
+Selección del backend de estado compartido del despliegue.
+"""
+from typing import Optional
+
+from core.config import settings
+from services.shared_state.base import StateBackend
+from services.shared_state.local import LocalStateBackend
+from services.shared_state.redis import RedisStateBackend
+from services.shared_state.sqlite import SQLiteStateBackend
+
+BACKEND_CLASSES = {
+    LocalStateBackend.name: LocalStateBackend,
+    SQLiteStateBackend.name: SQLiteStateBackend,
+    RedisStateBackend.name: RedisStateBackend,
+}
+
+
+def create_backend(name: Optional[str] = None) -> StateBackend:
+    """
+    Crea el backend por nombre (por defecto SHARED_STATE_BACKEND).
+
+    Raises:
+        ValueError: Si el backend no existe
+    """
+    name = name or settings.SHARED_STATE_BACKEND
+    if name not in BACKEND_CLASSES:
+        raise ValueError(f"Unknown shared state backend: {name}")
+    return BACKEND_CLASSES[name]()
+
+
+# Instancia global del backend
+shared_state = create_backend()
@@ -0,0 +1,162 @@
+"""
+Backend SQLite: estado compartido por los workers de un mismo host (o volumen).
+"""
+import asyncio
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from core.config import settings
+from services.shared_state.base import SharedStateError, StateBackend
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    expires_at REAL
+);
+CREATE TABLE IF NOT EXISTS leases (
+    grp TEXT NOT NULL,
+    member TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (grp, member)
+);
+"""
+
+
+class SQLiteStateBackend(StateBackend):
+    """
+    Archivo SQLite en modo WAL compartido entre procesos.
+
+    Las operaciones condicionales (only_if_absent, expected) corren en una
+    transacción BEGIN IMMEDIATE, así que son atómicas entre procesos. La E/S
+    corre en un hilo dedicado para no bloquear el event loop.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Args:
+            path: Ruta del archivo (por defecto SHARED_STATE_PATH)
+        """
+        super().__init__()
+        self.path = path or settings.SHARED_STATE_PATH
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shared-state")
+        # Solo se usa desde el hilo del executor
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(
+                self.path, timeout=settings.SHARED_STATE_TIMEOUT, isolation_level=None
+            )
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    async def _run(self, fn, *args):
+        try:
+            return await asyncio.get_event_loop().run_in_executor(self._executor, fn, *args)
+        except sqlite3.Error as e:
+            raise SharedStateError(f"SQLite shared state error: {e}") from e
+
+    def _transaction(self, fn):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = fn(conn)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return result
+
+    @staticmethod
+    def _current(conn: sqlite3.Connection, key: str) -> Optional[str]:
+        row = conn.execute(
+            "SELECT value FROM kv WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self._run(lambda: self._current(self._connection(), self.key(key)))
+
+    async def set(self, key: str, value: str, ttl: Optional[float] = None, only_if_absent: bool = False) -> bool:
+        key = self.key(key)
+
+        def write(conn: sqlite3.Connection) -> bool:
+            if only_if_absent and self._current(conn, key) is not None:
+                return False
+            conn.execute(
+                "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, time.time() + ttl if ttl is not None else None)
+            )
+            return True
+
+        return await self._run(self._transaction, write)
+
+    async def delete(self, key: str, expected: Optional[str] = None) -> bool:
+        key = self.key(key)
+
+        def remove(conn: sqlite3.Connection) -> bool:
+            current = self._current(conn, key)
+            if current is None or (expected is not None and current != expected):
+                return False
+            conn.execute("DELETE FROM kv WHERE key = ?", (key,))
+            return True
+
+        return await self._run(self._transaction, remove)
+
+    async def expire(self, key: str, ttl: float) -> bool:
+        key = self.key(key)
+
+        def renew(conn: sqlite3.Connection) -> bool:
+            if self._current(conn, key) is None:
+                return False
+            conn.execute("UPDATE kv SET expires_at = ? WHERE key = ?", (time.time() + ttl, key))
+            return True
+
+        return await self._run(self._transaction, renew)
+
+    async def lease_add(self, group: str, member: str, ttl: float) -> None:
+        await self._run(
+            self._connection_execute,
+            "INSERT OR REPLACE INTO leases (grp, member, expires_at) VALUES (?, ?, ?)",
+            (self.key(group), member, time.time() + ttl)
+        )
+
+    async def lease_remove(self, group: str, member: str) -> None:
+        await self._run(
+            self._connection_execute,
+            "DELETE FROM leases WHERE grp = ? AND member = ?",
+            (self.key(group), member)
+        )
+
+    async def lease_members(self, group: str) -> List[str]:
+        group = self.key(group)
+
+        def members(conn: sqlite3.Connection) -> List[str]:
+            now = time.time()
+            conn.execute("DELETE FROM leases WHERE grp = ? AND expires_at <= ?", (group, now))
+            return [row[0] for row in conn.execute("SELECT member FROM leases WHERE grp = ?", (group,))]
+
+        return await self._run(self._transaction, members)
+
+    def _connection_execute(self, sql: str, params: tuple) -> None:
+        self._connection().execute(sql, params)
+
+    async def close(self) -> None:
+        def close_connection():
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+        await self._run(close_connection)
+
+    def info(self):
+        return {**super().info(), "path": self.path}
@@ -0,0 +1,85 @@
+"""
+Tokenizador de Solidity (sin dependencias ni compilador).
+"""
+import re
+from typing import List, NamedTuple
+
+# Palabras reservadas y tipos elementales: se conservan al normalizar
+KEYWORDS = frozenset("""
+    abstract anonymous as assembly break catch constant constructor continue contract
+    delete do else emit enum error event external fallback false for function global
+    if immutable import indexed interface internal is library mapping memory modifier
+    new override payable pragma private public pure receive return returns revert
+    storage calldata struct true try type unchecked using view virtual while
+    address bool string bytes byte int uint fixed ufixed var
+    wei gwei ether seconds minutes hours days weeks
+""".split())
+
+_ELEMENTARY_TYPE_RE = re.compile(r"^(?:u?int\d+|bytes\d+|u?fixed\d+x\d+)$")
+
+_TOKEN_RE = re.compile(
+    r"""
+    (?P<ws>\s+)
+  | (?P<comment>//[^\n]*|/\*.*?(?:\*/|\Z))
+  | (?P<string>(?:hex|unicode)?"(?:\\.|[^"\\\n])*"|(?:hex|unicode)?'(?:\\.|[^'\\\n])*')
+  | (?P<number>0[xX][0-9a-fA-F_]+|(?:\d[\d_]*(?:\.\d[\d_]*)?|\.\d[\d_]*)(?:[eE]-?\d+)?)
+  | (?P<ident>[A-Za-z_$][A-Za-z0-9_$]*)
+  | (?P<punct>>>>=|>>>|<<=|>>=|\*\*|&&|\|\||==|!=|<=|>=|<<|>>|\+\+|--|\+=|-=|\*=|/=|%=|&=|\|=|\^=|=>|->|:=|.)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+
+class Token(NamedTuple):
+    """Token del código fuente: tipo, texto y posición (offset) en el archivo."""
+    kind: str
+    text: str
+    pos: int
+
+
+def is_keyword(text: str) -> bool:
+    """Si un identificador es palabra reservada o tipo elemental."""
+    return text in KEYWORDS or bool(_ELEMENTARY_TYPE_RE.match(text))
+
+
+def tokenize(code: str) -> List[Token]:
+    """
+    Divide el código en tokens, sin espacios ni comentarios.
+
+    Tipos: keyword, ident, number, string y punct. Un carácter no reconocido
+    se devuelve como punct, así el tokenizador nunca falla con código inválido.
+
+    Args:
+        code: Código fuente Solidity
+
+    Returns:
+        Lista de tokens en orden
+    """
+    tokens = []
+    for match in _TOKEN_RE.finditer(code):
+        kind = match.lastgroup
+        if kind in ("ws", "comment"):
+            continue
+        text = match.group()
+        if kind == "ident" and is_keyword(text):
+            kind = "keyword"
+        tokens.append(Token(kind, text, match.start()))
+    return tokens
+
+
+def matching_brace(tokens: List[Token], start: int) -> int:
+    """
+    Índice de la llave que cierra la que abre en tokens[start].
+
+    Si el código no está balanceado devuelve el último índice.
+    """
+    depth = 0
+    for index in range(start, len(tokens)):
+        text = tokens[index].text
+        if text == "{":
+            depth += 1
+        elif text == "}":
+            depth -= 1
+            if depth == 0:
+                return index
+    return len(tokens) - 1
@@ -0,0 +1,495 @@
+"""
+Pre-parser de Solidity: estructura del código sin compilarlo.
+"""
+import bisect
+import os
+import re
+from typing import Dict, Any, List, Optional, Tuple
+
+from services.solidity_lexer import Token, matching_brace, tokenize
+
+CONTRACT_KINDS = ("contract", "library", "interface")
+FUNCTION_KINDS = ("function", "constructor", "fallback", "receive")
+VISIBILITIES = ("public", "external", "internal", "private")
+MUTABILITIES = ("pure", "view", "payable", "constant")
+
+# Sentencias del cuerpo de un contrato que no declaran variables de estado
+_NON_STATE_STARTS = frozenset((
+    "using", "event", "error", "function", "modifier", "struct", "enum",
+    "constructor", "fallback", "receive", "pragma", "import"
+))
+_CALL_MEMBERS = ("call", "delegatecall", "staticcall")
+_TRANSFER_MEMBERS = ("transfer", "send")
+
+_VERSION_RE = re.compile(r"^(\d+|[xX*])(?:\.(\d+|[xX*]))?(?:\.(\d+|[xX*]))?$")
+_COMPARATOR_RE = re.compile(r"(\^|~|>=|<=|>|<|=)?\s*v?([0-9xX*.]+)")
+
+Version = Tuple[int, int, int]
+
+
+def _matching_paren(tokens: List[Token], start: int) -> int:
+    """Índice del paréntesis que cierra el que abre en tokens[start]."""
+    depth = 0
+    for index in range(start, len(tokens)):
+        text = tokens[index].text
+        if text == "(":
+            depth += 1
+        elif text == ")":
+            depth -= 1
+            if depth == 0:
+                return index
+    return len(tokens) - 1
+
+
+def _statement_end(tokens: List[Token], start: int) -> int:
+    """Índice del ';' que termina la sentencia (saltea llaves anidadas)."""
+    index = start
+    while index < len(tokens) and tokens[index].text != ";":
+        if tokens[index].text == "{":
+            index = matching_brace(tokens, index)
+        index += 1
+    return min(index, len(tokens) - 1)
+
+
+# --- Versiones del compilador --------------------------------------------------
+
+def _parse_partial(text: str) -> Tuple[Optional[int], ...]:
+    match = _VERSION_RE.match(text)
+    if not match:
+        raise ValueError(f"Invalid version: {text}")
+    return tuple(
+        None if part is None or part in ("x", "X", "*") else int(part)
+        for part in match.groups()
+    )
+
+
+def _comparator_bounds(operator: str, text: str) -> List[Tuple[str, Version]]:
+    """Traduce un comparador (^0.8.0, >=0.7, 0.8...) a cotas (op, versión) completas."""
+    major, minor, patch = _parse_partial(text)
+    if major is None:
+        return []
+    low = (major, minor or 0, patch or 0)
+
+    if operator in ("", "="):
+        if minor is None:
+            return [(">=", low), ("<", (major + 1, 0, 0))]
+        if patch is None:
+            return [(">=", low), ("<", (major, minor + 1, 0))]
+        return [("=", low)]
+    if operator == "^":
+        if major > 0 or minor is None:
+            return [(">=", low), ("<", (major + 1, 0, 0))]
+        if minor > 0 or patch is None:
+            return [(">=", low), ("<", (0, minor + 1, 0))]
+        return [(">=", low), ("<", (0, 0, patch + 1))]
+    if operator == "~":
+        if minor is None:
+            return [(">=", low), ("<", (major + 1, 0, 0))]
+        return [(">=", low), ("<", (major, minor + 1, 0))]
+    if operator in (">", "<="):
+        # Versiones parciales: >0.7 equivale a >=0.8.0 y <=0.7 a <0.8.0
+        if minor is None:
+            bound = (major + 1, 0, 0)
+        elif patch is None:
+            bound = (major, minor + 1, 0)
+        else:
+            return [(operator, low)]
+        return [(">=" if operator == ">" else "<", bound)]
+    return [(operator, low)]
+
+
+def _satisfies_bounds(version: Version, bounds: List[Tuple[str, Version]]) -> bool:
+    checks = {
+        "=": lambda a, b: a == b,
+        ">": lambda a, b: a > b,
+        ">=": lambda a, b: a >= b,
+        "<": lambda a, b: a < b,
+        "<=": lambda a, b: a <= b,
+    }
+    return all(checks[operator](version, bound) for operator, bound in bounds)
+
+
+def version_satisfies(version: str, constraint: str) -> bool:
+    """
+    Si una versión del compilador cumple el pragma solidity.
+
+    Acepta la sintaxis de rangos de Solidity (semver de npm): ^, ~, >=, >,
+    <=, <, =, versiones parciales (0.8, 0.8.x), rangos "a - b" y
+    alternativas con ||.
+
+    Raises:
+        ValueError: Si la versión o la restricción no son válidas
+    """
+    target = tuple(part or 0 for part in _parse_partial(version))
+    for alternative in constraint.split("||"):
+        alternative = alternative.strip()
+        if " - " in alternative:
+            low, high = (part.strip() for part in alternative.split(" - ", 1))
+            bounds = _comparator_bounds(">=", low) + _comparator_bounds("<=", high)
+        else:
+            bounds = []
+            for operator, text in _COMPARATOR_RE.findall(alternative):
+                bounds += _comparator_bounds(operator or "", text)
+        if _satisfies_bounds(target, bounds):
+            return True
+    return False
+
+
+def select_compiler(constraint: Optional[str], available: List[str]) -> Optional[str]:
+    """
+    Versión más alta de las disponibles que cumple el pragma.
+
+    Args:
+        constraint: Restricción del pragma solidity (None si no hay pragma)
+        available: Versiones instaladas en las herramientas
+
+    Returns:
+        Versión elegida, o None si ninguna cumple la restricción
+    """
+    candidates = sorted(available, key=lambda v: tuple(part or 0 for part in _parse_partial(v)), reverse=True)
+    if constraint is None:
+        return candidates[0] if candidates else None
+    for version in candidates:
+        try:
+            if version_satisfies(version, constraint):
+                return version
+        except ValueError:
+            # Pragma que no sabemos interpretar: que decida el compilador
+            return version
+    return None
+
+
+# --- Estructura ------------------------------------------------------------------
+
+def _parse_pragma(code: str, tokens: List[Token], index: int) -> Tuple[Dict[str, str], int]:
+    end = _statement_end(tokens, index)
+    name = tokens[index + 1].text if index + 1 < end else ""
+    value = code[tokens[index + 2].pos:tokens[end].pos].strip() if index + 2 < end else ""
+    return {"name": name, "value": value}, end
+
+
+def _parse_import(tokens: List[Token], index: int) -> Tuple[Dict[str, Any], int]:
+    end = _statement_end(tokens, index)
+    statement = tokens[index + 1:end]
+    path = next((token.text[1:-1] for token in statement if token.kind == "string"), None)
+    symbols = []
+    if statement and statement[0].text == "{":
+        close = next((i for i, token in enumerate(statement) if token.text == "}"), len(statement))
+        names = statement[1:close]
+        symbols = [
+            token.text for i, token in enumerate(names)
+            if token.kind == "ident" and (i == 0 or names[i - 1].text == ",")
+        ]
+    return {"path": path, "symbols": symbols}, end
+
+
+def _parse_function(tokens: List[Token], index: int, contract_kind: str) -> Tuple[Dict[str, Any], int]:
+    """Cabecera de una función, constructor, fallback o receive y su extensión."""
+    kind = tokens[index].text
+    cursor = index + 1
+    # "function ()" sin nombre es el fallback anterior a 0.6
+    name = "fallback" if kind == "function" else kind
+    if kind == "function" and cursor < len(tokens) and tokens[cursor].kind == "ident":
+        name = tokens[cursor].text
+        cursor += 1
+
+    parameters = 0
+    if cursor < len(tokens) and tokens[cursor].text == "(":
+        close = _matching_paren(tokens, cursor)
+        inner = tokens[cursor + 1:close]
+        parameters = (sum(1 for token in inner if token.text == ",") + 1) if inner else 0
+        cursor = close + 1
+
+    visibility = None
+    mutability = None
+    modifiers: List[str] = []
+    virtual = override = False
+    while cursor < len(tokens) and tokens[cursor].text not in ("{", ";"):
+        token = tokens[cursor]
+        if token.text in VISIBILITIES:
+            visibility = token.text
+        elif token.text in MUTABILITIES:
+            mutability = "view" if token.text == "constant" else token.text
+        elif token.text == "virtual":
+            virtual = True
+        elif token.text in ("override", "returns") or token.kind == "ident":
+            if token.text == "override":
+                override = True
+            elif token.kind == "ident":
+                modifiers.append(token.text)
+            if cursor + 1 < len(tokens) and tokens[cursor + 1].text == "(":
+                cursor = _matching_paren(tokens, cursor + 1)
+        cursor += 1
+
+    has_body = cursor < len(tokens) and tokens[cursor].text == "{"
+    end = matching_brace(tokens, cursor) if has_body else cursor
+
+    if visibility is None:
+        if kind in ("fallback", "receive") or contract_kind == "interface":
+            visibility = "external"
+        else:
+            visibility = "public"
+
+    return {
+        "name": name,
+        "kind": kind,
+        "visibility": visibility,
+        "state_mutability": mutability or "nonpayable",
+        "payable": mutability == "payable" or kind == "receive",
+        "modifiers": modifiers,
+        "parameters": parameters,
+        "virtual": virtual,
+        "override": override,
+        "has_body": has_body,
+    }, end
+
+
+def _parse_contract(tokens: List[Token], index: int) -> Tuple[Optional[Dict[str, Any]], int]:
+    kind = tokens[index].text
+    is_abstract = index > 0 and tokens[index - 1].text == "abstract"
+    name = tokens[index + 1].text if index + 1 < len(tokens) else None
+
+    brace = index
+    while brace < len(tokens) and tokens[brace].text not in ("{", ";"):
+        brace += 1
+    if brace >= len(tokens) or tokens[brace].text != "{":
+        return None, brace
+
+    bases = []
+    header = tokens[index + 2:brace]
+    if header and header[0].text == "is":
+        depth = 0
+        expect_name = True
+        for token in header[1:]:
+            if token.text == "(":
+                depth += 1
+            elif token.text == ")":
+                depth -= 1
+            elif depth == 0 and token.text == ",":
+                expect_name = True
+            elif depth == 0 and expect_name and token.kind == "ident":
+                bases.append(token.text)
+                expect_name = False
+            elif depth == 0 and token.text == "." and bases:
+                # Base calificada (Lib.Base): se queda el último nombre
+                bases.pop()
+                expect_name = True
+
+    end = matching_brace(tokens, brace)
+    contract = {
+        "name": name,
+        "kind": kind,
+        "abstract": is_abstract,
+        "bases": bases,
+        "functions": [],
+        "modifiers": [],
+        "events": [],
+        "state_variables": 0,
+    }
+
+    cursor = brace + 1
+    while cursor < end:
+        token = tokens[cursor]
+        text = token.text
+        if text in FUNCTION_KINDS and token.kind == "keyword":
+            stop = cursor
+            while stop < end and tokens[stop].text not in ("{", ";"):
+                stop += 1
+            if text == "function" and tokens[cursor + 1].text == "(" and tokens[stop].text == ";":
+                # Variable de estado de tipo función
+                contract["state_variables"] += 1
+                cursor = _statement_end(tokens, cursor) + 1
+                continue
+            function, stop = _parse_function(tokens, cursor, kind)
+            contract["functions"].append(function)
+            cursor = stop + 1
+        elif text == "modifier":
+            if cursor + 1 < end:
+                contract["modifiers"].append(tokens[cursor + 1].text)
+            stop = cursor
+            while stop < end and tokens[stop].text not in ("{", ";"):
+                stop += 1
+            cursor = (matching_brace(tokens, stop) if tokens[stop].text == "{" else stop) + 1
+        elif text in ("struct", "enum"):
+            stop = cursor
+            while stop < end and tokens[stop].text != "{":
+                stop += 1
+            cursor = matching_brace(tokens, stop) + 1
+        elif text == "event":
+            if cursor + 1 < end:
+                contract["events"].append(tokens[cursor + 1].text)
+            cursor = _statement_end(tokens, cursor) + 1
+        elif text in _NON_STATE_STARTS:
+            cursor = _statement_end(tokens, cursor) + 1
+        elif text in (";", "}"):
+            cursor += 1
+        else:
+            contract["state_variables"] += 1
+            cursor = _statement_end(tokens, cursor) + 1
+    return contract, end
+
+
+def _metrics(code: str, tokens: List[Token], contracts: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Métricas de complejidad para el planificador de presupuesto."""
+    external_calls = 0
+    for index in range(len(tokens) - 2):
+        if tokens[index].text != ".":
+            continue
+        member, following = tokens[index + 1].text, tokens[index + 2].text
+        if (member in _CALL_MEMBERS and following in ("(", "{")) or \
+                (member in _TRANSFER_MEMBERS and following == "("):
+            external_calls += 1
+
+    line_starts = [0] + [match.end() for match in re.finditer(r"\n", code)]
+    lines = {bisect.bisect_right(line_starts, token.pos) for token in tokens}
+
+    return {
+        "contracts": sum(1 for c in contracts if c["kind"] != "interface"),
+        "functions": sum(1 for c in contracts for f in c["functions"] if f["has_body"]),
+        "modifiers": sum(len(c["modifiers"]) for c in contracts),
+        "state_variables": sum(c["state_variables"] for c in contracts),
+        "external_calls": external_calls,
+        "loops": sum(1 for token in tokens if token.kind == "keyword" and token.text in ("for", "while", "do")),
+        "lines": len(lines),
+        "size_bytes": len(code.encode("utf-8")),
+    }
+
+
+def parse_source(code: str) -> Dict[str, Any]:
+    """
+    Extrae la estructura de un archivo Solidity sin compilarlo.
+
+    El análisis es tolerante: con código inválido devuelve lo que pudo
+    reconocer, nunca lanza excepciones por errores de sintaxis.
+
+    Args:
+        code: Código fuente Solidity
+
+    Returns:
+        Diccionario con pragmas, solidity_version (restricción del pragma
+        solidity o None), imports, contratos (tipo, bases, funciones con
+        visibilidad, mutabilidad y modificadores, eventos y cantidad de
+        variables de estado) y métricas de complejidad
+    """
+    tokens = tokenize(code)
+    pragmas = []
+    imports = []
+    contracts = []
+
+    index = 0
+    while index < len(tokens):
+        token = tokens[index]
+        if token.kind == "keyword" and token.text == "pragma":
+            pragma, index = _parse_pragma(code, tokens, index)
+            pragmas.append(pragma)
+        elif token.kind == "keyword" and token.text == "import":
+            statement, index = _parse_import(tokens, index)
+            imports.append(statement)
+        elif token.kind == "keyword" and token.text in CONTRACT_KINDS:
+            contract, index = _parse_contract(tokens, index)
+            if contract is not None:
+                contracts.append(contract)
+        elif token.text == "{":
+            # Declaraciones de nivel de archivo con cuerpo (struct, enum, función libre)
+            index = matching_brace(tokens, index)
+        index += 1
+
+    return {
+        "pragmas": pragmas,
+        "solidity_version": next((p["value"] for p in pragmas if p["name"] == "solidity"), None),
+        "imports": imports,
+        "contracts": contracts,
+        "metrics": _metrics(code, tokens, contracts),
+    }
+
+
+def deployable_contracts(outline: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Contratos que se pueden desplegar (ni interfaces, ni bibliotecas, ni abstractos)."""
+    return [
+        contract for contract in outline["contracts"]
+        if contract["kind"] == "contract" and not contract["abstract"]
+    ]
+
+
+def has_entry_points(outline: Dict[str, Any], contract: Dict[str, Any]) -> bool:
+    """
+    Si el contrato (o un contrato base) tiene funciones public/external que
+    modifican estado, las que ejercita un fuzzer.
+
+    Si alguna base no está declarada en el archivo (importada), se asume
+    que sí: el resultado es conservador.
+    """
+    by_name = {c["name"]: c for c in outline["contracts"]}
+    pending = [contract["name"]]
+    visited = set()
+    while pending:
+        name = pending.pop()
+        if name in visited:
+            continue
+        visited.add(name)
+        current = by_name.get(name)
+        if current is None:
+            return True
+        if any(
+            function["visibility"] in ("public", "external")
+            and function["state_mutability"] not in ("view", "pure")
+            and function["kind"] != "constructor"
+            for function in current["functions"]
+        ):
+            return True
+        pending.extend(current["bases"])
+    return False
+
+
+def primary_contract(outline: Dict[str, Any], filename: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Contrato principal del archivo.
+
+    Es el desplegable con el mismo nombre que el archivo o, si no hay, el
+    último desplegable declarado (los contratos base suelen ir primero).
+    """
+    candidates = deployable_contracts(outline) or outline["contracts"]
+    if not candidates:
+        return None
+    stem = os.path.splitext(os.path.basename(filename or ""))[0]
+    return next((c for c in candidates if c["name"] == stem), candidates[-1])
+
+
+def contract_info(
+    outline: Dict[str, Any],
+    filename: Optional[str] = None,
+    compiled: Optional[bool] = None
+) -> Dict[str, Any]:
+    """
+    Bloque contract_info del reporte, calculado a partir del código.
+
+    Args:
+        outline: Resultado de parse_source
+        filename: Nombre del archivo (para elegir el contrato principal)
+        compiled: Si Solc compiló el contrato
+
+    Returns:
+        Diccionario con contract_name, functions (public/external de los
+        contratos desplegables, o de todos si no hay), has_payable_functions,
+        compiled_successfully y los contratos declarados
+    """
+    primary = primary_contract(outline, filename)
+    scope = deployable_contracts(outline) or outline["contracts"]
+    functions = [
+        function for contract in scope for function in contract["functions"]
+        if function["visibility"] in ("public", "external") and function["kind"] == "function"
+    ]
+    names = list(dict.fromkeys(function["name"] for function in functions))
+    return {
+        "contract_name": primary["name"] if primary else None,
+        "functions": names,
+        "has_payable_functions": any(
+            function["payable"] for contract in scope for function in contract["functions"]
+        ),
+        "compiled_successfully": compiled,
+        "contracts": [
+            {"name": contract["name"], "kind": "abstract contract" if contract["abstract"] else contract["kind"]}
+            for contract in outline["contracts"]
+        ],
+        "solidity_version": outline["solidity_version"],
+    }
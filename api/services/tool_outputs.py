@@ -0,0 +1,192 @@
+"""
+Salidas grandes de las herramientas derramadas a disco y memoria retenida
+por análisis.
+"""
+import os
+import re
+import time
+import asyncio
+import contextvars
+from typing import Dict, Any, Optional
+
+from core.config import settings
+from core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Campos de texto crudo de los resultados de las herramientas
+SPILL_FIELDS = ("stdout", "stderr")
+
+# Directorio de las salidas dentro del workspace del análisis
+OUTPUTS_DIR = ".outputs"
+OUTPUT_NAME_RE = re.compile(r"^[A-Za-z0-9_.-]{1,128}$")
+
+
+def preview(text: str, limit: int) -> str:
+    """Comienzo y final de un texto (el final suele tener el resumen de la herramienta)."""
+    if len(text) <= limit:
+        return text
+    head = limit // 4
+    tail = limit - head
+    return f"{text[:head]}\n...[{len(text) - head - tail} chars on disk]...\n{text[-tail:]}"
+
+
+def output_path(analysis_id: str, name: str) -> Optional[str]:
+    """Archivo de una salida derramada de un análisis, o None si no existe."""
+    if not OUTPUT_NAME_RE.match(name) or not OUTPUT_NAME_RE.match(analysis_id):
+        return None
+    path = os.path.join(settings.WORKSPACE_DIR, analysis_id, OUTPUTS_DIR, name)
+    return path if os.path.isfile(path) else None
+
+
+def sweep_outputs() -> int:
+    """
+    Borra las salidas derramadas de más de TOOL_OUTPUT_TTL segundos.
+
+    Returns:
+        Archivos borrados
+    """
+    cutoff = time.time() - settings.TOOL_OUTPUT_TTL
+    removed = 0
+    try:
+        analyses = os.listdir(settings.WORKSPACE_DIR)
+    except FileNotFoundError:
+        return 0
+    for analysis_id in analyses:
+        folder = os.path.join(settings.WORKSPACE_DIR, analysis_id, OUTPUTS_DIR)
+        try:
+            names = os.listdir(folder)
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+        for name in names:
+            path = os.path.join(folder, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except FileNotFoundError:
+                # Otro worker la borró primero
+                continue
+        try:
+            os.rmdir(folder)
+        except OSError:
+            pass
+    return removed
+
+
+async def sweep_outputs_periodically() -> None:
+    """Barre las salidas vencidas cada TOOL_OUTPUT_SWEEP_INTERVAL segundos."""
+    loop = asyncio.get_event_loop()
+    while True:
+        try:
+            removed = await loop.run_in_executor(None, sweep_outputs)
+            if removed:
+                logger.info(f"Removed {removed} expired tool outputs")
+        except OSError as e:
+            logger.warning(f"Could not sweep tool outputs: {e}")
+        await asyncio.sleep(settings.TOOL_OUTPUT_SWEEP_INTERVAL)
+
+
+def _rss_bytes() -> Optional[int]:
+    """Memoria residente del proceso (Linux), o None si no se puede leer."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class OutputSpool:
+    """
+    Salidas de las herramientas de un análisis y su memoria retenida.
+
+    Los campos SPILL_FIELDS de más de TOOL_OUTPUT_SPILL_BYTES se escriben en
+    <workspace>/<analysis_id>/.outputs y se reemplazan por una referencia
+    (nombre, ruta relativa al workspace, tamaño y una vista previa de
+    TOOL_OUTPUT_PREVIEW_CHARS) que se serializa igual en los prompts, el
+    historial y el estado compartido. Los candidatos de corrección usan el
+    spool del análisis, así que sus salidas sobreviven al borrado de sus
+    workspaces. sweep_outputs() borra las salidas vencidas.
+
+    La memoria se cuenta sin recorrer los valores: received() suma los bytes
+    de cada respuesta de las herramientas al recibirla y spill() los que pasan
+    a disco; la diferencia es lo que el análisis retiene. sample() registra
+    el pico de memoria residente del proceso.
+    """
+
+    def __init__(self, analysis_id: str):
+        """
+        Args:
+            analysis_id: ID del análisis
+        """
+        self.analysis_id = analysis_id
+        self._sequence = 0
+        self.spilled_outputs = 0
+        self.spilled_bytes = 0
+        self.received_bytes = 0
+        self.rss_peak_bytes: Optional[int] = None
+
+    def spill(self, service_name: str, result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Derrama las salidas grandes de un resultado (en un hilo: escribe a disco).
+
+        Returns:
+            El resultado con las salidas grandes reemplazadas por referencias
+        """
+        if settings.TOOL_OUTPUT_SPILL_BYTES <= 0 or not isinstance(result, dict):
+            return result
+        spilled = dict(result)
+        for field in SPILL_FIELDS:
+            text = result.get(field)
+            if not isinstance(text, str):
+                continue
+            data = text.encode("utf-8")
+            if len(data) <= settings.TOOL_OUTPUT_SPILL_BYTES:
+                continue
+            self._sequence += 1
+            name = f"{self._sequence:03d}-{service_name}-{field}.log"
+            relative = os.path.join(self.analysis_id, OUTPUTS_DIR, name)
+            path = os.path.join(settings.WORKSPACE_DIR, relative)
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "wb") as f:
+                    f.write(data)
+            except OSError as e:
+                logger.warning(f"Could not spill {service_name} {field} of {self.analysis_id}: {e}")
+                continue
+            spilled[field] = {
+                "spilled": True,
+                "name": name,
+                "path": relative,
+                "bytes": len(data),
+                "preview": preview(text, settings.TOOL_OUTPUT_PREVIEW_CHARS)
+            }
+            self.spilled_outputs += 1
+            self.spilled_bytes += len(data)
+        return spilled
+
+    def received(self, size: int) -> None:
+        """Suma el cuerpo de una respuesta de una herramienta."""
+        self.received_bytes += size
+
+    def sample(self) -> None:
+        """Registra la memoria residente del proceso."""
+        rss = _rss_bytes()
+        if rss is not None:
+            self.rss_peak_bytes = max(self.rss_peak_bytes or 0, rss)
+
+    def report(self) -> Dict[str, Any]:
+        """Sección "memory" de la respuesta."""
+        return {
+            "received_bytes": self.received_bytes,
+            "spilled_outputs": self.spilled_outputs,
+            "spilled_bytes": self.spilled_bytes,
+            "retained_bytes": max(self.received_bytes - self.spilled_bytes, 0),
+            "process_rss_peak_bytes": self.rss_peak_bytes
+        }
+
+
+# Spool del análisis en curso (lo heredan las tareas de los candidatos)
+current_spool: contextvars.ContextVar[Optional[OutputSpool]] = contextvars.ContextVar(
+    "current_spool", default=None
+)
@@ -0,0 +1,9 @@
+"""
+Configuración de pytest: los tests importan los módulos de la API como lo
+hace main.py (services.*, core.*) y los paquetes de la raíz del repositorio.
+"""
+import os
+import sys
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [API_DIR, os.path.dirname(API_DIR)]
@@ -0,0 +1,90 @@
+"""
+Tests del orden y la deduplicación de los lotes.
+"""
+import asyncio
+
+from models.schemas import BatchItem
+from services.batch import BatchRunner, _source_key, order_by_cost
+
+
+def item(code, **kwargs):
+    return BatchItem(code=code, **kwargs)
+
+
+def test_order_by_cost_starts_with_the_longest_contracts():
+    items = [item("a" * 10), item("b" * 300), item("c" * 50), item("d" * 300)]
+    # Los empates conservan el orden de llegada
+    assert order_by_cost(items) == [1, 3, 2, 0]
+
+
+def test_order_by_cost_empty_batch():
+    assert order_by_cost([]) == []
+
+
+def test_source_key_identical_contracts():
+    assert _source_key(item("contract A {}", id="x")) == _source_key(item("contract A {}", id="y"))
+
+
+def test_source_key_distinguishes_code_filename_and_options():
+    base = _source_key(item("contract A {}"))
+    assert _source_key(item("contract A { }")) != base
+    assert _source_key(item("contract A {}", filename="A.sol")) != base
+    assert _source_key(item("contract A {}", is_production_ready=False)) != base
+
+
+def test_runner_analyzes_duplicates_once():
+    calls = []
+    events = []
+
+    async def run_item(batch_item, job_id):
+        calls.append(job_id)
+        await asyncio.sleep(0)
+        return {"analysis_id": job_id, "results": {"response": {"status": "SAFE"}}}
+
+    async def scenario():
+        runner = BatchRunner("b", run_item, events.append, concurrency=2)
+        batch = asyncio.ensure_future(runner.run())
+        runner.submit(0, item("contract A {}", id="first"))
+        runner.submit(1, item("contract B {}"))
+        runner.submit(2, item("contract A {}", id="copy"))
+        runner.reject(3, "Invalid contract line")
+        runner.close()
+        return await batch
+
+    summary = asyncio.run(scenario())
+    assert sorted(calls) == ["b-0", "b-1"]
+    duplicate = next(event for event in events if event["event"] == "duplicate")
+    assert duplicate == {
+        "event": "duplicate",
+        "index": 2,
+        "id": "copy",
+        "duplicate_of": 0,
+        "analysis_id": "b-0",
+        "outcome": "completed"
+    }
+    assert events[-1] is summary
+    assert {key: summary[key] for key in ("total", "unique", "duplicates", "completed", "invalid")} == {
+        "total": 4, "unique": 2, "duplicates": 1, "completed": 3, "invalid": 1
+    }
+    assert summary["verdicts"] == {"SAFE": 3}
+
+
+def test_runner_reports_failures_and_their_duplicates():
+    events = []
+
+    async def run_item(batch_item, job_id):
+        raise RuntimeError("tools unavailable")
+
+    async def scenario():
+        runner = BatchRunner("b", run_item, events.append, concurrency=1)
+        batch = asyncio.ensure_future(runner.run())
+        runner.submit(0, item("contract A {}"))
+        runner.submit(1, item("contract A {}"))
+        runner.close()
+        return await batch
+
+    summary = asyncio.run(scenario())
+    assert [event["event"] for event in events] == ["error", "duplicate", "summary"]
+    assert events[0]["error_type"] == "internal_error"
+    assert events[1]["outcome"] == "failed"
+    assert summary["failed"] == 2
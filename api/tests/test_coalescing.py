@@ -0,0 +1,125 @@
+"""
+Tests de la coalescencia de análisis idénticos (estado local).
+"""
+import asyncio
+
+import pytest
+
+from core.config import settings
+from services.coalescing import AnalysisCoalescer
+
+
+class FakeAnalysis:
+    """Análisis que publica un evento y espera hasta que el test lo libere."""
+
+    def __init__(self):
+        self.started = 0
+        self.cancelled = 0
+        self.release = asyncio.Event()
+
+    def factory(self, on_event):
+        return self._run(on_event)
+
+    async def _run(self, on_event):
+        self.started += 1
+        if on_event is not None:
+            on_event({"event": "stage", "stage": "tools"})
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return {"analysis_id": "leader", "results": {"findings": []}}
+
+
+def test_make_key_depends_on_code_and_options():
+    key = AnalysisCoalescer.make_key("contract A {}", "A.sol", False)
+    assert key == AnalysisCoalescer.make_key("contract A {}", "A.sol", False)
+    assert key != AnalysisCoalescer.make_key("contract A {}", "A.sol", True)
+    assert key != AnalysisCoalescer.make_key("contract A {}", "B.sol", False)
+    assert key != AnalysisCoalescer.make_key("contract B {}", "A.sol", False)
+    project = {"files": {"lib/B.sol": "contract B {}"}, "remappings": []}
+    assert key != AnalysisCoalescer.make_key("contract A {}", "A.sol", False, project)
+
+
+def test_concurrent_identical_requests_share_one_analysis():
+    async def scenario():
+        coalescer = AnalysisCoalescer()
+        analysis = FakeAnalysis()
+        leader = asyncio.ensure_future(coalescer.run("k", "leader", analysis.factory))
+        await asyncio.sleep(0)
+        events = []
+        follower = asyncio.ensure_future(coalescer.run("k", "follower", analysis.factory, events.append))
+        await asyncio.sleep(0)
+        assert coalescer.snapshot()["in_flight"][0]["waiters"] == 2
+        analysis.release.set()
+        first, second = await asyncio.gather(leader, follower)
+        return coalescer, analysis, events, first, second
+
+    coalescer, analysis, events, first, second = asyncio.run(scenario())
+    assert analysis.started == 1
+    # El seguidor recibe los eventos emitidos antes de sumarse
+    assert events == [{"event": "stage", "stage": "tools"}]
+    assert "coalesced_with" not in first
+    assert second["coalesced_with"] == "leader"
+    # Cada pedido recibe su propia copia del resultado
+    second["results"]["findings"].append("x")
+    assert first["results"]["findings"] == []
+    snapshot = coalescer.snapshot()
+    assert (snapshot["leaders"], snapshot["followers"], snapshot["in_flight"]) == (1, 1, [])
+
+
+def test_cancelling_one_request_keeps_the_shared_analysis():
+    async def scenario():
+        coalescer = AnalysisCoalescer()
+        analysis = FakeAnalysis()
+        leader = asyncio.ensure_future(coalescer.run("k", "leader", analysis.factory))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(coalescer.run("k", "follower", analysis.factory))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        analysis.release.set()
+        return analysis, await follower
+
+    analysis, result = asyncio.run(scenario())
+    assert analysis.cancelled == 0
+    assert result["coalesced_with"] == "leader"
+
+
+def test_analysis_is_cancelled_when_nobody_waits():
+    async def scenario():
+        coalescer = AnalysisCoalescer()
+        analysis = FakeAnalysis()
+        request = asyncio.ensure_future(coalescer.run("k", "first", analysis.factory))
+        await asyncio.sleep(0)
+        request.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await request
+        await asyncio.sleep(0)
+        # Un pedido nuevo con la misma clave lanza otro análisis
+        analysis.release.set()
+        result = await coalescer.run("k", "second", analysis.factory)
+        return coalescer, analysis, result
+
+    coalescer, analysis, result = asyncio.run(scenario())
+    assert (analysis.started, analysis.cancelled) == (2, 1)
+    assert "coalesced_with" not in result
+    assert coalescer.snapshot()["abandoned"] == 1
+
+
+def test_disabled_coalescing_runs_every_request(monkeypatch):
+    monkeypatch.setattr(settings, "COALESCING_ENABLED", False)
+
+    async def scenario():
+        coalescer = AnalysisCoalescer()
+        analysis = FakeAnalysis()
+        analysis.release.set()
+        await asyncio.gather(
+            coalescer.run("k", "a", analysis.factory),
+            coalescer.run("k", "b", analysis.factory)
+        )
+        return analysis
+
+    assert asyncio.run(scenario()).started == 2
@@ -0,0 +1,97 @@
+"""
+Tests de las huellas normalizadas.
+"""
+from services.fingerprints import attribute_findings, fingerprint_source, normalize
+from services.solidity_lexer import tokenize
+
+VAULT = """pragma solidity ^0.8.0;
+
+contract Vault {
+    mapping(address => uint) balances;
+
+    function withdraw() public {
+        uint amount = balances[msg.sender];
+        (bool ok, ) = msg.sender.call{value: amount}("");
+        require(ok, "failed");
+        balances[msg.sender] = 0;
+    }
+
+    function deposit() public payable {
+        balances[msg.sender] += msg.value;
+    }
+}
+"""
+
+# Mismo contrato con otros nombres, literales, comentarios y formato
+RENAMED = """pragma solidity ^0.8.4;
+import "./Other.sol";
+
+// Otro nombre, misma lógica
+contract Bank {
+    mapping(address => uint) funds;
+
+    function take() public
+    {
+        uint value_ = funds[msg.sender];
+        (bool success, ) = msg.sender.call{value: value_}("");
+        require(success, "transfer failed");   /* sin cambios */
+        funds[msg.sender] = 100;
+    }
+
+    function deposit() public payable { funds[msg.sender] += msg.value; }
+}
+"""
+
+
+def test_normalize_renames_identifiers_by_appearance():
+    tokens = tokenize('total = balances[msg.sender] + 42; emit Paid("x");')
+    assert normalize(tokens) == [
+        "$1", "=", "$2", "[", "msg", ".", "sender", "]", "+", "NUM", ";",
+        "emit", "$3", "(", "STR", ")", ";"
+    ]
+
+
+def test_normalize_keeps_builtins_and_reserved_words():
+    normalized = normalize(tokenize("require(msg.sender.call{value: 1}(\"\"));"))
+    assert normalized[:7] == ["require", "(", "msg", ".", "sender", ".", "call"]
+
+
+def test_renamed_contract_has_same_fingerprints():
+    original, renamed = fingerprint_source(VAULT), fingerprint_source(RENAMED)
+    assert original["source"] == renamed["source"]
+    assert original["solidity"] == renamed["solidity"] == "0.8"
+    assert [c["fingerprint"] for c in original["contracts"]] == [c["fingerprint"] for c in renamed["contracts"]]
+    assert [f["fingerprint"] for f in original["contracts"][0]["functions"]] == \
+        [f["fingerprint"] for f in renamed["contracts"][0]["functions"]]
+    assert [f["name"] for f in renamed["contracts"][0]["functions"]] == ["take", "deposit"]
+
+
+def test_logic_change_only_changes_the_affected_function():
+    changed = fingerprint_source(VAULT.replace("balances[msg.sender] = 0;", "balances[msg.sender] -= amount;"))
+    original = fingerprint_source(VAULT)
+    assert changed["source"] != original["source"]
+    withdraw, deposit = changed["contracts"][0]["functions"]
+    assert withdraw["fingerprint"] != original["contracts"][0]["functions"][0]["fingerprint"]
+    assert deposit["fingerprint"] == original["contracts"][0]["functions"][1]["fingerprint"]
+
+
+def test_compiler_family_is_part_of_the_fingerprint():
+    older = fingerprint_source(VAULT.replace("^0.8.0", "^0.7.6"))
+    assert older["solidity"] == "0.7"
+    assert older["source"] != fingerprint_source(VAULT)["source"]
+
+
+def test_attribute_findings_by_name():
+    contracts = fingerprint_source(VAULT)["contracts"]
+    tool_results = {"slither": {"results": {"detectors": [{
+        "check": "reentrancy-eth",
+        "impact": "High",
+        "confidence": "Medium",
+        "description": "Reentrancy in Vault.withdraw() (Vault.sol#6-11)"
+    }]}}}
+    findings = attribute_findings(contracts, tool_results)
+    vault = contracts[0]
+    withdraw, deposit = vault["functions"]
+    assert [f["check"] for f in findings[vault["fingerprint"]]] == ["reentrancy-eth"]
+    assert [f["check"] for f in findings[withdraw["fingerprint"]]] == ["reentrancy-eth"]
+    assert findings[deposit["fingerprint"]] == []
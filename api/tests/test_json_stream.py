@@ -0,0 +1,93 @@
+"""
+Tests del parser JSON incremental.
+"""
+import json
+
+import pytest
+
+from services.json_stream import MAX_PREFIX_CHARS, JSONStreamError, JSONStreamParser
+
+RESPONSE = {
+    "status": "VULNERABLE",
+    "risk_score": 7.5,
+    "vulnerabilities": [
+        {"title": "Reentrancy", "lines": [8, 10], "note": "usa \"call\" {antes}"},
+        {"title": "Unchecked return", "lines": []}
+    ],
+    "tools_reports": {"slither": {"ok": True}, "echidna": None},
+    "summary": {"is_production_ready": False}
+}
+
+
+def feed_in_chunks(parser, text, size):
+    emitted = []
+    for start in range(0, len(text), size):
+        emitted.extend(parser.feed(text[start:start + size]))
+    return emitted
+
+
+@pytest.mark.parametrize("size", [1, 7, 10_000])
+def test_emits_second_level_values_whatever_the_chunking(size):
+    text = json.dumps(RESPONSE, ensure_ascii=False)
+    parser = JSONStreamParser()
+    emitted = feed_in_chunks(parser, text, size)
+    assert emitted == [
+        (("vulnerabilities", 0), RESPONSE["vulnerabilities"][0]),
+        (("vulnerabilities", 1), RESPONSE["vulnerabilities"][1]),
+        (("tools_reports", "slither"), {"ok": True}),
+        (("tools_reports", "echidna"), None),
+        (("summary", "is_production_ready"), False),
+    ]
+    assert parser.done
+    assert parser.close() == RESPONSE
+
+
+def test_emit_depth_one_emits_top_level_values():
+    parser = JSONStreamParser(emit_depth=1)
+    emitted = parser.feed('{"a": 1, "b": [1, 2], "c": {"d": "x"}}')
+    assert emitted == [(("a",), 1), (("b",), [1, 2]), (("c",), {"d": "x"})]
+
+
+def test_values_are_emitted_as_soon_as_they_close():
+    parser = JSONStreamParser()
+    assert parser.feed('{"vulnerabilities": [{"title": "A"}') == [(("vulnerabilities", 0), {"title": "A"})]
+    assert parser.feed(', {"title": "B"') == []
+    assert parser.feed('}]}') == [(("vulnerabilities", 1), {"title": "B"})]
+
+
+def test_tolerates_prefix_and_trailing_text():
+    parser = JSONStreamParser()
+    parser.feed('```json\n{"status": "SAFE"}\n```')
+    assert parser.close() == {"status": "SAFE"}
+
+
+def test_rejects_text_without_object():
+    parser = JSONStreamParser()
+    with pytest.raises(JSONStreamError, match="no JSON object found"):
+        parser.feed("x" * (MAX_PREFIX_CHARS + 1))
+
+
+@pytest.mark.parametrize("text", [
+    '{"status": "SAFE",, "risk_score": 1}',
+    '{"status" "SAFE"}',
+    '{"vulnerabilities": [1 2]}',
+    '{"status": "SAFE"]',
+])
+def test_detects_syntax_errors_in_the_chunk_that_contains_them(text):
+    parser = JSONStreamParser()
+    with pytest.raises(JSONStreamError) as error:
+        feed_in_chunks(parser, text, 4)
+    assert error.value.position <= len(text)
+
+
+def test_invalid_scalar_is_an_error():
+    parser = JSONStreamParser(emit_depth=1)
+    with pytest.raises(JSONStreamError, match="invalid literal"):
+        parser.feed('{"risk_score": 1.2.3, ')
+
+
+def test_close_requires_complete_object():
+    parser = JSONStreamParser()
+    parser.feed('{"status": "SA')
+    with pytest.raises(JSONStreamError, match="ended before"):
+        parser.close()
@@ -0,0 +1,99 @@
+"""
+Tests de la aplicación local de parches.
+"""
+import pytest
+
+from services.patching import PatchError, apply_edits, apply_fix_patch, apply_unified_diff
+
+CODE = """pragma solidity ^0.8.0;
+
+contract Vault {
+    mapping(address => uint) balances;
+
+    function withdraw() public {
+        uint amount = balances[msg.sender];
+        (bool ok, ) = msg.sender.call{value: amount}("");
+        require(ok);
+        balances[msg.sender] = 0;
+    }
+}
+"""
+
+
+def test_apply_edits_replaces_literal_block():
+    patched = apply_edits(CODE, [{
+        "search": "        require(ok);\n        balances[msg.sender] = 0;\n",
+        "replace": "        require(ok);\n"
+    }])
+    assert "balances[msg.sender] = 0;" not in patched
+    assert patched.count("require(ok);") == 1
+
+
+def test_apply_edits_matches_lines_ignoring_indentation():
+    # El modelo devuelve el bloque sin la indentación del contrato
+    patched = apply_edits(CODE, [{
+        "search": "uint amount = balances[msg.sender];\n(bool ok, ) = msg.sender.call{value: amount}(\"\");",
+        "replace": "uint amount = balances[msg.sender];\nbalances[msg.sender] = 0;\n(bool ok, ) = msg.sender.call{value: amount}(\"\");"
+    }])
+    assert "        uint amount = balances[msg.sender];\n        balances[msg.sender] = 0;\n" in patched
+
+
+def test_apply_edits_applies_in_order():
+    patched = apply_edits(CODE, [
+        {"search": "contract Vault", "replace": "contract SafeVault"},
+        {"search": "contract SafeVault {", "replace": "contract SafeVault is Guard {"}
+    ])
+    assert "contract SafeVault is Guard {" in patched
+
+
+@pytest.mark.parametrize("edits, message", [
+    ([{"search": "not in the contract", "replace": ""}], "not found"),
+    ([{"search": "balances[msg.sender]", "replace": ""}], "matches 2 times"),
+    ([{"search": "   ", "replace": ""}], "empty search block"),
+    (["withdraw"], "not an object"),
+])
+def test_apply_edits_rejects_bad_blocks(edits, message):
+    with pytest.raises(PatchError, match=message):
+        apply_edits(CODE, edits)
+
+
+def test_apply_unified_diff():
+    diff = """--- a/Vault.sol
++++ b/Vault.sol
+@@ -7,4 +7,4 @@
+         uint amount = balances[msg.sender];
++        balances[msg.sender] = 0;
+         (bool ok, ) = msg.sender.call{value: amount}("");
+         require(ok);
+-        balances[msg.sender] = 0;
+"""
+    patched = apply_unified_diff(CODE, diff)
+    assert patched.endswith("}\n")
+    lines = patched.split("\n")
+    assert lines[7] == "        balances[msg.sender] = 0;"
+    assert lines[10] == "    }"
+
+
+def test_apply_unified_diff_relocates_shifted_hunks():
+    # El hunk dice línea 1 pero el contexto está más abajo
+    diff = "@@ -1,1 +1,1 @@\n-contract Vault {\n+contract SafeVault {\n"
+    assert "contract SafeVault {" in apply_unified_diff(CODE, diff)
+
+
+def test_apply_unified_diff_errors():
+    with pytest.raises(PatchError, match="no hunks"):
+        apply_unified_diff(CODE, "just text")
+    with pytest.raises(PatchError, match="context not found"):
+        apply_unified_diff(CODE, "@@ -3,1 +3,1 @@\n-contract Other {\n+contract Vault {\n")
+
+
+def test_apply_fix_patch_validates_result():
+    with pytest.raises(PatchError, match="no edits or diff"):
+        apply_fix_patch(CODE, {"edits": []})
+    with pytest.raises(PatchError, match="removed the pragma"):
+        apply_fix_patch(CODE, {"edits": [{"search": "pragma solidity ^0.8.0;", "replace": ""}]})
+    with pytest.raises(PatchError, match="unclosed"):
+        apply_fix_patch(CODE, {"edits": [{"search": "    }\n}", "replace": "    }"}]})
+    # Los delimitadores dentro de strings y comentarios no cuentan
+    patched = apply_fix_patch(CODE, {"edits": [{"search": "require(ok);", "replace": 'require(ok, "call failed {"); // )'}]})
+    assert 'require(ok, "call failed {");' in patched
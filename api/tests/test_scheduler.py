@@ -0,0 +1,118 @@
+"""
+Tests de la cola justa de las herramientas.
+"""
+import asyncio
+
+from core.config import settings
+from services.scheduler import ClientContext, FairQueue
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+async def serve_in_order(queue, requests):
+    """Encola los pedidos con el slot ocupado y devuelve el orden de atención."""
+    order = []
+
+    async def request(name, client, cost):
+        await queue.acquire(client, cost)
+        order.append(name)
+        await asyncio.sleep(0)
+        queue.release()
+
+    await queue.acquire(ClientContext("holder"))
+    tasks = []
+    for name, client, cost in requests:
+        tasks.append(asyncio.ensure_future(request(name, client, cost)))
+        await asyncio.sleep(0)
+    queue.release()
+    await asyncio.gather(*tasks)
+    return order
+
+
+def test_acquire_uses_free_slots_without_waiting():
+    async def scenario():
+        queue = FairQueue("slither", 2)
+        await queue.acquire(ClientContext("a"))
+        await queue.acquire(ClientContext("b"))
+        assert queue.busy == 2
+        assert queue.estimated_wait() > 0
+        queue.release()
+        queue.release()
+        assert queue.busy == 0
+        assert queue.estimated_wait() == 0.0
+
+    run(scenario())
+
+
+def test_interactive_request_overtakes_a_batch_backlog():
+    batch = ClientContext("crawler", "batch")
+    user = ClientContext("user", "interactive")
+    order = run(serve_in_order(FairQueue("slither", 1), [
+        ("batch-1", batch, 1.0),
+        ("batch-2", batch, 1.0),
+        ("batch-3", batch, 1.0),
+        ("user-1", user, 1.0),
+    ]))
+    assert order == ["batch-1", "user-1", "batch-2", "batch-3"]
+
+
+def test_clients_of_the_same_class_alternate():
+    a, b = ClientContext("a", "batch"), ClientContext("b", "batch")
+    order = run(serve_in_order(FairQueue("slither", 1), [
+        ("a-1", a, 1.0), ("a-2", a, 1.0), ("a-3", a, 1.0),
+        ("b-1", b, 1.0), ("b-2", b, 1.0),
+    ]))
+    assert order == ["a-1", "b-1", "a-2", "b-2", "a-3"]
+
+
+def test_expensive_requests_wait_longer():
+    a, b = ClientContext("a", "batch"), ClientContext("b", "batch")
+    order = run(serve_in_order(FairQueue("slither", 1), [
+        ("a-long", a, 4.0), ("a-next", a, 1.0),
+        ("b-1", b, 1.0), ("b-2", b, 1.0), ("b-3", b, 1.0),
+    ]))
+    assert order.index("a-next") > order.index("b-3")
+
+
+def test_cancelled_waiters_do_not_keep_slots():
+    async def scenario():
+        queue = FairQueue("slither", 1)
+        await queue.acquire(ClientContext("holder"))
+        waiter = asyncio.ensure_future(queue.acquire(ClientContext("gone")))
+        await asyncio.sleep(0)
+        assert queue.snapshot()["queued"] == 1
+        waiter.cancel()
+        await asyncio.sleep(0)
+        assert queue.snapshot()["queued"] == 0
+        queue.release()
+        assert queue.busy == 0
+        await asyncio.wait_for(queue.acquire(ClientContext("next")), timeout=1)
+        assert queue.busy == 1
+
+    run(scenario())
+
+
+def test_snapshot_and_service_average():
+    async def scenario():
+        queue = FairQueue("slither", 1)
+        await queue.acquire(ClientContext("holder"))
+        waiters = [
+            asyncio.ensure_future(queue.acquire(ClientContext("c", priority)))
+            for priority in ("batch", "batch", "interactive")
+        ]
+        await asyncio.sleep(0)
+        snapshot = queue.snapshot()
+        assert snapshot["queued"] == 3
+        assert snapshot["queued_by_priority"] == {"batch": 2, "interactive": 1}
+
+        queue.release(elapsed=10.0)
+        assert queue.avg_service_seconds == 10.0
+        queue.release(elapsed=20.0)
+        alpha = settings.SCHEDULER_EWMA_ALPHA
+        assert queue.avg_service_seconds == alpha * 20.0 + (1 - alpha) * 10.0
+        for waiter in waiters:
+            waiter.cancel()
+
+    run(scenario())
@@ -0,0 +1,64 @@
+"""
+Tests de la resolución de versiones del pragma solidity.
+"""
+import pytest
+
+from services.solidity_parser import select_compiler, version_satisfies
+
+AVAILABLE = ["0.4.26", "0.6.12", "0.7.6", "0.8.0", "0.8.19", "0.8.24"]
+
+
+@pytest.mark.parametrize("version, constraint, expected", [
+    ("0.8.19", "^0.8.0", True),
+    ("0.9.0", "^0.8.0", False),
+    ("0.7.6", "^0.8.0", False),
+    ("0.4.26", "^0.4.24", True),
+    ("0.5.0", "^0.4.24", False),
+    ("0.0.3", "^0.0.3", True),
+    ("0.0.4", "^0.0.3", False),
+    ("0.8.24", "~0.8.20", True),
+    ("0.9.0", "~0.8.20", False),
+    ("0.8.19", "0.8.19", True),
+    ("0.8.20", "=0.8.19", False),
+    ("0.8.5", "0.8", True),
+    ("0.8.5", "0.8.x", True),
+    ("0.9.0", "0.8.x", False),
+    ("0.7.6", ">=0.6.0 <0.8.0", True),
+    ("0.8.0", ">=0.6.0 <0.8.0", False),
+    ("0.8.0", ">0.7", True),
+    ("0.7.6", ">0.7", False),
+    ("0.7.6", "<=0.7", True),
+    ("0.8.0", "<=0.7", False),
+    ("0.6.12", "0.6.0 - 0.7.6", True),
+    ("0.8.0", "0.6.0 - 0.7.6", False),
+    ("0.4.26", "^0.4.0 || ^0.8.0", True),
+    ("0.6.12", "^0.4.0 || ^0.8.0", False),
+])
+def test_version_satisfies(version, constraint, expected):
+    assert version_satisfies(version, constraint) is expected
+
+
+def test_version_satisfies_rejects_invalid_versions():
+    with pytest.raises(ValueError):
+        version_satisfies("latest", "^0.8.0")
+
+
+@pytest.mark.parametrize("constraint, expected", [
+    ("^0.8.0", "0.8.24"),
+    (">=0.6.0 <0.8.0", "0.7.6"),
+    ("0.8.19", "0.8.19"),
+    ("^0.4.24 || ^0.6.0", "0.6.12"),
+    (None, "0.8.24"),
+    ("^0.5.0", None),
+])
+def test_select_compiler_picks_highest_matching(constraint, expected):
+    assert select_compiler(constraint, AVAILABLE) == expected
+
+
+def test_select_compiler_without_versions():
+    assert select_compiler(None, []) is None
+    assert select_compiler("^0.8.0", []) is None
+
+
+def test_select_compiler_defers_unparseable_pragmas_to_the_compiler():
+    assert select_compiler("^0.8.0.1", AVAILABLE) == "0.8.24"
@@ -1,101 +1,412 @@
 import os
-import subprocess
+import re
+import json
+import time
+import fcntl
+import shutil
 import logging
-from fastapi import FastAPI, Body
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
+from typing import Optional
 
-app = FastAPI(title="Echidna Fuzzing Service")
-
-logging.basicConfig(
-    level=logging.INFO,
-    format="[%(asctime)s] %(levelname)s echidna_service - %(message)s"
+from tool_runtime import (
+    CPU_QUOTA, WORKSPACE_DIR, AnalysisRequest, CoverageMonitor, Invocation, RunOutcome,
+    ToolSpec, create_app
 )
+
 logger = logging.getLogger(__name__)
 
-class AnalysisRequest(BaseModel):
-    analysis_id: str
-    filename: str
 
-WORKSPACE_DIR = "/workspace"
+class EchidnaRequest(AnalysisRequest):
+    # Parámetros opcionales de la campaña (validados contra los máximos del servidor)
+    test_mode: Optional[str] = None
+    test_limit: Optional[int] = None
+    seq_len: Optional[int] = None
+    workers: Optional[int] = None
+    # Segundos sin crecimiento de cobertura antes de detener la campaña (0 = desactivado)
+    plateau_window: Optional[int] = None
+    # Linaje del contrato para reutilizar el corpus entre ejecuciones y correcciones
+    corpus_key: Optional[str] = None
+    fix_iteration: int = 0
+
+
+VALID_TEST_MODES = ("property", "assertion", "optimization", "overflow", "exploration")
+
+# Solo se persisten las secuencias; los reportes covered.* se regeneran en cada campaña
+CORPUS_SUBDIRS = ("coverage", "reproducers")
+CORPUS_KEY_RE = re.compile(r"^[A-Za-z0-9_-]{1,128}$")
+
+TEST_LINE_RE = re.compile(
+    r"^(?P<name>[A-Za-z_$][\w$]*(?:\([^)]*\))?):\s+(?P<status>passing|failed|solved|error)",
+    re.MULTILINE
+)
+# Línea de estado periódica: "[status] tests: 0/2, fuzzing: 1500/50000, values: [], cov: 1234, corpus: 5"
+PROGRESS_RE = re.compile(r"cov:\s*(?P<coverage>\d+),\s*corpus:\s*(?P<corpus>\d+)")
+STAT_RES = {
+    "total_calls": re.compile(r"^Total calls:\s*(\d+)", re.MULTILINE),
+    "unique_instructions": re.compile(r"^Unique instructions:\s*(\d+)", re.MULTILINE),
+    "unique_codehashes": re.compile(r"^Unique codehashes:\s*(\d+)", re.MULTILINE),
+    "corpus_size": re.compile(r"^Corpus size:\s*(\d+)", re.MULTILINE),
+    "seed": re.compile(r"^Seed:\s*(-?\d+)", re.MULTILINE),
+}
+
+
+def _corpus_files(root: str) -> list:
+    """Return (path, size, mtime) for every persisted sequence under root."""
+    files = []
+    for subdir in CORPUS_SUBDIRS:
+        base = os.path.join(root, subdir)
+        if not os.path.isdir(base):
+            continue
+        for name in os.listdir(base):
+            path = os.path.join(base, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            files.append((path, st.st_size, st.st_mtime))
+    return files
+
+
+def _lineage_lock(lineage_dir: str):
+    """Open and exclusively lock the lineage lock file."""
+    os.makedirs(lineage_dir, exist_ok=True)
+    handle = open(os.path.join(lineage_dir, ".lock"), "w")
+    fcntl.flock(handle, fcntl.LOCK_EX)
+    return handle
+
 
+def seed_corpus(corpus_root: str, corpus_key: str, run_corpus_dir: str) -> int:
+    """Copy the persisted lineage corpus into the corpus dir of this run."""
+    lineage_dir = os.path.join(corpus_root, corpus_key)
+    if not os.path.isdir(lineage_dir):
+        return 0
+    seeded = 0
+    with _lineage_lock(lineage_dir):
+        for path, _, _ in _corpus_files(lineage_dir):
+            subdir = os.path.basename(os.path.dirname(path))
+            target_dir = os.path.join(run_corpus_dir, subdir)
+            os.makedirs(target_dir, exist_ok=True)
+            shutil.copy2(path, os.path.join(target_dir, os.path.basename(path)))
+            seeded += 1
+    return seeded
 
-def log_command_output(command: str, result: subprocess.CompletedProcess) -> None:
-    """Log Echidna execution output to help debugging."""
-    logger.info("Command: %s", command)
-    logger.info("Exit code: %s", result.returncode)
-    stdout = result.stdout if result.stdout else "<empty>"
-    stderr = result.stderr if result.stderr else "<empty>"
-    logger.info("STDOUT:\n%s", stdout)
-    logger.info("STDERR:\n%s", stderr)
 
-@app.post("/analyze")
-async def analyze(request: AnalysisRequest = Body(...)):
+def persist_corpus(
+    corpus_root: str, corpus_key: str, run_corpus_dir: str, fix_iteration: int, max_bytes: int
+) -> dict:
     """
-    Analiza un contrato con Echidna (property-based testing).
+    Merge the sequences found by this run into the lineage corpus.
+
+    Sequence files are named after their content hash, so files already present
+    are skipped. Once merged, the lineage is trimmed to max_bytes by
+    dropping its oldest sequences.
     """
-    contract_dir = os.path.join(WORKSPACE_DIR, request.analysis_id)
-    
-    if not os.path.exists(contract_dir):
-        return JSONResponse(
-            status_code=404,
-            content={
-                "success": False,
-                "error": f"Contract directory not found: {contract_dir}",
-                "error_type": "file_not_found"
-            }
+    lineage_dir = os.path.join(corpus_root, corpus_key)
+    persisted = 0
+    evicted = 0
+    with _lineage_lock(lineage_dir):
+        for path, _, _ in _corpus_files(run_corpus_dir):
+            subdir = os.path.basename(os.path.dirname(path))
+            target_dir = os.path.join(lineage_dir, subdir)
+            target = os.path.join(target_dir, os.path.basename(path))
+            if os.path.exists(target):
+                os.utime(target)
+                continue
+            os.makedirs(target_dir, exist_ok=True)
+            tmp_target = target + ".tmp"
+            shutil.copy2(path, tmp_target)
+            os.replace(tmp_target, target)
+            persisted += 1
+
+        files = sorted(_corpus_files(lineage_dir), key=lambda item: item[2])
+        size = sum(item[1] for item in files)
+        while files and size > max_bytes:
+            path, file_size, _ = files.pop(0)
+            os.remove(path)
+            size -= file_size
+            evicted += 1
+
+        meta_path = os.path.join(lineage_dir, "meta.json")
+        meta = {"corpus_key": corpus_key, "runs": 0, "fix_iterations": []}
+        if os.path.exists(meta_path):
+            try:
+                with open(meta_path) as f:
+                    meta.update(json.load(f))
+            except (OSError, ValueError):
+                pass
+        meta["runs"] += 1
+        if fix_iteration not in meta["fix_iterations"]:
+            meta["fix_iterations"].append(fix_iteration)
+        meta["last_used"] = time.time()
+        meta["size_bytes"] = size
+        with open(meta_path, "w") as f:
+            json.dump(meta, f)
+
+    return {
+        "persisted_files": persisted,
+        "evicted_files": evicted,
+        "size_bytes": size,
+    }
+
+
+def evict_lineages(corpus_root: str, keep: str, total_max_bytes: int) -> int:
+    """Drop least recently used lineages until the corpus root fits its cap."""
+    if not os.path.isdir(corpus_root):
+        return 0
+    lineages = []
+    total = 0
+    for name in os.listdir(corpus_root):
+        lineage_dir = os.path.join(corpus_root, name)
+        if not os.path.isdir(lineage_dir):
+            continue
+        size = sum(item[1] for item in _corpus_files(lineage_dir))
+        meta_path = os.path.join(lineage_dir, "meta.json")
+        last_used = os.path.getmtime(meta_path) if os.path.exists(meta_path) else 0
+        lineages.append((last_used, name, size))
+        total += size
+
+    evicted = 0
+    for _, name, size in sorted(lineages):
+        if total <= total_max_bytes:
+            break
+        if name == keep:
+            continue
+        shutil.rmtree(os.path.join(corpus_root, name), ignore_errors=True)
+        total -= size
+        evicted += 1
+    return evicted
+
+
+def parse_echidna_output(stdout: str, elapsed: float) -> dict:
+    """Extract test statuses and campaign statistics from Echidna text output."""
+    tests = [
+        {"name": match.group("name"), "status": match.group("status")}
+        for match in TEST_LINE_RE.finditer(stdout or "")
+    ]
+    stats = {}
+    for key, pattern in STAT_RES.items():
+        match = pattern.search(stdout or "")
+        stats[key] = int(match.group(1)) if match else None
+
+    total_calls = stats["total_calls"]
+    calls_per_second = None
+    if total_calls is not None and elapsed > 0:
+        calls_per_second = round(total_calls / elapsed, 2)
+
+    return {
+        "tests": tests,
+        "passed": sum(1 for t in tests if t["status"] == "passing"),
+        "failed": sum(1 for t in tests if t["status"] in ("failed", "solved")),
+        **stats,
+        "elapsed_seconds": round(elapsed, 2),
+        "calls_per_second": calls_per_second,
+    }
+
+
+class EchidnaTool(ToolSpec):
+    """Property-based testing con Echidna."""
+
+    name = "echidna"
+    title = "Echidna Fuzzing Service"
+    service_name = "Echidna Property Testing"
+    request_model = EchidnaRequest
+    version_commands = {
+        "echidna": ["echidna", "--version"],
+        "solc": ["solc", "--version"],
+    }
+    # Valores por defecto y máximos de la campaña (configurables por despliegue)
+    defaults = {
+        "DEFAULT_TEST_MODE": "assertion",
+        "DEFAULT_TEST_LIMIT": 50000,
+        "DEFAULT_SEQ_LEN": 100,
+        "DEFAULT_TIMEOUT": 240,
+        "MAX_TEST_LIMIT": 1000000,
+        "MAX_SEQ_LEN": 300,
+        "MAX_WORKERS": CPU_QUOTA,
+        # Detención temprana por meseta de cobertura
+        "PLATEAU_WINDOW": 30,
+        "PLATEAU_MIN_RUNTIME": 15,
+        # Margen para la compilación previa a la campaña
+        "COMPILE_GRACE": 60,
+        "MEMORY_LIMIT_MB": 1536,
+        # Corpus persistente por linaje de contrato
+        "CORPUS_DIR": os.path.join(WORKSPACE_DIR, ".echidna-corpus"),
+        "CORPUS_MAX_BYTES": 50 * 1024 * 1024,
+        "CORPUS_TOTAL_MAX_BYTES": 500 * 1024 * 1024,
+    }
+
+    def contract_path(self, request: EchidnaRequest) -> str:
+        # Echidna recibe el directorio completo del análisis; en un proyecto,
+        # el archivo principal (el directorio incluye las dependencias)
+        if request.remappings is not None:
+            return super().contract_path(request)
+        return self.contract_dir(request)
+
+    def cache_inputs(self, request: EchidnaRequest) -> list:
+        if request.remappings is not None:
+            return self.source_files(request)
+        contract_dir = self.contract_dir(request)
+        return sorted(
+            os.path.join(contract_dir, name)
+            for name in os.listdir(contract_dir) if name.endswith(".sol")
+        )
+
+    def resolve_campaign(self, request: EchidnaRequest) -> dict:
+        """
+        Merge request parameters with server defaults and validate them.
+
+        Raises:
+            ToolError: If a parameter is out of range for this server.
+        """
+        config = self.config
+        campaign = {
+            "test_mode": request.test_mode or config.DEFAULT_TEST_MODE,
+            "test_limit": request.test_limit if request.test_limit is not None else config.DEFAULT_TEST_LIMIT,
+            "seq_len": request.seq_len if request.seq_len is not None else config.DEFAULT_SEQ_LEN,
+            "timeout": (
+                request.timeout if request.timeout is not None
+                else min(config.DEFAULT_TIMEOUT, config.MAX_TIMEOUT)
+            ),
+            "workers": request.workers if request.workers is not None else min(CPU_QUOTA, config.MAX_WORKERS),
+            "plateau_window": (
+                request.plateau_window if request.plateau_window is not None else config.PLATEAU_WINDOW
+            ),
+        }
+        if campaign["test_mode"] not in VALID_TEST_MODES:
+            raise self.invalid(
+                f"test_mode must be one of {', '.join(VALID_TEST_MODES)}"
+            )
+        limits = {
+            "test_limit": config.MAX_TEST_LIMIT,
+            "seq_len": config.MAX_SEQ_LEN,
+            "timeout": config.MAX_TIMEOUT,
+            "workers": config.MAX_WORKERS,
+        }
+        for key, maximum in limits.items():
+            if not 1 <= campaign[key] <= maximum:
+                raise self.invalid(f"{key} must be between 1 and {maximum}")
+        if not 0 <= campaign["plateau_window"] <= campaign["timeout"]:
+            raise self.invalid("plateau_window must be between 0 and timeout")
+        if request.corpus_key and not CORPUS_KEY_RE.match(request.corpus_key):
+            raise self.invalid("corpus_key must match [A-Za-z0-9_-]{1,128}")
+        return campaign
+
+    def prepare(self, request: EchidnaRequest) -> Invocation:
+        target = self.require_path(self.contract_path(request), "Contract")
+        contract_dir = self.contract_dir(request)
+        campaign = self.resolve_campaign(request)
+        layout_args = []
+        crytic_args = self.crytic_compile_args(request)
+        if crytic_args:
+            # La configuración de Echidna es YAML, que acepta JSON
+            config_path = os.path.join(contract_dir, "echidna.json")
+            with open(config_path, "w") as f:
+                json.dump({"cryticArgs": crytic_args}, f)
+            layout_args = ["--config", config_path]
+
+        run_corpus_dir = os.path.join(contract_dir, "echidna-corpus")
+        corpus_info = None
+        if request.corpus_key:
+            seeded = seed_corpus(self.config.CORPUS_DIR, request.corpus_key, run_corpus_dir)
+            corpus_info = {"corpus_key": request.corpus_key, "seeded_files": seeded}
+
+        run_timeout = campaign["timeout"] + self.config.COMPILE_GRACE
+        return Invocation(
+            [
+                "echidna", target,
+                "--test-mode", campaign["test_mode"],
+                "--test-limit", str(campaign["test_limit"]),
+                "--seq-len", str(campaign["seq_len"]),
+                "--timeout", str(campaign["timeout"]),
+                "--workers", str(campaign["workers"]),
+                "--format", "text",
+                "--corpus-dir", run_corpus_dir,
+            ] + layout_args,
+            run_timeout,
+            cpu_seconds=run_timeout * campaign["workers"],
+            monitor=CoverageMonitor(
+                PROGRESS_RE, campaign["plateau_window"], self.config.PLATEAU_MIN_RUNTIME
+            ),
+            context={
+                "campaign": campaign,
+                "run_corpus_dir": run_corpus_dir,
+                "corpus_info": corpus_info,
+            },
+            error_fields={"campaign": campaign}
         )
-    
-    try:
-        # Ejecutar Echidna
-        command = ["echidna", contract_dir, "--test-mode", "assertion"]
-        result = subprocess.run(
-            command,
-            capture_output=True,
-            text=True,
-            timeout=300
+
+    def parse_result(self, request: EchidnaRequest, invocation: Invocation, outcome: RunOutcome) -> dict:
+        result = outcome.process
+        results = parse_echidna_output(result.stdout, outcome.elapsed)
+
+        corpus_info = invocation.context["corpus_info"]
+        if request.corpus_key:
+            try:
+                corpus_info.update(
+                    persist_corpus(
+                        self.config.CORPUS_DIR,
+                        request.corpus_key,
+                        invocation.context["run_corpus_dir"],
+                        request.fix_iteration,
+                        self.config.CORPUS_MAX_BYTES
+                    )
+                )
+                corpus_info["evicted_lineages"] = evict_lineages(
+                    self.config.CORPUS_DIR, request.corpus_key, self.config.CORPUS_TOTAL_MAX_BYTES
+                )
+            except OSError as exc:
+                logger.warning("Could not persist Echidna corpus %s: %s", request.corpus_key, exc)
+
+        # Una campaña detenida por meseta termina con la señal de interrupción
+        is_success = (
+            result.returncode == 0
+            or (outcome.stop_reason == "plateau" and not results["failed"])
         )
-        log_command_output("echidna " + " ".join(command[1:]), result)
-        
-        is_success = (result.returncode == 0)
         error_type = None
-        
+
         if not is_success:
             stderr_lower = result.stderr.lower()
-            if "compilation failed" in stderr_lower:
+            if outcome.usage["limit_exceeded"]:
+                error_type = "resource_limit_exceeded"
+            elif results["failed"]:
+                error_type = "tests_failed"
+            elif "compilation failed" in stderr_lower:
                 error_type = "compilation_error"
             elif "not found" in stderr_lower:
                 error_type = "tool_not_found"
             else:
                 error_type = "analysis_error"
-        
+
         return {
             "success": is_success,
-            "command": f"echidna {contract_dir} --test-mode assertion",
+            "command": invocation.display_command,
             "stdout": result.stdout,
             "stderr": result.stderr,
             "exit_code": result.returncode,
-            "error_type": error_type
+            "resource_usage": outcome.usage,
+            "error_type": error_type,
+            "campaign": invocation.context["campaign"],
+            "stop_reason": outcome.stop_reason,
+            "monitor": invocation.monitor.summary(),
+            "corpus": corpus_info,
+            "results": results
         }
-        
-    except subprocess.TimeoutExpired:
-        logger.exception("Echidna analysis timed out for %s", contract_dir)
-        return {
-            "success": False,
-            "error": "Analysis timed out",
-            "error_type": "timeout"
-        }
-    except Exception as e:
-        logger.exception("Unexpected Echidna error for %s", contract_dir)
+
+    def warmup_options(self) -> dict:
+        return {"timeout": 10, "test_limit": 1000, "workers": 1, "plateau_window": 0}
+
+    def info(self) -> dict:
         return {
-            "success": False,
-            "error": f"Unexpected error: {str(e)}",
-            "error_type": "unexpected_error"
+            "cpu_quota": CPU_QUOTA,
+            "limits": {
+                "test_limit": self.config.MAX_TEST_LIMIT,
+                "seq_len": self.config.MAX_SEQ_LEN,
+                "timeout": self.config.MAX_TIMEOUT,
+                "workers": self.config.MAX_WORKERS
+            }
         }
 
-@app.get("/")
-async def root():
-    return {"service": "Echidna Property Testing", "version": "1.0"}
+
+app = create_app(EchidnaTool())
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,23 @@
+"""
+Shared logging setup of the API and the tool services.
+
+Records are written by a background thread from a bounded queue (logging
+never blocks a request), rendered as JSON lines, capped in size, and
+verbose payloads are sampled.
+"""
+from .formatting import JSONFormatter, TextFormatter, bounded_value, truncate
+from .handlers import BoundedQueueHandler, dropped_records, setup_logging, shutdown_logging
+from .payload import log_payload, should_sample
+
+__all__ = [
+    "BoundedQueueHandler",
+    "JSONFormatter",
+    "TextFormatter",
+    "bounded_value",
+    "dropped_records",
+    "log_payload",
+    "setup_logging",
+    "should_sample",
+    "shutdown_logging",
+    "truncate",
+]
@@ -0,0 +1,17 @@
+"""
+Logging configuration read from environment variables.
+"""
+import os
+
+# "json" (un objeto por línea) o "text" (formato legible clásico)
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+
+# Tamaño máximo de un mensaje o campo; el resto se reemplaza por un marcador
+LOG_MAX_FIELD_CHARS = int(os.getenv("LOG_MAX_FIELD_CHARS", "2000"))
+
+# Registros en espera de escritura; si la cola se llena se descartan
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+# Uno de cada N payloads verbosos (salida de herramientas, respuestas) se
+# registra a nivel INFO; con DEBUG se registran todos
+LOG_PAYLOAD_SAMPLE_EVERY = int(os.getenv("LOG_PAYLOAD_SAMPLE_EVERY", "100"))
@@ -0,0 +1,121 @@
+"""
+Size-capped rendering of log records as JSON or text.
+"""
+import itertools
+import json
+import logging
+import reprlib
+import time
+from typing import Any, Dict
+
+from .config import LOG_MAX_FIELD_CHARS
+
+# Atributos propios de LogRecord; el resto viene de extra={...}
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+def truncate(text: str, limit: int = LOG_MAX_FIELD_CHARS) -> str:
+    """Trim text to ``limit`` characters with a marker of what was dropped."""
+    if limit <= 0 or len(text) <= limit:
+        return text
+    return f"{text[:limit]}...[{len(text) - limit} chars truncated]"
+
+
+# Elementos y profundidad máximos de los contenedores registrados
+MAX_ITEMS = 32
+MAX_DEPTH = 4
+
+
+class _Budget:
+    def __init__(self, chars: int):
+        self.chars = chars
+
+
+def _bounded(value: Any, budget: _Budget, depth: int) -> Any:
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if budget.chars <= 0:
+        return "..."
+    if isinstance(value, bytes):
+        value = value[:budget.chars + 1].decode("utf-8", "replace")
+    if isinstance(value, str):
+        text = truncate(value, budget.chars)
+        budget.chars -= len(text)
+        return text
+    if depth >= MAX_DEPTH:
+        return "<...>"
+    if isinstance(value, dict):
+        items = list(itertools.islice(value.items(), MAX_ITEMS))
+        result = {str(key): _bounded(item, budget, depth + 1) for key, item in items}
+        if len(value) > MAX_ITEMS:
+            result["..."] = f"{len(value) - MAX_ITEMS} more keys"
+        return result
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = [_bounded(item, budget, depth + 1) for item in itertools.islice(value, MAX_ITEMS)]
+        if len(value) > MAX_ITEMS:
+            items.append(f"... {len(value) - MAX_ITEMS} more items")
+        return items
+    # Otros objetos: repr acotado (el repr completo podría incluir salidas enormes)
+    text = reprlib.Repr()
+    text.maxstring = text.maxother = max(budget.chars, 20)
+    return _bounded(text.repr(value), budget, depth)
+
+
+def bounded_value(value: Any, limit: int = LOG_MAX_FIELD_CHARS) -> Any:
+    """
+    Cheap, size-capped copy of a log argument or field.
+
+    Strings are cut, containers keep at most MAX_ITEMS elements and
+    MAX_DEPTH levels, and all the strings inside share a budget of ``limit``
+    characters, so logging a multi-megabyte payload never costs more than
+    that. Numbers and None pass through.
+    """
+    return _bounded(value, _Budget(limit), 0)
+
+
+def record_fields(record: logging.LogRecord) -> Dict[str, Any]:
+    """Structured fields passed with ``extra={...}``."""
+    return {
+        key: value for key, value in vars(record).items()
+        if key not in _RECORD_ATTRS and not key.startswith("_")
+    }
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per record: ts, level, service, logger, msg and extra fields."""
+
+    def __init__(self, service: str):
+        super().__init__()
+        self.service = service
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created))
+            + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "service": self.service,
+            "logger": record.name,
+            "msg": truncate(record.getMessage()),
+        }
+        for key, value in record_fields(record).items():
+            entry[key] = bounded_value(value)
+        # BoundedQueueHandler deja la traza ya formateada en exc_text
+        exc_text = self.formatException(record.exc_info) if record.exc_info else record.exc_text
+        if exc_text:
+            entry["exc"] = truncate(exc_text, LOG_MAX_FIELD_CHARS * 4)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """Classic one-line format with capped message and extra fields appended."""
+
+    def __init__(self, service: str):
+        super().__init__(f"[%(asctime)s] %(levelname)s {service} %(name)s - %(message)s")
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        record.message = truncate(record.message)
+        line = super().formatMessage(record)
+        fields = record_fields(record)
+        if fields:
+            line += " " + " ".join(f"{key}={bounded_value(value)}" for key, value in fields.items())
+        return line
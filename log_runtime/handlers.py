@@ -0,0 +1,117 @@
+"""
+Non-blocking logging: records go to a bounded queue and a background thread writes them.
+"""
+import atexit
+import logging
+import logging.handlers
+import queue
+import sys
+from typing import Optional, Union
+
+from .config import LOG_FORMAT, LOG_QUEUE_SIZE
+from .formatting import JSONFormatter, TextFormatter, bounded_value, record_fields, truncate
+
+# Loggers de uvicorn que por defecto escriben de forma síncrona y sin propagar
+UVICORN_LOGGERS = ("uvicorn", "uvicorn.error", "uvicorn.access")
+
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that never blocks the caller.
+
+    Arguments are capped before the record is enqueued (the caller pays at
+    most LOG_MAX_FIELD_CHARS per argument, never the full payload) and the
+    message is formatted by the listener thread. When the queue is full the
+    record is dropped and counted; the count is reported with the next record
+    that fits.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if isinstance(record.msg, str):
+            record.msg = truncate(record.msg)
+        else:
+            record.msg = str(bounded_value(record.msg))
+        if isinstance(record.args, dict):
+            record.args = {key: bounded_value(value) for key, value in record.args.items()}
+        elif record.args:
+            record.args = tuple(bounded_value(arg) for arg in record.args)
+        for key, value in record_fields(record).items():
+            setattr(record, key, bounded_value(value))
+        if record.exc_info:
+            # La traza se formatea acá: sus frames pueden cambiar antes de que
+            # el hilo de fondo escriba el registro
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.dropped:
+            record.dropped_records = self.dropped
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            return
+        self.dropped = 0
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_handler: Optional[BoundedQueueHandler] = None
+
+
+def setup_logging(service: str, level: Union[int, str] = logging.INFO, fmt: Optional[str] = None) -> None:
+    """
+    Route every log record of the process through the bounded queue.
+
+    Replaces the root handlers with a BoundedQueueHandler whose listener
+    writes JSON (or text) lines to stderr, and makes the uvicorn loggers
+    propagate to it. Calling it again only updates the level.
+
+    Args:
+        service: Service name included in every record
+        level: Root log level
+        fmt: "json" or "text" (defaults to LOG_FORMAT)
+    """
+    global _listener, _handler
+    root = logging.getLogger()
+    root.setLevel(level)
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler(sys.stderr)
+    if (fmt or LOG_FORMAT) == "text":
+        stream_handler.setFormatter(TextFormatter(service))
+    else:
+        stream_handler.setFormatter(JSONFormatter(service))
+
+    log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    _handler = BoundedQueueHandler(log_queue)
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=False)
+
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_handler)
+    for name in UVICORN_LOGGERS:
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers = []
+        uvicorn_logger.propagate = True
+
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Flush the queued records and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def dropped_records() -> int:
+    """Records dropped since the last one that fit in the queue."""
+    return _handler.dropped if _handler is not None else 0
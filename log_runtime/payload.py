@@ -0,0 +1,38 @@
+"""
+Sampling of verbose payloads (tool output, service responses).
+"""
+import itertools
+import logging
+from typing import Any, Dict
+
+from .config import LOG_PAYLOAD_SAMPLE_EVERY
+
+_counters: Dict[str, "itertools.count"] = {}
+
+
+def should_sample(key: str, every: int = LOG_PAYLOAD_SAMPLE_EVERY) -> bool:
+    """True for the first call and then one of every ``every`` calls with the same key."""
+    if every <= 1:
+        return True
+    counter = _counters.setdefault(key, itertools.count())
+    return next(counter) % every == 0
+
+
+def log_payload(logger: logging.Logger, key: str, message: str, payload: Any) -> None:
+    """
+    Log a verbose payload without flooding the log.
+
+    With DEBUG enabled every payload is logged; otherwise one of every
+    LOG_PAYLOAD_SAMPLE_EVERY payloads with the same key is logged at INFO.
+    The payload goes in the ``payload`` field and is capped like any other.
+
+    Args:
+        logger: Logger to use
+        key: Sampling key (e.g. "slither.response")
+        message: Log message
+        payload: Payload to log
+    """
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(message, extra={"payload": payload, "payload_key": key})
+    elif logger.isEnabledFor(logging.INFO) and should_sample(key):
+        logger.info(message, extra={"payload": payload, "payload_key": key, "sampled": True})
@@ -1,104 +1,283 @@
 import os
-import subprocess
+import re
+import json
 import logging
-from fastapi import FastAPI, Body
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
+from typing import Optional
 
-app = FastAPI(title="Medusa Fuzzing Service")
-
-logging.basicConfig(
-    level=logging.INFO,
-    format="[%(asctime)s] %(levelname)s medusa_service - %(message)s"
+from tool_runtime import (
+    CPU_QUOTA, AnalysisRequest, CoverageMonitor, Invocation, RunOutcome, ToolSpec, create_app
 )
+
 logger = logging.getLogger(__name__)
 
-class AnalysisRequest(BaseModel):
-    analysis_id: str
-    filename: str
 
-WORKSPACE_DIR = "/workspace"
+class MedusaRequest(AnalysisRequest):
+    # Parámetros opcionales de la campaña (validados contra los máximos del servidor)
+    test_limit: Optional[int] = None
+    seq_len: Optional[int] = None
+    workers: Optional[int] = None
+    # Segundos sin crecimiento de cobertura antes de detener la campaña (0 = desactivado)
+    plateau_window: Optional[int] = None
 
 
-def log_command_output(command: str, result: subprocess.CompletedProcess) -> None:
-    """Log Medusa execution details for visibility."""
-    logger.info("Command: %s", command)
-    logger.info("Exit code: %s", result.returncode)
-    stdout = result.stdout if result.stdout else "<empty>"
-    stderr = result.stderr if result.stderr else "<empty>"
-    logger.info("STDOUT:\n%s", stdout)
-    logger.info("STDERR:\n%s", stderr)
+TEST_RESULT_RE = re.compile(r"\[(?P<status>PASSED|FAILED)\]\s+(?P<kind>[^:]+):\s+(?P<name>.+?)\s*$")
+SUMMARY_RE = re.compile(r"(\d+)\s+test\(s\)\s+passed,\s+(\d+)\s+test\(s\)\s+failed")
+PROGRESS_RE = re.compile(r"fuzz:\s+elapsed:\s+(?P<elapsed>[^,]+),\s+calls:\s+(?P<calls>\d+)(?P<rest>.*)$")
+MONITOR_RE = re.compile(
+    r"fuzz:\s+elapsed:.*?(?:branches hit|coverage):\s+(?P<coverage>\d+),\s+corpus:\s+(?P<corpus>\d+)"
+)
+CALL_RE = re.compile(r"^\s*\d+\)\s+(?P<call>.+?)\s*$")
+COVERAGE_RE = re.compile(r"(?:branches hit|coverage):\s+(\d+)")
+CORPUS_RE = re.compile(r"corpus:\s+(\d+)")
 
-@app.post("/analyze")
-async def analyze(request: AnalysisRequest = Body(...)):
+
+def build_project_config(contract_path: str, campaign: dict, crytic_args: Optional[list] = None) -> dict:
     """
-    Analiza un contrato con Medusa (fuzzer).
+    Build the Medusa project config for one campaign.
+
+    Medusa applies the file on top of its defaults, so only the fields this
+    service controls are set. crytic_args carries the project layout
+    (remappings, base path) to crytic-compile.
     """
-    contract_path = os.path.join(WORKSPACE_DIR, request.analysis_id, request.filename)
-    
-    if not os.path.exists(contract_path):
-        return JSONResponse(
-            status_code=404,
-            content={
-                "success": False,
-                "error": f"Contract not found: {contract_path}",
-                "error_type": "file_not_found"
-            }
-        )
-    
-    try:
-        # Ejecutar Medusa
-        command = (
-            f"medusa fuzz --compilation-target {contract_path} --test-limit 1000 --no-color"
+    return {
+        "fuzzing": {
+            "workers": campaign["workers"],
+            "timeout": campaign["timeout"],
+            "testLimit": campaign["test_limit"],
+            "callSequenceLength": campaign["seq_len"],
+            "coverageEnabled": True,
+            "testing": {
+                "stopOnFailedTest": False,
+                "assertionTesting": {"enabled": True},
+                "propertyTesting": {"enabled": True},
+            },
+        },
+        "compilation": {
+            "platform": "crytic-compile",
+            "platformConfig": {
+                "target": contract_path,
+                "solcVersion": "",
+                "exportDirectory": "",
+                "args": crytic_args or [],
+            },
+        },
+        "logging": {"level": "info", "logDirectory": "", "noColor": True},
+    }
+
+
+def parse_medusa_output(stdout: str, elapsed: float) -> dict:
+    """Extract test results, failing sequences and throughput from Medusa output."""
+    tests = {}
+    failing_sequences = {}
+    last_failed = None
+    in_sequence = False
+    last_progress = None
+
+    for line in (stdout or "").splitlines():
+        match = TEST_RESULT_RE.search(line)
+        if match:
+            name = match.group("name")
+            status = match.group("status").lower()
+            tests[name] = {"name": name, "kind": match.group("kind").strip(), "status": status}
+            last_failed = name if status == "failed" else None
+            in_sequence = False
+            continue
+        if "[Call Sequence]" in line:
+            in_sequence = last_failed is not None
+            if in_sequence:
+                failing_sequences[last_failed] = []
+            continue
+        if in_sequence:
+            call = CALL_RE.match(line)
+            if call:
+                failing_sequences[last_failed].append(call.group("call"))
+                continue
+            in_sequence = False
+        progress = PROGRESS_RE.search(line)
+        if progress:
+            last_progress = progress
+
+    passed = sum(1 for t in tests.values() if t["status"] == "passed")
+    failed = sum(1 for t in tests.values() if t["status"] == "failed")
+    summary = None
+    for summary in SUMMARY_RE.finditer(stdout or ""):
+        pass
+    if summary:
+        passed, failed = int(summary.group(1)), int(summary.group(2))
+
+    total_calls = None
+    coverage = None
+    corpus_size = None
+    if last_progress:
+        total_calls = int(last_progress.group("calls"))
+        rest = last_progress.group("rest")
+        coverage_match = COVERAGE_RE.search(rest)
+        corpus_match = CORPUS_RE.search(rest)
+        coverage = int(coverage_match.group(1)) if coverage_match else None
+        corpus_size = int(corpus_match.group(1)) if corpus_match else None
+
+    calls_per_second = None
+    if total_calls is not None and elapsed > 0:
+        calls_per_second = round(total_calls / elapsed, 2)
+
+    return {
+        "tests_run": passed + failed,
+        "passed": passed,
+        "failed": failed,
+        "tests": list(tests.values()),
+        "failing_sequences": failing_sequences,
+        "total_calls": total_calls,
+        "calls_per_second": calls_per_second,
+        "coverage": {"branches_hit": coverage},
+        "corpus_size": corpus_size,
+        "elapsed_seconds": round(elapsed, 2),
+    }
+
+
+class MedusaTool(ToolSpec):
+    """Fuzzing con Medusa."""
+
+    name = "medusa"
+    title = "Medusa Fuzzing Service"
+    service_name = "Medusa Fuzzing"
+    request_model = MedusaRequest
+    version_commands = {
+        "medusa": ["medusa", "--version"],
+        "solc": ["solc", "--version"],
+    }
+    # Valores por defecto y máximos de la campaña (configurables por despliegue)
+    defaults = {
+        "DEFAULT_TIMEOUT": 120,
+        "DEFAULT_TEST_LIMIT": 0,
+        "DEFAULT_SEQ_LEN": 100,
+        "MAX_TEST_LIMIT": 5000000,
+        "MAX_SEQ_LEN": 300,
+        "MAX_WORKERS": CPU_QUOTA,
+        # Detención temprana por meseta de cobertura
+        "PLATEAU_WINDOW": 30,
+        "PLATEAU_MIN_RUNTIME": 15,
+        # Margen para la compilación previa a la campaña
+        "COMPILE_GRACE": 60,
+        "MEMORY_LIMIT_MB": 1536,
+        # Cantidad de caracteres de salida cruda devueltos a la API
+        "MAX_OUTPUT_CHARS": 4000,
+    }
+
+    def resolve_campaign(self, request: MedusaRequest) -> dict:
+        """
+        Merge request parameters with server defaults and validate them.
+
+        A test_limit of 0 means the campaign is bounded by its timeout only.
+
+        Raises:
+            ToolError: If a parameter is out of range for this server.
+        """
+        config = self.config
+        campaign = {
+            "timeout": (
+                request.timeout if request.timeout is not None
+                else min(config.DEFAULT_TIMEOUT, config.MAX_TIMEOUT)
+            ),
+            "test_limit": request.test_limit if request.test_limit is not None else config.DEFAULT_TEST_LIMIT,
+            "seq_len": request.seq_len if request.seq_len is not None else config.DEFAULT_SEQ_LEN,
+            "workers": request.workers if request.workers is not None else min(CPU_QUOTA, config.MAX_WORKERS),
+            "plateau_window": (
+                request.plateau_window if request.plateau_window is not None else config.PLATEAU_WINDOW
+            ),
+        }
+        limits = {
+            "timeout": (1, config.MAX_TIMEOUT),
+            "test_limit": (0, config.MAX_TEST_LIMIT),
+            "seq_len": (1, config.MAX_SEQ_LEN),
+            "workers": (1, config.MAX_WORKERS),
+        }
+        for key, (minimum, maximum) in limits.items():
+            if not minimum <= campaign[key] <= maximum:
+                raise self.invalid(f"{key} must be between {minimum} and {maximum}")
+        if not 0 <= campaign["plateau_window"] <= campaign["timeout"]:
+            raise self.invalid("plateau_window must be between 0 and timeout")
+        return campaign
+
+    def prepare(self, request: MedusaRequest) -> Invocation:
+        contract_path = self.require_path(self.contract_path(request))
+        campaign = self.resolve_campaign(request)
+
+        # Generar la configuración del proyecto para esta campaña
+        contract_dir = self.contract_dir(request)
+        config_path = os.path.join(contract_dir, "medusa.json")
+        with open(config_path, "w") as f:
+            json.dump(
+                build_project_config(contract_path, campaign, self.crytic_compile_args(request)), f, indent=2
+            )
+
+        run_timeout = campaign["timeout"] + self.config.COMPILE_GRACE
+        return Invocation(
+            ["medusa", "fuzz", "--config", config_path, "--no-color"],
+            run_timeout,
+            cpu_seconds=run_timeout * campaign["workers"],
+            cwd=contract_dir,
+            # Límite blando del runtime de Go por debajo del rlimit de memoria
+            env={**os.environ, "GOMEMLIMIT": f"{int(self.config.MEMORY_LIMIT_MB * 0.9)}MiB"},
+            monitor=CoverageMonitor(
+                MONITOR_RE, campaign["plateau_window"], self.config.PLATEAU_MIN_RUNTIME
+            ),
+            context={"campaign": campaign},
+            error_fields={"campaign": campaign}
         )
-        result = subprocess.run(
-            ["bash", "-c", command],
-            capture_output=True,
-            text=True,
-            timeout=300,
-            cwd=os.path.dirname(contract_path)
+
+    def parse_result(self, request: MedusaRequest, invocation: Invocation, outcome: RunOutcome) -> dict:
+        result = outcome.process
+        results = parse_medusa_output(result.stdout, outcome.elapsed)
+        # Una campaña detenida por meseta termina con la señal de interrupción
+        is_success = (
+            result.returncode == 0
+            or (outcome.stop_reason == "plateau" and not results["failed"])
         )
-        log_command_output(command, result)
-        
-        is_success = (result.returncode == 0)
         error_type = None
-        
+
         if not is_success:
             stderr_lower = result.stderr.lower()
-            if "compilation failed" in stderr_lower:
+            if outcome.usage["limit_exceeded"]:
+                error_type = "resource_limit_exceeded"
+            elif results["failed"]:
+                error_type = "tests_failed"
+            elif "compilation failed" in stderr_lower:
                 error_type = "compilation_error"
             elif "not found" in stderr_lower:
                 error_type = "tool_not_found"
             else:
                 error_type = "analysis_error"
-        
+
         return {
             "success": is_success,
-            "command": f"medusa fuzz --compilation-target {contract_path} --test-limit 1000",
+            "command": invocation.display_command,
             "stdout": result.stdout,
             "stderr": result.stderr,
             "exit_code": result.returncode,
-            "error_type": error_type
-        }
-        
-    except subprocess.TimeoutExpired:
-        logger.exception("Medusa analysis timed out for %s", contract_path)
-        return {
-            "success": False,
-            "error": "Analysis timed out",
-            "error_type": "timeout"
+            "resource_usage": outcome.usage,
+            "error_type": error_type,
+            "campaign": invocation.context["campaign"],
+            "stop_reason": outcome.stop_reason,
+            "monitor": invocation.monitor.summary(),
+            "results": results
         }
-    except Exception as e:
-        logger.exception("Unexpected Medusa error for %s", contract_path)
+
+    def warmup_options(self) -> dict:
+        return {"timeout": 10, "test_limit": 1000, "workers": 1, "plateau_window": 0}
+
+    def info(self) -> dict:
         return {
-            "success": False,
-            "error": f"Unexpected error: {str(e)}",
-            "error_type": "unexpected_error"
+            "cpu_quota": CPU_QUOTA,
+            "limits": {
+                "timeout": self.config.MAX_TIMEOUT,
+                "test_limit": self.config.MAX_TEST_LIMIT,
+                "seq_len": self.config.MAX_SEQ_LEN,
+                "workers": self.config.MAX_WORKERS
+            }
         }
 
-@app.get("/")
-async def root():
-    return {"service": "Medusa Fuzzing", "version": "1.0"}
+
+app = create_app(MedusaTool())
 
 if __name__ == "__main__":
     import uvicorn
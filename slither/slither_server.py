@@ -1,25 +1,14 @@
 import os
-import subprocess
 import json
 import logging
 from typing import Optional
-from fastapi import FastAPI, Body
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="[%(asctime)s] %(levelname)s slither_service - %(message)s"
+from log_runtime import log_payload
+from tool_runtime import (
+    AnalysisRequest, Invocation, RunOutcome, ToolSpec, create_app
 )
-logger = logging.getLogger(__name__)
-
-app = FastAPI(title="Slither Analysis Service")
-
-class AnalysisRequest(BaseModel):
-    analysis_id: str
-    filename: str
 
-WORKSPACE_DIR = "/workspace"
+logger = logging.getLogger(__name__)
 
 
 def summarize_detectors(generated_json: Optional[dict]) -> list:
@@ -44,21 +33,12 @@ def summarize_detectors(generated_json: Optional[dict]) -> list:
     return detectors_summary
 
 
-def log_command_output(command: str, result: subprocess.CompletedProcess) -> None:
-    """Log command execution details for observability."""
-    logger.info("Command: %s", command)
-    logger.info("Exit code: %s", result.returncode)
-    stdout = result.stdout if result.stdout else "<empty>"
-    stderr = result.stderr if result.stderr else "<empty>"
-    logger.info("STDOUT:\n%s", stdout)
-    logger.info("STDERR:\n%s", stderr)
-
 def classify_error(result):
     """
     Clasifica el tipo de error de Slither.
     """
     stderr_lower = result.stderr.lower()
-    
+
     if "compilation failed" in stderr_lower or "compilation error" in stderr_lower:
         return "compilation_error"
     elif "syntax error" in stderr_lower:
@@ -69,37 +49,49 @@ def classify_error(result):
     else:
         return "unknown_error"
 
-@app.post("/analyze")
-async def analyze(request: AnalysisRequest = Body(...)):
-    """
-    Analiza un contrato con Slither.
-    """
-    contract_path = os.path.join(WORKSPACE_DIR, request.analysis_id, request.filename)
-    output_json = os.path.join(WORKSPACE_DIR, request.analysis_id, "slither-report.json")
-    
-    if not os.path.exists(contract_path):
-        return JSONResponse(
-            status_code=404,
-            content={
-                "success": False,
-                "error": f"Contract not found: {contract_path}",
-                "error_type": "file_not_found"
+
+class SlitherTool(ToolSpec):
+    """Análisis estático con Slither."""
+
+    name = "slither"
+    title = "Slither Analysis Service"
+    service_name = "Slither Analysis"
+    version_commands = {
+        "slither": ["slither", "--version"],
+        "solc": ["solc", "--version"],
+    }
+    defaults = {
+        "MEMORY_LIMIT_MB": 768,
+        # El reporte completo ya queda en slither-report.json
+        "LOG_OUTPUT": False,
+        "CACHE_ENABLED": True,
+    }
+
+    def prepare(self, request: AnalysisRequest) -> Invocation:
+        contract_path = self.require_path(self.contract_path(request))
+        timeout = self.resolve_timeout(request)
+        output_json = os.path.join(self.contract_dir(request), "slither-report.json")
+        return Invocation(
+            ["slither", contract_path, "--json", output_json] + self.crytic_compile_args(request),
+            timeout,
+            context={"output_json": output_json},
+            error_fields={
+                "stdout": "",
+                "stderr": "",
+                "exit_code": None,
+                "results": {"detectors": []}
             }
         )
 
-    command_str = f"slither {contract_path} --json {output_json}"
-    try:
-        command = ["slither", contract_path, "--json", output_json]
-        result = subprocess.run(
-            command,
-            capture_output=True,
-            text=True,
-            timeout=300
-        )
-        # log_command_output("slither " + " ".join(command[1:]), result)
+    def parse_result(self, request: AnalysisRequest, invocation: Invocation, outcome: RunOutcome) -> dict:
+        result = outcome.process
         error_type = classify_error(result)
         is_success = (result.returncode <= 255)
+        if outcome.usage["limit_exceeded"]:
+            error_type = "resource_limit_exceeded"
+            is_success = False
 
+        output_json = invocation.context["output_json"]
         generated_json = None
         if os.path.exists(output_json):
             try:
@@ -111,46 +103,25 @@ async def analyze(request: AnalysisRequest = Body(...)):
         detectors = summarize_detectors(generated_json)
         response_payload = {
             "success": is_success,
-            "command": command_str,
+            "command": invocation.display_command,
             "stdout": result.stdout,
             "stderr": result.stderr,
             "error_type": error_type if not is_success else None,
             "exit_code": result.returncode,
+            "resource_usage": outcome.usage,
             "results": {
                 "detectors": detectors
             }
         }
-        logger.info("📤 RESPONSE TO API (RAW): %s", response_payload)
+        logger.info(
+            "Slither finished for %s: %d detectors", request.analysis_id, len(detectors),
+            extra={"success": is_success, "error_type": response_payload["error_type"]}
+        )
+        log_payload(logger, "slither.response", "Response to API", response_payload)
         return response_payload
 
-    except subprocess.TimeoutExpired:
-        response_payload = {
-            "success": False,
-            "command": command_str,
-            "stdout": "",
-            "stderr": "",
-            "error_type": "timeout",
-            "exit_code": None,
-            "results": {"detectors": []}
-        }
-        logger.info("📤 RESPONSE TO API (RAW): %s", response_payload)
-        return response_payload
-    except Exception as e:
-        response_payload = {
-            "success": False,
-            "command": command_str,
-            "stdout": "",
-            "stderr": str(e),
-            "error_type": "unexpected_error",
-            "exit_code": None,
-            "results": {"detectors": []}
-        }
-        logger.info("📤 RESPONSE TO API (RAW): %s", response_payload)
-        return response_payload
 
-@app.get("/")
-async def root():
-    return {"service": "Slither Analysis", "version": "1.0"}
+app = create_app(SlitherTool())
 
 if __name__ == "__main__":
     import uvicorn
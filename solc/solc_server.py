@@ -1,108 +1,63 @@
-import os
-import subprocess
-import json
 import logging
-from fastapi import FastAPI, Body
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
 
-app = FastAPI(title="Solc Compilation Service")
-
-logging.basicConfig(
-    level=logging.INFO,
-    format="[%(asctime)s] %(levelname)s solc_service - %(message)s"
+from tool_runtime import (
+    AnalysisRequest, Invocation, RunOutcome, ToolSpec, create_app
 )
+
 logger = logging.getLogger(__name__)
 
-class AnalysisRequest(BaseModel):
-    analysis_id: str
-    filename: str
 
-WORKSPACE_DIR = "/workspace"
+class SolcTool(ToolSpec):
+    """Compilación con Solc."""
 
+    name = "solc"
+    title = "Solc Compilation Service"
+    service_name = "Solc Compiler"
+    version_commands = {"solc": ["solc", "--version"]}
+    defaults = {
+        "MEMORY_LIMIT_MB": 384,
+        "MAX_CONCURRENCY": 2,
+        "CACHE_ENABLED": True,
+    }
 
-def log_command_output(command: str, result: subprocess.CompletedProcess) -> None:
-    """Log complete Solc command output for troubleshooting."""
-    logger.info("Command: %s", command)
-    logger.info("Exit code: %s", result.returncode)
-    stdout = result.stdout if result.stdout else "<empty>"
-    stderr = result.stderr if result.stderr else "<empty>"
-    logger.info("STDOUT:\n%s", stdout)
-    logger.info("STDERR:\n%s", stderr)
+    def prepare(self, request: AnalysisRequest) -> Invocation:
+        contract_path = self.require_path(self.contract_path(request))
+        timeout = self.resolve_timeout(request)
+        command = ["solc", "--combined-json", "abi,bin,ast"]
+        if request.remappings is not None:
+            # Proyecto: los imports se resuelven dentro del workspace
+            contract_dir = self.contract_dir(request)
+            command += ["--base-path", contract_dir, "--allow-paths", contract_dir]
+            command += self.remapping_args(request)
+        return Invocation(command + [contract_path], timeout)
 
-@app.post("/analyze")
-async def analyze(request: AnalysisRequest = Body(...)):
-    """
-    Compila un contrato con Solc.
-    """
-    contract_path = os.path.join(WORKSPACE_DIR, request.analysis_id, request.filename)
-    
-    if not os.path.exists(contract_path):
-        return JSONResponse(
-            status_code=404,
-            content={
-                "success": False,
-                "error": f"Contract not found: {contract_path}",
-                "error_type": "file_not_found"
-            }
-        )
-    
-    try:
-        # Ejecutar Solc
-        command = ["solc", "--combined-json", "abi,bin,ast", contract_path]
-        result = subprocess.run(
-            command,
-            capture_output=True,
-            text=True,
-            timeout=300
-        )
-        log_command_output(" ".join(command), result)
-        
+    def parse_result(self, request: AnalysisRequest, invocation: Invocation, outcome: RunOutcome) -> dict:
+        result = outcome.process
         is_success = (result.returncode == 0)
         error_type = None
-        compiled_json = None
-        
-        if is_success:
-            # Intentar parsear la salida JSON
-            try:
-                compiled_json = json.loads(result.stdout)
-            except:
-                compiled_json = {"raw": result.stdout}
-        else:
+
+        if not is_success:
             stderr_lower = result.stderr.lower()
-            if "compilation failed" in stderr_lower or "error" in stderr_lower:
+            if outcome.usage["limit_exceeded"]:
+                error_type = "resource_limit_exceeded"
+            elif "compilation failed" in stderr_lower or "error" in stderr_lower:
                 error_type = "compilation_error"
             elif "not found" in stderr_lower:
                 error_type = "tool_not_found"
             else:
                 error_type = "compilation_error"
-        
+
         return {
             "success": is_success,
-            "command": f"solc --combined-json abi,bin,ast {contract_path}",
+            "command": invocation.display_command,
             "stderr": result.stderr,
             "exit_code": result.returncode,
+            "resource_usage": outcome.usage,
             "error_type": error_type
         }
-        
-    except subprocess.TimeoutExpired:
-        logger.exception("Solc analysis timed out for %s", contract_path)
-        return {
-            "success": False,
-            "error": "Compilation timed out",
-            "error_type": "timeout"
-        }
-    except Exception as e:
-        logger.exception("Unexpected Solc error for %s", contract_path)
-        return {
-            "success": False,
-            "error": f"Unexpected error: {str(e)}",
-            "error_type": "unexpected_error"
-        }
 
-@app.get("/")
-async def root():
-    return {"service": "Solc Compiler", "version": "1.0"}
+
+app = create_app(SolcTool())
 
 if __name__ == "__main__":
     import uvicorn
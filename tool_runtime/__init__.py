@@ -0,0 +1,26 @@
+"""
+Shared runtime of the tool services (Slither, Solc, Medusa, Echidna).
+
+A service declares a ToolSpec (request model, command builder and result
+parser) and gets its FastAPI app from create_app().
+"""
+from .app import ToolRuntime, create_app, encode_event
+from .config import CPU_QUOTA, WORKSPACE_DIR, ToolConfig
+from .monitor import CoverageMonitor
+from .process import Invocation, RunOutcome
+from .spec import AnalysisRequest, ToolError, ToolSpec
+
+__all__ = [
+    "AnalysisRequest",
+    "CPU_QUOTA",
+    "CoverageMonitor",
+    "Invocation",
+    "RunOutcome",
+    "ToolConfig",
+    "ToolError",
+    "ToolRuntime",
+    "ToolSpec",
+    "WORKSPACE_DIR",
+    "create_app",
+    "encode_event",
+]
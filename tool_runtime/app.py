@@ -0,0 +1,481 @@
+"""
+FastAPI application shared by the tool services.
+"""
+import os
+import json
+import math
+import time
+import shutil
+import asyncio
+import logging
+import subprocess
+from typing import Dict, Optional, Set, Union
+
+from fastapi import FastAPI, Body
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from log_runtime import log_payload, setup_logging
+
+from .cache import ResultCache
+from .config import WORKSPACE_DIR
+from .limiter import ConcurrencyLimiter, QueueFullError
+from .metrics import Metrics
+from .output import cap_text
+from .process import Invocation, LineCallback, ProcessRunner, RunOutcome
+from .readiness import WARMUP_CONTRACT, Readiness, tool_version
+from .spec import AnalysisRequest, ToolError, ToolSpec
+
+logger = logging.getLogger(__name__)
+
+
+def log_command_output(command: str, result: subprocess.CompletedProcess) -> None:
+    """
+    Log the tool output to help debugging.
+
+    The exit code and output sizes are always logged; the output itself is
+    a sampled, size-capped payload (see log_runtime.log_payload).
+    """
+    stdout = result.stdout or ""
+    stderr = result.stderr or ""
+    logger.info(
+        "Command finished with exit code %s: %s", result.returncode, command,
+        extra={"stdout_chars": len(stdout), "stderr_chars": len(stderr)}
+    )
+    log_payload(logger, "command_output", "Command output", {"stdout": stdout, "stderr": stderr})
+
+
+def encode_event(event: dict) -> bytes:
+    """Serialize one NDJSON event."""
+    return (json.dumps(event, default=str) + "\n").encode("utf-8")
+
+
+class ToolRuntime:
+    """
+    Execute the requests of one ToolSpec.
+
+    Every request goes through the same pipeline: prepare (validation and
+    command), result cache, concurrency slot, process run, parse_result and
+    output caps. Metrics are recorded at each step.
+    """
+
+    def __init__(self, spec: ToolSpec):
+        self.spec = spec
+        self.config = spec.config
+        self.runner = ProcessRunner(self.config)
+        self.limiter = ConcurrencyLimiter(self.config.MAX_CONCURRENCY, self.config.MAX_QUEUE)
+        self.cache = (
+            ResultCache(self.config.CACHE_SIZE, self.config.CACHE_TTL)
+            if self.config.CACHE_ENABLED else None
+        )
+        self.metrics = Metrics()
+        self.readiness = Readiness()
+        self._warmup_task: Optional[asyncio.Task] = None
+        # Tareas esperando turno por analysis_id, para poder cancelarlas en cola
+        self._waiting: Dict[str, Set[asyncio.Task]] = {}
+        self._cancelled_waiting: Set[asyncio.Task] = set()
+
+    async def execute(
+        self,
+        request: AnalysisRequest,
+        on_line: Optional[LineCallback] = None,
+        state: Optional[dict] = None
+    ) -> Union[dict, JSONResponse]:
+        """
+        Run the tool for one request.
+
+        on_line receives every output line of the tool and state exposes the
+        progress of the run to /analyze/stream.
+        """
+        spec = self.spec
+        loop = asyncio.get_event_loop()
+        self.metrics.incr("requests")
+
+        try:
+            invocation = await loop.run_in_executor(None, spec.prepare, request)
+        except ToolError as exc:
+            self.metrics.incr(f"rejected_{exc.error_type}")
+            return exc.response()
+        except Exception as e:
+            logger.exception("Could not prepare %s run for %s", spec.name, request.analysis_id)
+            self.metrics.incr("errors")
+            return {
+                "success": False,
+                "error": f"Unexpected error: {str(e)}",
+                "error_type": "unexpected_error"
+            }
+        if state is not None:
+            state["invocation"] = invocation
+
+        cache_key = None
+        if self.cache is not None:
+            cache_key = ResultCache.make_key(
+                spec.name,
+                spec.cache_inputs(request),
+                request.model_dump(exclude={"analysis_id", "filename"})
+            )
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                self.metrics.incr("cache_hits")
+                cached["cached"] = True
+                return cached
+
+        queued_at = time.monotonic()
+        try:
+            await self._wait_for_slot(request.analysis_id)
+        except QueueFullError as exc:
+            self.metrics.incr("rejected_queue_full")
+            return JSONResponse(
+                status_code=503,
+                headers={"Retry-After": str(exc.retry_after)},
+                content={
+                    "success": False,
+                    "error": str(exc),
+                    "error_type": "queue_full",
+                    "retry_after": exc.retry_after
+                }
+            )
+        except asyncio.TimeoutError:
+            self.metrics.incr("rejected_queue_timeout")
+            return self._error(invocation, "queue_timeout", "Timed out waiting for a free tool slot")
+        except asyncio.CancelledError:
+            task = asyncio.current_task()
+            if task not in self._cancelled_waiting:
+                raise
+            self._cancelled_waiting.discard(task)
+            self.metrics.incr("cancelled")
+            return self._error(invocation, "cancelled", "Analysis cancelled while queued")
+
+        self.metrics.observe("queue_wait", time.monotonic() - queued_at)
+        if state is not None:
+            state["running"] = True
+        try:
+            result = await self._run(request, invocation, on_line)
+        finally:
+            self.limiter.release()
+
+        if cache_key is not None and result.get("success"):
+            self.cache.put(cache_key, result)
+        return result
+
+    async def _wait_for_slot(self, analysis_id: str) -> None:
+        task = asyncio.current_task()
+        self._waiting.setdefault(analysis_id, set()).add(task)
+        try:
+            await self.limiter.acquire(
+                retry_after=self._retry_after(),
+                timeout=self.config.QUEUE_TIMEOUT or None
+            )
+        finally:
+            waiting = self._waiting.get(analysis_id)
+            if waiting is not None:
+                waiting.discard(task)
+                if not waiting:
+                    del self._waiting[analysis_id]
+
+    def _retry_after(self) -> int:
+        """Seconds until a queued request would likely get a slot."""
+        average_run = self.metrics.average("run", default=self.config.DEFAULT_TIMEOUT / 4)
+        pending = self.limiter.waiting + 1
+        return max(1, math.ceil(average_run * pending / self.limiter.max_concurrency))
+
+    async def _run(
+        self,
+        request: AnalysisRequest,
+        invocation: Invocation,
+        on_line: Optional[LineCallback]
+    ) -> dict:
+        spec = self.spec
+        loop = asyncio.get_event_loop()
+        self.metrics.incr("runs")
+        try:
+            outcome = await loop.run_in_executor(
+                None,
+                lambda: self.runner.run(invocation, request.analysis_id, on_line)
+            )
+        except subprocess.TimeoutExpired:
+            logger.error("%s run timed out for %s", spec.name, request.analysis_id)
+            self.metrics.incr("timeouts")
+            return self._error(
+                invocation, "timeout", "Analysis timed out", stop_reason="timeout"
+            )
+        except Exception as e:
+            logger.exception("Unexpected %s error for %s", spec.name, request.analysis_id)
+            self.metrics.incr("errors")
+            return self._error(invocation, "unexpected_error", f"Unexpected error: {str(e)}")
+
+        self.metrics.observe("run", outcome.elapsed)
+        if self.config.LOG_OUTPUT:
+            log_command_output(invocation.display_command, outcome.process)
+
+        if outcome.stop_reason == "cancelled":
+            logger.info("%s run cancelled for %s", spec.name, request.analysis_id)
+            self.metrics.incr("cancelled")
+            return self._error(invocation, "cancelled", "Analysis cancelled", outcome)
+        if outcome.usage["limit_exceeded"]:
+            self.metrics.incr("limit_exceeded")
+
+        try:
+            result = await loop.run_in_executor(
+                None, spec.parse_result, request, invocation, outcome
+            )
+        except Exception as e:
+            logger.exception("Could not parse %s output for %s", spec.name, request.analysis_id)
+            self.metrics.incr("errors")
+            return self._error(invocation, "unexpected_error", f"Unexpected error: {str(e)}", outcome)
+
+        self.metrics.incr("succeeded" if result.get("success") else "failed")
+        return self._cap_output(result)
+
+    def _error(
+        self,
+        invocation: Invocation,
+        error_type: str,
+        message: str,
+        outcome: Optional[RunOutcome] = None,
+        **fields
+    ) -> dict:
+        """Build an error response with the fields the tool always returns."""
+        payload = {
+            "success": False,
+            "command": invocation.display_command,
+            "error": message,
+            "error_type": error_type,
+        }
+        payload.update(invocation.error_fields)
+        if outcome is not None:
+            payload.update({
+                "exit_code": outcome.returncode,
+                "resource_usage": outcome.usage,
+                "stop_reason": outcome.stop_reason,
+            })
+        payload.update(fields)
+        return payload
+
+    def _cap_output(self, result: dict) -> dict:
+        """Trim raw stdout/stderr in the response to MAX_OUTPUT_CHARS."""
+        truncated = False
+        for key in ("stdout", "stderr"):
+            if isinstance(result.get(key), str):
+                result[key], was_truncated = cap_text(result[key], self.config.MAX_OUTPUT_CHARS)
+                truncated = truncated or was_truncated
+        if "stdout" in result or "stderr" in result:
+            result["output_truncated"] = truncated
+        return result
+
+    def cancel(self, analysis_id: str) -> dict:
+        """Cancel the queued and running executions of analysis_id."""
+        queued = list(self._waiting.get(analysis_id, ()))
+        for task in queued:
+            self._cancelled_waiting.add(task)
+            task.cancel()
+        killed = False
+        # Sin nada en cola, la marca de cancelación alcanza a una ejecución por empezar
+        if not queued or self.runner.has_running(analysis_id):
+            killed = self.runner.cancel(analysis_id)
+        return {"cancelled_queued": len(queued), "killed_running": killed}
+
+    async def warm_up(self) -> None:
+        """
+        Record tool versions and run the warm-up job until it succeeds.
+
+        A failed warm-up is retried every WARMUP_RETRY_INTERVAL seconds; the
+        service reports not ready meanwhile.
+        """
+        spec = self.spec
+        loop = asyncio.get_event_loop()
+        timeout = self.config.VERSION_TIMEOUT
+        for binary, command in spec.version_commands.items():
+            self.readiness.versions[binary] = await loop.run_in_executor(
+                None, tool_version, command, timeout
+            )
+        if not self.config.WARMUP_ENABLED:
+            self.readiness.mark_ready()
+            return
+
+        while True:
+            self.readiness.status = "warming_up"
+            self.readiness.attempts += 1
+            started = time.monotonic()
+            try:
+                result = await self._warmup_once()
+            except Exception as e:
+                logger.exception("%s warm-up failed", spec.name)
+                result = {"success": False, "error": str(e), "error_type": "unexpected_error"}
+            if isinstance(result, JSONResponse):
+                result = json.loads(result.body)
+
+            self.readiness.warmup = {
+                "success": bool(result.get("success")),
+                "error_type": result.get("error_type"),
+                "seconds": round(time.monotonic() - started, 2),
+            }
+            if result.get("success"):
+                self.readiness.mark_ready()
+                logger.info("%s ready after warm-up (%ss)", spec.name, self.readiness.warmup["seconds"])
+                return
+            self.readiness.status = "failed"
+            logger.warning(
+                "%s warm-up failed (%s); retrying in %ss",
+                spec.name, result.get("error") or result.get("error_type"),
+                self.config.WARMUP_RETRY_INTERVAL
+            )
+            await asyncio.sleep(self.config.WARMUP_RETRY_INTERVAL)
+
+    async def _warmup_once(self) -> Union[dict, JSONResponse]:
+        analysis_id = f".warmup-{self.spec.name}"
+        warmup_dir = os.path.join(WORKSPACE_DIR, analysis_id)
+        filename = os.path.basename(WARMUP_CONTRACT)
+        os.makedirs(warmup_dir, exist_ok=True)
+        shutil.copy(WARMUP_CONTRACT, os.path.join(warmup_dir, filename))
+        request = self.spec.request_model(
+            analysis_id=analysis_id, filename=filename, **self.spec.warmup_options()
+        )
+        return await self.execute(request)
+
+    def snapshot(self) -> dict:
+        return {
+            "service": self.spec.service_name,
+            "ready": self.readiness.ready,
+            "running_processes": self.runner.running_count(),
+            "limiter": self.limiter.snapshot(),
+            "cache": self.cache.snapshot() if self.cache is not None else None,
+            **self.metrics.snapshot(),
+        }
+
+
+def create_app(spec: ToolSpec) -> FastAPI:
+    """
+    Build the FastAPI application of a tool service.
+
+    Endpoints: POST /analyze, POST /analyze/stream, POST /cancel/{analysis_id},
+    GET /health, GET /ready, GET /metrics and GET /. The warm-up job starts
+    in the background when the server starts.
+    """
+    setup_logging(f"{spec.name}_service")
+    runtime = ToolRuntime(spec)
+    request_model = spec.request_model
+    app = FastAPI(title=spec.title)
+    app.state.runtime = runtime
+
+    @app.on_event("startup")
+    async def start_warmup():
+        runtime._warmup_task = asyncio.ensure_future(runtime.warm_up())
+
+    @app.on_event("shutdown")
+    async def stop_warmup():
+        if runtime._warmup_task is not None and not runtime._warmup_task.done():
+            runtime._warmup_task.cancel()
+
+    @app.post("/analyze")
+    async def analyze(request: request_model = Body(...)):
+        """
+        Analiza un contrato con la herramienta del servicio.
+        """
+        return await runtime.execute(request)
+
+    @app.post("/analyze/stream")
+    async def analyze_stream(request: request_model = Body(...)):
+        """
+        Variante de /analyze que emite el progreso como NDJSON.
+
+        Eventos: started, output (una línea de stdout/stderr), stats (periódico),
+        y al final result o error. Si el cliente corta la conexión, el proceso de
+        la herramienta se termina de inmediato.
+        """
+        loop = asyncio.get_event_loop()
+        events: asyncio.Queue = asyncio.Queue()
+        state: dict = {}
+
+        def on_line(stream_name: str, line: str) -> None:
+            loop.call_soon_threadsafe(
+                events.put_nowait,
+                {"event": "output", "stream": stream_name, "line": line.rstrip("\n")}
+            )
+
+        async def generate():
+            started = time.monotonic()
+            task = asyncio.ensure_future(runtime.execute(request, on_line, state))
+            try:
+                yield encode_event({"event": "started", "analysis_id": request.analysis_id})
+                while True:
+                    getter = asyncio.ensure_future(events.get())
+                    done, _ = await asyncio.wait(
+                        {getter, task},
+                        timeout=spec.config.STREAM_STATS_INTERVAL,
+                        return_when=asyncio.FIRST_COMPLETED
+                    )
+                    if getter in done:
+                        yield encode_event(getter.result())
+                        continue
+                    getter.cancel()
+                    if task in done:
+                        break
+                    stats = {
+                        "event": "stats",
+                        "elapsed_seconds": round(time.monotonic() - started, 2),
+                        "queued": not state.get("running", False),
+                    }
+                    invocation = state.get("invocation")
+                    if invocation is not None and invocation.monitor is not None:
+                        stats["monitor"] = invocation.monitor.summary()
+                    yield encode_event(stats)
+
+                while not events.empty():
+                    yield encode_event(events.get_nowait())
+                result = task.result()
+                if isinstance(result, JSONResponse):
+                    yield encode_event({
+                        "event": "error",
+                        "status_code": result.status_code,
+                        "result": json.loads(result.body)
+                    })
+                else:
+                    yield encode_event({"event": "result", "result": result})
+            finally:
+                if not task.done():
+                    logger.info("Stream closed early; cancelling %s", request.analysis_id)
+                    if state.get("running"):
+                        runtime.runner.cancel(request.analysis_id)
+                    else:
+                        task.cancel()
+
+        return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+    @app.post("/cancel/{analysis_id}")
+    async def cancel(analysis_id: str):
+        """
+        Cancela la ejecución en curso (o en cola) de analysis_id y mata su árbol de procesos.
+        """
+        return {"analysis_id": analysis_id, "cancelled": True, **runtime.cancel(analysis_id)}
+
+    @app.get("/health")
+    async def health():
+        """
+        Liveness: el proceso del servicio responde.
+        """
+        return {"status": "ok", "service": spec.service_name}
+
+    @app.get("/ready")
+    async def ready():
+        """
+        Readiness: el warm-up terminó y la herramienta puede recibir análisis.
+
+        Responde 503 mientras el warm-up está en curso o falló.
+        """
+        snapshot = {"service": spec.service_name, **runtime.readiness.snapshot()}
+        if not runtime.readiness.ready:
+            return JSONResponse(status_code=503, content=snapshot)
+        return snapshot
+
+    @app.get("/metrics")
+    async def metrics():
+        """
+        Contadores, tiempos, estado de la cola y de la caché del servicio.
+        """
+        return runtime.snapshot()
+
+    @app.get("/")
+    async def root():
+        return {"service": spec.service_name, "version": spec.version, **spec.info()}
+
+    return app
@@ -0,0 +1,64 @@
+"""
+In-memory cache of tool results keyed by input content and options.
+"""
+import copy
+import json
+import time
+import hashlib
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+
+class ResultCache:
+    """
+    LRU cache of successful tool results with a time-to-live.
+
+    Keys hash the bytes of the input files together with the request options,
+    so the same contract re-analysed under a new analysis_id is a hit.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(tool: str, paths: Iterable[str], options: dict) -> str:
+        digest = hashlib.sha256(tool.encode("utf-8"))
+        for path in paths:
+            digest.update(b"\0" + path.rsplit("/", 1)[-1].encode("utf-8") + b"\0")
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(65536), b""):
+                    digest.update(chunk)
+        digest.update(json.dumps(options, sort_keys=True, default=str).encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[dict]:
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry[0] > self.ttl:
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return copy.deepcopy(entry[1])
+
+    def put(self, key: str, value: dict) -> None:
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = (time.monotonic(), copy.deepcopy(value))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def snapshot(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
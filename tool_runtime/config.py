@@ -0,0 +1,102 @@
+"""
+Per-tool configuration read from environment variables.
+"""
+import os
+from typing import Any, Dict
+
+
+def detect_cpu_quota() -> int:
+    """Return the number of CPUs granted to the container by its cgroup quota."""
+    # cgroup v2: "<quota> <period>" o "max <period>"
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()[:2]
+        if quota != "max":
+            return max(1, int(quota) // int(period))
+    except (OSError, ValueError):
+        pass
+    # cgroup v1
+    try:
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read().strip())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read().strip())
+        if quota > 0 and period > 0:
+            return max(1, quota // period)
+    except (OSError, ValueError):
+        pass
+    try:
+        return max(1, len(os.sched_getaffinity(0)))
+    except AttributeError:
+        return max(1, os.cpu_count() or 1)
+
+
+CPU_QUOTA = detect_cpu_quota()
+
+WORKSPACE_DIR = os.getenv("WORKSPACE_DIR", "/workspace")
+
+# Valores comunes a todas las herramientas; cada una puede redefinirlos
+RUNTIME_DEFAULTS: Dict[str, Any] = {
+    # Timeout de la ejecución solicitado por la API
+    "DEFAULT_TIMEOUT": 300,
+    "MAX_TIMEOUT": 600,
+    # Ejecuciones simultáneas y solicitudes en espera
+    "MAX_CONCURRENCY": 1,
+    "MAX_QUEUE": 16,
+    "QUEUE_TIMEOUT": 600.0,
+    # Salida capturada en memoria y salida devuelta en la respuesta
+    "MAX_CAPTURE_CHARS": 32 * 1024 * 1024,
+    "MAX_OUTPUT_CHARS": 200000,
+    "LOG_OUTPUT": True,
+    # Caché de resultados por contenido del contrato y parámetros
+    "CACHE_ENABLED": False,
+    "CACHE_SIZE": 128,
+    "CACHE_TTL": 3600,
+    # Límites de recursos por ejecución; CPU_TIME_LIMIT 0 = derivado del timeout
+    "MEMORY_LIMIT_MB": 1024,
+    "FILE_SIZE_LIMIT_MB": 256,
+    "CPU_TIME_LIMIT": 0,
+    # Intervalo entre eventos "stats" de /analyze/stream
+    "STREAM_STATS_INTERVAL": 2.0,
+    # Espera tras SIGINT antes de matar el proceso
+    "STOP_GRACE": 20,
+    # Warm-up al arrancar: el servicio no está listo hasta completarlo
+    "WARMUP_ENABLED": True,
+    "WARMUP_RETRY_INTERVAL": 30.0,
+    "VERSION_TIMEOUT": 30.0,
+}
+
+
+class ToolConfig:
+    """
+    Environment-backed settings of one tool service.
+
+    Each key is read from ``{PREFIX}_{KEY}`` and falls back to the tool
+    defaults, then to RUNTIME_DEFAULTS. Values keep the type of their default.
+    """
+
+    def __init__(self, prefix: str, defaults: Dict[str, Any]):
+        self.prefix = prefix
+        self._values: Dict[str, Any] = {}
+        for key, default in {**RUNTIME_DEFAULTS, **defaults}.items():
+            self._values[key] = self._read(f"{prefix}_{key}", default)
+
+    @staticmethod
+    def _read(env_name: str, default: Any) -> Any:
+        raw = os.getenv(env_name)
+        if raw is None:
+            return default
+        if isinstance(default, bool):
+            return raw.strip().lower() in ("1", "true", "yes", "on")
+        if default is None:
+            return raw
+        return type(default)(raw)
+
+    def __getattr__(self, key: str) -> Any:
+        try:
+            return self._values[key]
+        except KeyError:
+            raise AttributeError(f"{self.prefix} has no setting {key}") from None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return dict(self._values)
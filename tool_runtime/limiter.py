@@ -0,0 +1,62 @@
+"""
+Concurrency limiter with a bounded wait queue.
+"""
+import asyncio
+from typing import Optional
+
+
+class QueueFullError(Exception):
+    """Raised when both the running slots and the wait queue are full."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Tool queue is full; retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class ConcurrencyLimiter:
+    """
+    Bound the number of tool runs executing at once.
+
+    Up to `max_queue` requests wait for a slot in FIFO order; beyond that new
+    requests are rejected with QueueFullError instead of piling up.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.active = 0
+        self.waiting = 0
+        # Se crea al primer uso para quedar ligado al loop del servidor
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def acquire(self, retry_after: int = 1, timeout: Optional[float] = None) -> None:
+        """
+        Wait for an execution slot.
+
+        Raises:
+            QueueFullError: If the wait queue is full.
+            asyncio.TimeoutError: If no slot frees up within timeout.
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        if self.active >= self.max_concurrency and self.waiting >= self.max_queue:
+            raise QueueFullError(retry_after)
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=timeout)
+        finally:
+            self.waiting -= 1
+        self.active += 1
+
+    def release(self) -> None:
+        self.active -= 1
+        self._semaphore.release()
+
+    def snapshot(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "waiting": self.waiting,
+        }
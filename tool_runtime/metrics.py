@@ -0,0 +1,44 @@
+"""
+Counters and duration summaries exposed by GET /metrics.
+"""
+import time
+from collections import defaultdict
+from typing import Dict
+
+
+class Metrics:
+    """Process-local counters and timing summaries of one tool service."""
+
+    def __init__(self):
+        self.started = time.time()
+        self.counters: Dict[str, int] = defaultdict(int)
+        self.timings: Dict[str, dict] = {}
+
+    def incr(self, name: str, value: int = 1) -> None:
+        self.counters[name] += value
+
+    def observe(self, name: str, seconds: float) -> None:
+        timing = self.timings.setdefault(name, {"count": 0, "total": 0.0, "max": 0.0})
+        timing["count"] += 1
+        timing["total"] += seconds
+        timing["max"] = max(timing["max"], seconds)
+
+    def average(self, name: str, default: float = 0.0) -> float:
+        timing = self.timings.get(name)
+        if not timing or not timing["count"]:
+            return default
+        return timing["total"] / timing["count"]
+
+    def snapshot(self) -> dict:
+        return {
+            "uptime_seconds": round(time.time() - self.started, 1),
+            "counters": dict(self.counters),
+            "timings": {
+                name: {
+                    "count": timing["count"],
+                    "avg_seconds": round(timing["total"] / timing["count"], 3),
+                    "max_seconds": round(timing["max"], 3),
+                }
+                for name, timing in self.timings.items() if timing["count"]
+            },
+        }
@@ -0,0 +1,51 @@
+"""
+Coverage plateau detection for fuzzing campaigns.
+"""
+import time
+
+
+class CoverageMonitor:
+    """
+    Track coverage and corpus growth from the fuzzer progress lines.
+
+    The campaign is considered plateaued once neither value has grown for
+    `window` seconds, after at least `min_runtime` seconds of fuzzing.
+    """
+
+    def __init__(self, pattern, window: float, min_runtime: float):
+        self.pattern = pattern
+        self.window = window
+        self.min_runtime = min_runtime
+        self.started = time.monotonic()
+        self.last_growth = None
+        self.best = (-1, -1)
+        self.samples = 0
+
+    def feed(self, line: str) -> None:
+        match = self.pattern.search(line)
+        if not match:
+            return
+        current = (int(match.group("coverage")), int(match.group("corpus")))
+        self.samples += 1
+        if current[0] > self.best[0] or current[1] > self.best[1]:
+            self.best = (max(current[0], self.best[0]), max(current[1], self.best[1]))
+            self.last_growth = time.monotonic()
+
+    def plateaued(self, now: float) -> bool:
+        if self.window <= 0 or self.last_growth is None:
+            return False
+        if now - self.started < self.min_runtime:
+            return False
+        return now - self.last_growth >= self.window
+
+    def summary(self) -> dict:
+        return {
+            "plateau_window": self.window,
+            "progress_samples": self.samples,
+            "max_coverage": self.best[0] if self.best[0] >= 0 else None,
+            "max_corpus": self.best[1] if self.best[1] >= 0 else None,
+            "seconds_since_growth": (
+                round(time.monotonic() - self.last_growth, 2)
+                if self.last_growth is not None else None
+            ),
+        }
@@ -0,0 +1,59 @@
+"""
+Size caps for captured tool output.
+"""
+from collections import deque
+from typing import Optional, Tuple
+
+
+def truncation_marker(dropped: int) -> str:
+    return f"\n...[{dropped} chars truncated]...\n"
+
+
+class BoundedBuffer:
+    """
+    Accumulate output lines keeping at most ``limit`` characters.
+
+    The first quarter of the budget keeps the head of the output (banners,
+    compilation errors); the rest keeps the most recent lines (final reports).
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.head_limit = limit // 4
+        self.head = []
+        self.head_size = 0
+        self.tail = deque()
+        self.tail_size = 0
+        self.dropped = 0
+
+    def append(self, line: str) -> None:
+        if not self.tail and self.head_size + len(line) <= self.head_limit:
+            self.head.append(line)
+            self.head_size += len(line)
+            return
+        self.tail.append(line)
+        self.tail_size += len(line)
+        while self.tail_size > self.limit - self.head_size and len(self.tail) > 1:
+            dropped = self.tail.popleft()
+            self.tail_size -= len(dropped)
+            self.dropped += len(dropped)
+
+    def getvalue(self) -> str:
+        middle = truncation_marker(self.dropped) if self.dropped else ""
+        return "".join(self.head) + middle + "".join(self.tail)
+
+
+def cap_text(text: Optional[str], limit: int) -> Tuple[str, bool]:
+    """
+    Trim text to ``limit`` characters, keeping its head and tail.
+
+    Returns:
+        Tuple (text, truncated).
+    """
+    text = text or ""
+    if limit <= 0 or len(text) <= limit:
+        return text, False
+    head = limit // 4
+    tail = limit - head
+    dropped = len(text) - head - tail
+    return text[:head] + truncation_marker(dropped) + text[-tail:], True
@@ -0,0 +1,318 @@
+"""
+Tool process execution: process groups, rlimits, cancellation and usage accounting.
+"""
+import os
+import time
+import signal
+import logging
+import resource
+import threading
+import subprocess
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .config import ToolConfig
+from .output import BoundedBuffer
+
+logger = logging.getLogger(__name__)
+
+# Mensajes con los que las herramientas reportan falta de memoria
+MEMORY_ERROR_MARKERS = (
+    "out of memory", "cannot allocate memory", "memoryerror",
+    "std::bad_alloc", "heap overflow"
+)
+
+# Segundos durante los que se recuerda una cancelación sin proceso en curso
+CANCEL_MARK_TTL = 30
+
+LineCallback = Callable[[str, str], None]
+
+
+class Invocation:
+    """Everything the runner needs to execute one tool command."""
+
+    def __init__(
+        self,
+        command: List[str],
+        timeout: float,
+        cpu_seconds: Optional[int] = None,
+        cwd: Optional[str] = None,
+        env: Optional[Dict[str, str]] = None,
+        monitor=None,
+        display_command: Optional[str] = None,
+        context: Optional[dict] = None,
+        error_fields: Optional[dict] = None
+    ):
+        self.command = command
+        self.timeout = timeout
+        self.cpu_seconds = cpu_seconds if cpu_seconds is not None else int(timeout)
+        self.cwd = cwd
+        self.env = env
+        self.monitor = monitor
+        self.display_command = display_command or " ".join(command)
+        # Estado propio de la herramienta entre prepare() y parse_result()
+        self.context = context or {}
+        # Campos que la herramienta añade a sus respuestas de error
+        self.error_fields = error_fields or {}
+
+
+class RunOutcome:
+    """Result of one finished tool process."""
+
+    def __init__(self, process: subprocess.CompletedProcess, stop_reason: str, usage: dict, elapsed: float):
+        self.process = process
+        self.stop_reason = stop_reason
+        self.usage = usage
+        self.elapsed = elapsed
+
+    @property
+    def returncode(self) -> int:
+        return self.process.returncode
+
+    @property
+    def stdout(self) -> str:
+        return self.process.stdout
+
+    @property
+    def stderr(self) -> str:
+        return self.process.stderr
+
+
+def kill_tree(process: subprocess.Popen, sig: int = signal.SIGKILL) -> None:
+    """Send sig to the whole process group of process."""
+    try:
+        os.killpg(process.pid, sig)
+    except ProcessLookupError:
+        pass
+
+
+def resource_usage(rusage, wall_seconds: float, returncode: int, stderr: str, limits: dict) -> dict:
+    """Build the resource usage report of a finished run."""
+    limit_exceeded = None
+    stderr_lower = (stderr or "").lower()
+    cpu_used = (rusage.ru_utime + rusage.ru_stime) if rusage is not None else 0
+    if returncode == -signal.SIGXCPU or (
+        returncode == -signal.SIGKILL and 0 < limits["cpu_seconds"] <= cpu_used
+    ):
+        limit_exceeded = "cpu_time"
+    elif returncode == -signal.SIGXFSZ:
+        limit_exceeded = "file_size"
+    elif any(marker in stderr_lower for marker in MEMORY_ERROR_MARKERS):
+        limit_exceeded = "memory"
+
+    usage = {
+        "wall_seconds": round(wall_seconds, 3),
+        "limits": limits,
+        "limit_exceeded": limit_exceeded,
+    }
+    if rusage is not None:
+        usage.update({
+            "cpu_user_seconds": round(rusage.ru_utime, 3),
+            "cpu_system_seconds": round(rusage.ru_stime, 3),
+            # ru_maxrss está en KiB en Linux
+            "max_rss_mb": round(rusage.ru_maxrss / 1024, 1),
+            "fs_read_blocks": rusage.ru_inblock,
+            "fs_write_blocks": rusage.ru_oublock,
+        })
+    return usage
+
+
+class ProcessRunner:
+    """
+    Run tool commands in their own process group and keep them cancellable.
+
+    Processes are indexed by analysis_id. A cancellation that arrives before
+    the process starts is remembered for CANCEL_MARK_TTL seconds and consumed
+    by the first run that observes it.
+    """
+
+    def __init__(self, config: ToolConfig):
+        self.config = config
+        self._running: Dict[str, List[subprocess.Popen]] = {}
+        self._cancelled: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def running_count(self) -> int:
+        with self._lock:
+            return sum(len(processes) for processes in self._running.values())
+
+    def has_running(self, analysis_id: str) -> bool:
+        with self._lock:
+            return bool(self._running.get(analysis_id))
+
+    def cancel(self, analysis_id: str) -> bool:
+        """Kill every process tree running for analysis_id."""
+        now = time.monotonic()
+        with self._lock:
+            for key, marked_at in list(self._cancelled.items()):
+                if now - marked_at > CANCEL_MARK_TTL:
+                    del self._cancelled[key]
+            self._cancelled[analysis_id] = now
+            processes = list(self._running.get(analysis_id, []))
+        for process in processes:
+            kill_tree(process)
+        return bool(processes)
+
+    def consume_cancel_mark(self, analysis_id: str) -> bool:
+        """Pop the cancellation mark of analysis_id, if any."""
+        with self._lock:
+            return self._cancelled.pop(analysis_id, None) is not None
+
+    def limit_process(self, cpu_seconds: int) -> Tuple[dict, Callable[[], None]]:
+        """
+        Memory, CPU-time and file-size rlimits for a tool process.
+
+        The limits are set in the child between fork and exec (the returned
+        function is the Popen preexec_fn), so the tool never runs unconfined
+        and every process it forks (crytic-compile, solc) inherits them.
+
+        RLIMIT_DATA is used for memory: it bounds what the process actually maps
+        for writing, so runtimes that reserve large address ranges up front (Go,
+        GHC) are not killed at startup. Limits are inherited by child processes
+        but apply to each process separately.
+
+        Returns:
+            (limits reported in the usage block, preexec_fn)
+        """
+        memory_mb = self.config.MEMORY_LIMIT_MB
+        file_size_mb = self.config.FILE_SIZE_LIMIT_MB
+        limits = {
+            "memory_mb": memory_mb,
+            "cpu_seconds": cpu_seconds,
+            "file_size_mb": file_size_mb,
+        }
+        requested = [
+            (resource.RLIMIT_DATA, memory_mb * 1024 * 1024),
+            # El límite duro deja margen para que SIGXCPU llegue antes de SIGKILL
+            (resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 5)),
+            (resource.RLIMIT_FSIZE, file_size_mb * 1024 * 1024),
+        ]
+        rlimits = []
+        for rlimit, value in requested:
+            soft, hard = value if isinstance(value, tuple) else (value, value)
+            if soft <= 0:
+                continue
+            # Un proceso sin privilegios no puede subir su límite duro: se
+            # ajusta aquí porque en el hijo no hay logging seguro
+            _, current_hard = resource.getrlimit(rlimit)
+            if current_hard != resource.RLIM_INFINITY and hard > current_hard:
+                logger.warning("rlimit %s capped to the inherited hard limit %s", rlimit, current_hard)
+                hard = current_hard
+                soft = min(soft, current_hard)
+            rlimits.append((rlimit, (soft, hard)))
+
+        def preexec():
+            # Entre fork y exec: solo llamadas al sistema, sin locks ni logging
+            for rlimit, value in rlimits:
+                try:
+                    resource.setrlimit(rlimit, value)
+                except (OSError, ValueError):
+                    pass
+
+        return limits, preexec
+
+    def run(
+        self,
+        invocation: Invocation,
+        analysis_id: str,
+        on_line: Optional[LineCallback] = None
+    ) -> RunOutcome:
+        """
+        Run a tool in its own process group, streaming its output line by line.
+
+        On plateau the process group gets SIGINT so the fuzzer can print its
+        final report; if it does not exit within STOP_GRACE seconds it is
+        killed. on_line receives (stream_name, line) from the reader threads.
+        Captured output is bounded by MAX_CAPTURE_CHARS per stream.
+
+        The process is reaped with wait4 so its CPU time, max RSS and block
+        I/O can be reported.
+
+        Returns:
+            RunOutcome whose stop_reason is "completed", "plateau" or "cancelled".
+
+        Raises:
+            subprocess.TimeoutExpired: If the hard timeout expires first.
+        """
+        command = invocation.command
+        timeout = invocation.timeout
+        monitor = invocation.monitor
+        cpu_seconds = self.config.CPU_TIME_LIMIT or invocation.cpu_seconds
+        limits, preexec = self.limit_process(cpu_seconds)
+
+        process = subprocess.Popen(
+            command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            cwd=invocation.cwd,
+            start_new_session=True,
+            env=invocation.env,
+            preexec_fn=preexec
+        )
+        with self._lock:
+            self._running.setdefault(analysis_id, []).append(process)
+            cancelled_early = analysis_id in self._cancelled
+        if cancelled_early:
+            kill_tree(process)
+        stdout_buffer = BoundedBuffer(self.config.MAX_CAPTURE_CHARS)
+        stderr_buffer = BoundedBuffer(self.config.MAX_CAPTURE_CHARS)
+
+        def pump(stream, sink, stream_name):
+            for line in stream:
+                sink.append(line)
+                if monitor is not None:
+                    monitor.feed(line)
+                if on_line is not None:
+                    on_line(stream_name, line)
+
+        readers = [
+            threading.Thread(target=pump, args=(process.stdout, stdout_buffer, "stdout"), daemon=True),
+            threading.Thread(target=pump, args=(process.stderr, stderr_buffer, "stderr"), daemon=True),
+        ]
+        for reader in readers:
+            reader.start()
+
+        stop_reason = "completed"
+        started = time.monotonic()
+        deadline = started + timeout
+        rusage = None
+        poll_interval = 0.05
+        try:
+            while True:
+                pid, status, rusage = os.wait4(process.pid, os.WNOHANG)
+                if pid:
+                    process.returncode = os.waitstatus_to_exitcode(status)
+                    break
+                now = time.monotonic()
+                if now >= deadline:
+                    kill_tree(process)
+                    _, status, rusage = os.wait4(process.pid, 0)
+                    process.returncode = os.waitstatus_to_exitcode(status)
+                    if stop_reason == "completed":
+                        raise subprocess.TimeoutExpired(command, timeout)
+                    break
+                if stop_reason == "completed" and monitor is not None and monitor.plateaued(now):
+                    logger.info("Coverage plateau reached; stopping campaign")
+                    stop_reason = "plateau"
+                    kill_tree(process, signal.SIGINT)
+                    deadline = min(deadline, now + self.config.STOP_GRACE)
+                time.sleep(poll_interval)
+                # Sondeo rápido al inicio para no penalizar ejecuciones cortas
+                poll_interval = min(poll_interval * 2, 0.5)
+        finally:
+            with self._lock:
+                self._running[analysis_id].remove(process)
+                if not self._running[analysis_id]:
+                    del self._running[analysis_id]
+                # La marca de cancelación se consume con la ejecución afectada
+                if self._cancelled.pop(analysis_id, None) is not None:
+                    stop_reason = "cancelled"
+
+        for reader in readers:
+            reader.join(timeout=5)
+        elapsed = time.monotonic() - started
+        result = subprocess.CompletedProcess(
+            command, process.returncode, stdout_buffer.getvalue(), stderr_buffer.getvalue()
+        )
+        usage = resource_usage(rusage, elapsed, process.returncode, result.stderr, limits)
+        return RunOutcome(result, stop_reason, usage, elapsed)
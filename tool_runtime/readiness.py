@@ -0,0 +1,66 @@
+"""
+Startup warm-up and readiness state of a tool service.
+"""
+import os
+import time
+import logging
+import subprocess
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Contrato trivial incluido en la imagen para el warm-up
+WARMUP_CONTRACT = os.path.join(os.path.dirname(__file__), "warmup", "Warmup.sol")
+
+
+def tool_version(command: List[str], timeout: float) -> Optional[str]:
+    """Return the last non-empty output line of a version command."""
+    try:
+        completed = subprocess.run(command, capture_output=True, text=True, timeout=timeout)
+    except (OSError, subprocess.TimeoutExpired) as exc:
+        logger.warning("Could not get version with %s: %s", " ".join(command), exc)
+        return None
+    lines = [
+        line.strip()
+        for line in (completed.stdout + completed.stderr).splitlines()
+        if line.strip()
+    ]
+    return lines[-1] if lines else None
+
+
+class Readiness:
+    """
+    Warm-up state of a tool service.
+
+    The service is live as soon as the process answers and ready once a
+    warm-up run on WARMUP_CONTRACT has succeeded, so the first real analysis
+    does not pay the cold-start cost of the tool.
+    """
+
+    def __init__(self):
+        self.status = "starting"
+        self.versions: Dict[str, Optional[str]] = {}
+        self.warmup: Optional[dict] = None
+        self.attempts = 0
+        self.started = time.time()
+        self.ready_at: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.status == "ready"
+
+    def mark_ready(self) -> None:
+        self.status = "ready"
+        self.ready_at = time.time()
+
+    def snapshot(self) -> dict:
+        return {
+            "ready": self.ready,
+            "status": self.status,
+            "versions": self.versions,
+            "warmup": self.warmup,
+            "warmup_attempts": self.attempts,
+            "startup_seconds": (
+                round(self.ready_at - self.started, 2) if self.ready_at is not None else None
+            ),
+        }
@@ -0,0 +1,172 @@
+"""
+Declaration of a tool service: request model, command builder and result parser.
+"""
+import os
+from typing import Any, Dict, List, Optional
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from .config import ToolConfig, WORKSPACE_DIR
+from .process import Invocation, RunOutcome
+
+
+class AnalysisRequest(BaseModel):
+    analysis_id: str
+    # Ruta del archivo principal relativa al workspace del análisis
+    filename: str
+    # Timeout opcional asignado por la API (validado contra el máximo del servidor)
+    timeout: Optional[int] = None
+    # Remapeos de imports (prefijo=ruta relativa al workspace) de un análisis
+    # de proyecto; None en los análisis de un solo archivo
+    remappings: Optional[List[str]] = None
+
+
+class ToolError(Exception):
+    """Request rejected before the tool runs (missing input, invalid parameters)."""
+
+    def __init__(self, status_code: int, error_type: str, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+        self.error_type = error_type
+        self.message = message
+
+    def response(self) -> JSONResponse:
+        return JSONResponse(
+            status_code=self.status_code,
+            content={
+                "success": False,
+                "error": self.message,
+                "error_type": self.error_type
+            }
+        )
+
+
+class ToolSpec:
+    """
+    Base class of a tool service.
+
+    Subclasses declare the service metadata and implement prepare() (validate
+    the request and build the command) and parse_result() (turn the finished
+    process into the response). Execution, limits, queueing, cancellation,
+    streaming, caching and metrics are handled by the runtime.
+    """
+
+    # Prefijo de las variables de entorno y de los logs
+    name: str = ""
+    # Título de la aplicación FastAPI
+    title: str = ""
+    # Nombre devuelto por GET /
+    service_name: str = ""
+    version: str = "1.0"
+    request_model = AnalysisRequest
+    # Valores por defecto propios de la herramienta (ver RUNTIME_DEFAULTS)
+    defaults: Dict[str, Any] = {}
+    # Comandos cuya salida identifica la versión de cada binario usado
+    version_commands: Dict[str, List[str]] = {}
+
+    def __init__(self):
+        self.config = ToolConfig(self.name.upper(), self.defaults)
+
+    def contract_dir(self, request: AnalysisRequest) -> str:
+        return os.path.join(WORKSPACE_DIR, request.analysis_id)
+
+    def contract_path(self, request: AnalysisRequest) -> str:
+        path = os.path.normpath(os.path.join(WORKSPACE_DIR, request.analysis_id, request.filename))
+        if not path.startswith(self.contract_dir(request) + os.sep):
+            raise self.invalid("filename must be a path inside the analysis workspace")
+        return path
+
+    def require_path(self, path: str, label: str = "Contract") -> str:
+        """Raise a 404 ToolError if path does not exist."""
+        if not os.path.exists(path):
+            raise ToolError(404, "file_not_found", f"{label} not found: {path}")
+        return path
+
+    def remapping_args(self, request: AnalysisRequest) -> List[str]:
+        """
+        Remappings of a project analysis with absolute targets.
+
+        Absolute targets resolve the same way for solc and crytic-compile,
+        whatever the working directory of the tool.
+
+        Raises:
+            ToolError: If a remapping is malformed or points outside the workspace.
+        """
+        contract_dir = self.contract_dir(request)
+        resolved = []
+        for remapping in request.remappings or []:
+            prefix, separator, target = remapping.partition("=")
+            if not separator or not prefix or any(char.isspace() for char in remapping):
+                raise self.invalid(f"Invalid remapping: {remapping}")
+            path = os.path.normpath(os.path.join(contract_dir, target))
+            if path != contract_dir and not path.startswith(contract_dir + os.sep):
+                raise self.invalid(f"Remapping target outside the project: {remapping}")
+            resolved.append(f"{prefix}={path}{'/' if target.endswith('/') else ''}")
+        return resolved
+
+    def crytic_compile_args(self, request: AnalysisRequest) -> List[str]:
+        """crytic-compile arguments for the project layout (Slither, Medusa, Echidna)."""
+        if request.remappings is None:
+            return []
+        contract_dir = self.contract_dir(request)
+        args = []
+        remappings = self.remapping_args(request)
+        if remappings:
+            args += ["--solc-remaps", " ".join(remappings)]
+        return args + ["--solc-args", f"--base-path {contract_dir} --allow-paths {contract_dir}"]
+
+    def source_files(self, request: AnalysisRequest) -> List[str]:
+        """Every Solidity file of the analysis workspace, main file first."""
+        contract_path = self.contract_path(request)
+        sources = []
+        for root, _, names in os.walk(self.contract_dir(request)):
+            sources.extend(
+                os.path.join(root, name) for name in names
+                if name.endswith(".sol") and os.path.join(root, name) != contract_path
+            )
+        return [contract_path] + sorted(sources)
+
+    def resolve_timeout(self, request: AnalysisRequest) -> int:
+        """Return the requested timeout or the server default, validated."""
+        config = self.config
+        timeout = (
+            request.timeout if request.timeout is not None
+            else min(config.DEFAULT_TIMEOUT, config.MAX_TIMEOUT)
+        )
+        if not 1 <= timeout <= config.MAX_TIMEOUT:
+            raise self.invalid(f"timeout must be between 1 and {config.MAX_TIMEOUT}")
+        return timeout
+
+    @staticmethod
+    def invalid(message: str) -> ToolError:
+        return ToolError(422, "invalid_parameters", message)
+
+    def prepare(self, request: AnalysisRequest) -> Invocation:
+        """
+        Validate the request and build the command to run.
+
+        Runs in a worker thread, so it may touch the filesystem.
+
+        Raises:
+            ToolError: If the request cannot be served.
+        """
+        raise NotImplementedError
+
+    def parse_result(self, request: AnalysisRequest, invocation: Invocation, outcome: RunOutcome) -> dict:
+        """Build the response of a run that was not cancelled nor timed out."""
+        raise NotImplementedError
+
+    def cache_inputs(self, request: AnalysisRequest) -> List[str]:
+        """Files whose content identifies the input, for the result cache."""
+        if request.remappings is not None:
+            return self.source_files(request)
+        return [self.contract_path(request)]
+
+    def warmup_options(self) -> Dict[str, Any]:
+        """Request parameters of the startup warm-up run (kept short)."""
+        return {}
+
+    def info(self) -> dict:
+        """Extra fields for GET /."""
+        return {}
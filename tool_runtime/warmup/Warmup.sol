@@ -0,0 +1,17 @@
+// SPDX-License-Identifier: MIT
+pragma solidity ^0.8.0;
+
+// Contrato mínimo con el que cada servicio calienta su herramienta al arrancar
+contract Warmup {
+    uint256 private counter;
+
+    function increment(uint256 amount) public {
+        uint256 previous = counter;
+        counter += amount % 100;
+        assert(counter >= previous);
+    }
+
+    function current() public view returns (uint256) {
+        return counter;
+    }
+}